@@ -1,17 +1,28 @@
 """Módulo de navegação e interação com o browser."""
 
 from atc.navegacao.acoes_pagina import (
+    ErroPortalSefaz,
+    aguardar_elemento_ou_erro_portal,
     aguardar_pagina_carregar,
     clicar_em_elemento_por_texto,
     clicar_em_link_por_texto,
+    ler_mensagem_erro_portal,
     preencher_campo_data_mascarado,
     tirar_captura_de_tela_em_erro,
 )
+from atc.navegacao.artefatos_falha import ColetorArtefatosFalha
+from atc.navegacao.reproducao_har import ReprodutorHar, instalar_reproducao_har
 
 __all__ = [
+    "ColetorArtefatosFalha",
+    "ErroPortalSefaz",
+    "ReprodutorHar",
+    "aguardar_elemento_ou_erro_portal",
     "aguardar_pagina_carregar",
     "clicar_em_elemento_por_texto",
     "clicar_em_link_por_texto",
+    "instalar_reproducao_har",
+    "ler_mensagem_erro_portal",
     "preencher_campo_data_mascarado",
     "tirar_captura_de_tela_em_erro",
 ]
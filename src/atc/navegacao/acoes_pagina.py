@@ -1,22 +1,89 @@
 """
 Funções atômicas de interação com o browser (clicar, aguardar, captura de tela em erro).
+As esperas disputam o elemento esperado com as mensagens de erro do portal (growl/messages):
+se o portal recusar a etapa, a espera aborta na hora com o texto do próprio portal.
 """
 
 import asyncio
 from pathlib import Path
 
-from playwright.async_api import Page
+from playwright.async_api import Locator, Page
 
 from icms_pi import configuracoes
+from icms_pi.instrumentacao import etapa_cronometrada
 from icms_pi.logger import configurar_logger_da_aplicacao
 
 logger = configurar_logger_da_aplicacao(__name__)
 
 
+class ErroPortalSefaz(Exception):
+    """O portal exibiu mensagem de erro (ex.: I.E. não cadastrada, período não permitido)."""
+
+
+async def ler_mensagem_erro_portal(pagina: Page) -> str | None:
+    """Retorna o texto das mensagens de erro visíveis do portal (ou None se não houver)."""
+    mensagens = pagina.locator(configuracoes.SELETOR_PI_MENSAGENS_ERRO)
+    textos: list[str] = []
+    for indice in range(await mensagens.count()):
+        mensagem = mensagens.nth(indice)
+        if not await mensagem.is_visible():
+            continue
+        texto = " ".join((await mensagem.inner_text()).split())
+        if texto and texto not in textos:
+            textos.append(texto)
+    return " — ".join(textos) if textos else None
+
+
+async def _levantar_erro_portal(pagina: Page) -> None:
+    mensagem = await ler_mensagem_erro_portal(pagina)
+    raise ErroPortalSefaz(mensagem or "Portal exibiu mensagem de erro sem texto")
+
+
+async def aguardar_elemento_ou_erro_portal(
+    pagina: Page, locator: Locator, timeout: int | None = None,
+) -> None:
+    """
+    Aguarda o elemento ficar visível ou o portal exibir mensagem de erro, o que vier primeiro.
+    Se o elemento não apareceu e há erro do portal, levanta ErroPortalSefaz com o texto do portal.
+    """
+    if timeout is None:
+        timeout = configuracoes.TIMEOUT_AGUARDAR_ELEMENTO_MS
+    # Só mensagens visíveis entram na disputa: ``.first`` escolhe pela ordem no DOM, e um
+    # contêiner de mensagens oculto antes do campo prenderia a espera até o timeout
+    mensagens = pagina.locator(configuracoes.SELETOR_PI_MENSAGENS_ERRO).filter(visible=True)
+    await locator.or_(mensagens).first.wait_for(state="visible", timeout=timeout)
+    if not await locator.is_visible():
+        await _levantar_erro_portal(pagina)
+
+
+@etapa_cronometrada("aguardar_pagina_carregar")
 async def aguardar_pagina_carregar(pagina: Page) -> None:
-    """Aguarda a página atingir estado networkidle (rede ociosa)."""
+    """
+    Aguarda a página atingir estado networkidle (rede ociosa). Se o portal exibir mensagem
+    de erro antes disso, levanta ErroPortalSefaz sem esperar a rede ficar ociosa.
+    """
     logger.debug("Aguardando estado networkidle da página.")
-    await pagina.wait_for_load_state("networkidle", timeout=configuracoes.TIMEOUT_PAGINA_CARREGAR_MS)
+    timeout = configuracoes.TIMEOUT_PAGINA_CARREGAR_MS
+    tarefa_rede = asyncio.ensure_future(
+        pagina.wait_for_load_state("networkidle", timeout=timeout)
+    )
+    tarefa_erro = asyncio.ensure_future(
+        pagina.locator(configuracoes.SELETOR_PI_MENSAGENS_ERRO).first.wait_for(
+            state="visible", timeout=timeout
+        )
+    )
+    try:
+        concluidas, _ = await asyncio.wait(
+            {tarefa_rede, tarefa_erro}, return_when=asyncio.FIRST_COMPLETED
+        )
+        if tarefa_erro in concluidas and tarefa_erro.exception() is None:
+            await _levantar_erro_portal(pagina)
+        await tarefa_rede
+    finally:
+        for tarefa in (tarefa_rede, tarefa_erro):
+            if not tarefa.done():
+                tarefa.cancel()
+        await asyncio.gather(tarefa_rede, tarefa_erro, return_exceptions=True)
     logger.debug("Página em estado networkidle.")
 
 
@@ -24,7 +91,7 @@ async def clicar_em_link_por_texto(pagina: Page, texto_do_link: str) -> None:
     """Clica em um link cujo texto visível corresponde exatamente ao informado."""
     logger.debug("Procurando link com texto: %s", texto_do_link)
     locator = pagina.get_by_role("link", name=texto_do_link)
-    await locator.wait_for(state="visible", timeout=configuracoes.TIMEOUT_AGUARDAR_ELEMENTO_MS)
+    await aguardar_elemento_ou_erro_portal(pagina, locator)
     await locator.click()
     logger.info("Clicado no link: %s", texto_do_link)
 
@@ -33,7 +100,7 @@ async def clicar_em_elemento_por_texto(pagina: Page, texto_visivel: str) -> None
     """Clica em qualquer elemento cujo texto visível corresponda ao informado."""
     logger.debug("Procurando elemento com texto: %s", texto_visivel)
     locator = pagina.get_by_text(texto_visivel, exact=True)
-    await locator.wait_for(state="visible", timeout=configuracoes.TIMEOUT_AGUARDAR_ELEMENTO_MS)
+    await aguardar_elemento_ou_erro_portal(pagina, locator)
     await locator.click()
     logger.info("Clicado no elemento: %s", texto_visivel)
 
@@ -41,7 +108,7 @@ async def clicar_em_elemento_por_texto(pagina: Page, texto_visivel: str) -> None
 async def preencher_campo_data_mascarado(pagina: Page, seletor: str, valor_dd_mm_aaaa: str) -> None:
     """Preenche campo de data com máscara: foca, seleciona tudo (Ctrl+A), digita o valor."""
     locator = pagina.locator(seletor)
-    await locator.wait_for(state="visible", timeout=configuracoes.TIMEOUT_AGUARDAR_ELEMENTO_MS)
+    await aguardar_elemento_ou_erro_portal(pagina, locator)
     await locator.click()
     await pagina.keyboard.press("Control+a")
     await pagina.keyboard.type(valor_dd_mm_aaaa, delay=30)
@@ -55,7 +122,7 @@ async def preencher_campo_valor_mascarado(pagina: Page, seletor: str, valor: flo
     """
     valor_str = f"{valor:.2f}".replace(".", ",")  # ex: 1234.56 -> "1234,56"
     locator = pagina.locator(seletor)
-    await locator.wait_for(state="visible", timeout=configuracoes.TIMEOUT_AGUARDAR_ELEMENTO_MS)
+    await aguardar_elemento_ou_erro_portal(pagina, locator)
     await locator.click()
     await pagina.keyboard.press("Control+a")
     await pagina.keyboard.type(valor_str, delay=40)
@@ -0,0 +1,357 @@
+"""
+Artefatos de falha da automação (captura de tela, DOM e trace), fora do caminho crítico.
+
+Para cada I.E. com falha, ``ColetorArtefatosFalha.registrar_falha``:
+
+1. calcula a assinatura da tela de erro (processo, etapa, caminho da URL, classe do erro e
+   mensagem com dígitos mascarados);
+2. tira o screenshot JPEG recortado na região dos formulários e mensagens (codificado pelo
+   Chromium) e, no próprio Chromium, o hash perceptual dele (dHash de 64 bits sobre a imagem
+   reduzida a 9x8). Mesma assinatura e hash a até ``ARTEFATOS_DISTANCIA_HASH_TELA`` bits de
+   uma captura existente é tela repetida: não gera nova captura, só uma linha no
+   ``indice.jsonl``. Os dígitos da I.E. no formulário somem na redução; um formulário em outro
+   estado, não;
+3. para telas novas, captura o restante antes da próxima navegação: se configurado, o DOM
+   (HTML ou MHTML via CDP) e o chunk do trace do Playwright da I.E.;
+4. entrega compressão, escrita em disco e a poda pelo orçamento de disco a uma thread, sem
+   que o lote espere.
+"""
+
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from playwright.async_api import BrowserContext, Page
+
+from icms_pi import configuracoes
+from icms_pi.logger import configurar_logger_da_aplicacao
+from atc.navegacao.acoes_pagina import ler_mensagem_erro_portal
+
+logger = configurar_logger_da_aplicacao(__name__)
+
+ARQUIVO_INDICE = "indice.jsonl"
+
+# Região de interesse: união das mensagens de erro e formulários visíveis, limitada à viewport
+_JS_REGIAO_RELEVANTE = """
+(seletorErro) => {
+    const caixas = [];
+    for (const el of document.querySelectorAll(seletorErro + ", form")) {
+        const r = el.getBoundingClientRect();
+        if (r.width > 0 && r.height > 0) caixas.push(r);
+    }
+    if (!caixas.length) return null;
+    const x = Math.max(0, Math.min(...caixas.map((r) => r.left)) - 8);
+    const y = Math.max(0, Math.min(...caixas.map((r) => r.top)) - 8);
+    const direita = Math.min(window.innerWidth, Math.max(...caixas.map((r) => r.right)) + 8);
+    const baixo = Math.min(window.innerHeight, Math.max(...caixas.map((r) => r.bottom)) + 8);
+    if (direita <= x || baixo <= y) return null;
+    return {x, y, width: direita - x, height: baixo - y};
+}
+"""
+
+
+# dHash da captura: imagem reduzida a 9x8 em tons de cinza, 1 bit por vizinho horizontal.
+# Roda no Chromium (decodificação e redução da imagem), sem dependência de imagem no Python.
+_JS_HASH_PERCEPTUAL = """
+async ([dados, tipo]) => {
+    const imagem = new Image();
+    imagem.src = `data:${tipo};base64,${dados}`;
+    try {
+        await imagem.decode();
+    } catch (e) {
+        return null;
+    }
+    const canvas = document.createElement("canvas");
+    canvas.width = 9;
+    canvas.height = 8;
+    const ctx = canvas.getContext("2d");
+    ctx.imageSmoothingQuality = "high";
+    ctx.drawImage(imagem, 0, 0, 9, 8);
+    const px = ctx.getImageData(0, 0, 9, 8).data;
+    const cinza = (i) => px[i] * 0.299 + px[i + 1] * 0.587 + px[i + 2] * 0.114;
+    let bits = "";
+    for (let y = 0; y < 8; y++) {
+        for (let x = 0; x < 8; x++) {
+            const i = (y * 9 + x) * 4;
+            bits += cinza(i) > cinza(i + 4) ? "1" : "0";
+        }
+    }
+    return bits;
+}
+"""
+
+
+def assinatura_da_falha(
+    processo: str, etapa: str, url: str, erro: BaseException, mensagem_portal: str | None
+) -> str:
+    """Hash do conteúdo da tela de erro, estável entre I.E.s (dígitos e espaços normalizados)."""
+    texto = mensagem_portal or str(erro).split("\n")[0]
+    texto = re.sub(r"\d+", "#", " ".join(texto.lower().split()))[:200]
+    base = "|".join((processo, etapa, urlsplit(url).path, type(erro).__name__, texto))
+    return hashlib.sha1(base.encode("utf-8")).hexdigest()
+
+
+def telas_semelhantes(hash_a: str | None, hash_b: str | None) -> bool:
+    """Hashes perceptuais (hex) a até ``ARTEFATOS_DISTANCIA_HASH_TELA`` bits; sem hash, iguais."""
+    if hash_a is None or hash_b is None:
+        return True
+    distancia = (int(hash_a, 16) ^ int(hash_b, 16)).bit_count()
+    return distancia <= configuracoes.ARTEFATOS_DISTANCIA_HASH_TELA
+
+
+def _tamanho_pasta(pasta: Path) -> list[tuple[float, int, Path]]:
+    arquivos = []
+    for caminho in pasta.iterdir():
+        if caminho.is_file() and caminho.name != ARQUIVO_INDICE:
+            estado = caminho.stat()
+            arquivos.append((estado.st_mtime, estado.st_size, caminho))
+    return arquivos
+
+
+class ColetorArtefatosFalha:
+    """Artefatos de falha de um processo em uma execução (um por contexto do navegador)."""
+
+    # Uma thread de escrita compartilhada: ordem de escrita preservada e poda sem corrida
+    _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="artefatos-falha")
+    _trava_indice = threading.Lock()
+
+    def __init__(self, processo: str, contexto: BrowserContext | None = None) -> None:
+        self._processo = processo
+        self._contexto = contexto
+        self._pasta = configuracoes.PASTA_CAPTURAS_ERROS_ABSOLUTA
+        self._trace_ativo = False
+        self._chunk_aberto = False
+        self._pendentes: set[Future] = set()
+        self._assinaturas = self._carregar_assinaturas()
+        # Capturas ainda na fila da thread de escrita; gravadas, valem pelo disco (a poda as
+        # remove de lá)
+        self._capturas_a_gravar: set[str] = set()
+        self._trava_capturas = threading.Lock()
+
+    def _carregar_assinaturas(self) -> dict[str, list[tuple[str | None, str]]]:
+        """
+        Capturas já registradas que ainda existem, por assinatura: (hash perceptual, arquivo).
+        Deduplicação entre execuções.
+        """
+        assinaturas: dict[str, list[tuple[str | None, str]]] = {}
+        try:
+            with open(self._pasta / ARQUIVO_INDICE, encoding="utf-8") as arquivo:
+                for linha in arquivo:
+                    try:
+                        registro = json.loads(linha)
+                    except ValueError:
+                        continue
+                    captura = registro.get("captura")
+                    if (
+                        captura and not registro.get("repetida")
+                        and (self._pasta / captura).exists()
+                    ):
+                        assinaturas.setdefault(registro["assinatura"], []).append(
+                            (registro.get("hash_tela"), captura)
+                        )
+        except OSError:
+            pass
+        return assinaturas
+
+    async def iniciar(self) -> None:
+        """Liga o trace do Playwright no contexto (se configurado); os chunks são por I.E."""
+        if configuracoes.ARTEFATOS_TRACE and self._contexto is not None:
+            await self._contexto.tracing.start(screenshots=True, snapshots=True)
+            self._trace_ativo = True
+
+    async def iniciar_ie(self) -> None:
+        if self._trace_ativo:
+            await self._fechar_chunk()
+            await self._contexto.tracing.start_chunk()
+            self._chunk_aberto = True
+
+    async def concluir_ie(self) -> None:
+        """I.E. sem falha: descarta o chunk de trace."""
+        await self._fechar_chunk()
+
+    async def _fechar_chunk(self, caminho: Path | None = None) -> None:
+        if not self._chunk_aberto:
+            return
+        self._chunk_aberto = False
+        try:
+            await self._contexto.tracing.stop_chunk(path=str(caminho) if caminho else None)
+        except Exception:
+            logger.exception("Falha ao fechar chunk do trace do Playwright.")
+
+    def _captura_existe(self, captura: str) -> bool:
+        with self._trava_capturas:
+            if captura in self._capturas_a_gravar:
+                return True
+        return (self._pasta / captura).exists()
+
+    def _captura_semelhante(self, assinatura: str, hash_tela: str | None) -> str | None:
+        """Captura existente da mesma tela; esquece as que a poda já removeu."""
+        capturas = self._assinaturas.get(assinatura, [])
+        capturas[:] = [(h, c) for h, c in capturas if self._captura_existe(c)]
+        return next((c for h, c in capturas if telas_semelhantes(h, hash_tela)), None)
+
+    async def registrar_falha(
+        self, pagina: Page, etapa: str, ie: str, erro: BaseException
+    ) -> None:
+        """Captura os artefatos da falha (ou só indexa, se a tela já foi capturada)."""
+        try:
+            mensagem_portal = await ler_mensagem_erro_portal(pagina)
+            assinatura = assinatura_da_falha(
+                self._processo, etapa, pagina.url, erro, mensagem_portal
+            )
+            registro = {
+                "ts": datetime.now().isoformat(timespec="seconds"),
+                "processo": self._processo,
+                "ie": ie,
+                "etapa": etapa,
+                "classe_erro": type(erro).__name__,
+                "mensagem": mensagem_portal or str(erro).split("\n")[0][:200],
+                "assinatura": assinatura,
+            }
+            nome_base = (
+                f"erro_{self._processo}_{etapa}_{ie}_"
+                f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{assinatura[:8]}"
+            )
+            nome_tela, tela = await self._capturar_tela(pagina, nome_base)
+            hash_tela = await self._hash_perceptual(pagina, tela)
+            registro["hash_tela"] = hash_tela
+            existente = self._captura_semelhante(assinatura, hash_tela)
+            if existente:
+                await self._fechar_chunk()
+                registro.update(captura=existente, repetida=True)
+                self._agendar(self._gravar, registro, {})
+                logger.info("Falha da IE %s igual a captura existente (%s).", ie, existente)
+                return
+
+            conteudos = {nome_tela: tela}
+            conteudos.update(await self._capturar_restante(pagina, nome_base))
+            self._assinaturas.setdefault(assinatura, []).append((hash_tela, nome_tela))
+            with self._trava_capturas:
+                self._capturas_a_gravar.add(nome_tela)
+            registro.update(captura=nome_tela, repetida=False)
+            self._agendar(self._gravar, registro, conteudos)
+        except Exception:
+            # Artefato é diagnóstico: nunca derruba o lote
+            logger.exception("Falha ao coletar artefatos de erro da IE %s.", ie)
+
+    async def _capturar_tela(self, pagina: Page, nome_base: str) -> tuple[str, bytes]:
+        """Screenshot recortado na região relevante: (nome do arquivo, bytes)."""
+        formato = configuracoes.ARTEFATOS_FORMATO_CAPTURA
+        opcoes: dict[str, object] = {"type": formato, "animations": "disabled"}
+        if formato == "jpeg":
+            opcoes["quality"] = configuracoes.ARTEFATOS_QUALIDADE_JPEG
+        regiao = await pagina.evaluate(_JS_REGIAO_RELEVANTE, configuracoes.SELETOR_PI_MENSAGENS_ERRO)
+        if regiao:
+            opcoes["clip"] = regiao
+        extensao = "jpg" if formato == "jpeg" else formato
+        return f"{nome_base}.{extensao}", await pagina.screenshot(**opcoes)
+
+    @staticmethod
+    async def _hash_perceptual(pagina: Page, tela: bytes) -> str | None:
+        """dHash (hex, 64 bits) da captura; None se o Chromium não decodificar a imagem."""
+        tipo = "image/jpeg" if configuracoes.ARTEFATOS_FORMATO_CAPTURA == "jpeg" else "image/png"
+        try:
+            bits = await pagina.evaluate(
+                _JS_HASH_PERCEPTUAL, [base64.b64encode(tela).decode("ascii"), tipo]
+            )
+        except Exception:
+            logger.debug("Hash perceptual da captura indisponível.", exc_info=True)
+            return None
+        return f"{int(bits, 2):016x}" if bits else None
+
+    async def _capturar_restante(self, pagina: Page, nome_base: str) -> dict[str, bytes]:
+        """DOM e chunk do trace de uma tela nova (conforme configuração)."""
+        conteudos: dict[str, bytes] = {}
+        if configuracoes.ARTEFATOS_DOM == "html":
+            conteudos[f"{nome_base}.html.gz"] = (await pagina.content()).encode("utf-8")
+        elif configuracoes.ARTEFATOS_DOM == "mhtml":
+            sessao = await pagina.context.new_cdp_session(pagina)
+            try:
+                instantaneo = await sessao.send("Page.captureSnapshot", {"format": "mhtml"})
+            finally:
+                await sessao.detach()
+            conteudos[f"{nome_base}.mhtml.gz"] = instantaneo["data"].encode("utf-8")
+
+        if self._chunk_aberto:
+            # Escrito pelo driver do Playwright; aguardado para liberar o próximo chunk
+            self._pasta.mkdir(parents=True, exist_ok=True)
+            await self._fechar_chunk(self._pasta / f"{nome_base}.trace.zip")
+        return conteudos
+
+    def _agendar(self, funcao, *args: object) -> None:
+        futuro = self._executor.submit(funcao, *args)
+        self._pendentes.add(futuro)
+        futuro.add_done_callback(self._pendentes.discard)
+
+    def _gravar(self, registro: dict[str, object], conteudos: dict[str, bytes]) -> None:
+        """Thread de escrita: arquivos (DOM comprimido), índice e poda pelo orçamento."""
+        try:
+            self._pasta.mkdir(parents=True, exist_ok=True)
+            for nome, dados in conteudos.items():
+                caminho = self._pasta / nome
+                if nome.endswith(".gz"):
+                    dados = gzip.compress(dados, compresslevel=6)
+                caminho.write_bytes(dados)
+                logger.warning("Artefato de erro salvo: %s", caminho)
+            with self._trava_indice, open(self._pasta / ARQUIVO_INDICE, "a", encoding="utf-8") as indice:
+                indice.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        except OSError:
+            logger.exception("Falha ao gravar artefatos de erro em %s", self._pasta)
+        finally:
+            # Gravada (ou perdida): daqui em diante a captura vale pelo que há no disco
+            with self._trava_capturas:
+                self._capturas_a_gravar.difference_update(conteudos)
+        try:
+            self._podar()
+        except OSError:
+            logger.exception("Falha ao podar artefatos de erro em %s", self._pasta)
+
+    def _podar(self) -> None:
+        """Remove os artefatos mais antigos enquanto a pasta passar do orçamento de disco."""
+        orcamento = configuracoes.ARTEFATOS_ORCAMENTO_DISCO_MB * 1024 * 1024
+        arquivos = sorted(_tamanho_pasta(self._pasta))
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        removidos = 0
+        while arquivos and total > orcamento:
+            _, tamanho, caminho = arquivos.pop(0)
+            caminho.unlink(missing_ok=True)
+            total -= tamanho
+            removidos += 1
+        if removidos:
+            logger.info("Orçamento de disco dos artefatos: %d arquivo(s) antigo(s) removido(s).", removidos)
+
+    async def encerrar(self, timeout_s: float = 10.0) -> None:
+        """Para o trace e aguarda as escritas pendentes sem bloquear o event loop."""
+        if self._trace_ativo:
+            await self._fechar_chunk()
+            try:
+                await self._contexto.tracing.stop()
+            except Exception:
+                logger.exception("Falha ao encerrar trace do Playwright.")
+            self._trace_ativo = False
+        pendentes = list(self._pendentes)
+        if not pendentes:
+            return
+        inicio = time.perf_counter()
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(
+                    *(asyncio.wrap_future(f) for f in pendentes), return_exceptions=True
+                ),
+                timeout_s,
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Escritas de artefatos ainda pendentes após %.0f s.", timeout_s)
+            return
+        logger.debug(
+            "Escritas de artefatos concluídas em %.0f ms.", (time.perf_counter() - inicio) * 1000
+        )
@@ -0,0 +1,308 @@
+"""
+Resolução autorreparável de campos do DAR Web.
+
+Os ids gerados pelo JSF (``j_idt43``, ``formCasoGeral:j_idt67`` ...) mudam a cada deploy da
+SEFAZ. Cada campo lógico (I.E., período, datas, valor...) é localizado primeiro pelo seletor
+em cache (sessão → disco → configurado), conferido contra as pistas do campo (um id posicional
+reatribuído pode apontar para outro campo visível); se ele não aparecer ou não conferir, o
+campo é re-resolvido uma vez
+por pistas estáveis (texto do rótulo, tipo do input, classe do widget PrimeFaces) e, por fim,
+volta-se ao seletor configurado.
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from playwright.async_api import Error as PlaywrightError, Page, TimeoutError as PlaywrightTimeoutError
+
+from icms_pi import configuracoes
+from icms_pi.instrumentacao import etapa_cronometrada
+from icms_pi.logger import configurar_logger_da_aplicacao
+from icms_pi.trava_arquivo import TravaArquivo
+from atc.navegacao.acoes_pagina import (
+    ErroPortalSefaz,
+    aguardar_elemento_ou_erro_portal,
+    ler_mensagem_erro_portal,
+)
+
+logger = configurar_logger_da_aplicacao(__name__)
+
+# Pistas estáveis por campo lógico (rótulos já normalizados: minúsculo, sem acento)
+PISTAS_CAMPOS_PI: dict[str, dict[str, object]] = {
+    "select_codigo": {
+        "tag": "select",
+        "rotulos": ("codigo da receita", "codigo", "receita"),
+        "texto_opcao": "113",
+    },
+    "campo_ie": {
+        "tag": "input",
+        "rotulos": ("inscricao estadual", "insc estadual", "i e"),
+        "tipo": "text",
+    },
+    "substituicao": {
+        "tag": "select",
+        "rotulos": ("substituicao tributaria", "substituicao"),
+        "texto_opcao": "nao",
+    },
+    "periodo_referencia": {
+        "tag": "input",
+        "rotulos": ("periodo de referencia", "periodo"),
+        "tipo": "text",
+    },
+    "data_vencimento": {
+        "tag": "input",
+        "rotulos": ("data de vencimento", "vencimento"),
+        "classes_widget": ("ui-calendar", "hasDatepicker"),
+    },
+    "data_pagamento": {
+        "tag": "input",
+        "rotulos": ("data de pagamento", "pagamento"),
+        "classes_widget": ("ui-calendar", "hasDatepicker"),
+    },
+    "valor_principal": {
+        "tag": "input",
+        "rotulos": ("valor principal",),
+        "tipo": "text",
+    },
+}
+
+_MARCADOR_ERRO_PORTAL = "__erro_portal__"
+
+# Funções comuns aos scripts abaixo: normalização, visibilidade, conferência das pistas e
+# campos apontados pelos rótulos (na ordem de ``rotulos``)
+_JS_FUNCOES_PISTAS = """
+    const norm = (s) => (s || "").normalize("NFD").replace(/[\\u0300-\\u036f]/g, "")
+        .toLowerCase().replace(/[:*.]/g, " ").replace(/\\s+/g, " ").trim();
+    const visivel = (el) => !!(el && (el.offsetWidth || el.offsetHeight || el.getClientRects().length));
+    const tag = pistas.tag;
+    const rotulos = pistas.rotulos || [];
+    const classes = pistas.classes_widget || [];
+    const confere = (el) => {
+        if (!el || el.tagName.toLowerCase() !== tag || !visivel(el) || el.disabled) return false;
+        if (pistas.tipo && tag === "input" && (el.type || "text") !== pistas.tipo) return false;
+        if (classes.length && !classes.some((c) => el.classList.contains(c) || el.closest("." + c))) return false;
+        if (pistas.texto_opcao && tag === "select") {
+            return Array.from(el.options).some((o) => norm(o.textContent).startsWith(pistas.texto_opcao));
+        }
+        return true;
+    };
+    const campos = Array.from(document.querySelectorAll(tag));
+    const alvosPorRotulo = () => {
+        const alvos = [];
+        const candidatosRotulo = document.querySelectorAll("label, .ui-outputlabel, span, td, th, legend");
+        for (const rotulo of rotulos) {
+            for (const lb of candidatosRotulo) {
+                const texto = norm(lb.textContent);
+                if (texto.length > 60 || !(texto === rotulo || texto.startsWith(rotulo + " "))) continue;
+                let alvo = null;
+                const paraId = lb.getAttribute("for");
+                if (paraId) {
+                    alvo = document.getElementById(paraId);
+                    if (alvo && alvo.tagName.toLowerCase() !== tag) alvo = alvo.querySelector(tag);
+                }
+                if (!confere(alvo)) {
+                    alvo = campos.find((el) =>
+                        (lb.compareDocumentPosition(el) & Node.DOCUMENT_POSITION_FOLLOWING) && confere(el));
+                }
+                if (confere(alvo) && !alvos.includes(alvo)) alvos.push(alvo);
+            }
+        }
+        return alvos;
+    };
+"""
+
+# Retorna o seletor concreto do campo (por id ou name), o marcador de erro do portal ou null.
+_JS_RESOLVER_CAMPO = """
+({pistas, seletorErro, marcadorErro}) => {""" + _JS_FUNCOES_PISTAS + """
+    for (const el of document.querySelectorAll(seletorErro)) {
+        if (visivel(el)) return marcadorErro;
+    }
+    const seletorDe = (el) => {
+        if (el.id) return `[id="${el.id}"]`;
+        if (el.name) return `${tag}[name="${el.name}"]`;
+        return null;
+    };
+    for (const alvo of alvosPorRotulo()) {
+        const seletor = seletorDe(alvo);
+        if (seletor) return seletor;
+    }
+    const semRotulo = campos.filter(confere);
+    if (semRotulo.length === 1 && (pistas.texto_opcao || classes.length)) return seletorDe(semRotulo[0]);
+    return null;
+}
+"""
+
+# True se o elemento ainda é o campo das pistas: tag, tipo, widget e, havendo rótulo do campo
+# na página, o elemento é um dos apontados por ele (id posicional reatribuído a outro campo)
+_JS_CONFERIR_CAMPO = """
+(el, pistas) => {""" + _JS_FUNCOES_PISTAS + """
+    if (!confere(el)) return false;
+    const alvos = alvosPorRotulo();
+    return !alvos.length || alvos.includes(el);
+}
+"""
+
+
+def _trava_cache(caminho: Path) -> TravaArquivo:
+    # GUI, worker, partições e workers distribuídos da mesma máquina dividem o arquivo
+    return TravaArquivo(caminho.with_name(caminho.name + ".lock"))
+
+
+def _carregar_cache_disco() -> dict[str, dict[str, str]]:
+    """Lê o cache sem travar (quem chama detém a trava)."""
+    caminho = configuracoes.ARQUIVO_CACHE_SELETORES
+    try:
+        with open(caminho, encoding="utf-8") as arquivo:
+            dados = json.load(arquivo)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError):
+        logger.warning("Cache de seletores ilegível, ignorando: %s", caminho)
+        return {}
+    return dados if isinstance(dados, dict) else {}
+
+
+def _gravar_cache_disco(processo: str, seletores: dict[str, str]) -> None:
+    """
+    Mescla os seletores (campo lógico -> seletor) no cache do processo: leitura, mescla e
+    escrita sob a trava do arquivo, por um temporário exclusivo trocado atomicamente.
+    """
+    caminho = configuracoes.ARQUIVO_CACHE_SELETORES
+    temporario: str | None = None
+    try:
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        with _trava_cache(caminho):
+            dados = _carregar_cache_disco()
+            dados.setdefault(processo, {}).update(seletores)
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=caminho.parent, prefix=f"{caminho.stem}_",
+                suffix=".tmp", delete=False,
+            ) as arquivo:
+                temporario = arquivo.name
+                json.dump(dados, arquivo, ensure_ascii=False, indent=2)
+            os.replace(temporario, caminho)
+            temporario = None
+    except OSError:
+        logger.exception("Falha ao gravar cache de seletores em %s", caminho)
+    finally:
+        if temporario is not None:
+            try:
+                os.remove(temporario)
+            except OSError:
+                pass
+
+
+def seletores_em_cache(processo: str) -> dict[str, str]:
+    """Retorna os seletores resolvidos em disco para o processo (campo lógico -> seletor)."""
+    caminho = configuracoes.ARQUIVO_CACHE_SELETORES
+    try:
+        with _trava_cache(caminho):
+            return dict(_carregar_cache_disco().get(processo, {}))
+    except OSError:
+        # Pasta sem permissão para a trava: leitura sem ela
+        return dict(_carregar_cache_disco().get(processo, {}))
+
+
+class LocalizadorCampos:
+    """
+    Localiza campos lógicos de um processo (ATC, Normal, DIFAL) no DAR Web.
+    Ordem: cache da sessão → cache em disco → seletor configurado; em falha, re-resolve
+    uma vez pelas pistas de PISTAS_CAMPOS_PI e, por fim, volta ao seletor configurado.
+    """
+
+    def __init__(self, processo: str, seletores_configurados: dict[str, str]) -> None:
+        self._processo = processo
+        self._seletores_configurados = seletores_configurados
+        self._cache_sessao: dict[str, str] = {}
+        self._cache_disco = seletores_em_cache(processo)
+
+    def seletor_configurado(self, campo: str) -> str:
+        return self._seletores_configurados[campo]
+
+    @etapa_cronometrada("resolver_campo")
+    async def resolver(self, pagina: Page, campo: str) -> str:
+        """Retorna o seletor concreto do campo já visível na página."""
+        configurado = self._seletores_configurados[campo]
+        candidato = (
+            self._cache_sessao.get(campo) or self._cache_disco.get(campo) or configurado
+        )
+        try:
+            await aguardar_elemento_ou_erro_portal(
+                pagina,
+                pagina.locator(candidato).first,
+                timeout=configuracoes.TIMEOUT_REVALIDAR_SELETOR_MS,
+            )
+        except PlaywrightTimeoutError:
+            logger.info(
+                "Seletor de %s (%s) não encontrado; re-resolvendo por pistas.", campo, candidato
+            )
+        else:
+            if await self._confere_pistas(pagina, campo, candidato):
+                self._cache_sessao[campo] = candidato
+                return candidato
+            logger.warning(
+                "Seletor de %s (%s) aponta para outro campo; re-resolvendo por pistas.",
+                campo, candidato,
+            )
+
+        resolvido = await self._resolver_por_pistas(pagina, campo)
+        if resolvido:
+            if resolvido != candidato:
+                logger.warning(
+                    "Campo %s (%s) resolvido para %s.", campo, self._processo, resolvido
+                )
+            await self._memorizar(campo, resolvido)
+            return resolvido
+
+        logger.warning(
+            "Campo %s (%s) sem resolução por pistas; usando seletor configurado %s.",
+            campo, self._processo, configurado,
+        )
+        await aguardar_elemento_ou_erro_portal(pagina, pagina.locator(configurado).first)
+        await self._memorizar(campo, configurado)
+        return configurado
+
+    async def _confere_pistas(self, pagina: Page, campo: str, seletor: str) -> bool:
+        """Confere o campo visível do seletor contra as pistas (sem pistas, aceita)."""
+        pistas = PISTAS_CAMPOS_PI.get(campo)
+        if not pistas:
+            return True
+        try:
+            return bool(await pagina.locator(seletor).first.evaluate(_JS_CONFERIR_CAMPO, pistas))
+        except PlaywrightError:
+            # Página navegou no meio da conferência: a re-resolução decide
+            return False
+
+    async def _resolver_por_pistas(self, pagina: Page, campo: str) -> str | None:
+        pistas = PISTAS_CAMPOS_PI.get(campo)
+        if not pistas:
+            return None
+        argumentos = {
+            "pistas": pistas,
+            "seletorErro": configuracoes.SELETOR_PI_MENSAGENS_ERRO,
+            "marcadorErro": _MARCADOR_ERRO_PORTAL,
+        }
+        try:
+            resultado = await pagina.wait_for_function(
+                _JS_RESOLVER_CAMPO,
+                arg=argumentos,
+                timeout=configuracoes.TIMEOUT_REVALIDAR_SELETOR_MS,
+            )
+        except PlaywrightTimeoutError:
+            return None
+        seletor = await resultado.json_value()
+        if seletor == _MARCADOR_ERRO_PORTAL:
+            mensagem = await ler_mensagem_erro_portal(pagina)
+            raise ErroPortalSefaz(mensagem or "Portal exibiu mensagem de erro sem texto")
+        return seletor or None
+
+    async def _memorizar(self, campo: str, seletor: str) -> None:
+        self._cache_sessao[campo] = seletor
+        if self._cache_disco.get(campo) != seletor:
+            self._cache_disco[campo] = seletor
+            # Só o campo alterado: campos gravados por outros processos ficam. A trava e o disco
+            # ficam numa thread, para não parar as outras I.E.s do event loop
+            await asyncio.to_thread(_gravar_cache_disco, self._processo, {campo: seletor})
@@ -0,0 +1,136 @@
+"""
+Reprodução de sessões do DAR Web gravadas em HAR.
+
+``route_from_har`` do Playwright casa os POSTs pelo corpo exato; no JSF o corpo carrega o
+``javax.faces.ViewState`` e datas que mudam a cada execução, então a reprodução não casaria.
+Aqui cada requisição é casada em três níveis, do mais ao menos específico:
+
+1. método + caminho + campos do formulário, ignorando ViewState, marcas de tempo, datas e
+   períodos (mês/ano);
+2. método + caminho + nomes dos campos (valores diferentes, ex.: outra I.E.);
+3. método + caminho.
+
+Cada resposta gravada é servida uma vez, em qualquer nível, na ordem da gravação; esgotadas as
+de uma chave, repete-se a última dela.
+"""
+
+import base64
+import json
+import re
+from collections import deque
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+from playwright.async_api import BrowserContext, Request, Route
+
+from icms_pi.logger import configurar_logger_da_aplicacao
+
+logger = configurar_logger_da_aplicacao(__name__)
+
+# Campos de formulário/query que mudam entre execuções sem mudar a tela pedida
+_CAMPOS_VOLATEIS = frozenset({"javax.faces.ViewState", "_", "nocache", "timestamp"})
+_PADRAO_MARCA_TEMPO = re.compile(r"^\d{10,13}$")
+# dd/mm/aaaa e o período mm/aaaa: a reprodução move o lote para um mês ainda válido
+_PADRAO_DATA = re.compile(r"(?:\d{2}/)?\d{2}/\d{4}")
+
+# Cabeçalhos que não valem para o corpo já decodificado do HAR
+_CABECALHOS_IGNORADOS = frozenset({"content-encoding", "content-length", "transfer-encoding"})
+
+
+def _campos_normalizados(texto: str) -> tuple[tuple[str, str], ...]:
+    campos = []
+    for nome, valor in parse_qsl(texto, keep_blank_values=True):
+        if nome in _CAMPOS_VOLATEIS or _PADRAO_MARCA_TEMPO.match(valor):
+            continue
+        campos.append((nome, _PADRAO_DATA.sub("<data>", valor)))
+    return tuple(sorted(campos))
+
+
+def chaves_requisicao(
+    metodo: str, url: str, corpo: str | None
+) -> tuple[tuple[object, ...], tuple[object, ...], tuple[object, ...]]:
+    """Chaves de casamento (exata, por nomes de campos, por caminho) de uma requisição."""
+    partes = urlsplit(url)
+    campos = _campos_normalizados(partes.query) + _campos_normalizados(corpo or "")
+    base = (metodo.upper(), partes.path)
+    return (
+        base + (campos,),
+        base + (tuple(nome for nome, _ in campos),),
+        base,
+    )
+
+
+class ReprodutorHar:
+    """Serve as respostas de um arquivo HAR para as requisições do contexto do navegador."""
+
+    def __init__(self, caminho_har: Path) -> None:
+        self._caminho = Path(caminho_har)
+        # Uma lista de entradas; os três níveis guardam índices nela (consumida em qualquer nível,
+        # a resposta não é servida de novo por outro)
+        self._respostas: list[dict[str, object]] = []
+        self._consumidas: list[bool] = []
+        self._filas: list[dict[tuple[object, ...], deque[int]]] = [{}, {}, {}]
+        self._ultima: list[dict[tuple[object, ...], int]] = [{}, {}, {}]
+        self.servidas = 0
+        self.sem_correspondencia: list[str] = []
+        self._carregar()
+
+    def _carregar(self) -> None:
+        with open(self._caminho, encoding="utf-8") as arquivo:
+            har = json.load(arquivo)
+        entradas = har.get("log", {}).get("entries", [])
+        for entrada in entradas:
+            requisicao = entrada["request"]
+            corpo = (requisicao.get("postData") or {}).get("text")
+            chaves = chaves_requisicao(requisicao["method"], requisicao["url"], corpo)
+            indice = len(self._respostas)
+            self._respostas.append(entrada["response"])
+            self._consumidas.append(False)
+            for nivel, chave in enumerate(chaves):
+                self._filas[nivel].setdefault(chave, deque()).append(indice)
+                self._ultima[nivel][chave] = indice
+        logger.info("HAR carregado para reprodução: %s (%d requisições).", self._caminho, len(entradas))
+
+    def _resposta_para(self, request: Request) -> dict[str, object] | None:
+        chaves = chaves_requisicao(request.method, request.url, request.post_data)
+        for nivel, chave in enumerate(chaves):
+            fila = self._filas[nivel].get(chave)
+            if fila is None:
+                continue
+            while fila and self._consumidas[fila[0]]:
+                fila.popleft()
+            if fila:
+                indice = fila.popleft()
+                self._consumidas[indice] = True
+                return self._respostas[indice]
+            # Esgotadas as respostas desta chave: repete a última gravada para ela
+            return self._respostas[self._ultima[nivel][chave]]
+        return None
+
+    async def atender(self, route: Route, request: Request) -> None:
+        resposta = self._resposta_para(request)
+        if resposta is None:
+            self.sem_correspondencia.append(f"{request.method} {request.url}")
+            logger.warning("HAR sem resposta para %s %s", request.method, request.url)
+            await route.abort("failed")
+            return
+        conteudo = resposta.get("content", {})
+        texto = conteudo.get("text") or ""
+        corpo = (
+            base64.b64decode(texto) if conteudo.get("encoding") == "base64"
+            else texto.encode("utf-8")
+        )
+        cabecalhos = {
+            h["name"]: h["value"]
+            for h in resposta.get("headers", [])
+            if h["name"].lower() not in _CABECALHOS_IGNORADOS
+        }
+        self.servidas += 1
+        await route.fulfill(status=resposta.get("status", 200), headers=cabecalhos, body=corpo)
+
+
+async def instalar_reproducao_har(contexto: BrowserContext, caminho_har: Path) -> ReprodutorHar:
+    """Intercepta todas as requisições do contexto e responde a partir do HAR (sem rede)."""
+    reprodutor = ReprodutorHar(caminho_har)
+    await contexto.route("**/*", reprodutor.atender)
+    return reprodutor
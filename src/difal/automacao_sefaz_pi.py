@@ -5,51 +5,44 @@ Avançar → preenche período, datas e valor principal (coluna DIF. ALIQUOTA).
 """
 
 import asyncio
-from datetime import date, datetime
+import contextlib
+from collections.abc import AsyncIterator, Awaitable, Callable
+from pathlib import Path
 
 from playwright.async_api import async_playwright, Browser, Page, BrowserContext
 
 from icms_pi import configuracoes
 from difal import configuracoes as configuracoes_difal
+from icms_pi.instrumentacao import (
+    MedidorEtapas,
+    ativar_medidor,
+    desativar_medidor,
+    etapa_cronometrada,
+    medir_etapa,
+    medir_ie,
+)
+from icms_pi.controle_execucao import ExecucaoCancelada, ponto_de_controle, trecho_cancelavel
 from icms_pi.logger import configurar_logger_da_aplicacao
+from icms_pi.progresso import EVENTO_FALHA, EVENTO_PULADA, EVENTO_SUCESSO, emitir_progresso
+from icms_pi.regras_valor import (
+    data_dia_15_mes_referencia,
+    data_vencimento_no_passado,
+    valor_invalido,
+)
 from atc.navegacao.acoes_pagina import (
+    ErroPortalSefaz,
+    aguardar_elemento_ou_erro_portal,
     aguardar_pagina_carregar,
     preencher_campo_data_mascarado,
     preencher_campo_valor_mascarado,
-    tirar_captura_de_tela_em_erro,
 )
+from atc.navegacao.artefatos_falha import ColetorArtefatosFalha
+from atc.navegacao.localizador_campos import LocalizadorCampos
+from atc.navegacao.reproducao_har import ReprodutorHar, instalar_reproducao_har
 
 logger = configurar_logger_da_aplicacao(__name__)
 
 
-def _valor_difal_invalido(valor: object) -> bool:
-    """Retorna True se o valor DIFAL (DIF. ALIQUOTA) não deve ser processado."""
-    if valor is None:
-        return True
-    if isinstance(valor, (int, float)) and valor == 0:
-        return True
-    if isinstance(valor, str):
-        s = valor.strip().lower()
-        if not s or s == "null":
-            return True
-    return False
-
-
-def _data_dia_15_mes_referencia(mes_ref: int, ano_ref: int) -> tuple[int, int, int]:
-    """Retorna (dia, mês, ano) para o dia 15 do mês de referência."""
-    return 15, mes_ref, ano_ref
-
-
-def _data_vencimento_no_passado(mes_ref: int, ano_ref: int) -> bool:
-    """Retorna True se a data de vencimento (dia 15 do mês de referência) já passou."""
-    dia, mes, ano = _data_dia_15_mes_referencia(mes_ref, ano_ref)
-    try:
-        data_venc = date(ano, mes, dia)
-        return data_venc < date.today()
-    except ValueError:
-        return True
-
-
 class AutomacaoDifalPI:
     """
     Automação para ICMS DIFAL / Imposto, Juros e Multa (SEFAZ-PI, DAR Web).
@@ -57,62 +50,128 @@ class AutomacaoDifalPI:
     Avançar → período, datas (dia 15), valor principal (coluna DIF. ALIQUOTA) → Calcular Imposto.
     """
 
-    def __init__(self, headless: bool = False) -> None:
+    def __init__(
+        self,
+        headless: bool = False,
+        url_portal: str | None = None,
+        intervalo_ms: int | None = None,
+        gravar_har: Path | None = None,
+        reproduzir_har: Path | None = None,
+        manter_aberto: bool = False,
+    ) -> None:
         self._headless = headless
+        self._manter_aberto = manter_aberto
+        self._gravar_har = gravar_har
+        self._reproduzir_har = reproduzir_har
+        self.reprodutor_har: ReprodutorHar | None = None
+        self.medidor: MedidorEtapas | None = None
+        self._url_portal = url_portal or configuracoes.URL_PORTAL_DARWEB_SEFAZ_PI
+        self._intervalo_ms = (
+            configuracoes.INTERVALO_ENTRE_EXECUCOES_MS if intervalo_ms is None else intervalo_ms
+        )
         self._playwright = None
         self._browser: Browser | None = None
         self._context: BrowserContext | None = None
         self._pagina: Page | None = None
+        self._artefatos: ColetorArtefatosFalha | None = None
+        self._localizador = LocalizadorCampos(
+            "difal",
+            {
+                "select_codigo": configuracoes_difal.SELETOR_PI_SELECT_CODIGO,
+                "campo_ie": configuracoes_difal.SELETOR_PI_CAMPO_IE,
+                "substituicao": configuracoes_difal.SELETOR_PI_SUBSTITUICAO,
+                "periodo_referencia": configuracoes_difal.SELETOR_PI_PERIODO_REFERENCIA,
+                "data_vencimento": configuracoes_difal.SELETOR_PI_DATA_VENCIMENTO,
+                "data_pagamento": configuracoes_difal.SELETOR_PI_DATA_PAGAMENTO,
+                "valor_principal": configuracoes_difal.SELETOR_PI_VALOR_PRINCIPAL,
+            },
+        )
 
+    @etapa_cronometrada("iniciar_navegador")
     async def _iniciar_browser(self) -> None:
         logger.info("Iniciando navegador (ICMS DIFAL PI).")
         self._playwright = await async_playwright().start()
         self._browser = await self._playwright.chromium.launch(headless=self._headless)
+        opcoes_har: dict[str, object] = {}
+        if self._gravar_har:
+            # HAR com corpos embutidos; gravado em disco quando o contexto é fechado
+            opcoes_har = {"record_har_path": str(self._gravar_har), "record_har_content": "embed"}
         self._context = await self._browser.new_context(
             viewport={"width": 1280, "height": 720},
             ignore_https_errors=True,
+            **opcoes_har,
         )
+        if self._reproduzir_har:
+            self.reprodutor_har = await instalar_reproducao_har(
+                self._context, self._reproduzir_har
+            )
+        self._artefatos = ColetorArtefatosFalha("difal", self._context)
+        await self._artefatos.iniciar()
         self._pagina = await self._context.new_page()
         self._pagina.set_default_timeout(configuracoes.TIMEOUT_AGUARDAR_ELEMENTO_MS)
         logger.debug("Navegador e página prontos.")
 
     async def _encerrar_browser(self) -> None:
-        if self._context:
-            await self._context.close()
-        if self._browser:
-            await self._browser.close()
-        if self._playwright:
-            await self._playwright.stop()
+        if self._playwright is None:
+            return
+        artefatos, contexto, browser, playwright = (
+            self._artefatos, self._context, self._browser, self._playwright
+        )
+        self._artefatos = self._context = self._browser = self._playwright = self._pagina = None
+        if artefatos:
+            await artefatos.encerrar()
+        if contexto:
+            await contexto.close()
+        if browser:
+            await browser.close()
+        await playwright.stop()
         logger.info("Navegador encerrado.")
 
-    def _nome_captura_erro(self, etapa: str, ie: str = "") -> str:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        sufixo = f"_{ie}" if ie else ""
-        return f"erro_difal_{etapa}{sufixo}_{timestamp}.png"
+    async def encerrar(self) -> None:
+        """Fecha o navegador mantido aberto entre chamadas (``manter_aberto``)."""
+        await self._encerrar_browser()
 
+    @contextlib.asynccontextmanager
+    async def sessao(self) -> AsyncIterator[Page]:
+        """
+        Abre o navegador (se ainda fechado) e entrega a página do fluxo.
+        Ao sair, fecha o navegador, salvo quando ``manter_aberto``.
+        """
+        if self._playwright is None:
+            await self._iniciar_browser()
+        try:
+            yield self._pagina
+        finally:
+            if not self._manter_aberto:
+                await self._encerrar_browser()
+
+    async def resolver_campo(self, campo: str) -> str:
+        """Seletor que localiza ``campo`` na página atual (cache, configurado ou pistas)."""
+        return await self._localizador.resolver(self._pagina, campo)
+
+    @etapa_cronometrada("pagina_inicial")
     async def _acessar_pagina_inicial_pi(self) -> None:
         """Acessa a URL do DAR Web (SEFAZ-PI)."""
-        logger.info("Acessando %s", configuracoes.URL_PORTAL_DARWEB_SEFAZ_PI)
-        await self._pagina.goto(configuracoes.URL_PORTAL_DARWEB_SEFAZ_PI)
+        logger.info("Acessando %s", self._url_portal)
+        await self._pagina.goto(self._url_portal)
         await aguardar_pagina_carregar(self._pagina)
 
+    @etapa_cronometrada("menu_icms")
     async def _clicar_menu_icms_pi(self) -> None:
         """Clica no link do menu ICMS."""
         locator = self._pagina.locator(configuracoes_difal.SELETOR_PI_MENU_ICMS).filter(
             has_text="ICMS"
         )
-        await locator.first.wait_for(
-            state="visible", timeout=configuracoes.TIMEOUT_AGUARDAR_ELEMENTO_MS
-        )
+        await aguardar_elemento_ou_erro_portal(self._pagina, locator.first)
         await locator.first.click()
         await aguardar_pagina_carregar(self._pagina)
         logger.debug("Clicado no menu ICMS.")
 
+    @etapa_cronometrada("selecionar_codigo")
     async def _selecionar_imposto_juros_multa_pi(self) -> None:
         """Seleciona a opção 113001 - ICMS - IMPOSTO, JUROS E MULTA no select."""
-        select = self._pagina.locator(configuracoes_difal.SELETOR_PI_SELECT_CODIGO)
-        await select.wait_for(
-            state="visible", timeout=configuracoes.TIMEOUT_AGUARDAR_ELEMENTO_MS
+        select = self._pagina.locator(
+            await self._localizador.resolver(self._pagina, "select_codigo")
         )
         await select.select_option(
             label=configuracoes_difal.VALOR_OPCAO_PI_IMPOSTO_JUROS_MULTA
@@ -120,87 +179,101 @@ class AutomacaoDifalPI:
         await aguardar_pagina_carregar(self._pagina)
         logger.debug("Selecionado: 113001 - ICMS Imposto, Juros e Multa.")
 
+    @etapa_cronometrada("avancar")
     async def _clicar_botao_avancar_pi(self) -> None:
         """Clica no botão Avançar (mesmo seletor do ATC)."""
         locator = self._pagina.locator(configuracoes_difal.SELETOR_PI_BOTAO_AVANCAR).filter(
             has_text="Avançar"
         )
-        await locator.first.wait_for(
-            state="visible", timeout=configuracoes.TIMEOUT_AGUARDAR_ELEMENTO_MS
-        )
+        await aguardar_elemento_ou_erro_portal(self._pagina, locator.first)
         await locator.first.click()
         await aguardar_pagina_carregar(self._pagina)
         logger.debug("Clicado no botão Avançar.")
 
+    @etapa_cronometrada("preencher_ie")
     async def _preencher_ie_pi(self, ie_digitos: str) -> None:
         """Preenche o campo de Inscrição Estadual (#fieldInscricaoEstadual)."""
-        campo = self._pagina.locator(configuracoes_difal.SELETOR_PI_CAMPO_IE)
-        await campo.wait_for(
-            state="visible", timeout=configuracoes.TIMEOUT_AGUARDAR_ELEMENTO_MS
+        campo = self._pagina.locator(
+            await self._localizador.resolver(self._pagina, "campo_ie")
         )
         await campo.fill("")
         await campo.fill(ie_digitos)
         logger.debug("Campo IE preenchido com %s", ie_digitos)
 
+    @etapa_cronometrada("substituicao")
     async def _selecionar_substituicao_nao_pi(self) -> None:
         """Seleciona 'Não' no campo Substituição Tributária (cmbSubstituicao)."""
-        select = self._pagina.locator(configuracoes_difal.SELETOR_PI_SUBSTITUICAO)
-        await select.wait_for(
-            state="visible", timeout=configuracoes.TIMEOUT_AGUARDAR_ELEMENTO_MS
+        select = self._pagina.locator(
+            await self._localizador.resolver(self._pagina, "substituicao")
         )
         await select.select_option(value=configuracoes_difal.VALOR_SUBSTITUICAO_NAO)
         logger.debug("Substituição tributária: NÃO.")
 
+    @etapa_cronometrada("periodo")
     async def _preencher_periodo_pi(self, mes_ref: int, ano_ref: int) -> None:
         """Preenche o período de referência (formato MM/AAAA)."""
         periodo_str = f"{mes_ref:02d}/{ano_ref}"
-        locator = self._pagina.locator(configuracoes_difal.SELETOR_PI_PERIODO_REFERENCIA)
-        await locator.wait_for(
-            state="visible", timeout=configuracoes.TIMEOUT_AGUARDAR_ELEMENTO_MS
+        locator = self._pagina.locator(
+            await self._localizador.resolver(self._pagina, "periodo_referencia")
         )
         await locator.fill("")
         await locator.fill(periodo_str)
         logger.debug("Período de referência preenchido: %s", periodo_str)
 
+    @etapa_cronometrada("datas")
     async def _preencher_datas_vencimento_pagamento_pi(
         self, mes_ref: int, ano_ref: int
     ) -> None:
         """Preenche Vencimento e Pagamento com o dia 15 do mês de referência."""
-        dia, mes, ano = _data_dia_15_mes_referencia(mes_ref, ano_ref)
+        dia, mes, ano = data_dia_15_mes_referencia(mes_ref, ano_ref)
         data_str = f"{dia:02d}/{mes:02d}/{ano}"
         await preencher_campo_data_mascarado(
             self._pagina,
-            configuracoes_difal.SELETOR_PI_DATA_VENCIMENTO,
+            await self._localizador.resolver(self._pagina, "data_vencimento"),
             data_str,
         )
         await preencher_campo_data_mascarado(
             self._pagina,
-            configuracoes_difal.SELETOR_PI_DATA_PAGAMENTO,
+            await self._localizador.resolver(self._pagina, "data_pagamento"),
             data_str,
         )
         logger.debug("Datas Vencimento e Pagamento preenchidas: %s", data_str)
 
+    @etapa_cronometrada("valor_principal")
     async def _preencher_valor_principal_pi(self, valor_principal: float) -> None:
         """Preenche o valor principal (coluna DIF. ALIQUOTA)."""
         await preencher_campo_valor_mascarado(
             self._pagina,
-            configuracoes_difal.SELETOR_PI_VALOR_PRINCIPAL,
+            await self._localizador.resolver(self._pagina, "valor_principal"),
             valor_principal,
         )
         logger.debug("Valor principal (DIFAL) preenchido: %s", valor_principal)
 
+    @etapa_cronometrada("calcular_imposto")
     async def _clicar_botao_calcular_imposto_pi(self) -> None:
         """Clica no botão Calcular Imposto."""
         locator = self._pagina.locator(
             configuracoes_difal.SELETOR_PI_BOTAO_CALCULAR_IMPOSTO
         ).filter(has_text="Calcular Imposto")
-        await locator.first.wait_for(
-            state="visible", timeout=configuracoes.TIMEOUT_AGUARDAR_ELEMENTO_MS
-        )
+        await aguardar_elemento_ou_erro_portal(self._pagina, locator.first)
         await locator.first.click()
         await aguardar_pagina_carregar(self._pagina)
         logger.debug("Clicado no botão Calcular Imposto.")
 
+    def etapas_sonda_pi(
+        self, ie_digitos: str
+    ) -> list[tuple[str, Callable[[], Awaitable[None]]]]:
+        """Etapas do fluxo até o formulário Caso Geral (usadas pela sonda do portal)."""
+        return [
+            ("pagina_inicial", self._acessar_pagina_inicial_pi),
+            ("menu_icms", self._clicar_menu_icms_pi),
+            ("selecionar_codigo", self._selecionar_imposto_juros_multa_pi),
+            ("avancar_codigo", self._clicar_botao_avancar_pi),
+            ("preencher_ie", lambda: self._preencher_ie_pi(ie_digitos)),
+            ("substituicao", self._selecionar_substituicao_nao_pi),
+            ("avancar_ie", self._clicar_botao_avancar_pi),
+        ]
+
     async def executar_fluxo_por_ie_pi(
         self,
         lista_dados: list[dict[str, object]],
@@ -214,12 +287,16 @@ class AutomacaoDifalPI:
         ies_sucesso: list[str] = []
         ies_erro: list[tuple[str, str]] = []
         total = len(lista_dados)
+        self.medidor = MedidorEtapas("difal")
+        token_medidor = ativar_medidor(self.medidor)
 
         try:
-            await self._iniciar_browser()
+            if self._playwright is None:
+                await self._iniciar_browser()
             await self._acessar_pagina_inicial_pi()
 
             for indice, item in enumerate(lista_dados):
+                await ponto_de_controle()
                 ie = str(item.get("ie", ""))
                 ie_digitos = str(item.get("ie_digitos", "") or ie)
                 valor_difal = item.get("valor_difal")
@@ -230,55 +307,63 @@ class AutomacaoDifalPI:
                     ies_erro.append(
                         (ie or "(vazio)", "Período (mês/ano) ausente nos dados da planilha")
                     )
+                    emitir_progresso("difal", EVENTO_PULADA, ie, detalhe="Período ausente")
                     continue
 
                 if not ie or not ie_digitos:
                     ies_erro.append((ie or "(vazio)", "IE inválida ou vazia"))
+                    emitir_progresso("difal", EVENTO_PULADA, ie, detalhe="IE inválida ou vazia")
                     continue
 
-                if _valor_difal_invalido(valor_difal):
+                if valor_invalido(valor_difal):
                     logger.info(
                         "IE %s pulada: valor DIF. ALIQUOTA ausente, zero ou vazio.",
                         ie,
                     )
+                    emitir_progresso("difal", EVENTO_PULADA, ie, detalhe="Valor DIF. ALIQUOTA ausente")
                     continue
 
-                if _data_vencimento_no_passado(mes_ref, ano_ref):
+                if data_vencimento_no_passado(mes_ref, ano_ref):
                     motivo = "Data de vencimento no passado — portal não permite datas passadas"
                     ies_erro.append((ie, motivo))
                     logger.info("IE %s pulada: %s", ie, motivo)
+                    emitir_progresso("difal", EVENTO_PULADA, ie, detalhe=motivo)
                     continue
 
                 logger.info("Processando IE %s DIFAL (%d/%d).", ie, indice + 1, total)
 
                 if indice > 0:
-                    ms = configuracoes.INTERVALO_ENTRE_EXECUCOES_MS
+                    ms = self._intervalo_ms
                     logger.info(
                         "Aguardando %d ms (%.1f s) antes da próxima IE.",
                         ms, ms / 1000.0,
                     )
-                    await asyncio.sleep(ms / 1000.0)
-                    await self._acessar_pagina_inicial_pi()
+                    async with trecho_cancelavel():
+                        async with medir_etapa("intervalo_entre_ies"):
+                            await asyncio.sleep(ms / 1000.0)
+                        await self._acessar_pagina_inicial_pi()
 
+                await self._artefatos.iniciar_ie()
                 try:
-                    await self._clicar_menu_icms_pi()
-                    await self._selecionar_imposto_juros_multa_pi()
-                    await self._clicar_botao_avancar_pi()
-                    await self._preencher_ie_pi(ie_digitos)
-                    await self._selecionar_substituicao_nao_pi()
-                    await self._clicar_botao_avancar_pi()
-                    await self._preencher_periodo_pi(mes_ref, ano_ref)
-                    await self._preencher_datas_vencimento_pagamento_pi(mes_ref, ano_ref)
-                    await self._preencher_valor_principal_pi(float(valor_difal))
-                    await self._clicar_botao_calcular_imposto_pi()
+                    async with medir_ie(ie, int(item.get("tentativa", 1))), trecho_cancelavel():
+                        await self._clicar_menu_icms_pi()
+                        await self._selecionar_imposto_juros_multa_pi()
+                        await self._clicar_botao_avancar_pi()
+                        await self._preencher_ie_pi(ie_digitos)
+                        await self._selecionar_substituicao_nao_pi()
+                        await self._clicar_botao_avancar_pi()
+                        await self._preencher_periodo_pi(mes_ref, ano_ref)
+                        await self._preencher_datas_vencimento_pagamento_pi(mes_ref, ano_ref)
+                        await self._preencher_valor_principal_pi(float(valor_difal))
+                        await self._clicar_botao_calcular_imposto_pi()
                 except Exception as e:
-                    logger.exception(
-                        "Erro ao preencher formulário DIFAL PI para IE %s: %s", ie, e
-                    )
-                    await tirar_captura_de_tela_em_erro(
-                        self._pagina,
-                        self._nome_captura_erro("formulario_difal", ie),
-                    )
+                    if isinstance(e, ErroPortalSefaz):
+                        logger.warning("Portal recusou IE %s: %s", ie, e)
+                    else:
+                        logger.exception(
+                            "Erro ao preencher formulário DIFAL PI para IE %s: %s", ie, e
+                        )
+                    await self._artefatos.registrar_falha(self._pagina, "formulario_difal", ie, e)
                     motivo = (
                         str(e).split("\n")[0].strip() if str(e)
                         else "Falha ao preencher formulário ICMS DIFAL"
@@ -286,13 +371,33 @@ class AutomacaoDifalPI:
                     if len(motivo) > 80:
                         motivo = motivo[:77] + "..."
                     ies_erro.append((ie, motivo))
+                    emitir_progresso(
+                        "difal", EVENTO_FALHA, ie, detalhe=motivo,
+                        tentativa=int(item.get("tentativa", 1)),
+                    )
                     continue
 
+                await self._artefatos.concluir_ie()
                 ies_sucesso.append(ie)
+                emitir_progresso(
+                    "difal", EVENTO_SUCESSO, ie, tentativa=int(item.get("tentativa", 1))
+                )
                 logger.info("IE %s concluída (formulário DIFAL preenchido).", ie)
 
-        finally:
+        except ExecucaoCancelada:
+            logger.warning(
+                "Lote cancelado pelo operador (%s): %d sucesso, %d erro até aqui.",
+                "difal", len(ies_sucesso), len(ies_erro),
+            )
+        except BaseException:
+            # Navegador em estado desconhecido: a próxima chamada abre outro
             await self._encerrar_browser()
+            raise
+        finally:
+            if not self._manter_aberto:
+                await self._encerrar_browser()
+            desativar_medidor(token_medidor)
+            self.medidor.salvar()
 
         logger.info(
             "Fluxo DIFAL PI finalizado: %d sucesso, %d erro.",
@@ -0,0 +1,271 @@
+"""
+Benchmark ponta a ponta contra o simulador local do DAR Web.
+
+Sobe o ``SimuladorDarWeb`` (latência, taxa de recusa, AJAX e ids configuráveis), gera um
+lote sintético por processo (ATC, Normal, DIFAL) e roda ``executar_fluxo_por_ie_pi`` com o
+motor escolhido (navegador e/ou HTTP), sem tocar o portal real. Relata IEs/min, p50/p95 por
+etapa e pico de memória; o relatório completo vai para ``benchmark_<timestamp>.json`` na
+pasta de resultados. IEs/min conta só as I.E.s concluídas pelo motor: as que o motor HTTP
+repassa ao navegador são relatadas à parte (``fallback_navegador``).
+
+Uso::
+
+    python -m icms_pi.benchmark --quantidade 20 --motor navegador,http --latencia-ms 200
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+from pathlib import Path
+
+from icms_pi import configuracoes
+from icms_pi.execucao_lote import CLASSES_AUTOMACAO_POR_PROCESSO
+from icms_pi.logger import configurar_logger_da_aplicacao
+from icms_pi.motor_http import MotorHttpDarWeb
+from icms_pi.simulador_darweb import SimuladorDarWeb
+from icms_pi.telemetria import encerrar_telemetria, iniciar_telemetria
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = configurar_logger_da_aplicacao(__name__)
+
+
+def gerar_lote(quantidade: int, semente: int | None = None) -> list[dict[str, object]]:
+    """Lote sintético no formato de ``obter_dados_para_dae`` (período = mês seguinte)."""
+    aleatorio = random.Random(semente)
+    hoje = date.today()
+    mes_ref = hoje.month % 12 + 1
+    ano_ref = hoje.year + (1 if hoje.month == 12 else 0)
+    lote: list[dict[str, object]] = []
+    for n in range(quantidade):
+        ie_digitos = f"19{n + 1:07d}"
+        lote.append({
+            "ie": ie_digitos,
+            "ie_digitos": ie_digitos,
+            "valor_atc": round(aleatorio.uniform(50, 25_000), 2),
+            "valor_normal": round(aleatorio.uniform(50, 25_000), 2),
+            "valor_difal": round(aleatorio.uniform(50, 25_000), 2),
+            "mes_ref": mes_ref,
+            "ano_ref": ano_ref,
+            "dados_originais": {},
+        })
+    return lote
+
+
+def _rss_mb(quem: int) -> float | None:
+    if resource is None:
+        return None
+    maximo = resource.getrusage(quem).ru_maxrss
+    # Linux informa em KiB, macOS em bytes
+    return round(maximo / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+async def _rodar_processo(
+    processo_id: str,
+    motor: str,
+    lote: list[dict[str, object]],
+    url: str,
+    headless: bool,
+    concorrencia: int,
+) -> dict[str, object]:
+    if motor == configuracoes.MOTOR_HTTP:
+        automacao = MotorHttpDarWeb(
+            processo_id, concorrencia=concorrencia, url_portal=url, intervalo_ms=0
+        )
+    else:
+        automacao = CLASSES_AUTOMACAO_POR_PROCESSO[processo_id](
+            headless=headless, url_portal=url, intervalo_ms=0
+        )
+
+    inicio = time.perf_counter()
+    ies_ok, ies_erro = await automacao.executar_fluxo_por_ie_pi(lote)
+    duracao_s = time.perf_counter() - inicio
+    # I.E.s que o motor HTTP repassa ao navegador não foram concluídas aqui: ficam fora da
+    # vazão e aparecem à parte em fallback_navegador
+    fallback = len(getattr(automacao, "itens_para_navegador", []))
+    concluidas = len(ies_ok) + len(ies_erro)
+    return {
+        "processo": processo_id,
+        "motor": motor,
+        "ies": len(lote),
+        "sucesso": len(ies_ok),
+        "erro": len(ies_erro),
+        "fallback_navegador": fallback,
+        "duracao_s": round(duracao_s, 2),
+        "ies_por_minuto": round(concluidas / duracao_s * 60.0, 1) if duracao_s else 0.0,
+        "etapas_ms": automacao.medidor.resumo(),
+    }
+
+
+async def executar_benchmark(
+    processos_ids: list[str],
+    motores: list[str],
+    quantidade: int,
+    headless: bool = True,
+    concorrencia: int | None = None,
+    medir_memoria_python: bool = False,
+    parametros_simulador: dict[str, object] | None = None,
+) -> dict[str, object]:
+    """
+    Roda cada processo com cada motor contra um simulador novo e retorna o relatório
+    ({"parametros", "resultados", "memoria_mb"}).
+    """
+    parametros_simulador = dict(parametros_simulador or {})
+    concorrencia = concorrencia or configuracoes.CONCORRENCIA_MOTOR_HTTP
+    lote = gerar_lote(quantidade, parametros_simulador.get("semente"))
+    resultados: list[dict[str, object]] = []
+
+    # Cache de seletores isolado: ids renomeados no simulador não podem sujar o cache real
+    cache_original = configuracoes.ARQUIVO_CACHE_SELETORES
+    if medir_memoria_python:
+        tracemalloc.start()
+    telemetria = iniciar_telemetria()
+    try:
+        with tempfile.TemporaryDirectory(prefix="icms_pi_benchmark_") as pasta_temporaria:
+            configuracoes.ARQUIVO_CACHE_SELETORES = Path(pasta_temporaria) / "cache_seletores.json"
+            with SimuladorDarWeb(**parametros_simulador) as simulador:
+                for motor in motores:
+                    for processo_id in processos_ids:
+                        logger.info("Benchmark: %s com motor %s (%d IEs).", processo_id, motor, quantidade)
+                        resultados.append(
+                            await _rodar_processo(
+                                processo_id, motor, lote, simulador.url, headless, concorrencia
+                            )
+                        )
+                requisicoes = simulador.requisicoes
+        pico_python = tracemalloc.get_traced_memory()[1] if medir_memoria_python else None
+    finally:
+        encerrar_telemetria()
+        configuracoes.ARQUIVO_CACHE_SELETORES = cache_original
+        if medir_memoria_python:
+            tracemalloc.stop()
+
+    return {
+        "parametros": {
+            "processos": processos_ids,
+            "motores": motores,
+            "quantidade": quantidade,
+            "headless": headless,
+            "concorrencia_http": concorrencia,
+            "simulador": parametros_simulador,
+        },
+        "resultados": resultados,
+        "telemetria": str(telemetria.caminho) if telemetria else None,
+        "requisicoes_simulador": requisicoes,
+        "memoria_mb": {
+            "pico_python_tracemalloc": (
+                round(pico_python / (1024 * 1024), 1) if pico_python is not None else None
+            ),
+            "pico_rss_processo": _rss_mb(resource.RUSAGE_SELF) if resource else None,
+            "pico_rss_filhos": _rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+        },
+    }
+
+
+def _salvar_relatorio(relatorio: dict[str, object]) -> Path | None:
+    pasta = configuracoes.PASTA_SAIDA_RESULTADOS_ABSOLUTA
+    try:
+        pasta.mkdir(parents=True, exist_ok=True)
+        caminho = pasta / f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        caminho.write_text(json.dumps(relatorio, ensure_ascii=False, indent=2), encoding="utf-8")
+        return caminho
+    except OSError:
+        logger.exception("Falha ao salvar relatório do benchmark.")
+        return None
+
+
+def _imprimir_relatorio(relatorio: dict[str, object]) -> None:
+    for resultado in relatorio["resultados"]:
+        print(
+            f"\n{resultado['processo']} [{resultado['motor']}]: {resultado['ies']} IEs em "
+            f"{resultado['duracao_s']:.1f} s — {resultado['ies_por_minuto']:.1f} IEs/min "
+            f"(ok {resultado['sucesso']}, erro {resultado['erro']}, "
+            f"fallback {resultado['fallback_navegador']})"
+        )
+        for etapa, estatisticas in resultado["etapas_ms"].items():
+            print(
+                f"  {etapa:<20} n={estatisticas['n']:<5} p50={estatisticas['p50']:>8.1f} ms"
+                f"  p95={estatisticas['p95']:>8.1f} ms  p99={estatisticas['p99']:>8.1f} ms"
+            )
+    memoria = relatorio["memoria_mb"]
+    print(
+        f"\nPico de memória (MB): python={memoria['pico_python_tracemalloc']}, "
+        f"processo={memoria['pico_rss_processo']}, filhos={memoria['pico_rss_filhos']}"
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="icms_pi_benchmark",
+        description="Benchmark dos fluxos DAR Web contra o simulador local.",
+    )
+    parser.add_argument(
+        "--processos", default=",".join(CLASSES_AUTOMACAO_POR_PROCESSO),
+        help="processos separados por vírgula (antecipado,normal,difal)",
+    )
+    parser.add_argument(
+        "--motor", default=configuracoes.MOTOR_AUTOMACAO,
+        help="motores separados por vírgula (navegador,http)",
+    )
+    parser.add_argument("--quantidade", type=int, default=10, help="IEs por processo")
+    parser.add_argument("--concorrencia", type=int, default=None, help="contextos do motor HTTP")
+    parser.add_argument("--com-janela", action="store_true", help="navegador visível")
+    parser.add_argument(
+        "--memoria-python", action="store_true",
+        help="mede o pico do heap Python com tracemalloc (deixa a execução mais lenta)",
+    )
+    parser.add_argument("--latencia-ms", type=int, default=0)
+    parser.add_argument("--variacao-ms", type=int, default=0)
+    parser.add_argument("--taxa-erro", type=float, default=0.0)
+    parser.add_argument("--ajax", action="store_true", help="botões com postback parcial")
+    parser.add_argument("--atraso-ajax-ms", type=int, default=0)
+    parser.add_argument("--deslocamento-ids", type=int, default=0, help="renumera os j_idtNN")
+    parser.add_argument("--semente", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    processos_ids = [p.strip() for p in args.processos.split(",") if p.strip()]
+    motores = [m.strip() for m in args.motor.split(",") if m.strip()]
+    invalidos = [p for p in processos_ids if p not in CLASSES_AUTOMACAO_POR_PROCESSO]
+    invalidos += [
+        m for m in motores if m not in (configuracoes.MOTOR_NAVEGADOR, configuracoes.MOTOR_HTTP)
+    ]
+    if invalidos:
+        parser.error(f"valores inválidos: {', '.join(invalidos)}")
+
+    relatorio = asyncio.run(
+        executar_benchmark(
+            processos_ids,
+            motores,
+            args.quantidade,
+            headless=not args.com_janela,
+            concorrencia=args.concorrencia,
+            medir_memoria_python=args.memoria_python,
+            parametros_simulador={
+                "latencia_ms": args.latencia_ms,
+                "variacao_ms": args.variacao_ms,
+                "taxa_erro": args.taxa_erro,
+                "ajax": args.ajax,
+                "atraso_ajax_ms": args.atraso_ajax_ms,
+                "deslocamento_ids": args.deslocamento_ids,
+                "semente": args.semente,
+            },
+        )
+    )
+    _imprimir_relatorio(relatorio)
+    caminho = _salvar_relatorio(relatorio)
+    if caminho:
+        print(f"\nRelatório salvo em {caminho}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""
+Execução do lote sem interface gráfica, para agendamento (cron, Agendador de Tarefas).
+
+Lê a planilha, monta os itens executáveis de cada processo pelas mesmas regras da GUI
+(``IndiceItens``), roda ``executar_lote`` e grava ``resultado_lote_<timestamp>.json`` na pasta
+de saída (que também recebe telemetria e latências da execução). Os módulos pesados (openpyxl,
+Playwright, automações) só são importados depois de validados os argumentos, de modo que
+``--help`` e erros de uso respondem na hora.
+
+Uso::
+
+    python -m icms_pi.cli planilha.xlsx --processos antecipado,difal --motor http --concorrencia 4
+    python -m icms_pi.cli planilha.xlsx --particoes 4 --ies-por-minuto 30
+
+Com ``--particoes K`` (K > 1) as I.E.s são divididas entre K processos, cada um com seu
+navegador, sob um teto comum de I.E.s por minuto (``icms_pi.execucao_particionada``).
+
+Código de saída: 0 (todas as I.E.s com sucesso), 1 (alguma I.E. com erro), 2 (argumentos ou
+planilha inválidos), 3 (lote recusado pela sonda do portal; nenhuma I.E. executada), 130
+(interrompido com Ctrl+C; o lote para de forma cooperativa e o arquivo de resultados registra
+o parcial).
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import signal
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from icms_pi import configuracoes
+from icms_pi.logger import configurar_logger_da_aplicacao
+
+logger = configurar_logger_da_aplicacao(__name__)
+
+PROCESSOS_VALIDOS = ("antecipado", "normal", "difal")
+
+SAIDA_SUCESSO = 0
+SAIDA_COM_ERROS = 1
+SAIDA_ENTRADA_INVALIDA = 2
+SAIDA_RECUSADO_PELA_SONDA = 3
+SAIDA_INTERROMPIDA = 130
+
+
+def _montar_lote(
+    planilha: Path, processos_ids: list[str]
+) -> tuple[dict[str, list[dict[str, object]]], int, int, int]:
+    """(itens executáveis por processo, total de linhas, mês, ano) da planilha."""
+    from icms_pi.excel_filiais import extrair_todos_os_dados, obter_dados_para_dae
+    from icms_pi.indice_itens import IndiceItens
+
+    linhas, nome_para_indice, mes_ref, ano_ref = extrair_todos_os_dados(planilha)
+    indice = IndiceItens(obter_dados_para_dae(linhas, nome_para_indice, mes_ref, ano_ref))
+    return (
+        {pid: indice.itens_do_processo(pid) for pid in processos_ids},
+        len(indice), mes_ref, ano_ref,
+    )
+
+
+def _salvar_resultado(pasta: Path, resultado: dict[str, object]) -> Path:
+    pasta.mkdir(parents=True, exist_ok=True)
+    caminho = pasta / f"resultado_lote_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    caminho.write_text(json.dumps(resultado, ensure_ascii=False, indent=2), encoding="utf-8")
+    return caminho
+
+
+def executar(
+    planilha: Path,
+    processos_ids: list[str],
+    headless: bool = True,
+    motor: str | None = None,
+    concorrencia: int | None = None,
+    sondar: bool = False,
+    pasta_saida: Path | None = None,
+    particoes: int | None = None,
+    ies_por_minuto: float | None = None,
+) -> tuple[int, Path | None]:
+    """Roda o lote da planilha e grava o resultado; devolve (código de saída, arquivo)."""
+    from icms_pi.controle_execucao import (
+        ControleExecucao,
+        LoteRecusadoPelaSonda,
+        registrar_controle,
+    )
+    from icms_pi.execucao_lote import executar_lote
+    from icms_pi.execucao_particionada import executar_particionado
+    from icms_pi.telemetria import encerrar_telemetria, iniciar_telemetria
+
+    if pasta_saida is not None:
+        configuracoes.PASTA_SAIDA_RESULTADOS_ABSOLUTA = pasta_saida.resolve()
+    motor = motor or configuracoes.MOTOR_AUTOMACAO
+    particoes = particoes or configuracoes.PARTICOES_LOTE
+
+    try:
+        lista_por_processo, total_linhas, mes_ref, ano_ref = _montar_lote(planilha, processos_ids)
+    except Exception as e:
+        logger.error("Não foi possível ler a planilha %s: %s", planilha, e)
+        return SAIDA_ENTRADA_INVALIDA, None
+    quantidades = {pid: len(itens) for pid, itens in lista_por_processo.items()}
+    logger.info(
+        "Planilha %s: %d linha(s), período %02d/%d, executáveis por processo %s.",
+        planilha.name, total_linhas, mes_ref, ano_ref, quantidades,
+    )
+
+    # Primeiro Ctrl+C cancela o lote de forma cooperativa (fecha navegadores, grava o parcial)
+    controle = ControleExecucao()
+    if particoes > 1:
+        if sondar:
+            logger.warning("Sonda do portal ignorada no lote particionado.")
+            sondar = False
+        controle, futuro = executar_particionado(
+            lista_por_processo, processos_ids, headless, motor=motor, particoes=particoes,
+            concorrencia=concorrencia, ies_por_minuto=ies_por_minuto,
+        )
+
+    def _ao_interromper(_sinal, _quadro) -> None:
+        logger.warning("Interrupção recebida: cancelando o lote.")
+        controle.cancelar()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    sinal_anterior = signal.signal(signal.SIGINT, _ao_interromper)
+    inicio = datetime.now()
+    t0 = time.perf_counter()
+    recusa: list[str] | None = None
+    if particoes > 1:
+        try:
+            # Espera em fatias: o tratador do Ctrl+C só roda entre elas
+            while not concurrent.futures.wait([futuro], timeout=0.5).done:
+                pass
+            ies_ok, ies_erro = futuro.result()
+        finally:
+            signal.signal(signal.SIGINT, sinal_anterior)
+    else:
+        registrar_controle(controle)
+        iniciar_telemetria()
+        try:
+            ies_ok, ies_erro = asyncio.run(
+                executar_lote(
+                    lista_por_processo, processos_ids, headless,
+                    motor=motor, sondar=sondar, concorrencia=concorrencia,
+                )
+            )
+        except LoteRecusadoPelaSonda as e:
+            logger.error("Lote recusado pela sonda do portal: %s", e)
+            ies_ok, ies_erro, recusa = [], [], e.motivos
+        finally:
+            encerrar_telemetria()
+            registrar_controle(None)
+            signal.signal(signal.SIGINT, sinal_anterior)
+
+    caminho = _salvar_resultado(configuracoes.PASTA_SAIDA_RESULTADOS_ABSOLUTA, {
+        "planilha": str(planilha.resolve()),
+        "periodo": f"{mes_ref:02d}/{ano_ref}",
+        "processos": processos_ids,
+        "motor": motor,
+        "headless": headless,
+        "concorrencia": concorrencia,
+        "sondar": sondar,
+        "particoes": particoes,
+        "ies_por_minuto": ies_por_minuto,
+        "inicio": inicio.isoformat(timespec="seconds"),
+        "duracao_s": round(time.perf_counter() - t0, 1),
+        "cancelado": controle.cancelado,
+        "recusado_pela_sonda": recusa,
+        "executaveis": quantidades,
+        "sucesso": ies_ok,
+        "erro": [{"ie": ie, "motivo": motivo} for ie, motivo in ies_erro],
+    })
+    situacao = (
+        "cancelado" if controle.cancelado
+        else "recusado pela sonda" if recusa is not None else "concluído"
+    )
+    logger.info(
+        "Lote %s: %d sucesso, %d erro(s). Resultado em %s",
+        situacao, len(ies_ok), len(ies_erro), caminho,
+    )
+    if controle.cancelado:
+        return SAIDA_INTERROMPIDA, caminho
+    if recusa is not None:
+        return SAIDA_RECUSADO_PELA_SONDA, caminho
+    return (SAIDA_COM_ERROS if ies_erro else SAIDA_SUCESSO), caminho
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="icms_pi_cli",
+        description="Executa o lote de DAEs de uma planilha sem interface gráfica.",
+    )
+    parser.add_argument("planilha", type=Path, help="planilha Excel das filiais")
+    parser.add_argument(
+        "--processos", default=",".join(PROCESSOS_VALIDOS),
+        help="processos separados por vírgula (antecipado,normal,difal)",
+    )
+    parser.add_argument(
+        "--motor", default=configuracoes.MOTOR_AUTOMACAO,
+        choices=(configuracoes.MOTOR_NAVEGADOR, configuracoes.MOTOR_HTTP),
+    )
+    parser.add_argument("--concorrencia", type=int, default=None, help="contextos do motor HTTP")
+    parser.add_argument("--sondar", action="store_true", help="sonda o portal antes do lote")
+    parser.add_argument(
+        "--particoes", type=int, default=None,
+        help="processos que dividem as I.E.s, cada um com seu navegador (padrão: PARTICOES_LOTE)",
+    )
+    parser.add_argument(
+        "--ies-por-minuto", type=float, default=None,
+        help="teto de I.E.s por minuto somando as partições (padrão: ORCAMENTO_IES_POR_MINUTO)",
+    )
+    parser.add_argument("--com-janela", action="store_true", help="navegador visível")
+    parser.add_argument(
+        "--saida", type=Path, default=None,
+        help="pasta do resultado, telemetria e latências (padrão: pasta de resultados)",
+    )
+    args = parser.parse_args(argv)
+
+    processos_ids = [p.strip() for p in args.processos.split(",") if p.strip()]
+    invalidos = [p for p in processos_ids if p not in PROCESSOS_VALIDOS]
+    if invalidos or not processos_ids:
+        parser.error(f"processos inválidos: {', '.join(invalidos) or '(nenhum)'}")
+    if args.concorrencia is not None and args.concorrencia < 1:
+        parser.error("--concorrencia deve ser ao menos 1")
+    if args.particoes is not None and args.particoes < 1:
+        parser.error("--particoes deve ser ao menos 1")
+    if args.ies_por_minuto is not None and args.ies_por_minuto < 0:
+        parser.error("--ies-por-minuto não pode ser negativo")
+    if not args.planilha.is_file():
+        parser.error(f"planilha não encontrada: {args.planilha}")
+
+    codigo, caminho = executar(
+        args.planilha,
+        processos_ids,
+        headless=not args.com_janela,
+        motor=args.motor,
+        concorrencia=args.concorrencia,
+        sondar=args.sondar,
+        pasta_saida=args.saida,
+        particoes=args.particoes,
+        ies_por_minuto=args.ies_por_minuto,
+    )
+    if caminho:
+        print(f"Resultado salvo em {caminho}")
+    return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main())
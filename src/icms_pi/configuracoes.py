@@ -1,6 +1,7 @@
 """Constantes e configurações comuns do sistema ICMS-PI.
 
-Inclui: URL do portal DAR Web, timeouts, configurações de lote, pastas de saída/erro.
+Inclui: URL do portal DAR Web, timeouts, mensagens de erro do portal, configurações de lote,
+pastas de saída/erro, logging.
 """
 
 import os
@@ -11,16 +12,106 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # --- URL do portal ---
-URL_PORTAL_DARWEB_SEFAZ_PI = "https://webas.sefaz.pi.gov.br/darweb/faces/views/index.xhtml"
+URL_PORTAL_DARWEB_SEFAZ_PI = os.getenv(
+    "URL_PORTAL_DARWEB_SEFAZ_PI",
+    "https://webas.sefaz.pi.gov.br/darweb/faces/views/index.xhtml",
+)
 
 # --- Timeouts ---
 TIMEOUT_PAGINA_CARREGAR_MS = 30_000
 TIMEOUT_AGUARDAR_ELEMENTO_MS = 15_000
 
+TIMEOUT_REVALIDAR_SELETOR_MS = 3_000
+
+# --- Mensagens de erro do portal (PrimeFaces growl / messages) ---
+# Só severidades error/fatal: avisos (warn) do PrimeFaces não interrompem a I.E.
+SELETOR_PI_MENSAGENS_ERRO = ", ".join(
+    (
+        ".ui-growl-item:has(.ui-growl-image-error)",
+        ".ui-growl-item:has(.ui-growl-image-fatal)",
+        ".ui-messages-error",
+        ".ui-messages-fatal",
+        ".ui-message-error",
+    )
+)
+
 # --- Configurações de lote ---
 INTERVALO_ENTRE_EXECUCOES_MS = 10_000
 QUANTIDADE_POR_VEZ = 1
 
+# --- Motor de automação ---
+# "navegador" (Playwright/Chromium) ou "http" (postback JSF direto; navegador como fallback)
+MOTOR_NAVEGADOR = "navegador"
+MOTOR_HTTP = "http"
+MOTOR_AUTOMACAO = os.getenv("MOTOR_AUTOMACAO", MOTOR_NAVEGADOR)
+# Motor HTTP: contextos simultâneos por processo e pausa entre I.E.s de um mesmo contexto
+# (o intervalo do navegador, INTERVALO_ENTRE_EXECUCOES_MS, anularia o ganho do motor)
+CONCORRENCIA_MOTOR_HTTP = max(1, int(os.getenv("CONCORRENCIA_MOTOR_HTTP", "4")))
+INTERVALO_MOTOR_HTTP_MS = int(os.getenv("INTERVALO_MOTOR_HTTP_MS", "2000"))
+
+# --- Sonda do portal antes do lote ---
+# I.E. fictícia usada para percorrer o fluxo até o formulário Caso Geral (configurável no .env)
+IE_SONDA_PORTAL = os.getenv("IE_SONDA_PORTAL", "000000000")
+# Etapa da sonda acima deste tempo → lote roda com concorrência mínima
+LIMITE_LATENCIA_SONDA_MS = 8_000
+
+# --- Agendamento dos processos do lote ---
+# ATC, Normal e DIFAL como tarefas concorrentes no mesmo event loop (multiplica a carga no portal)
+PROCESSOS_EM_PARALELO = os.getenv("PROCESSOS_EM_PARALELO", "0") == "1"
+
+# --- Worker da automação (icms_pi.worker_automacao) ---
+# A GUI roda os motores em um processo separado (0 = thread no próprio processo da GUI)
+WORKER_EM_PROCESSO = os.getenv("WORKER_EM_PROCESSO", "1") != "0"
+# Reinícios do worker por lote após queda (retoma as I.E.s pendentes do diário)
+WORKER_REINICIOS_MAXIMOS = 2
+
+# --- Lote particionado (icms_pi.execucao_particionada) ---
+# Processos do sistema que dividem as I.E.s do lote, cada um com seu navegador (1 = sem partição)
+PARTICOES_LOTE = max(1, int(os.getenv("PARTICOES_LOTE", "1")))
+# Teto de I.E.s por minuto somando todas as partições (0 = sem teto)
+ORCAMENTO_IES_POR_MINUTO = float(os.getenv("ORCAMENTO_IES_POR_MINUTO", "0"))
+
+# --- Execução distribuída (icms_pi.execucao_distribuida) ---
+DISTRIBUIDO_PORTA = int(os.getenv("DISTRIBUIDO_PORTA", "8765"))
+# Token compartilhado entre coordenador e workers (cabeçalho X-Icms-Pi-Token; vazio = sem token)
+DISTRIBUIDO_TOKEN = os.getenv("DISTRIBUIDO_TOKEN", "")
+# Validade da concessão de uma I.E. sem renovação; o worker renova a cada terço do prazo
+DISTRIBUIDO_CONCESSAO_S = float(os.getenv("DISTRIBUIDO_CONCESSAO_S", "120"))
+# I.E.s concedidas por pedido do worker (um navegador/cliente HTTP por grupo)
+DISTRIBUIDO_IES_POR_PEDIDO = 5
+# Concessões expiradas da mesma I.E. antes de ela voltar como erro (worker cai sempre nela)
+DISTRIBUIDO_EXPIRACOES_MAXIMAS = 3
+
+# --- Telemetria JSONL por execução (resultados/telemetria_<execucao>.jsonl) ---
+TELEMETRIA_ATIVA = os.getenv("TELEMETRIA_ATIVA", "1") != "0"
+# Eventos aguardando escrita; acima disso são descartados (nunca bloqueia o event loop)
+CAPACIDADE_FILA_TELEMETRIA = 10_000
+
+# --- Logging (um arquivo por execução em logs/, gravado por QueueListener) ---
+LOG_NIVEL_CONSOLE = os.getenv("LOG_NIVEL_CONSOLE", "INFO")
+LOG_NIVEL_ARQUIVO = os.getenv("LOG_NIVEL_ARQUIVO", "DEBUG")
+# Nível por subsistema (prefixo do logger), ex.: "atc=INFO,icms_pi.motor_http=DEBUG"
+LOG_NIVEIS = os.getenv("LOG_NIVEIS", "")
+LOG_TAMANHO_MAXIMO_BYTES = 10 * 1024 * 1024
+LOG_SEGMENTOS_POR_EXECUCAO = 5
+LOG_EXECUCOES_MANTIDAS = 30
+# Painel de log da GUI: últimas linhas mantidas em memória (o histórico completo fica no arquivo)
+LOG_PAINEL_CAPACIDADE = int(os.getenv("LOG_PAINEL_CAPACIDADE", "2000"))
+LOG_PAINEL_INTERVALO_MS = 200
+
+# --- Artefatos de falha (capturas_erros/, ver atc.navegacao.artefatos_falha) ---
+# "jpeg" (recortado na região do formulário) ou "png"
+ARTEFATOS_FORMATO_CAPTURA = os.getenv("ARTEFATOS_FORMATO_CAPTURA", "jpeg")
+ARTEFATOS_QUALIDADE_JPEG = int(os.getenv("ARTEFATOS_QUALIDADE_JPEG", "60"))
+# DOM da página na falha: "" (desligado), "html" ou "mhtml"
+ARTEFATOS_DOM = os.getenv("ARTEFATOS_DOM", "")
+# Trace do Playwright (um .trace.zip por falha); pesa no tempo de cada etapa
+ARTEFATOS_TRACE = os.getenv("ARTEFATOS_TRACE", "0") == "1"
+# Mesma assinatura e hash perceptual da captura (64 bits) a até N bits: tela repetida
+ARTEFATOS_DISTANCIA_HASH_TELA = int(os.getenv("ARTEFATOS_DISTANCIA_HASH_TELA", "4"))
+# Acima disso, os artefatos mais antigos são removidos
+ARTEFATOS_ORCAMENTO_DISCO_MB = int(os.getenv("ARTEFATOS_ORCAMENTO_DISCO_MB", "200"))
+
 # --- Pastas ---
 PASTA_SAIDA_RESULTADOS = os.getenv("PASTA_SAIDA_RESULTADOS", "resultados")
 PASTA_CAPTURAS_DE_TELA_ERROS = os.getenv("PASTA_CAPTURAS_DE_TELA_ERROS", "capturas_erros")
@@ -29,3 +120,6 @@ _raiz_projeto = Path(__file__).resolve().parent.parent.parent
 PASTA_SAIDA_RESULTADOS_ABSOLUTA = _raiz_projeto / PASTA_SAIDA_RESULTADOS
 PASTA_CAPTURAS_ERROS_ABSOLUTA = _raiz_projeto / PASTA_CAPTURAS_DE_TELA_ERROS
 
+# Seletores concretos resolvidos por pistas estáveis (ids JSF mudam a cada deploy da SEFAZ)
+ARQUIVO_CACHE_SELETORES = PASTA_SAIDA_RESULTADOS_ABSOLUTA / "cache_seletores.json"
+
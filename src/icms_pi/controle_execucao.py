@@ -0,0 +1,154 @@
+"""
+Pausa, retomada e cancelamento cooperativos do lote.
+
+A GUI cria um ``ControleExecucao`` por lote e o registra (``registrar_controle``) na thread do
+lote; os motores consultam o controle ativo sem recebê-lo por parâmetro, como os eventos de
+progresso. Sem controle registrado (CLI, benchmark) as funções não fazem nada.
+
+- ``ponto_de_controle()``: entre I.E.s; espera enquanto pausado e levanta
+  ``ExecucaoCancelada`` se cancelado.
+- ``trecho_cancelavel()``: em volta de esperas e etapas longas (intervalo entre I.E.s, I.E.
+  no portal); um vigia confere o cancelamento a cada ``_FATIA_S`` e interrompe a tarefa no
+  ponto em que estiver, de modo que o cancelamento para em menos de um segundo.
+
+Com ``registrar_orcamento`` (lote particionado em vários processos, ``icms_pi.execucao_particionada``)
+``ponto_de_controle()`` também espera a vaga da I.E. no orçamento global de taxa. O controle
+pode ser criado com eventos de ``multiprocessing`` e repassado aos processos do lote.
+
+``ExecucaoCancelada`` herda de ``BaseException`` (como ``asyncio.CancelledError``): atravessa
+os ``except Exception`` das I.E.s, passa pelos ``finally`` que fecham navegador e contextos e é
+tratada no nível do fluxo, que devolve os resultados parciais.
+
+``LoteRecusadoPelaSonda`` sinaliza que a sonda do portal recusou o lote antes da primeira
+I.E.: nenhuma foi executada, e quem chama relata a recusa à parte dos erros por I.E.
+"""
+
+import threading
+from contextlib import asynccontextmanager
+
+# Granularidade das esperas: teto da latência de pausa/cancelamento
+_FATIA_S = 0.1
+
+
+class ExecucaoCancelada(BaseException):
+    """O operador cancelou o lote."""
+
+
+class LoteRecusadoPelaSonda(Exception):
+    """A sonda do portal recusou o lote; nenhuma I.E. foi executada."""
+
+    def __init__(self, motivos: list[str]) -> None:
+        super().__init__("; ".join(motivos) or "sonda do portal")
+        self.motivos = list(motivos)
+
+
+class ControleExecucao:
+    """Estado de pausa/cancelamento compartilhado entre a thread do Tk e a do lote."""
+
+    def __init__(self, contexto_mp=None) -> None:
+        # Com um contexto de multiprocessing, os eventos valem também nos processos filhos
+        fabrica_evento = contexto_mp.Event if contexto_mp is not None else threading.Event
+        self._cancelado = fabrica_evento()
+        self._liberado = fabrica_evento()
+        self._liberado.set()
+
+    @property
+    def cancelado(self) -> bool:
+        return self._cancelado.is_set()
+
+    @property
+    def pausado(self) -> bool:
+        return not self._liberado.is_set() and not self.cancelado
+
+    def pausar(self) -> None:
+        self._liberado.clear()
+
+    def retomar(self) -> None:
+        self._liberado.set()
+
+    def cancelar(self) -> None:
+        self._cancelado.set()
+        self._liberado.set()
+
+    def verificar(self) -> None:
+        if self.cancelado:
+            raise ExecucaoCancelada()
+
+    async def aguardar_liberacao(self) -> None:
+        """Retorna quando não estiver pausado; levanta ``ExecucaoCancelada`` se cancelado."""
+        import asyncio  # só roda dentro do event loop; fora dele a GUI não paga o import
+
+        while not self._liberado.is_set():
+            await asyncio.sleep(_FATIA_S)
+        self.verificar()
+
+
+_controle_ativo: ControleExecucao | None = None
+# Objeto com ``reservar() -> segundos de espera`` (ex.: ``OrcamentoTaxa``)
+_orcamento_ativo = None
+
+
+def registrar_controle(controle: ControleExecucao | None) -> None:
+    """Define o controle do lote em andamento (None desliga)."""
+    global _controle_ativo
+    _controle_ativo = controle
+
+
+def registrar_orcamento(orcamento) -> None:
+    """Define o orçamento de taxa consultado a cada I.E. (None desliga)."""
+    global _orcamento_ativo
+    _orcamento_ativo = orcamento
+
+
+def execucao_cancelada() -> bool:
+    controle = _controle_ativo
+    return controle is not None and controle.cancelado
+
+
+async def ponto_de_controle() -> None:
+    controle = _controle_ativo
+    if controle is not None:
+        await controle.aguardar_liberacao()
+    orcamento = _orcamento_ativo
+    if orcamento is not None:
+        import asyncio
+
+        espera = orcamento.reservar()
+        while espera > 0:
+            if controle is not None:
+                controle.verificar()
+            fatia = min(_FATIA_S, espera)
+            await asyncio.sleep(fatia)
+            espera -= fatia
+
+
+@asynccontextmanager
+async def trecho_cancelavel():
+    """Interrompe o trecho (na espera ou etapa em curso) quando o lote é cancelado."""
+    import asyncio
+
+    controle = _controle_ativo
+    if controle is None:
+        yield
+        return
+    controle.verificar()
+    tarefa = asyncio.current_task()
+    interrompida = False
+
+    async def _vigiar() -> None:
+        nonlocal interrompida
+        while not controle.cancelado:
+            await asyncio.sleep(_FATIA_S)
+        interrompida = True
+        tarefa.cancel()
+
+    vigia = asyncio.create_task(_vigiar())
+    try:
+        yield
+    except asyncio.CancelledError:
+        if not interrompida:
+            raise
+        tarefa.uncancel()
+        raise ExecucaoCancelada() from None
+    finally:
+        vigia.cancel()
@@ -0,0 +1,138 @@
+"""
+Diário do lote (``resultados/diario_<execução>.jsonl``): o que foi pedido e o que já terminou.
+
+Uma linha JSON por registro, gravada e descarregada na hora (sobrevive à queda do worker):
+
+- ``lote``: processos, motor, headless, sonda e os itens de cada processo;
+- ``ie``: resultado terminal de uma I.E. em um processo (sucesso, falha ou pulada, com motivo);
+- ``reinicio``: o worker caiu e foi reiniciado com as pendentes;
+- ``concessao_expirada``: (execução distribuída) o worker com a I.E. parou de renovar a concessão;
+- ``fim``: totais do lote e se foi cancelado.
+
+``pendentes`` devolve os itens do lote sem registro ``ie`` — é com eles que o worker é
+reiniciado — e ``resultados`` remonta (sucesso, erro) a partir dos registros.
+"""
+
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from icms_pi import configuracoes
+from icms_pi.logger import configurar_logger_da_aplicacao
+from icms_pi.regras_valor import item_sem_valor
+
+logger = configurar_logger_da_aplicacao(__name__)
+
+RESULTADO_SUCESSO = "sucesso"
+RESULTADO_FALHA = "falha"
+RESULTADO_PULADA = "pulada"
+
+
+def item_serializavel(item: dict[str, object]) -> dict[str, object]:
+    """Item do lote sem as células originais da planilha (não vão para o worker nem o diário)."""
+    return {chave: valor for chave, valor in item.items() if chave != "dados_originais"}
+
+
+class DiarioExecucao:
+    """Diário JSONL de um lote; escrito por um processo de cada vez (GUI ou worker)."""
+
+    def __init__(self, caminho: Path) -> None:
+        self.caminho = caminho
+        self._trava = threading.Lock()
+
+    @classmethod
+    def novo(cls, pasta: Path | None = None) -> "DiarioExecucao":
+        pasta = pasta or configuracoes.PASTA_SAIDA_RESULTADOS_ABSOLUTA
+        pasta.mkdir(parents=True, exist_ok=True)
+        return cls(pasta / f"diario_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.jsonl")
+
+    def registrar(self, registro: dict[str, object]) -> None:
+        registro = {"ts": datetime.now().isoformat(timespec="milliseconds"), **registro}
+        linha = json.dumps(registro, ensure_ascii=False, default=str) + "\n"
+        with self._trava:
+            try:
+                with open(self.caminho, "a", encoding="utf-8") as arquivo:
+                    arquivo.write(linha)
+                    arquivo.flush()
+            except OSError:
+                logger.exception("Falha ao gravar o diário do lote em %s", self.caminho)
+
+    def registrar_lote(
+        self,
+        lista_por_processo: dict[str, list[dict[str, object]]],
+        processos_ids: list[str],
+        headless: bool,
+        motor: str | None,
+        sondar: bool,
+    ) -> None:
+        self.registrar({
+            "tipo": "lote",
+            "processos": processos_ids,
+            "headless": headless,
+            "motor": motor,
+            "sondar": sondar,
+            "itens": {
+                pid: [item_serializavel(item) for item in itens]
+                for pid, itens in lista_por_processo.items()
+            },
+        })
+
+    def registrar_ie(self, processo: str, ie: str, resultado: str, motivo: str = "") -> None:
+        self.registrar(
+            {"tipo": "ie", "processo": processo, "ie": ie, "resultado": resultado, "motivo": motivo}
+        )
+
+    def ler(self) -> list[dict[str, object]]:
+        """Registros válidos (uma linha truncada pela queda do processo é ignorada)."""
+        registros: list[dict[str, object]] = []
+        try:
+            with open(self.caminho, encoding="utf-8") as arquivo:
+                for linha in arquivo:
+                    try:
+                        registros.append(json.loads(linha))
+                    except ValueError:
+                        continue
+        except OSError:
+            pass
+        return registros
+
+    def pendentes(self) -> dict[str, list[dict[str, object]]]:
+        registros = self.ler()
+        lote = next((r for r in registros if r.get("tipo") == "lote"), None)
+        if lote is None:
+            return {}
+        concluidas = {
+            (r["processo"], r["ie"]) for r in registros if r.get("tipo") == "ie"
+        }
+        return {
+            pid: [item for item in itens if (pid, str(item.get("ie", ""))) not in concluidas]
+            for pid, itens in lote["itens"].items()
+        }
+
+    def resultados(self) -> tuple[list[str], list[tuple[str, str]]]:
+        """
+        (IEs com sucesso, (IE, motivo) de falhas e puladas) segundo o diário. Como em
+        ``executar_fluxo_por_ie_pi``, a I.E. pulada por valor ausente/zero não entra nos erros.
+        """
+        registros = self.ler()
+        lote = next((r for r in registros if r.get("tipo") == "lote"), None)
+        itens = {
+            (pid, str(item.get("ie", ""))): item
+            for pid, itens_processo in (lote["itens"].items() if lote else ())
+            for item in itens_processo
+        }
+        ies_ok: list[str] = []
+        ies_erro: list[tuple[str, str]] = []
+        for registro in registros:
+            if registro.get("tipo") != "ie":
+                continue
+            if registro["resultado"] == RESULTADO_SUCESSO:
+                ies_ok.append(registro["ie"])
+                continue
+            if registro["resultado"] == RESULTADO_PULADA:
+                item = itens.get((registro["processo"], registro["ie"]))
+                if item is not None and item_sem_valor(registro["processo"], item):
+                    continue
+            ies_erro.append((registro["ie"], registro.get("motivo") or registro["resultado"]))
+        return ies_ok, ies_erro
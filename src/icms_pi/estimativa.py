@@ -0,0 +1,203 @@
+"""
+Estimativa de duração do lote e ETA ao vivo.
+
+Antes da execução, ``estimar_lote`` usa o histórico de tempos por etapa gravado por
+``MedidorEtapas`` (``resultados/latencias_*_<processo>_<motor>.json``, execuções mais recentes
+mescladas) para prever a duração por processo: abertura do navegador, custo médio por I.E.
+(I.E. completa + volta à página inicial) e o intervalo entre I.E.s configurado, dividido pela
+concorrência no motor HTTP. Sem histórico, valem custos padrão conservadores.
+
+Durante a execução, ``EstimadorEta`` consome os eventos de progresso (``icms_pi.progresso``):
+vazão em I.E.s/min numa janela móvel, ETA (misturando a previsão inicial com a vazão observada
+conforme as amostras chegam, de modo que mudanças de concorrência, intervalo ou falhas entram
+na estimativa) e um sparkline da latência média móvel por I.E.
+"""
+
+import json
+import time
+from collections import deque
+from pathlib import Path
+
+from icms_pi import configuracoes
+from icms_pi.instrumentacao import HistogramaLatencia
+from icms_pi.logger import configurar_logger_da_aplicacao
+from icms_pi.progresso import (
+    EVENTO_FALHA,
+    EVENTO_INICIADA,
+    EVENTO_PULADA,
+    EVENTO_SUCESSO,
+)
+
+logger = configurar_logger_da_aplicacao(__name__)
+
+# Execuções anteriores mescladas por processo e motor
+HISTORICO_EXECUCOES = 10
+
+# Custos padrão (ms) sem histórico
+_CUSTO_PADRAO_MS: dict[str, dict[str, float]] = {
+    configuracoes.MOTOR_NAVEGADOR: {
+        "iniciar_navegador": 3_000.0, "pagina_inicial": 2_500.0, "ie_completa": 15_000.0,
+    },
+    configuracoes.MOTOR_HTTP: {
+        "iniciar_navegador": 0.0, "pagina_inicial": 0.0, "ie_completa": 2_000.0,
+    },
+}
+
+# Janela da vazão ao vivo e amostras até a vazão observada prevalecer sobre a previsão
+_JANELA_VAZAO_S = 300.0
+_AMOSTRAS_CONFIANCA = 10
+_BLOCOS_SPARKLINE = "▁▂▃▄▅▆▇█"
+
+
+def carregar_historico(
+    processo: str, motor: str, pasta: Path | None = None
+) -> tuple[dict[str, HistogramaLatencia], int]:
+    """Histogramas por etapa das últimas execuções do processo/motor e quantas foram lidas."""
+    pasta = pasta or configuracoes.PASTA_SAIDA_RESULTADOS_ABSOLUTA
+    arquivos = sorted(pasta.glob(f"latencias_*_{processo}_{motor}.json"))[-HISTORICO_EXECUCOES:]
+    histogramas: dict[str, HistogramaLatencia] = {}
+    lidas = 0
+    for caminho in arquivos:
+        try:
+            dados = json.loads(caminho.read_text(encoding="utf-8"))
+            for etapa, dados_histograma in dados["histogramas"].items():
+                histograma = HistogramaLatencia.de_dict(dados_histograma)
+                histogramas.setdefault(etapa, HistogramaLatencia()).mesclar(histograma)
+        except (OSError, ValueError, KeyError):
+            logger.warning("Histórico de latências ilegível: %s", caminho)
+            continue
+        lidas += 1
+    return histogramas, lidas
+
+
+def _media_ms(histogramas: dict[str, HistogramaLatencia], etapa: str, padrao: float) -> float:
+    histograma = histogramas.get(etapa)
+    if histograma is None or not histograma.total:
+        return padrao
+    return histograma.soma_us / histograma.total / 1000.0
+
+
+def estimar_lote(
+    quantidades: dict[str, int],
+    motor: str,
+    concorrencia: int | None = None,
+    intervalo_ms: int | None = None,
+) -> dict[str, object]:
+    """
+    Duração prevista do lote: {"total_s", "por_processo": {processo: s}, "execucoes_historico"}.
+    Os processos rodam em sequência; no motor HTTP, as I.E.s de um processo em paralelo.
+    """
+    if motor == configuracoes.MOTOR_HTTP:
+        concorrencia = max(1, concorrencia or configuracoes.CONCORRENCIA_MOTOR_HTTP)
+        if intervalo_ms is None:
+            intervalo_ms = configuracoes.INTERVALO_MOTOR_HTTP_MS
+    else:
+        concorrencia = max(1, concorrencia or configuracoes.QUANTIDADE_POR_VEZ)
+        if intervalo_ms is None:
+            intervalo_ms = configuracoes.INTERVALO_ENTRE_EXECUCOES_MS
+    padrao = _CUSTO_PADRAO_MS.get(motor, _CUSTO_PADRAO_MS[configuracoes.MOTOR_NAVEGADOR])
+    por_processo: dict[str, float] = {}
+    execucoes_historico = 0
+    for processo, quantidade in quantidades.items():
+        if quantidade <= 0:
+            continue
+        historico, lidas = carregar_historico(processo, motor)
+        execucoes_historico += lidas
+        abertura_ms = _media_ms(historico, "iniciar_navegador", padrao["iniciar_navegador"])
+        pagina_ms = _media_ms(historico, "pagina_inicial", padrao["pagina_inicial"])
+        ie_ms = _media_ms(historico, "ie_completa", padrao["ie_completa"])
+        if motor == configuracoes.MOTOR_HTTP:
+            total_ms = quantidade * (ie_ms + intervalo_ms) / concorrencia
+        else:
+            total_ms = abertura_ms + pagina_ms + quantidade * ie_ms
+            total_ms += (quantidade - 1) * (intervalo_ms + pagina_ms)
+        por_processo[processo] = total_ms / 1000.0
+    return {
+        "total_s": sum(por_processo.values()),
+        "por_processo": por_processo,
+        "execucoes_historico": execucoes_historico,
+    }
+
+
+def formatar_duracao(segundos: float) -> str:
+    segundos = max(0, int(round(segundos)))
+    if segundos >= 3600:
+        return f"{segundos // 3600} h {segundos % 3600 // 60:02d} min"
+    if segundos >= 60:
+        return f"{segundos // 60} min {segundos % 60:02d} s"
+    return f"{segundos} s"
+
+
+class EstimadorEta:
+    """Vazão, ETA e latência móvel do lote em andamento, a partir dos eventos de progresso."""
+
+    def __init__(self, total: int, estimativa_inicial_s: float) -> None:
+        self.total = total
+        self._inicio = time.time()
+        self._segundos_por_ie_previsto = estimativa_inicial_s / total if total else 0.0
+        self.concluidas = 0
+        self._conclusoes: deque[float] = deque()
+        self._inicio_por_ie: dict[tuple[str, str], float] = {}
+        self._duracoes: deque[float] = deque(maxlen=60)
+
+    def registrar(self, evento: dict[str, object]) -> None:
+        tipo = evento["tipo"]
+        ts = float(evento["ts"])
+        chave = (str(evento["processo"]), str(evento["ie"]))
+        if tipo == EVENTO_INICIADA:
+            self._inicio_por_ie[chave] = ts
+        elif tipo in (EVENTO_SUCESSO, EVENTO_FALHA):
+            self.concluidas += 1
+            self._conclusoes.append(ts)
+            inicio = self._inicio_por_ie.pop(chave, None)
+            if inicio is not None:
+                self._duracoes.append(ts - inicio)
+        elif tipo == EVENTO_PULADA:
+            # Sem custo de portal: sai do restante, mas não entra na vazão
+            self.concluidas += 1
+
+    def ies_por_minuto(self, agora: float | None = None) -> float:
+        agora = agora or time.time()
+        while self._conclusoes and agora - self._conclusoes[0] > _JANELA_VAZAO_S:
+            self._conclusoes.popleft()
+        if not self._conclusoes:
+            return 0.0
+        janela = min(_JANELA_VAZAO_S, agora - self._inicio)
+        return len(self._conclusoes) / janela * 60.0 if janela > 0 else 0.0
+
+    def eta_s(self, agora: float | None = None) -> float:
+        """Tempo restante: previsão inicial, substituída pela vazão observada conforme as amostras."""
+        restantes = max(0, self.total - self.concluidas)
+        previsto = restantes * self._segundos_por_ie_previsto
+        vazao = self.ies_por_minuto(agora)
+        if not vazao:
+            return previsto
+        observado = restantes / vazao * 60.0
+        peso = min(1.0, len(self._conclusoes) / _AMOSTRAS_CONFIANCA)
+        return peso * observado + (1.0 - peso) * previsto
+
+    def _medias_moveis(self, janela_media: int = 5) -> list[float]:
+        duracoes = list(self._duracoes)
+        medias = []
+        for i in range(len(duracoes)):
+            trecho = duracoes[max(0, i - janela_media + 1): i + 1]
+            medias.append(sum(trecho) / len(trecho))
+        return medias
+
+    def sparkline(self, pontos: int = 20) -> str:
+        """Latência média móvel por I.E. (últimas conclusões) em blocos unicode."""
+        medias = self._medias_moveis()[-pontos:]
+        if len(medias) < 2:
+            return ""
+        minimo, maximo = min(medias), max(medias)
+        faixa = (maximo - minimo) or 1.0
+        ultimo = len(_BLOCOS_SPARKLINE) - 1
+        return "".join(_BLOCOS_SPARKLINE[int((m - minimo) / faixa * ultimo)] for m in medias)
+
+    def resumo(self) -> str:
+        medias = self._medias_moveis()
+        latencia = f"  {medias[-1]:.1f} s/IE" if medias else ""
+        return (
+            f"{self.ies_por_minuto():.1f} IEs/min  ETA {formatar_duracao(self.eta_s())}"
+            f"{latencia}  {self.sparkline()}"
+        ).rstrip()
@@ -1,7 +1,9 @@
 """Extração de dados de planilhas Excel de filiais (formato ICMS-PI: ATC, Normal, DIFAL). Inclui colunas ATC e DIF. ALIQUOTA."""
 
 import re
+import threading
 import unicodedata
+from collections.abc import Iterator
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -51,6 +53,13 @@ MESES_ABREV = {
 # Dígitos I.E. Piauí
 DIGITOS_IE_PI = 9
 
+# Linhas por lote na carga incremental (extrair_em_lotes)
+TAMANHO_LOTE_CARGA = 500
+
+
+class CargaPlanilhaCancelada(Exception):
+    """Carga da planilha interrompida a pedido do usuário."""
+
 
 def _normalizar_cabecalho(texto: str | None) -> str:
     """Retorna o texto em minúsculo, sem acentos, sem pontos e com espaços normais."""
@@ -205,25 +214,18 @@ def _normalizar_ie_pi(ie: str | int | None) -> str:
     return s.zfill(DIGITOS_IE_PI)
 
 
-def _extrair_linhas_dados_completos(
+def _iterar_linhas_dados(
     planilha: openpyxl.worksheet.worksheet.Worksheet,
     indice_linha_cabecalho: int,
     nome_para_indice: dict[str, int],
     coluna_ie: int,
-) -> list[dict[str, object]]:
+) -> Iterator[dict[str, object]]:
     """
-    Percorre as linhas abaixo do cabeçalho e extrai todas as colunas até encontrar
-    uma linha de rodapé / total ou fim da área de dados.
+    Percorre as linhas abaixo do cabeçalho (uma única passada) e extrai todas as colunas até
+    encontrar uma linha de rodapé / total ou fim da área de dados.
     """
-    linhas: list[dict[str, object]] = []
-    row_num = indice_linha_cabecalho + 2
-    while True:
-        linha = list(
-            planilha.iter_rows(min_row=row_num, max_row=row_num, values_only=True)
-        )
-        if not linha:
-            break
-        celulas = list(linha[0])
+    for linha in planilha.iter_rows(min_row=indice_linha_cabecalho + 2, values_only=True):
+        celulas = list(linha)
         if _linha_parece_rodape_ou_total(celulas):
             break
         dados: dict[str, object] = {}
@@ -236,9 +238,18 @@ def _extrair_linhas_dados_completos(
             dados["ie_normalizada"] = _normalizar_ie_pi(celulas[coluna_ie])
         else:
             dados["ie_normalizada"] = ""
-        linhas.append(dados)
-        row_num += 1
-    return linhas
+        yield dados
+
+
+def _extrair_linhas_dados_completos(
+    planilha: openpyxl.worksheet.worksheet.Worksheet,
+    indice_linha_cabecalho: int,
+    nome_para_indice: dict[str, int],
+    coluna_ie: int,
+) -> list[dict[str, object]]:
+    return list(
+        _iterar_linhas_dados(planilha, indice_linha_cabecalho, nome_para_indice, coluna_ie)
+    )
 
 
 def _linha_parece_rodape_ou_total(celulas: list[object]) -> bool:
@@ -259,39 +270,83 @@ def _linha_parece_rodape_ou_total(celulas: list[object]) -> bool:
     return any(p in texto_concatenado for p in palavras_chave)
 
 
-def extrair_todos_os_dados(
+def extrair_em_lotes(
     caminho_arquivo: Path,
-) -> tuple[list[dict[str, object]], dict[str, int], int, int]:
+    tamanho_lote: int = TAMANHO_LOTE_CARGA,
+    cancelar: threading.Event | None = None,
+) -> Iterator[dict[str, object]]:
     """
-    Carrega o arquivo Excel e retorna:
-    - lista de dicionários com os dados de cada linha
-    - mapeamento nome_coluna -> índice_coluna
-    - mês de referência
-    - ano de referência
+    Carga incremental da planilha (modo somente leitura do openpyxl, uma passada nas linhas).
+    Produz primeiro ``{"tipo": "cabecalho", "nome_para_indice", "mes_ref", "ano_ref",
+    "total_estimado"}`` e depois ``{"tipo": "linhas", "linhas": [...]}`` a cada
+    ``tamanho_lote`` linhas. Com ``cancelar`` sinalizado, levanta ``CargaPlanilhaCancelada``.
     """
     logger.info("Carregando planilha: %s", caminho_arquivo)
     if not caminho_arquivo.exists():
         raise FileNotFoundError(caminho_arquivo)
 
-    workbook = openpyxl.load_workbook(caminho_arquivo, data_only=True)
-    planilha = workbook.active
-
-    indice_linha_cabecalho = _encontrar_linha_cabecalho(planilha)
-    if indice_linha_cabecalho is None:
-        raise ValueError("Não foi possível encontrar a linha de cabeçalho com I.E.")
-
-    nome_para_indice, coluna_ie = _mapear_cabecalho(planilha, indice_linha_cabecalho)
-    linhas = _extrair_linhas_dados_completos(
-        planilha, indice_linha_cabecalho, nome_para_indice, coluna_ie
-    )
-    mes_ref, ano_ref = _extrair_periodo_da_area_titulo(planilha)
+    workbook = openpyxl.load_workbook(caminho_arquivo, read_only=True, data_only=True)
+    try:
+        planilha = workbook.active
+
+        indice_linha_cabecalho = _encontrar_linha_cabecalho(planilha)
+        if indice_linha_cabecalho is None:
+            raise ValueError("Não foi possível encontrar a linha de cabeçalho com I.E.")
+
+        nome_para_indice, coluna_ie = _mapear_cabecalho(planilha, indice_linha_cabecalho)
+        mes_ref, ano_ref = _extrair_periodo_da_area_titulo(planilha)
+        total_estimado = max(0, (planilha.max_row or 0) - indice_linha_cabecalho - 1)
+        yield {
+            "tipo": "cabecalho",
+            "nome_para_indice": nome_para_indice,
+            "mes_ref": mes_ref,
+            "ano_ref": ano_ref,
+            "total_estimado": total_estimado,
+        }
+
+        lote: list[dict[str, object]] = []
+        quantidade = 0
+        for dados in _iterar_linhas_dados(
+            planilha, indice_linha_cabecalho, nome_para_indice, coluna_ie
+        ):
+            lote.append(dados)
+            if len(lote) >= tamanho_lote:
+                if cancelar is not None and cancelar.is_set():
+                    raise CargaPlanilhaCancelada(str(caminho_arquivo))
+                quantidade += len(lote)
+                yield {"tipo": "linhas", "linhas": lote}
+                lote = []
+        if lote:
+            quantidade += len(lote)
+            yield {"tipo": "linhas", "linhas": lote}
+    finally:
+        workbook.close()
 
     logger.info(
         "Planilha carregada: %d linhas de dados, período %02d/%04d",
-        len(linhas),
+        quantidade,
         mes_ref,
         ano_ref,
     )
+
+
+def extrair_todos_os_dados(
+    caminho_arquivo: Path,
+) -> tuple[list[dict[str, object]], dict[str, int], int, int]:
+    """
+    Carrega o arquivo Excel e retorna:
+    - lista de dicionários com os dados de cada linha
+    - mapeamento nome_coluna -> índice_coluna
+    - mês de referência
+    - ano de referência
+    """
+    linhas: list[dict[str, object]] = []
+    for parte in extrair_em_lotes(caminho_arquivo):
+        if parte["tipo"] == "cabecalho":
+            nome_para_indice = parte["nome_para_indice"]
+            mes_ref, ano_ref = parte["mes_ref"], parte["ano_ref"]
+        else:
+            linhas.extend(parte["linhas"])
     return linhas, nome_para_indice, mes_ref, ano_ref
 
 
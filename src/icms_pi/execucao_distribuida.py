@@ -0,0 +1,808 @@
+"""
+Execução distribuída: um coordenador com a planilha e o diário, workers em outras máquinas.
+
+O coordenador lê a planilha (mesmas regras da CLI), grava o diário do lote
+(``icms_pi.diario_execucao``) e serve um protocolo HTTP/JSON simples; os workers pedem
+concessões de I.E.s, executam com o motor do lote e devolvem cada resultado assim que ele sai:
+
+- ``POST /concessoes`` ``{"worker", "quantidade"}`` → ``{"concessoes": [{"id", "processo",
+  "item"}], "motor", "execucao", "concessao_s", "aguardar_s", "fim"}``;
+- ``POST /renovar`` ``{"worker", "concessoes": [ids]}`` → ``{"perdidas": [ids], "cancelar"}``;
+- ``POST /resultado`` ``{"worker", "concessao", "processo", "ie", "resultado", "motivo"}``;
+- ``POST /liberar`` ``{"worker", "concessoes": [ids]}``: I.E.s não executadas (worker cancelado);
+- ``GET /estado``: totais do lote e workers vistos.
+
+Uma concessão vale ``DISTRIBUIDO_CONCESSAO_S`` e o worker a renova a cada terço do prazo
+enquanto executa; se o worker cair, a concessão expira e a I.E. volta para o início da fila
+(depois de ``DISTRIBUIDO_EXPIRACOES_MAXIMAS`` expirações, volta como erro). O primeiro resultado
+terminal de uma I.E. vale; repetidos são ignorados. Com ``DISTRIBUIDO_TOKEN`` as requisições
+precisam do cabeçalho ``X-Icms-Pi-Token``; num host fora do loopback sem token configurado, o
+coordenador gera um e o mostra ao subir (os workers o recebem em ``DISTRIBUIDO_TOKEN``). Cada worker mantém um navegador/cliente HTTP por
+processo aberto entre as concessões (``MotoresReutilizaveis``) e grava sua telemetria e
+latências localmente (``telemetria_<execucao>_<worker>.jsonl``).
+
+Uso (vários workers na mesma máquina servem para testar)::
+
+    python -m icms_pi.execucao_distribuida coordenador planilha.xlsx --host 0.0.0.0 --motor http
+    python -m icms_pi.execucao_distribuida worker http://coordenador:8765
+    python -m icms_pi.execucao_distribuida coordenador --retomar resultados/diario_<...>.jsonl
+"""
+
+import argparse
+import collections
+import hmac
+import ipaddress
+import json
+import os
+import queue
+import secrets
+import signal
+import socket
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from icms_pi import configuracoes
+from icms_pi.controle_execucao import ControleExecucao, registrar_controle
+from icms_pi.diario_execucao import (
+    RESULTADO_FALHA,
+    RESULTADO_PULADA,
+    RESULTADO_SUCESSO,
+    DiarioExecucao,
+    item_serializavel,
+)
+from icms_pi.logger import configurar_logger_da_aplicacao
+from icms_pi.progresso import FilaProgresso, registrar_fila_progresso
+
+if TYPE_CHECKING:
+    import asyncio
+
+    from icms_pi.execucao_lote import MotoresReutilizaveis
+
+logger = configurar_logger_da_aplicacao(__name__)
+
+CABECALHO_TOKEN = "X-Icms-Pi-Token"
+_RESULTADOS_TERMINAIS = {RESULTADO_SUCESSO, RESULTADO_FALHA, RESULTADO_PULADA}
+_ORDEM_PROCESSOS = ("antecipado", "normal", "difal")
+
+# Espera sugerida ao worker sem I.E. livre (todas concedidas a outros)
+_CONSULTA_OCIOSA_S = 2.0
+# Coordenador segue respondendo "fim" por este tempo depois do lote terminar
+_ESPERA_FINAL_S = 2 * _CONSULTA_OCIOSA_S
+_VIGIA_S = 1.0
+_TIMEOUT_REQUISICAO_S = 10.0
+# Worker desiste depois deste tempo sem conseguir falar com o coordenador
+_LIMITE_SEM_COORDENADOR_S = 30.0
+
+
+# ---------------------------------------------------------------------------
+# Coordenador
+# ---------------------------------------------------------------------------
+
+class _Concessao:
+    """I.E. de um processo concedida a um worker até ``expira_em`` (``time.monotonic``)."""
+
+    def __init__(self, processo: str, item: dict[str, object], worker: str, prazo_s: float) -> None:
+        self.id = secrets.token_hex(8)
+        self.processo = processo
+        self.item = item
+        self.worker = worker
+        self.expira_em = time.monotonic() + prazo_s
+
+    @property
+    def chave(self) -> tuple[str, str]:
+        return self.processo, str(self.item.get("ie", ""))
+
+
+class CoordenadorLote:
+    """Fila de I.E.s pendentes, concessões com prazo e resultados gravados no diário."""
+
+    def __init__(
+        self,
+        lista_por_processo: dict[str, list[dict[str, object]]],
+        processos_ids: list[str],
+        motor: str,
+        diario: DiarioExecucao,
+        concessao_s: float | None = None,
+    ) -> None:
+        self.motor = motor
+        self.diario = diario
+        self.concessao_s = concessao_s or configuracoes.DISTRIBUIDO_CONCESSAO_S
+        self.id_execucao = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self._pendentes: collections.deque[tuple[str, dict[str, object]]] = collections.deque(
+            (pid, item_serializavel(item))
+            for pid in _ORDEM_PROCESSOS if pid in processos_ids
+            for item in lista_por_processo.get(pid, [])
+        )
+        self.total = len(self._pendentes)
+        self._concessoes: dict[str, _Concessao] = {}
+        self._concluidas: set[tuple[str, str]] = set()
+        self._expiracoes: collections.Counter[tuple[str, str]] = collections.Counter()
+        self._workers: dict[str, float] = {}
+        self._trava = threading.Lock()
+        self.cancelado = False
+        self.concluido = threading.Event()
+        self._verificar_fim()
+
+    def _visto(self, worker: str) -> None:
+        self._workers[worker] = time.monotonic()
+
+    def _verificar_fim(self) -> None:
+        if not self._concessoes and (self.cancelado or not self._pendentes):
+            self.concluido.set()
+
+    def _expirar(self) -> None:
+        agora = time.monotonic()
+        for concessao in [c for c in self._concessoes.values() if c.expira_em <= agora]:
+            del self._concessoes[concessao.id]
+            processo, ie = concessao.chave
+            self._expiracoes[concessao.chave] += 1
+            expiracoes = self._expiracoes[concessao.chave]
+            self.diario.registrar({
+                "tipo": "concessao_expirada", "processo": processo, "ie": ie,
+                "worker": concessao.worker, "expiracoes": expiracoes,
+            })
+            if expiracoes >= configuracoes.DISTRIBUIDO_EXPIRACOES_MAXIMAS:
+                logger.error(
+                    "I.E. %s (%s): concessão expirou %d vez(es); volta como erro.",
+                    ie, processo, expiracoes,
+                )
+                self._concluidas.add(concessao.chave)
+                self.diario.registrar_ie(
+                    processo, ie, RESULTADO_FALHA, f"concessão expirada {expiracoes} vez(es)"
+                )
+            elif not self.cancelado:
+                logger.warning(
+                    "Concessão da I.E. %s (%s) expirou com o worker %s; I.E. volta para a fila.",
+                    ie, processo, concessao.worker,
+                )
+                self._pendentes.appendleft((concessao.processo, concessao.item))
+        self._verificar_fim()
+
+    def vigiar(self) -> None:
+        """Thread do coordenador: expira as concessões vencidas até o fim do lote."""
+        while not self.concluido.wait(_VIGIA_S):
+            with self._trava:
+                self._expirar()
+
+    def conceder(self, worker: str, quantidade: int) -> dict[str, object]:
+        with self._trava:
+            self._visto(worker)
+            self._expirar()
+            concessoes: list[_Concessao] = []
+            while not self.cancelado and self._pendentes and len(concessoes) < max(1, quantidade):
+                processo, item = self._pendentes.popleft()
+                concessao = _Concessao(processo, item, worker, self.concessao_s)
+                self._concessoes[concessao.id] = concessao
+                concessoes.append(concessao)
+            fim = self.concluido.is_set()
+        if concessoes:
+            logger.info(
+                "%d I.E.(s) concedida(s) ao worker %s: %s.",
+                len(concessoes), worker, ", ".join(c.chave[1] for c in concessoes),
+            )
+        return {
+            "concessoes": [
+                {"id": c.id, "processo": c.processo, "item": c.item} for c in concessoes
+            ],
+            "motor": self.motor,
+            "execucao": self.id_execucao,
+            "concessao_s": self.concessao_s,
+            "aguardar_s": _CONSULTA_OCIOSA_S,
+            "fim": fim,
+        }
+
+    def renovar(self, worker: str, ids: list[str]) -> dict[str, object]:
+        with self._trava:
+            self._visto(worker)
+            self._expirar()
+            perdidas = []
+            for id_concessao in ids:
+                concessao = self._concessoes.get(id_concessao)
+                if concessao is None or concessao.worker != worker:
+                    perdidas.append(id_concessao)
+                else:
+                    concessao.expira_em = time.monotonic() + self.concessao_s
+            return {"perdidas": perdidas, "cancelar": self.cancelado}
+
+    def registrar_resultado(
+        self, worker: str, id_concessao: str, processo: str, ie: str, resultado: str, motivo: str
+    ) -> dict[str, object]:
+        if resultado not in _RESULTADOS_TERMINAIS:
+            raise ValueError(f"resultado inválido: {resultado}")
+        chave = (processo, ie)
+        with self._trava:
+            self._visto(worker)
+            self._concessoes.pop(id_concessao, None)
+            if chave in self._concluidas:
+                logger.warning("Resultado repetido da I.E. %s (%s) ignorado (worker %s).",
+                               ie, processo, worker)
+                self._verificar_fim()
+                return {"aceito": False}
+            self._concluidas.add(chave)
+            # Resultado atrasado de concessão já expirada: tira a I.E. da fila e de outro worker
+            for concessao in [c for c in self._concessoes.values() if c.chave == chave]:
+                del self._concessoes[concessao.id]
+            self._pendentes = collections.deque(
+                (pid, item) for pid, item in self._pendentes
+                if (pid, str(item.get("ie", ""))) != chave
+            )
+            self.diario.registrar_ie(processo, ie, resultado, motivo)
+            self._verificar_fim()
+        logger.info("I.E. %s (%s): %s pelo worker %s.", ie, processo, resultado, worker)
+        return {"aceito": True}
+
+    def liberar(self, worker: str, ids: list[str]) -> dict[str, object]:
+        with self._trava:
+            self._visto(worker)
+            for id_concessao in ids:
+                concessao = self._concessoes.pop(id_concessao, None)
+                if concessao is not None and concessao.chave not in self._concluidas:
+                    self._pendentes.appendleft((concessao.processo, concessao.item))
+            self._verificar_fim()
+        return {}
+
+    def cancelar(self) -> None:
+        """Para de conceder e pede aos workers que cancelem; termina quando as concessões voltarem."""
+        with self._trava:
+            self.cancelado = True
+            self._verificar_fim()
+
+    def estado(self) -> dict[str, object]:
+        with self._trava:
+            agora = time.monotonic()
+            return {
+                "execucao": self.id_execucao,
+                "total": self.total,
+                "concluidas": len(self._concluidas),
+                "pendentes": len(self._pendentes),
+                "concedidas": len(self._concessoes),
+                "cancelado": self.cancelado,
+                "workers": {w: round(agora - visto, 1) for w, visto in self._workers.items()},
+            }
+
+
+class _ManipuladorCoordenador(BaseHTTPRequestHandler):
+    server_version = "icms-pi-coordenador"
+
+    def log_message(self, formato: str, *args: object) -> None:
+        logger.debug("HTTP %s - " + formato, self.client_address[0], *args)
+
+    def _responder(self, status: int, corpo: dict[str, object]) -> None:
+        dados = json.dumps(corpo, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _autorizado(self) -> bool:
+        token = configuracoes.DISTRIBUIDO_TOKEN
+        if not token:
+            return True
+        return hmac.compare_digest(self.headers.get(CABECALHO_TOKEN, ""), token)
+
+    def do_GET(self) -> None:
+        if not self._autorizado():
+            self._responder(401, {"erro": "token inválido"})
+        elif self.path == "/estado":
+            self._responder(200, self.server.coordenador.estado())
+        else:
+            self._responder(404, {"erro": "rota desconhecida"})
+
+    def do_POST(self) -> None:
+        if not self._autorizado():
+            self._responder(401, {"erro": "token inválido"})
+            return
+        coordenador: CoordenadorLote = self.server.coordenador
+        try:
+            tamanho = int(self.headers.get("Content-Length") or 0)
+            dados = json.loads(self.rfile.read(tamanho) or b"{}")
+            worker = str(dados["worker"])
+            if self.path == "/concessoes":
+                corpo = coordenador.conceder(worker, int(dados.get("quantidade", 1)))
+            elif self.path == "/renovar":
+                corpo = coordenador.renovar(worker, list(dados["concessoes"]))
+            elif self.path == "/resultado":
+                corpo = coordenador.registrar_resultado(
+                    worker, str(dados["concessao"]), str(dados["processo"]), str(dados["ie"]),
+                    str(dados["resultado"]), str(dados.get("motivo") or ""),
+                )
+            elif self.path == "/liberar":
+                corpo = coordenador.liberar(worker, list(dados["concessoes"]))
+            else:
+                self._responder(404, {"erro": "rota desconhecida"})
+                return
+        except (KeyError, TypeError, ValueError) as e:
+            self._responder(400, {"erro": f"requisição inválida: {e}"})
+            return
+        self._responder(200, corpo)
+
+
+def _host_local(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def coordenar(
+    planilha: Path | None,
+    processos_ids: list[str],
+    motor: str | None = None,
+    host: str = "127.0.0.1",
+    porta: int | None = None,
+    retomar: Path | None = None,
+    concessao_s: float | None = None,
+    pasta_saida: Path | None = None,
+) -> tuple[int, Path | None]:
+    """Serve o lote aos workers até todas as I.E.s terem resultado; devolve (código, arquivo)."""
+    from icms_pi.cli import (
+        SAIDA_COM_ERROS,
+        SAIDA_ENTRADA_INVALIDA,
+        SAIDA_INTERROMPIDA,
+        SAIDA_SUCESSO,
+        _montar_lote,
+        _salvar_resultado,
+    )
+
+    if pasta_saida is not None:
+        configuracoes.PASTA_SAIDA_RESULTADOS_ABSOLUTA = pasta_saida.resolve()
+    motor = motor or configuracoes.MOTOR_AUTOMACAO
+
+    if retomar is not None:
+        diario = DiarioExecucao(retomar)
+        lote = next((r for r in diario.ler() if r.get("tipo") == "lote"), None)
+        if lote is None:
+            logger.error("Diário %s sem registro do lote.", retomar)
+            return SAIDA_ENTRADA_INVALIDA, None
+        processos_ids, motor = list(lote["processos"]), str(lote["motor"] or motor)
+        lista_por_processo = diario.pendentes()
+        logger.info("Retomando o diário %s.", retomar.name)
+    else:
+        try:
+            lista_por_processo, _total, _mes, _ano = _montar_lote(planilha, processos_ids)
+        except Exception as e:
+            logger.error("Não foi possível ler a planilha %s: %s", planilha, e)
+            return SAIDA_ENTRADA_INVALIDA, None
+        diario = DiarioExecucao.novo()
+        diario.registrar_lote(lista_por_processo, processos_ids, True, motor, False)
+
+    if not configuracoes.DISTRIBUIDO_TOKEN and not _host_local(host):
+        # Fora do loopback, sem token qualquer um na rede pediria e devolveria I.E.s
+        configuracoes.DISTRIBUIDO_TOKEN = secrets.token_urlsafe(24)
+        logger.warning(
+            "Coordenador em %s sem DISTRIBUIDO_TOKEN: token gerado para este lote e mostrado "
+            "na saída padrão (fora do log); os workers precisam dele em DISTRIBUIDO_TOKEN.", host,
+        )
+        print(f"DISTRIBUIDO_TOKEN={configuracoes.DISTRIBUIDO_TOKEN}", flush=True)
+
+    coordenador = CoordenadorLote(lista_por_processo, processos_ids, motor, diario, concessao_s)
+    servidor = ThreadingHTTPServer((host, porta or configuracoes.DISTRIBUIDO_PORTA),
+                                   _ManipuladorCoordenador)
+    servidor.daemon_threads = True
+    servidor.coordenador = coordenador
+    threading.Thread(target=servidor.serve_forever, name="coordenador-http", daemon=True).start()
+    threading.Thread(target=coordenador.vigiar, name="coordenador-vigia", daemon=True).start()
+    endereco, porta_real = servidor.server_address[:2]
+    logger.info(
+        "Coordenador em http://%s:%s: %d I.E.(s), motor=%s, concessão de %.0f s, diário=%s",
+        endereco, porta_real, coordenador.total, motor, coordenador.concessao_s, diario.caminho.name,
+    )
+
+    def _ao_interromper(_sinal, _quadro) -> None:
+        logger.warning("Interrupção recebida: cancelando o lote nos workers.")
+        coordenador.cancelar()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    sinal_anterior = signal.signal(signal.SIGINT, _ao_interromper)
+    inicio = datetime.now()
+    t0 = time.perf_counter()
+    try:
+        while not coordenador.concluido.wait(0.5):
+            pass
+        # Workers ociosos ainda recebem "fim" antes do servidor fechar
+        time.sleep(_ESPERA_FINAL_S)
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+        signal.signal(signal.SIGINT, sinal_anterior)
+
+    ies_ok, ies_erro = diario.resultados()
+    estado = coordenador.estado()
+    diario.registrar({"tipo": "fim", "sucesso": len(ies_ok), "erro": len(ies_erro),
+                      "cancelado": coordenador.cancelado})
+    caminho = _salvar_resultado(configuracoes.PASTA_SAIDA_RESULTADOS_ABSOLUTA, {
+        "planilha": str(planilha.resolve()) if planilha else None,
+        "diario": str(diario.caminho),
+        "processos": processos_ids,
+        "motor": motor,
+        "distribuido": True,
+        "workers": sorted(estado["workers"]),
+        "inicio": inicio.isoformat(timespec="seconds"),
+        "duracao_s": round(time.perf_counter() - t0, 1),
+        "cancelado": coordenador.cancelado,
+        "sucesso": ies_ok,
+        "erro": [{"ie": ie, "motivo": motivo} for ie, motivo in ies_erro],
+    })
+    logger.info(
+        "Lote distribuído %s: %d sucesso, %d erro(s), %d worker(s). Resultado em %s",
+        "cancelado" if coordenador.cancelado else "concluído", len(ies_ok), len(ies_erro),
+        len(estado["workers"]), caminho,
+    )
+    if coordenador.cancelado:
+        return SAIDA_INTERROMPIDA, caminho
+    return (SAIDA_COM_ERROS if ies_erro else SAIDA_SUCESSO), caminho
+
+
+# ---------------------------------------------------------------------------
+# Worker
+# ---------------------------------------------------------------------------
+
+class _ClienteCoordenador:
+    """POST/GET JSON no coordenador; falhas de rede sobem como ``OSError``."""
+
+    def __init__(self, url: str, worker: str) -> None:
+        self.url = url.rstrip("/")
+        self.worker = worker
+
+    def chamar(self, rota: str, dados: dict[str, object] | None = None) -> dict[str, object]:
+        corpo = None
+        if dados is not None:
+            corpo = json.dumps({"worker": self.worker, **dados}).encode("utf-8")
+        requisicao = urllib.request.Request(
+            self.url + rota, data=corpo, method="POST" if corpo else "GET"
+        )
+        requisicao.add_header("Content-Type", "application/json")
+        if configuracoes.DISTRIBUIDO_TOKEN:
+            requisicao.add_header(CABECALHO_TOKEN, configuracoes.DISTRIBUIDO_TOKEN)
+        with urllib.request.urlopen(requisicao, timeout=_TIMEOUT_REQUISICAO_S) as resposta:
+            return json.loads(resposta.read() or b"{}")
+
+
+class _ConcessoesAbertas:
+    """Concessões do grupo em execução ainda sem resultado enviado (lote, progresso, renovação)."""
+
+    def __init__(self, concessoes: list[dict[str, object]]) -> None:
+        self._trava = threading.Lock()
+        self._ids = {
+            (str(c["processo"]), str(c["item"].get("ie", ""))): str(c["id"]) for c in concessoes
+        }
+
+    def encerrar(self, processo: str, ie: str) -> str | None:
+        with self._trava:
+            return self._ids.pop((processo, ie), None)
+
+    def ids(self) -> list[str]:
+        with self._trava:
+            return list(self._ids.values())
+
+    def restantes(self) -> list[tuple[str, str, str]]:
+        with self._trava:
+            return [(processo, ie, id_c) for (processo, ie), id_c in self._ids.items()]
+
+
+class _EnvioResultados:
+    """Thread que entrega os resultados ao coordenador, insistindo enquanto ele não responde."""
+
+    def __init__(self, cliente: _ClienteCoordenador) -> None:
+        self._cliente = cliente
+        self._fila: queue.Queue = queue.Queue()
+        threading.Thread(target=self._enviar, name="worker-resultados", daemon=True).start()
+
+    def enviar(
+        self, id_concessao: str, processo: str, ie: str, resultado: str, motivo: str = ""
+    ) -> None:
+        self._fila.put({"concessao": id_concessao, "processo": processo, "ie": ie,
+                        "resultado": resultado, "motivo": motivo})
+
+    def aguardar(self) -> None:
+        self._fila.join()
+
+    def _enviar(self) -> None:
+        while True:
+            resultado = self._fila.get()
+            limite = time.monotonic() + _LIMITE_SEM_COORDENADOR_S
+            while True:
+                try:
+                    self._cliente.chamar("/resultado", resultado)
+                    break
+                except urllib.error.HTTPError as e:
+                    logger.error("Coordenador recusou o resultado da I.E. %s (HTTP %s).",
+                                 resultado["ie"], e.code)
+                    break
+                except OSError as e:
+                    if time.monotonic() >= limite:
+                        logger.error("Resultado da I.E. %s não entregue ao coordenador: %s",
+                                     resultado["ie"], e)
+                        break
+                    time.sleep(_CONSULTA_OCIOSA_S)
+            self._fila.task_done()
+
+
+class _ProgressoRemoto(FilaProgresso):
+    """Fila de progresso do worker: cada resultado terminal vai na hora para o coordenador."""
+
+    def __init__(self, abertas: _ConcessoesAbertas, envio: _EnvioResultados) -> None:
+        super().__init__()
+        self._abertas = abertas
+        self._envio = envio
+
+    def emitir(self, evento: dict[str, object]) -> None:
+        if evento["tipo"] not in _RESULTADOS_TERMINAIS:
+            return
+        processo, ie = str(evento["processo"]), str(evento["ie"])
+        id_concessao = self._abertas.encerrar(processo, ie)
+        if id_concessao is not None:
+            self._envio.enviar(
+                id_concessao, processo, ie, str(evento["tipo"]), str(evento.get("detalhe") or "")
+            )
+
+
+def _renovar_concessoes(
+    cliente: _ClienteCoordenador,
+    abertas: _ConcessoesAbertas,
+    controle: ControleExecucao,
+    intervalo_s: float,
+    parar: threading.Event,
+) -> None:
+    """Thread do worker: renova as concessões em execução; cancela se o coordenador pedir."""
+    while not parar.wait(intervalo_s):
+        ids = abertas.ids()
+        if not ids:
+            continue
+        try:
+            resposta = cliente.chamar("/renovar", {"concessoes": ids})
+        except OSError as e:
+            logger.warning("Falha ao renovar concessões no coordenador: %s", e)
+            continue
+        if resposta.get("perdidas"):
+            logger.warning(
+                "%d concessão(ões) expiraram no coordenador; as I.E.s podem ser refeitas por "
+                "outro worker.", len(resposta["perdidas"]),
+            )
+        if resposta.get("cancelar") and not controle.cancelado:
+            logger.warning("Coordenador cancelou o lote.")
+            controle.cancelar()
+
+
+async def _lote_por_processo(
+    lista_por_processo: dict[str, list[dict[str, object]]],
+    headless: bool,
+    motor: str,
+    motores: "MotoresReutilizaveis",
+) -> dict[str, tuple[list[str], list[tuple[str, str]]]]:
+    """
+    ``executar_lote`` separado por processo: a mesma I.E. pode vir concedida em dois processos
+    e cada um tem seu resultado.
+    """
+    import asyncio
+
+    from icms_pi.execucao_lote import executar_lote
+
+    def _lote(pid: str):
+        return executar_lote(
+            {pid: lista_por_processo[pid]}, [pid], headless, motor=motor, motores=motores
+        )
+
+    pids = list(lista_por_processo)
+    if not configuracoes.PROCESSOS_EM_PARALELO:
+        return {pid: await _lote(pid) for pid in pids}
+    resultados = await asyncio.gather(*(_lote(pid) for pid in pids), return_exceptions=True)
+    # Todos terminam (e fecham navegador/contextos) antes de uma falha subir
+    for resultado in resultados:
+        if isinstance(resultado, BaseException):
+            raise resultado
+    return dict(zip(pids, resultados))
+
+
+def _executar_concessoes(
+    loop: "asyncio.AbstractEventLoop",
+    cliente: _ClienteCoordenador,
+    envio: _EnvioResultados,
+    resposta: dict[str, object],
+    controle: ControleExecucao,
+    headless: bool,
+    motores: "MotoresReutilizaveis",
+) -> None:
+    concessoes: list[dict[str, object]] = resposta["concessoes"]
+    lista_por_processo: dict[str, list[dict[str, object]]] = {}
+    for concessao in concessoes:
+        lista_por_processo.setdefault(str(concessao["processo"]), []).append(concessao["item"])
+    abertas = _ConcessoesAbertas(concessoes)
+    registrar_fila_progresso(_ProgressoRemoto(abertas, envio))
+    parar = threading.Event()
+    threading.Thread(
+        target=_renovar_concessoes,
+        args=(cliente, abertas, controle, float(resposta["concessao_s"]) / 3, parar),
+        name="worker-renovacao", daemon=True,
+    ).start()
+    por_processo: dict[str, tuple[list[str], list[tuple[str, str]]]] = {}
+    falha_do_lote = ""
+    try:
+        por_processo = loop.run_until_complete(
+            _lote_por_processo(lista_por_processo, headless, str(resposta["motor"]), motores)
+        )
+    except Exception as e:
+        logger.exception("Falha ao executar as I.E.s concedidas.")
+        falha_do_lote = f"Erro no worker: {e}"
+    finally:
+        parar.set()
+        registrar_fila_progresso(None)
+
+    # Resultados sem evento terminal vêm do retorno do lote do processo; o resto volta para a
+    # fila (ou, se o lote falhou, volta como erro: devolvida, a I.E. cairia de novo no mesmo
+    # worker)
+    liberar: list[str] = []
+    for processo, ie, id_concessao in abertas.restantes():
+        ies_ok, ies_erro = por_processo.get(processo, ([], []))
+        motivos = dict(ies_erro)
+        if ie in ies_ok:
+            envio.enviar(id_concessao, processo, ie, RESULTADO_SUCESSO)
+        elif ie in motivos:
+            envio.enviar(id_concessao, processo, ie, RESULTADO_FALHA, motivos[ie])
+        elif falha_do_lote:
+            envio.enviar(id_concessao, processo, ie, RESULTADO_FALHA, falha_do_lote)
+        else:
+            liberar.append(id_concessao)
+    envio.aguardar()
+    if liberar:
+        try:
+            cliente.chamar("/liberar", {"concessoes": liberar})
+        except OSError as e:
+            logger.warning("Falha ao devolver %d concessão(ões) (vão expirar): %s", len(liberar), e)
+
+
+def trabalhar(
+    url: str,
+    headless: bool = True,
+    concorrencia: int | None = None,
+    ies_por_pedido: int | None = None,
+) -> int:
+    """Pede e executa concessões do coordenador até o lote acabar; devolve o código de saída."""
+    import asyncio
+
+    from icms_pi.execucao_lote import MotoresReutilizaveis
+    from icms_pi.telemetria import encerrar_telemetria, iniciar_telemetria
+
+    worker = f"{socket.gethostname()}-{os.getpid()}"
+    cliente = _ClienteCoordenador(url, worker)
+    envio = _EnvioResultados(cliente)
+    controle = ControleExecucao()
+    quantidade = ies_por_pedido or configuracoes.DISTRIBUIDO_IES_POR_PEDIDO
+
+    def _ao_interromper(_sinal, _quadro) -> None:
+        logger.warning("Interrupção recebida: cancelando as I.E.s em execução.")
+        controle.cancelar()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    sinal_anterior = signal.signal(signal.SIGINT, _ao_interromper)
+    registrar_controle(controle)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    # Um navegador/cliente HTTP por processo para todas as concessões do worker
+    motores = MotoresReutilizaveis(headless, concorrencia)
+    logger.info("Worker %s conectando ao coordenador %s.", worker, cliente.url)
+    ultimo_contato = time.monotonic()
+    codigo = 0
+    try:
+        telemetria_iniciada = False
+        while not controle.cancelado:
+            try:
+                resposta = cliente.chamar("/concessoes", {"quantidade": quantidade})
+            except urllib.error.HTTPError as e:
+                logger.error("Coordenador recusou o worker (HTTP %s): %s", e.code, e.reason)
+                codigo = 1
+                break
+            except OSError as e:
+                if time.monotonic() - ultimo_contato > _LIMITE_SEM_COORDENADOR_S:
+                    logger.error("Coordenador inacessível há %.0f s: %s",
+                                 _LIMITE_SEM_COORDENADOR_S, e)
+                    codigo = 1
+                    break
+                time.sleep(_CONSULTA_OCIOSA_S)
+                continue
+            ultimo_contato = time.monotonic()
+            if resposta["fim"]:
+                logger.info("Coordenador encerrou o lote.")
+                break
+            if not resposta["concessoes"]:
+                time.sleep(float(resposta["aguardar_s"]))
+                continue
+            if not telemetria_iniciada:
+                iniciar_telemetria(f"{resposta['execucao']}_{worker}")
+                telemetria_iniciada = True
+            _executar_concessoes(loop, cliente, envio, resposta, controle, headless, motores)
+            ultimo_contato = time.monotonic()
+    finally:
+        loop.run_until_complete(motores.encerrar())
+        encerrar_telemetria()
+        registrar_controle(None)
+        loop.close()
+        signal.signal(signal.SIGINT, sinal_anterior)
+    return codigo
+
+
+def main(argv: list[str] | None = None) -> int:
+    from icms_pi.cli import PROCESSOS_VALIDOS
+
+    parser = argparse.ArgumentParser(
+        prog="icms_pi_distribuido",
+        description="Lote distribuído: coordenador com a planilha e workers que executam as I.E.s.",
+    )
+    subparsers = parser.add_subparsers(dest="modo", required=True)
+
+    coordenador = subparsers.add_parser(
+        "coordenador", help="serve as I.E.s da planilha aos workers"
+    )
+    coordenador.add_argument("planilha", type=Path, nargs="?", help="planilha Excel das filiais")
+    coordenador.add_argument(
+        "--processos", default=",".join(PROCESSOS_VALIDOS),
+        help="processos separados por vírgula (antecipado,normal,difal)",
+    )
+    coordenador.add_argument(
+        "--motor", default=configuracoes.MOTOR_AUTOMACAO,
+        choices=(configuracoes.MOTOR_NAVEGADOR, configuracoes.MOTOR_HTTP),
+    )
+    coordenador.add_argument("--host", default="127.0.0.1",
+                             help="interface de escuta (0.0.0.0 para workers em outras máquinas)")
+    coordenador.add_argument("--porta", type=int, default=configuracoes.DISTRIBUIDO_PORTA)
+    coordenador.add_argument(
+        "--concessao-s", type=float, default=None,
+        help="validade da concessão sem renovação (padrão: DISTRIBUIDO_CONCESSAO_S)",
+    )
+    coordenador.add_argument("--retomar", type=Path, default=None,
+                             help="diário de um lote interrompido: serve só as I.E.s pendentes")
+    coordenador.add_argument(
+        "--saida", type=Path, default=None, help="pasta do diário e do resultado"
+    )
+
+    worker = subparsers.add_parser("worker", help="executa I.E.s concedidas pelo coordenador")
+    worker.add_argument("url", help="endereço do coordenador (ex.: http://192.168.0.10:8765)")
+    worker.add_argument("--concorrencia", type=int, default=None, help="contextos do motor HTTP")
+    worker.add_argument("--ies-por-pedido", type=int, default=None,
+                        help="I.E.s por concessão pedida (padrão: DISTRIBUIDO_IES_POR_PEDIDO)")
+    worker.add_argument("--com-janela", action="store_true", help="navegador visível")
+    args = parser.parse_args(argv)
+
+    if args.modo == "worker":
+        if args.concorrencia is not None and args.concorrencia < 1:
+            parser.error("--concorrencia deve ser ao menos 1")
+        if args.ies_por_pedido is not None and args.ies_por_pedido < 1:
+            parser.error("--ies-por-pedido deve ser ao menos 1")
+        return trabalhar(
+            args.url, headless=not args.com_janela, concorrencia=args.concorrencia,
+            ies_por_pedido=args.ies_por_pedido,
+        )
+
+    processos_ids = [p.strip() for p in args.processos.split(",") if p.strip()]
+    invalidos = [p for p in processos_ids if p not in PROCESSOS_VALIDOS]
+    if invalidos or not processos_ids:
+        parser.error(f"processos inválidos: {', '.join(invalidos) or '(nenhum)'}")
+    if args.retomar is not None:
+        if not args.retomar.is_file():
+            parser.error(f"diário não encontrado: {args.retomar}")
+    elif args.planilha is None or not args.planilha.is_file():
+        parser.error(f"planilha não encontrada: {args.planilha}")
+    if args.concessao_s is not None and args.concessao_s <= 0:
+        parser.error("--concessao-s deve ser positivo")
+
+    codigo, caminho = coordenar(
+        args.planilha, processos_ids, motor=args.motor, host=args.host, porta=args.porta,
+        retomar=args.retomar, concessao_s=args.concessao_s, pasta_saida=args.saida,
+    )
+    if caminho:
+        print(f"Resultado salvo em {caminho}")
+    return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+Execução de um processo (ATC, Normal, DIFAL) com o motor configurado.
+
+Motor ``navegador``: classe de automação Playwright do processo. Motor ``http``: postback JSF
+direto (``MotorHttpDarWeb``); as I.E.s que o motor HTTP não consegue concluir por resposta
+inesperada do portal são reprocessadas pelo navegador (fallback).
+
+``executar_lote`` roda o lote inteiro (sonda opcional + processos) e é usado pelo event loop
+da GUI (``icms_pi.laco_assincrono``), pelo processo worker (``icms_pi.worker_automacao``) e pela
+CLI. Com ``PROCESSOS_EM_PARALELO`` os processos do lote rodam como tarefas concorrentes no
+mesmo loop (cada um com seu navegador ou cliente HTTP e seu intervalo entre I.E.s); sem ele,
+em sequência.
+
+Quem chama ``executar_lote`` várias vezes no mesmo loop (o worker distribuído, uma vez por
+concessão) passa ``MotoresReutilizaveis``: o navegador e os contextos HTTP de cada processo
+ficam abertos entre as chamadas, sem relançar o Chromium nem refazer a preparação.
+"""
+
+import asyncio
+
+from icms_pi import configuracoes
+from icms_pi.controle_execucao import LoteRecusadoPelaSonda, execucao_cancelada
+from icms_pi.logger import configurar_logger_da_aplicacao
+from icms_pi.motor_http import MotorHttpDarWeb
+from icms_pi.sonda_portal import sondar_portal
+from atc.automacao_sefaz_pi import AutomacaoAntecipacaoParcialPI
+from difal.automacao_sefaz_pi import AutomacaoDifalPI
+from normal.automacao_sefaz_pi import AutomacaoNormalPI
+
+logger = configurar_logger_da_aplicacao(__name__)
+
+CLASSES_AUTOMACAO_POR_PROCESSO: dict[str, type] = {
+    "antecipado": AutomacaoAntecipacaoParcialPI,
+    "normal": AutomacaoNormalPI,
+    "difal": AutomacaoDifalPI,
+}
+
+
+class MotoresReutilizaveis:
+    """Um motor HTTP e uma automação de navegador por processo, abertos até ``encerrar``."""
+
+    def __init__(self, headless: bool, concorrencia: int | None = None) -> None:
+        self._headless = headless
+        self._concorrencia = concorrencia
+        self._http: dict[str, MotorHttpDarWeb] = {}
+        self._navegador: dict[str, object] = {}
+
+    def http(self, processo_id: str) -> MotorHttpDarWeb:
+        if processo_id not in self._http:
+            self._http[processo_id] = MotorHttpDarWeb(
+                processo_id, concorrencia=self._concorrencia, manter_aberto=True
+            )
+        return self._http[processo_id]
+
+    def navegador(self, processo_id: str):
+        if processo_id not in self._navegador:
+            self._navegador[processo_id] = CLASSES_AUTOMACAO_POR_PROCESSO[processo_id](
+                headless=self._headless, manter_aberto=True
+            )
+        return self._navegador[processo_id]
+
+    async def encerrar(self) -> None:
+        for motor in (*self._http.values(), *self._navegador.values()):
+            try:
+                await motor.encerrar()
+            except Exception:
+                logger.exception("Falha ao encerrar motor mantido aberto.")
+        self._http.clear()
+        self._navegador.clear()
+
+
+async def executar_processo(
+    processo_id: str,
+    lista_dados: list[dict[str, object]],
+    headless: bool,
+    motor: str | None = None,
+    concorrencia: int | None = None,
+    motores: MotoresReutilizaveis | None = None,
+) -> tuple[list[str], list[tuple[str, str]]]:
+    """
+    Roda o fluxo do processo para a lista e retorna (IEs com sucesso, (IE, motivo) com erro).
+    Com ``motores``, usa os deles (``headless`` e ``concorrencia`` já fixados neles).
+    """
+    motor = motor or configuracoes.MOTOR_AUTOMACAO
+    ies_ok: list[str] = []
+    ies_erro: list[tuple[str, str]] = []
+
+    if motor == configuracoes.MOTOR_HTTP:
+        motor_http = (
+            motores.http(processo_id) if motores is not None
+            else MotorHttpDarWeb(processo_id, concorrencia=concorrencia)
+        )
+        ies_ok, ies_erro = await motor_http.executar_fluxo_por_ie_pi(lista_dados)
+        # Fallback é a próxima tentativa da I.E. (telemetria)
+        lista_dados = [
+            dict(item, tentativa=int(item.get("tentativa", 1)) + 1)
+            for item in motor_http.itens_para_navegador
+        ]
+        if not lista_dados or execucao_cancelada():
+            return ies_ok, ies_erro
+        logger.info(
+            "%d IE(s) de %s seguem para o navegador (fallback do motor HTTP).",
+            len(lista_dados), processo_id,
+        )
+
+    automacao = (
+        motores.navegador(processo_id) if motores is not None
+        else CLASSES_AUTOMACAO_POR_PROCESSO[processo_id](headless=headless)
+    )
+    ok, erro = await automacao.executar_fluxo_por_ie_pi(lista_dados)
+    return ies_ok + ok, ies_erro + erro
+
+
+async def executar_lote(
+    lista_por_processo: dict[str, list[dict[str, object]]],
+    processos_ids: list[str],
+    headless: bool,
+    motor: str | None = None,
+    sondar: bool = False,
+    concorrencia: int | None = None,
+    em_paralelo: bool | None = None,
+    motores: MotoresReutilizaveis | None = None,
+) -> tuple[list[str], list[tuple[str, str]]]:
+    """
+    Sonda (opcional) e processos ATC, Normal, DIFAL; para ao cancelar o lote. Se a sonda
+    recusa o portal, levanta ``LoteRecusadoPelaSonda`` sem executar nenhuma I.E.
+    ``concorrencia`` (motor HTTP) é o teto pedido; a sonda pode reduzi-lo. ``em_paralelo``
+    (padrão ``PROCESSOS_EM_PARALELO``) roda os processos ao mesmo tempo. ``motores`` mantém
+    navegador e contextos HTTP abertos entre chamadas.
+    """
+    ies_ok: list[str] = []
+    ies_erro: list[tuple[str, str]] = []
+
+    if sondar:
+        processos_com_itens = [pid for pid in processos_ids if lista_por_processo.get(pid)]
+        sonda = await sondar_portal(processos_com_itens, headless)
+        for motivo in sonda["motivos"]:
+            logger.info("Sonda do portal: %s", motivo)
+        if sonda["concorrencia"] == 0:
+            raise LoteRecusadoPelaSonda(sonda["motivos"])
+        # Teto só quando o portal está lento; saudável, vale a concorrência pedida
+        if sonda["concorrencia"] is not None:
+            concorrencia = (
+                sonda["concorrencia"] if concorrencia is None
+                else min(concorrencia, sonda["concorrencia"])
+            )
+
+    pids = [
+        pid for pid in ("antecipado", "normal", "difal")
+        if pid in processos_ids and lista_por_processo.get(pid)
+    ]
+    if em_paralelo is None:
+        em_paralelo = configuracoes.PROCESSOS_EM_PARALELO
+
+    if em_paralelo and len(pids) > 1:
+        logger.info("Processos em paralelo: %s.", ", ".join(pids))
+        resultados = await asyncio.gather(
+            *(
+                executar_processo(
+                    pid, lista_por_processo[pid], headless, motor=motor, concorrencia=concorrencia,
+                    motores=motores,
+                )
+                for pid in pids
+            ),
+            return_exceptions=True,
+        )
+        # Todos terminam (e fecham navegador/contextos) antes de uma falha subir
+        for resultado in resultados:
+            if isinstance(resultado, BaseException):
+                raise resultado
+            ies_ok.extend(resultado[0])
+            ies_erro.extend(resultado[1])
+        return ies_ok, ies_erro
+
+    for pid in pids:
+        if execucao_cancelada():
+            break
+        ok, erro = await executar_processo(
+            pid, lista_por_processo[pid], headless, motor=motor, concorrencia=concorrencia,
+            motores=motores,
+        )
+        ies_ok.extend(ok)
+        ies_erro.extend(erro)
+    return ies_ok, ies_erro
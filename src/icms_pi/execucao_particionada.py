@@ -0,0 +1,396 @@
+"""
+Lote particionado em vários processos do sistema (``PARTICOES_LOTE`` > 1 ou ``--particoes``).
+
+As I.E.s de cada processo (ATC, Normal, DIFAL) são distribuídas em rodízio entre K partições; cada
+partição roda ``executar_lote`` num processo ``spawn`` próprio, com seu event loop, navegador ou
+cliente HTTP e telemetria (``telemetria_<execucao>_p<k>.jsonl``). Os processos compartilham:
+
+- o ``ControleExecucao`` (eventos de ``multiprocessing``): pausa e cancelamento valem em todas
+  as partições na hora;
+- o ``OrcamentoTaxa``: teto global de I.E.s por minuto (``ORCAMENTO_IES_POR_MINUTO``), reservado
+  por ``ponto_de_controle()`` antes de cada I.E., de modo que K partições não multiplicam a
+  carga no portal.
+
+O processo pai recebe por uma fila os eventos de progresso e os registros de log das
+partições, grava os resultados terminais num único diário do lote (``icms_pi.diario_execucao``)
+e, ao final, junta a telemetria das partições em ``telemetria_<execucao>.jsonl`` e os
+histogramas de latência em ``latencias_<execucao>_<processo>_<motor>.json``. Se uma partição
+cair, suas I.E.s sem resultado no diário voltam como erro; as demais partições seguem.
+
+A sonda do portal não roda no modo particionado (cada partição sondaria o portal por conta
+própria); a concorrência pedida vale para cada partição.
+"""
+
+import concurrent.futures
+import json
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from icms_pi import configuracoes
+from icms_pi.controle_execucao import ControleExecucao, registrar_controle, registrar_orcamento
+from icms_pi.diario_execucao import (
+    RESULTADO_FALHA,
+    RESULTADO_PULADA,
+    RESULTADO_SUCESSO,
+    DiarioExecucao,
+    item_serializavel,
+)
+from icms_pi.instrumentacao import HistogramaLatencia
+from icms_pi.logger import adicionar_destino, configurar_logger_da_aplicacao
+from icms_pi.progresso import FilaProgresso, registrar_fila_progresso
+from icms_pi.telemetria import encerrar_telemetria, iniciar_telemetria
+from icms_pi.worker_automacao import HandlerIpc
+
+logger = configurar_logger_da_aplicacao(__name__)
+# Registros vindos das partições, regravados no log do processo pai
+logger_particao = configurar_logger_da_aplicacao("icms_pi.particao")
+
+_RESULTADOS_TERMINAIS = {RESULTADO_SUCESSO, RESULTADO_FALHA, RESULTADO_PULADA}
+MOTIVO_PARTICAO_ENCERRADA = "partição encerrada inesperadamente"
+_ESPERA_MENSAGEM_S = 0.5
+_ESPERA_ENCERRAMENTO_S = 5.0
+
+
+class OrcamentoTaxa:
+    """Teto de I.E.s por minuto comum a todas as partições (uma vaga reservada por I.E.)."""
+
+    def __init__(self, ies_por_minuto: float, contexto_mp) -> None:
+        self._intervalo_s = 60.0 / ies_por_minuto
+        # time.time(): relógio comum aos processos
+        self._proxima_vaga = contexto_mp.Value("d", 0.0, lock=False)
+        self._trava = contexto_mp.Lock()
+
+    def reservar(self) -> float:
+        """Reserva a próxima vaga livre e devolve quantos segundos faltam para ela."""
+        agora = time.time()
+        with self._trava:
+            vaga = max(agora, self._proxima_vaga.value)
+            self._proxima_vaga.value = vaga + self._intervalo_s
+        return vaga - agora
+
+
+def dividir_em_particoes(
+    lista_por_processo: dict[str, list[dict[str, object]]],
+    processos_ids: list[str],
+    particoes: int,
+) -> list[dict[str, list[dict[str, object]]]]:
+    """Distribui os itens de cada processo em rodízio; partições sem itens ficam de fora."""
+    fatias = [
+        {
+            pid: itens[k::particoes]
+            for pid, itens in lista_por_processo.items()
+            if pid in processos_ids and itens[k::particoes]
+        }
+        for k in range(particoes)
+    ]
+    return [fatia for fatia in fatias if fatia]
+
+
+# ---------------------------------------------------------------------------
+# Lado da partição (processo filho)
+# ---------------------------------------------------------------------------
+
+class _CanalFila:
+    """Envio para a fila do pai com o número da partição (mesma interface de ``_CanalIpc``)."""
+
+    def __init__(self, fila, particao: int) -> None:
+        self._fila = fila
+        self._particao = particao
+
+    def enviar(self, mensagem: dict[str, object]) -> bool:
+        mensagem["particao"] = self._particao
+        try:
+            self._fila.put(mensagem)
+            return True
+        except (OSError, ValueError):
+            return False
+
+
+class _ProgressoParticao(FilaProgresso):
+    """Fila de progresso da partição: repassa cada evento ao processo pai."""
+
+    def __init__(self, canal: _CanalFila) -> None:
+        super().__init__()
+        self._canal = canal
+
+    def emitir(self, evento: dict[str, object]) -> None:
+        self._canal.enviar({"tipo": "progresso", "evento": evento})
+
+
+def _principal_particao(
+    particao: int,
+    pedido: dict[str, object],
+    fila,
+    controle: ControleExecucao,
+    orcamento: OrcamentoTaxa | None,
+) -> None:
+    """Ponto de entrada do processo da partição: um lote, um event loop."""
+    import asyncio
+
+    # Ctrl+C no terminal chega a todo o grupo de processos: quem cancela é o pai, pelo
+    # ControleExecucao compartilhado, para cada partição encerrar a I.E. em curso e responder
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    from icms_pi.execucao_lote import executar_lote
+
+    configuracoes.PASTA_SAIDA_RESULTADOS_ABSOLUTA = Path(str(pedido["pasta_saida"]))
+    canal = _CanalFila(fila, particao)
+    adicionar_destino(HandlerIpc(canal))
+    registrar_controle(controle)
+    registrar_orcamento(orcamento)
+    registrar_fila_progresso(_ProgressoParticao(canal))
+    iniciar_telemetria(str(pedido["id_execucao"]))
+    try:
+        ies_ok, ies_erro = asyncio.run(
+            executar_lote(
+                pedido["lista_por_processo"], list(pedido["processos_ids"]),
+                bool(pedido["headless"]), motor=pedido.get("motor"),
+                concorrencia=pedido.get("concorrencia"),
+            )
+        )
+    except Exception:
+        logger.exception("Falha na partição %d do lote.", particao)
+        canal.enviar({"tipo": "falha"})
+        return
+    finally:
+        encerrar_telemetria()
+    canal.enviar({"tipo": "fim", "ok": ies_ok, "erro": ies_erro})
+
+
+# ---------------------------------------------------------------------------
+# Lado do processo pai
+# ---------------------------------------------------------------------------
+
+def _juntar_telemetria(pasta: Path, id_execucao: str, particoes: int) -> None:
+    """Concatena ``telemetria_<id>_p<k>.jsonl`` em ``telemetria_<id>.jsonl`` (com a partição)."""
+    partes = [pasta / f"telemetria_{id_execucao}_p{k}.jsonl" for k in range(particoes)]
+    partes = [parte for parte in partes if parte.is_file()]
+    if not partes:
+        return
+    destino = pasta / f"telemetria_{id_execucao}.jsonl"
+    with open(destino, "a", encoding="utf-8") as saida:
+        for parte in partes:
+            particao = int(parte.stem.rsplit("_p", 1)[1])
+            with open(parte, encoding="utf-8") as entrada:
+                for linha in entrada:
+                    try:
+                        evento = json.loads(linha)
+                    except json.JSONDecodeError:
+                        continue
+                    evento["execucao"] = id_execucao
+                    evento["particao"] = particao
+                    saida.write(json.dumps(evento, ensure_ascii=False, default=str) + "\n")
+            parte.unlink()
+    logger.info("Telemetria das %d partição(ões) gravada em %s", len(partes), destino)
+
+
+def _juntar_latencias(pasta: Path, id_execucao: str) -> None:
+    """Mescla os histogramas ``latencias_<id>_p<k>_<processo>_<motor>.json`` por processo e motor."""
+    grupos: dict[tuple[str, str], list[tuple[Path, dict[str, object]]]] = {}
+    for caminho in sorted(pasta.glob(f"latencias_{id_execucao}_p*_*.json")):
+        try:
+            dados = json.loads(caminho.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            continue
+        grupos.setdefault((str(dados["processo"]), str(dados["motor"])), []).append(
+            (caminho, dados)
+        )
+    for (processo, motor), arquivos in grupos.items():
+        histogramas: dict[str, HistogramaLatencia] = {}
+        for _caminho, dados in arquivos:
+            for etapa, bruto in dados["histogramas"].items():
+                histograma = HistogramaLatencia.de_dict(bruto)
+                if etapa in histogramas:
+                    histogramas[etapa].mesclar(histograma)
+                else:
+                    histogramas[etapa] = histograma
+        destino = pasta / f"latencias_{id_execucao}_{processo}_{motor}.json"
+        destino.write_text(json.dumps({
+            "processo": processo,
+            "motor": motor,
+            "execucao": id_execucao,
+            "resumo_ms": {etapa: h.resumo() for etapa, h in histogramas.items()},
+            "histogramas": {etapa: h.para_dict() for etapa, h in histogramas.items()},
+        }, ensure_ascii=False, indent=2), encoding="utf-8")
+        for caminho, _dados in arquivos:
+            caminho.unlink()
+
+
+class LoteParticionado:
+    """Um lote dividido em partições; ``iniciar`` devolve (controle, futuro do resultado)."""
+
+    def __init__(
+        self,
+        lista_por_processo: dict[str, list[dict[str, object]]],
+        processos_ids: list[str],
+        headless: bool,
+        motor: str | None = None,
+        particoes: int | None = None,
+        concorrencia: int | None = None,
+        ies_por_minuto: float | None = None,
+        fila_progresso: FilaProgresso | None = None,
+    ) -> None:
+        self._contexto = multiprocessing.get_context("spawn")
+        self.processos_ids = processos_ids
+        self.headless = headless
+        self.motor = motor or configuracoes.MOTOR_AUTOMACAO
+        self.concorrencia = concorrencia
+        self.id_execucao = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.lista_por_processo = lista_por_processo
+        self.fatias = dividir_em_particoes(
+            lista_por_processo, processos_ids, particoes or configuracoes.PARTICOES_LOTE
+        )
+        if ies_por_minuto is None:
+            ies_por_minuto = configuracoes.ORCAMENTO_IES_POR_MINUTO
+        self.ies_por_minuto = ies_por_minuto
+        self.orcamento = OrcamentoTaxa(ies_por_minuto, self._contexto) if ies_por_minuto else None
+        self.controle = ControleExecucao(self._contexto)
+        self.fila_progresso = fila_progresso
+        self.diario: DiarioExecucao | None = None
+        self._fila = self._contexto.Queue()
+        self._processos: list[multiprocessing.process.BaseProcess] = []
+
+    def iniciar(self) -> tuple[ControleExecucao, concurrent.futures.Future]:
+        self.diario = DiarioExecucao.novo()
+        self.diario.registrar_lote(
+            self.lista_por_processo, self.processos_ids, self.headless, self.motor, False
+        )
+        logger.info(
+            "Lote particionado: %d partição(ões), total itens=%d, motor=%s, teto=%s I.E./min, "
+            "diário=%s",
+            len(self.fatias), sum(len(i) for i in self.lista_por_processo.values()),
+            self.motor, f"{self.ies_por_minuto:g}" if self.orcamento else "sem",
+            self.diario.caminho.name,
+        )
+        for k, fatia in enumerate(self.fatias):
+            pedido = {
+                "id_execucao": f"{self.id_execucao}_p{k}",
+                "lista_por_processo": {
+                    pid: [item_serializavel(item) for item in itens] for pid, itens in fatia.items()
+                },
+                "processos_ids": self.processos_ids,
+                "headless": self.headless,
+                "motor": self.motor,
+                "concorrencia": self.concorrencia,
+                "pasta_saida": str(configuracoes.PASTA_SAIDA_RESULTADOS_ABSOLUTA),
+            }
+            processo = self._contexto.Process(
+                target=_principal_particao,
+                args=(k, pedido, self._fila, self.controle, self.orcamento),
+                name=f"icms-pi-particao-{k}",
+                daemon=True,
+            )
+            processo.start()
+            self._processos.append(processo)
+            logger.info(
+                "Partição %d iniciada (pid %s): %s.", k, processo.pid,
+                {pid: len(itens) for pid, itens in fatia.items()},
+            )
+        futuro: concurrent.futures.Future = concurrent.futures.Future()
+        threading.Thread(
+            target=self._acompanhar, args=(futuro,), name="particoes-acompanhamento", daemon=True
+        ).start()
+        return self.controle, futuro
+
+    def _acompanhar(self, futuro: concurrent.futures.Future) -> None:
+        """Thread de acompanhamento: o futuro sempre recebe o resultado ou a exceção."""
+        try:
+            futuro.set_result(self._coletar_resultados())
+        except Exception as e:
+            logger.exception("Falha ao acompanhar as partições do lote.")
+            self.controle.cancelar()
+            for processo in self._processos:
+                if processo.is_alive():
+                    processo.kill()
+            futuro.set_exception(e)
+
+    def _coletar_resultados(self) -> tuple[list[str], list[tuple[str, str]]]:
+        """Lê as mensagens das partições até todas terminarem (ou caírem) e junta o resultado."""
+        resultados: dict[int, tuple[list[str], list[tuple[str, str]]] | None] = {}
+        # Partição morta sem "fim": espera uma leitura vazia a mais (mensagens ainda no pipe)
+        suspeitas: set[int] = set()
+        while len(resultados) < len(self._processos):
+            try:
+                mensagem = self._fila.get(timeout=_ESPERA_MENSAGEM_S)
+            except queue.Empty:
+                for k, processo in enumerate(self._processos):
+                    if k in resultados or processo.is_alive():
+                        continue
+                    if k in suspeitas:
+                        logger.error(
+                            "Partição %d encerrada (código %s) sem concluir o lote.",
+                            k, processo.exitcode,
+                        )
+                        resultados[k] = None
+                    else:
+                        suspeitas.add(k)
+                continue
+
+            k = int(mensagem["particao"])
+            tipo = mensagem.get("tipo")
+            if tipo == "progresso":
+                evento = mensagem["evento"]
+                if evento["tipo"] in _RESULTADOS_TERMINAIS:
+                    self.diario.registrar_ie(
+                        str(evento["processo"]), str(evento["ie"]), str(evento["tipo"]),
+                        str(evento.get("detalhe") or ""),
+                    )
+                if self.fila_progresso is not None:
+                    self.fila_progresso.emitir(evento)
+            elif tipo == "log":
+                logger_particao.log(
+                    int(mensagem["nivel"]), "[p%d] %s", k, mensagem["mensagem"]
+                )
+            elif tipo == "fim":
+                resultados[k] = (mensagem["ok"], mensagem["erro"])
+            elif tipo == "falha":
+                resultados[k] = None
+
+        for processo in self._processos:
+            processo.join(timeout=_ESPERA_ENCERRAMENTO_S)
+            if processo.is_alive():
+                processo.kill()
+                processo.join()
+
+        if all(resultado is not None for resultado in resultados.values()):
+            ies_ok = [ie for k in sorted(resultados) for ie in resultados[k][0]]
+            ies_erro = [erro for k in sorted(resultados) for erro in resultados[k][1]]
+        else:
+            # O que terminou está no diário; o restante das partições caídas volta como erro
+            ies_ok, ies_erro = self.diario.resultados()
+            ies_erro += [
+                (str(item.get("ie", "")), MOTIVO_PARTICAO_ENCERRADA)
+                for itens in self.diario.pendentes().values() for item in itens
+            ]
+        self.diario.registrar({"tipo": "fim", "sucesso": len(ies_ok), "erro": len(ies_erro),
+                               "cancelado": self.controle.cancelado})
+
+        pasta = configuracoes.PASTA_SAIDA_RESULTADOS_ABSOLUTA
+        try:
+            _juntar_telemetria(pasta, self.id_execucao, len(self._processos))
+            _juntar_latencias(pasta, self.id_execucao)
+        except OSError:
+            logger.exception("Falha ao juntar telemetria/latências das partições.")
+        return ies_ok, ies_erro
+
+
+def executar_particionado(
+    lista_por_processo: dict[str, list[dict[str, object]]],
+    processos_ids: list[str],
+    headless: bool,
+    motor: str | None = None,
+    particoes: int | None = None,
+    concorrencia: int | None = None,
+    ies_por_minuto: float | None = None,
+    fila_progresso: FilaProgresso | None = None,
+) -> tuple[ControleExecucao, concurrent.futures.Future]:
+    """Inicia o lote em partições; o futuro recebe (IEs com sucesso, (IE, motivo) com erro)."""
+    return LoteParticionado(
+        lista_por_processo, processos_ids, headless, motor=motor, particoes=particoes,
+        concorrencia=concorrencia, ies_por_minuto=ies_por_minuto, fila_progresso=fila_progresso,
+    ).iniciar()
@@ -1,6 +1,20 @@
-"""Interface desktop com CustomTkinter para o sistema ICMS-PI (ATC, Normal, DIFAL). Exibe Valor ATC e DIF. ALIQUOTA."""
-
-import asyncio
+"""
+Interface desktop com CustomTkinter para o sistema ICMS-PI (ATC, Normal, DIFAL). Exibe Valor ATC e DIF. ALIQUOTA.
+
+A janela é pintada antes de carregar os subsistemas pesados: openpyxl (``excel_filiais``),
+Playwright e as automações (regras de valor, ``execucao_lote``) são importados sob demanda e,
+logo após a primeira pintura, por uma thread de pré-carga. ``--perfil-inicializacao`` registra o
+tempo de cada import e dos marcos da inicialização (``icms_pi.perfil_inicializacao``).
+"""
+
+# Primeiro import: com o perfil ativo, cronometra todos os seguintes
+from icms_pi import perfil_inicializacao
+
+import argparse
+import bisect
+import concurrent.futures
+import logging
+import queue
 import sys
 import threading
 from pathlib import Path
@@ -9,16 +23,29 @@ from tkinter import filedialog, messagebox
 import customtkinter as ctk
 
 from icms_pi import configuracoes
-from icms_pi.excel_filiais import (
-    extrair_todos_os_dados,
-    obter_dados_para_dae,
-    obter_ies_dos_dados,
-    _obter_chave_ie,
+from icms_pi.controle_execucao import (
+    ControleExecucao,
+    LoteRecusadoPelaSonda,
+    registrar_controle,
 )
+from icms_pi.estimativa import EstimadorEta, estimar_lote, formatar_duracao
+from icms_pi.indice_itens import PROCESSOS, IndiceItens, regras_de_valor_por_processo
+from icms_pi.laco_assincrono import LacoAssincrono
+from icms_pi.lista_selecao import ListaSelecaoVirtual
 from icms_pi.logger import configurar_logger_da_aplicacao
-from atc.automacao_sefaz_pi import AutomacaoAntecipacaoParcialPI, _valor_atc_invalido
-from difal.automacao_sefaz_pi import AutomacaoDifalPI, _valor_difal_invalido
-from normal.automacao_sefaz_pi import AutomacaoNormalPI, _valor_normal_invalido
+from icms_pi.painel_log import PainelLog
+from icms_pi.progresso import (
+    EVENTO_ETAPA,
+    EVENTO_FALHA,
+    EVENTO_INICIADA,
+    EVENTO_PULADA,
+    EVENTO_SUCESSO,
+    FilaProgresso,
+    registrar_fila_progresso,
+)
+from icms_pi.telemetria import encerrar_telemetria, iniciar_telemetria
+from icms_pi.visualizador_dados import IndiceColunas, JanelaDadosExtraidos
+from icms_pi.worker_automacao import ProcessoAutomacao
 
 logger = configurar_logger_da_aplicacao(__name__)
 
@@ -39,6 +66,21 @@ _PID_PARA_LABEL_CURTO: dict[str, str] = {
 }
 _LABEL_CURTO_PARA_PID: dict[str, str] = {v: k for k, v in _PID_PARA_LABEL_CURTO.items()}
 
+# Linhas de cabeçalho antes da primeira IE na tabela
+_LINHAS_CABECALHO_TABELA = 2
+
+# Status exibido na tabela para cada evento de progresso (etapa não muda a linha)
+_STATUS_POR_EVENTO: dict[str, str] = {
+    EVENTO_INICIADA: "rodando",
+    EVENTO_SUCESSO: "ok",
+    EVENTO_FALHA: "erro",
+    EVENTO_PULADA: "pulada",
+}
+# Intervalo do poller que drena os eventos de progresso na thread do Tk
+_INTERVALO_PROGRESSO_MS = 250
+# Pausa na digitação antes de aplicar a busca de IEs
+_ATRASO_BUSCA_MS = 120
+
 
 # ---------------------------------------------------------------------------
 # Funções auxiliares
@@ -63,119 +105,106 @@ def _formato_intervalo_ms(ms: int) -> str:
     return f"{ms} ms"
 
 
-def _item_executavel_para_processo(item: dict[str, object], processo_id: str) -> bool:
-    """Retorna True se o item tem valor válido para o processo (antecipado=ATC, normal=NORMAL, difal=DIF. ALIQUOTA)."""
-    if processo_id == "antecipado":
-        return not _valor_atc_invalido(item.get("valor_atc"))
-    if processo_id == "normal":
-        return not _valor_normal_invalido(item.get("valor_normal"))
-    if processo_id == "difal":
-        return not _valor_difal_invalido(item.get("valor_difal"))
-    return False
-
-
-def _contar_executaveis_ignoradas(
-    lista_dados: list[dict[str, object]],
-    processos_ids: list[str] | None = None,
-) -> tuple[int, int]:
-    """Conta executáveis (com valor válido para pelo menos um dos processos) e ignoradas."""
-    if not processos_ids:
-        processos_ids = ["antecipado"]
-    executaveis = sum(
-        1 for item in lista_dados
-        if any(_item_executavel_para_processo(item, pid) for pid in processos_ids)
-    )
-    return executaveis, len(lista_dados) - executaveis
-
-
 # ---------------------------------------------------------------------------
-# Execução em background (thread separada)
+# Execução em background (event loop da aplicação)
 # ---------------------------------------------------------------------------
 
-def _executar_lote_em_background(
-    lista_dados: list[dict[str, object]],
+def _submeter_lote(
+    laco: LacoAssincrono,
+    lista_por_processo: dict[str, list[dict[str, object]]],
     processos_ids: list[str],
     headless: bool,
-    result_callback=None,
-    lista_por_processo: dict[str, list[dict[str, object]]] | None = None,
-) -> None:
-    if not processos_ids:
-        return
-
-    # Se lista_por_processo foi passada (modo 3 listas), usa ela; senão filtra por valor
-    if lista_por_processo is None:
-        lista_por_processo = {}
-        for pid in processos_ids:
-            if pid == "antecipado":
-                lista_por_processo[pid] = [
-                    item for item in lista_dados
-                    if not _valor_atc_invalido(item.get("valor_atc"))
-                ]
-            elif pid == "normal":
-                lista_por_processo[pid] = [
-                    item for item in lista_dados
-                    if not _valor_normal_invalido(item.get("valor_normal"))
-                ]
-            elif pid == "difal":
-                lista_por_processo[pid] = [
-                    item for item in lista_dados
-                    if not _valor_difal_invalido(item.get("valor_difal"))
-                ]
-
+    sondar: bool = False,
+    motor: str | None = None,
+    fila_progresso: FilaProgresso | None = None,
+    controle: ControleExecucao | None = None,
+) -> concurrent.futures.Future:
+    """Agenda o lote no event loop da aplicação; o futuro recebe (IEs ok, (IE, motivo) com erro)."""
     total = sum(len(lista_por_processo.get(pid, [])) for pid in processos_ids)
-    intervalo_txt = _formato_intervalo_ms(configuracoes.INTERVALO_ENTRE_EXECUCOES_MS)
+    intervalo_txt = _formato_intervalo_ms(
+        configuracoes.INTERVALO_MOTOR_HTTP_MS if motor == configuracoes.MOTOR_HTTP
+        else configuracoes.INTERVALO_ENTRE_EXECUCOES_MS
+    )
     logger.info(
-        "Iniciando lote: processos=%s, total itens=%s, intervalo=%s, headless=%s",
-        processos_ids, total, intervalo_txt, headless,
+        "Iniciando lote: processos=%s, total itens=%s, intervalo=%s, headless=%s, motor=%s",
+        processos_ids, total, intervalo_txt, headless, motor or configuracoes.MOTOR_AUTOMACAO,
     )
 
+    async def _lote() -> tuple[list[str], list[tuple[str, str]]]:
+        from icms_pi.execucao_lote import executar_lote
+
+        iniciar_telemetria()
+        registrar_fila_progresso(fila_progresso)
+        registrar_controle(controle)
+        try:
+            return await executar_lote(
+                lista_por_processo, processos_ids, headless, motor=motor, sondar=sondar
+            )
+        finally:
+            registrar_controle(None)
+            registrar_fila_progresso(None)
+            encerrar_telemetria()
+
+    return laco.submeter(_lote())
+
+
+def _carregar_planilha_em_background(
+    caminho: Path,
+    fila: queue.SimpleQueue,
+    cancelar: threading.Event,
+) -> None:
+    """
+    Lê a planilha em lotes em uma thread separada e publica na fila, para a thread do Tk:
+    ("cabecalho", parte), ("linhas", linhas_extraidas, lista_dados) por lote e, ao final,
+    ("fim",), ("cancelado",) ou ("erro", mensagem).
+    """
     def _worker() -> None:
+        from icms_pi.excel_filiais import (
+            CargaPlanilhaCancelada,
+            extrair_em_lotes,
+            obter_dados_para_dae,
+        )
+
         try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
-            ies_ok: list[str] = []
-            ies_erro: list[tuple[str, str]] = []
-
-            if "antecipado" in processos_ids:
-                lista_atc = lista_por_processo.get("antecipado", [])
-                if lista_atc:
-                    async def _rodar_antecipado() -> None:
-                        automacao = AutomacaoAntecipacaoParcialPI(headless=headless)
-                        ok, erro = await automacao.executar_fluxo_por_ie_pi(lista_atc)
-                        ies_ok.extend(ok)
-                        ies_erro.extend(erro)
-                    loop.run_until_complete(_rodar_antecipado())
-
-            if "normal" in processos_ids:
-                lista_normal = lista_por_processo.get("normal", [])
-                if lista_normal:
-                    async def _rodar_normal() -> None:
-                        automacao = AutomacaoNormalPI(headless=headless)
-                        ok, erro = await automacao.executar_fluxo_por_ie_pi(lista_normal)
-                        ies_ok.extend(ok)
-                        ies_erro.extend(erro)
-                    loop.run_until_complete(_rodar_normal())
-
-            if "difal" in processos_ids:
-                lista_difal = lista_por_processo.get("difal", [])
-                if lista_difal:
-                    async def _rodar_difal() -> None:
-                        automacao = AutomacaoDifalPI(headless=headless)
-                        ok, erro = await automacao.executar_fluxo_por_ie_pi(lista_difal)
-                        ies_ok.extend(ok)
-                        ies_erro.extend(erro)
-                    loop.run_until_complete(_rodar_difal())
-
-            if result_callback is not None:
-                result_callback(ies_ok, ies_erro)
+            # Regras de valor (automações) carregadas aqui, não no índice da thread do Tk
+            regras_de_valor_por_processo()
+            cabecalho: dict[str, object] = {}
+            for parte in extrair_em_lotes(caminho, cancelar=cancelar):
+                if parte["tipo"] == "cabecalho":
+                    cabecalho = parte
+                    fila.put(("cabecalho", parte))
+                    continue
+                lista_dados = obter_dados_para_dae(
+                    parte["linhas"], cabecalho["nome_para_indice"],
+                    cabecalho["mes_ref"], cabecalho["ano_ref"],
+                )
+                fila.put(("linhas", parte["linhas"], lista_dados))
+            fila.put(("fim",))
+        except CargaPlanilhaCancelada:
+            fila.put(("cancelado",))
+        except Exception as e:
+            logger.exception("Falha ao carregar planilha %s", caminho)
+            fila.put(("erro", str(e)))
+
+    threading.Thread(target=_worker, name="carga-planilha", daemon=True).start()
+
+
+def _pre_carregar_subsistemas() -> None:
+    """Importa em segundo plano o que a janela só usa depois (planilha, automações, motores)."""
+    def _worker() -> None:
+        try:
+            import icms_pi.excel_filiais  # noqa: F401  (openpyxl)
+
+            regras_de_valor_por_processo()
+            if not configuracoes.WORKER_EM_PROCESSO:
+                import icms_pi.execucao_lote  # noqa: F401
+        except Exception:
+            logger.exception("Falha na pré-carga dos módulos da automação.")
         finally:
-            try:
-                loop.close()
-            except Exception:
-                logger.exception("Falha ao fechar event loop da GUI.")
+            perfil_inicializacao.marcar("pre_carga_concluida")
+            perfil_inicializacao.gravar_relatorio()
 
-    threading.Thread(target=_worker, daemon=True).start()
+    threading.Thread(target=_worker, name="pre-carga", daemon=True).start()
 
 
 # ---------------------------------------------------------------------------
@@ -185,67 +214,21 @@ def _executar_lote_em_background(
 def _mostrar_janela_dados_extraidos(
     parent: ctk.CTk,
     caminho: Path,
-    dados_extraidos: list[dict[str, object]],
-    nomes_colunas: list[str],
-    nome_para_indice: dict[str, int],
+    indice: IndiceColunas,
 ) -> None:
-    if not dados_extraidos or not nomes_colunas:
+    if not indice.dados or not indice.colunas:
         messagebox.showinfo("Dados", "Nenhum dado extraído para exibir.")
         return
-
-    janela = ctk.CTkToplevel(parent)
-    janela.title("Dados extraídos do Excel")
-    janela.geometry("920x520")
-    janela.minsize(500, 340)
-
-    ctk.CTkLabel(
-        janela,
-        text=(
+    JanelaDadosExtraidos(
+        parent,
+        (
             f"Arquivo: {caminho.name}  |  "
-            f"{len(dados_extraidos)} linhas  |  "
-            f"{len(nomes_colunas)} colunas"
+            f"{len(indice.dados)} linhas  |  "
+            f"{len(indice.colunas)} colunas"
         ),
-        font=ctk.CTkFont(size=12),
-    ).pack(pady=8)
-
-    texto = ctk.CTkTextbox(
-        janela, font=ctk.CTkFont(family="Consolas", size=12), wrap="none",
+        indice,
+        formatar_ie=_ie_para_exibicao,
     )
-    texto.pack(fill="both", expand=True, padx=12, pady=(0, 12))
-
-    colunas = nomes_colunas
-    larguras = [max(len(str(col)), 4) for col in colunas]
-    for i, col in enumerate(colunas):
-        larguras[i] = max(
-            larguras[i],
-            max(
-                (len(str(linha.get(col, "") or "")) for linha in dados_extraidos[:100]),
-                default=0,
-            ),
-        )
-        larguras[i] = min(larguras[i], 30)
-
-    def _cel(s: object, w: int) -> str:
-        ss = "" if s is None else str(s).strip()
-        return (ss[: w - 2] + "..") if len(ss) > w else ss.ljust(w)
-
-    ie_key = _obter_chave_ie(nome_para_indice)
-
-    linha_cab = " | ".join(_cel(col, larguras[i]) for i, col in enumerate(colunas))
-    sep = "-+-".join("-" * w for w in larguras)
-    linhas_txt = [linha_cab, sep]
-    for linha in dados_extraidos:
-        def _valor_celula(col: str, idx: int, _linha=linha) -> str:
-            v = _linha.get(col)
-            if ie_key and col == ie_key and v is not None:
-                return _cel(_ie_para_exibicao(str(v)), larguras[idx])
-            return _cel(v, larguras[idx])
-        linhas_txt.append(
-            " | ".join(_valor_celula(col, i) for i, col in enumerate(colunas))
-        )
-
-    texto.insert("1.0", "\n".join(linhas_txt))
-    texto.configure(state="disabled")
 
 
 # ---------------------------------------------------------------------------
@@ -270,19 +253,66 @@ class App(ctk.CTk):
         self._caminho_excel: Path | None = None
         self._dados_extraidos: list[dict[str, object]] = []
         self._lista_dados: list[dict[str, object]] = []
+        # Executabilidade por processo e valores formatados, calculados uma vez na carga
+        self._indice = IndiceItens()
+        # Índice de colunas da janela "Ver dados", montado na primeira abertura
+        self._indice_colunas: IndiceColunas | None = None
         self._nomes_colunas: list[str] = []
         self._nome_para_indice: dict[str, int] = {}
         self._mes_ref: int = 0
         self._ano_ref: int = 0
         self._executando = False
 
+        # Carga da planilha em background: fila da thread leitora, sinal de cancelamento
+        # e linhas já exibidas na tabela (com o status de cada IE/processo no lote atual)
+        self._fila_carga: queue.SimpleQueue | None = None
+        self._cancelar_carga: threading.Event | None = None
+        self._total_estimado_carga = 0
+        self._linhas_na_tabela = 0
+        self._status_tabela: dict[tuple[str, str], str] = {}
+
+        # Busca de IEs: posições encontradas (None = sem filtro) e busca pendente do debounce
+        self._posicoes_busca: list[int] | None = None
+        self._busca_agendada: str | None = None
+
         self._modo_ies = self._MODO_TABELA
-        self._vars_selecao: list[tuple[dict[str, object], ctk.BooleanVar]] = []
         # Modo 3 listas: qual processo está em edição e seleção por processo
         self._processo_selecao_visivel: str = "antecipado"
-        self._selecao_por_processo: dict[str, list[tuple[dict[str, object], ctk.BooleanVar]]] = {}
+        self._selecao_por_processo: dict[str, ListaSelecaoVirtual] = {}
+
+        # Progresso da execução: linha de cada IE na tabela e contadores do lote
+        self._fila_progresso: FilaProgresso | None = None
+        # I.E. -> (linha no textbox, posição em _lista_dados)
+        self._linha_por_ie: dict[str, tuple[int, int]] = {}
+        self._total_previsto = 0
+        self._contadores_progresso: dict[str, int] = {}
+        self._ies_em_andamento: set[tuple[str, str]] = set()
+        self._estimador: EstimadorEta | None = None
+        # Pausa/cancelamento do lote em andamento; fechar a janela cancela e espera o fim
+        self._controle: ControleExecucao | None = None
+        self._fechar_ao_finalizar = False
+        # Processo worker dos motores (WORKER_EM_PROCESSO), mantido entre os lotes
+        self._processo_automacao: ProcessoAutomacao | None = None
+        # Sem worker: event loop persistente da aplicação; o lote em curso é um futuro
+        self._laco: LacoAssincrono | None = None
+        self._futuro_lote: concurrent.futures.Future | None = None
 
         self._construir_layout()
+        self.protocol("WM_DELETE_WINDOW", self._ao_fechar)
+        self._pintada = False
+        self.bind("<Map>", self._ao_mapear, add="+")
+
+    def _ao_mapear(self, _evento=None) -> None:
+        """Na primeira exibição: marca a primeira pintura e inicia a pré-carga."""
+        if self._pintada:
+            return
+        self._pintada = True
+
+        def _apos_pintura() -> None:
+            perfil_inicializacao.marcar("primeira_pintura")
+            _pre_carregar_subsistemas()
+
+        self.after_idle(_apos_pintura)
 
     # ------------------------------------------------------------------
     # Layout
@@ -335,6 +365,14 @@ class App(ctk.CTk):
         self._btn_ver_dados.grid(row=0, column=2, padx=(4, 4), pady=12)
         self._btn_ver_dados.grid_remove()
 
+        self._btn_cancelar_carga = ctk.CTkButton(
+            frame, text="Cancelar carga", width=140,
+            fg_color="firebrick", hover_color="darkred",
+            command=self._ao_cancelar_carga,
+        )
+        self._btn_cancelar_carga.grid(row=0, column=2, padx=(4, 4), pady=12)
+        self._btn_cancelar_carga.grid_remove()
+
         self._btn_abrir = ctk.CTkButton(
             frame, text="Selecionar arquivo…", width=140,
             command=self._selecionar_arquivo,
@@ -415,6 +453,31 @@ class App(ctk.CTk):
         )
         self._btn_alternar_modo.grid(row=0, column=1, sticky="e")
 
+        # Busca por trecho da I.E. ou do valor: filtra tabela e listas dos processos
+        busca = ctk.CTkFrame(header, fg_color="transparent")
+        busca.grid(row=1, column=0, columnspan=2, sticky="ew", pady=(4, 0))
+        self._entrada_busca = ctk.CTkEntry(
+            busca, width=220, height=28, placeholder_text="Buscar I.E. ou valor…",
+        )
+        self._entrada_busca.pack(side="left")
+        self._entrada_busca.bind("<KeyRelease>", lambda _e: self._agendar_busca())
+        self._btn_marcar_encontradas = ctk.CTkButton(
+            busca, text="Marcar encontradas", width=140, height=28,
+            font=ctk.CTkFont(size=11), state="disabled",
+            command=lambda: self._marcar_encontradas(True),
+        )
+        self._btn_marcar_encontradas.pack(side="left", padx=(8, 4))
+        self._btn_desmarcar_encontradas = ctk.CTkButton(
+            busca, text="Desmarcar encontradas", width=150, height=28,
+            font=ctk.CTkFont(size=11), state="disabled",
+            command=lambda: self._marcar_encontradas(False),
+        )
+        self._btn_desmarcar_encontradas.pack(side="left", padx=4)
+        self._lbl_busca = ctk.CTkLabel(
+            busca, text="", font=ctk.CTkFont(size=11), text_color="gray",
+        )
+        self._lbl_busca.pack(side="left", padx=8)
+
         _GRID_CONTEUDO = dict(row=1, column=0, sticky="nsew", padx=8, pady=(4, 8))
 
         # Modo tabela (textbox)
@@ -453,7 +516,6 @@ class App(ctk.CTk):
         self._container_listas.grid_rowconfigure(0, weight=1)
         # Frames por processo (preenchidos ao entrar no modo seleção)
         self._frame_lista_por_processo: dict[str, ctk.CTkFrame] = {}
-        self._frame_scroll_por_processo: dict[str, ctk.CTkScrollableFrame] = {}
         self._barra_por_processo: dict[str, ctk.CTkFrame] = {}
         self._lbl_contador_por_processo: dict[str, ctk.CTkLabel] = {}
 
@@ -492,6 +554,22 @@ class App(ctk.CTk):
         ).grid(row=row_idx, column=0, sticky="w", padx=22, pady=(0, 4))
         row_idx += 1
 
+        self._var_motor_http = ctk.BooleanVar(
+            value=configuracoes.MOTOR_AUTOMACAO == configuracoes.MOTOR_HTTP
+        )
+        ctk.CTkCheckBox(
+            frame, text="Motor HTTP (sem navegador)",
+            variable=self._var_motor_http, font=ctk.CTkFont(size=12),
+        ).grid(row=row_idx, column=0, sticky="w", padx=22, pady=(0, 4))
+        row_idx += 1
+
+        self._var_sondar = ctk.BooleanVar(value=True)
+        ctk.CTkCheckBox(
+            frame, text="Sondar portal antes do lote",
+            variable=self._var_sondar, font=ctk.CTkFont(size=12),
+        ).grid(row=row_idx, column=0, sticky="w", padx=22, pady=(0, 4))
+        row_idx += 1
+
         ctk.CTkFrame(frame, height=1).grid(
             row=row_idx, column=0, sticky="ew", padx=12, pady=6,
         )
@@ -504,24 +582,29 @@ class App(ctk.CTk):
             command=self._ao_executar, state="disabled",
         )
         self._btn_executar.grid(row=row_idx, column=0, padx=12, pady=(4, 12), sticky="ew")
+        row_idx += 1
+
+        # Pausar/Retomar e Cancelar: só durante a execução
+        self._frame_controle = ctk.CTkFrame(frame, fg_color="transparent")
+        self._frame_controle.grid(row=row_idx, column=0, padx=12, pady=(0, 12), sticky="ew")
+        self._frame_controle.grid_columnconfigure((0, 1), weight=1)
+        self._btn_pausar = ctk.CTkButton(
+            self._frame_controle, text="⏸  Pausar", height=32,
+            command=self._ao_pausar_retomar,
+        )
+        self._btn_pausar.grid(row=0, column=0, padx=(0, 4), sticky="ew")
+        self._btn_cancelar = ctk.CTkButton(
+            self._frame_controle, text="■  Cancelar", height=32,
+            fg_color="firebrick", hover_color="darkred",
+            command=self._ao_cancelar_execucao,
+        )
+        self._btn_cancelar.grid(row=0, column=1, padx=(4, 0), sticky="ew")
+        self._frame_controle.grid_remove()
 
     # --- Painel de log ---
     def _criar_painel_log(self, parent: ctk.CTkFrame) -> None:
-        frame = ctk.CTkFrame(parent, corner_radius=8)
-        frame.grid(row=1, column=0, sticky="nsew")
-        frame.grid_rowconfigure(1, weight=1)
-        frame.grid_columnconfigure(0, weight=1)
-
-        ctk.CTkLabel(
-            frame, text="Log de execução",
-            font=ctk.CTkFont(size=13, weight="bold"),
-        ).grid(row=0, column=0, sticky="w", padx=12, pady=(8, 2))
-
-        self._textbox_log = ctk.CTkTextbox(
-            frame, font=ctk.CTkFont(family="Consolas", size=11),
-            state="disabled", wrap="word",
-        )
-        self._textbox_log.grid(row=1, column=0, sticky="nsew", padx=8, pady=(0, 8))
+        self._painel_log = PainelLog(parent, corner_radius=8)
+        self._painel_log.grid(row=1, column=0, sticky="nsew")
 
     # --- Barra de status ---
     def _criar_barra_status(self) -> None:
@@ -535,18 +618,31 @@ class App(ctk.CTk):
         )
         self._lbl_status.grid(row=0, column=0, sticky="ew", padx=14, pady=3)
 
+        self._lbl_progresso = ctk.CTkLabel(
+            frame, text="", font=ctk.CTkFont(family="Consolas", size=11),
+            text_color="gray", anchor="e",
+        )
+        self._lbl_progresso.grid(row=0, column=1, sticky="e", padx=14, pady=3)
+
     # ------------------------------------------------------------------
     # Helpers
     # ------------------------------------------------------------------
-    def _log(self, msg: str) -> None:
-        self._textbox_log.configure(state="normal")
-        self._textbox_log.insert("end", msg + "\n")
-        self._textbox_log.see("end")
-        self._textbox_log.configure(state="disabled")
+    def _log(self, msg: str, nivel: int = logging.INFO) -> None:
+        """Vai para o arquivo de log da execução e, pelo listener, para o painel (em lote)."""
+        logger.log(nivel, msg)
+
+    def _motor_selecionado(self) -> str:
+        if self._var_motor_http.get():
+            return configuracoes.MOTOR_HTTP
+        return configuracoes.MOTOR_NAVEGADOR
 
     def _status(self, msg: str) -> None:
         self._lbl_status.configure(text=msg)
 
+    def _processos_ativos(self) -> list[str]:
+        """Processos marcados no painel (todos, se nenhum) — base das contagens."""
+        return [pid for pid, var in self._vars_processos.items() if var.get()] or list(PROCESSOS)
+
     def _habilitar_botoes(self, habilitado: bool = True) -> None:
         estado = "normal" if habilitado else "disabled"
         self._btn_abrir.configure(state=estado)
@@ -571,21 +667,23 @@ class App(ctk.CTk):
         self._container_selecao.grid_remove()
         self._textbox_ies.grid(**self._grid_conteudo)
         self._btn_alternar_modo.configure(text="Selecionar IEs")
+        self._btn_marcar_encontradas.configure(state="disabled")
+        self._btn_desmarcar_encontradas.configure(state="disabled")
 
     def _mostrar_modo_selecao(self) -> None:
         self._modo_ies = self._MODO_SELECAO
         self._textbox_ies.grid_remove()
         self._container_selecao.grid(**self._grid_conteudo)
         self._btn_alternar_modo.configure(text="Ver tabela")
+        self._btn_marcar_encontradas.configure(state="normal")
+        self._btn_desmarcar_encontradas.configure(state="normal")
         self._atualizar_seletor_processos_selecao()
         self._construir_listas_por_processo()
         self._mostrar_lista_do_processo(self._processo_selecao_visivel)
 
     def _atualizar_seletor_processos_selecao(self) -> None:
         """Mostra no seletor só os processos marcados no painel Processos; rótulos curtos (ATC, Normal, DIFAL)."""
-        processos_ativos = [p for p, var in self._vars_processos.items() if var.get()]
-        if not processos_ativos:
-            processos_ativos = ["antecipado", "normal", "difal"]
+        processos_ativos = self._processos_ativos()
         valores = [_PID_PARA_LABEL_CURTO[pid] for pid in ("antecipado", "normal", "difal") if pid in processos_ativos]
         if not valores:
             valores = ["ATC", "Normal", "DIFAL"]
@@ -624,22 +722,18 @@ class App(ctk.CTk):
         for p, frame in self._frame_lista_por_processo.items():
             frame.destroy()
         self._frame_lista_por_processo.clear()
-        self._frame_scroll_por_processo.clear()
         self._barra_por_processo.clear()
         self._lbl_contador_por_processo.clear()
 
         for pid in ("antecipado", "normal", "difal"):
             itens_processo = self._itens_executaveis_para_processo(pid)
+            posicoes = self._indice.posicoes_do_processo(pid)
             frame_lista = ctk.CTkFrame(self._container_listas, fg_color="transparent")
             frame_lista.grid(row=0, column=0, sticky="nsew")
             frame_lista.grid_columnconfigure(0, weight=1)
             frame_lista.grid_rowconfigure(0, weight=1)
             self._frame_lista_por_processo[pid] = frame_lista
 
-            scroll = ctk.CTkScrollableFrame(frame_lista)
-            scroll.grid(row=0, column=0, sticky="nsew", padx=4, pady=(4, 0))
-            self._frame_scroll_por_processo[pid] = scroll
-
             barra = ctk.CTkFrame(frame_lista, fg_color="transparent")
             barra.grid(row=1, column=0, sticky="ew", padx=4, pady=(4, 6))
             self._barra_por_processo[pid] = barra
@@ -662,89 +756,54 @@ class App(ctk.CTk):
             self._lbl_contador_por_processo[pid] = lbl_cont
 
             # Valor a exibir: só o do processo atual (ATC, NORMAL ou DIF. ALIQUOTA)
-            chave_valor = {"antecipado": "valor_atc", "normal": "valor_normal", "difal": "valor_difal"}
-            valor_key = chave_valor.get(pid, "valor_atc")
-
-            vars_list: list[tuple[dict[str, object], ctk.BooleanVar]] = []
-            for item in itens_processo:
-                ie = _ie_para_exibicao(item.get("ie") or item.get("ie_digitos") or "")
-                val = item.get(valor_key)
-                valor_txt = (
-                    f"{val:.2f}"
-                    if isinstance(val, (int, float))
-                    else (str(val) if val is not None else "—")
+            textos: list[tuple[str, str]] = [
+                (
+                    _ie_para_exibicao(item.get("ie") or item.get("ie_digitos") or ""),
+                    self._indice.valor_formatado(pos, pid),
                 )
-                var = ctk.BooleanVar(value=True)
-                vars_list.append((item, var))
-                row = ctk.CTkFrame(scroll, fg_color="transparent")
-                row.pack(fill="x", pady=1)
-                cb = ctk.CTkCheckBox(row, text="", variable=var, width=28)
-                cb.pack(side="left", padx=(0, 6), pady=3)
-                var.trace_add("write", lambda *_, proc=pid: self._atualizar_contador_selecao())
-                ctk.CTkLabel(
-                    row, text=ie,
-                    font=ctk.CTkFont(family="Consolas", size=12), width=110,
-                ).pack(side="left", padx=4, pady=3)
-                ctk.CTkLabel(
-                    row, text=valor_txt,
-                    font=ctk.CTkFont(family="Consolas", size=12), width=80,
-                ).pack(side="left", padx=4, pady=3)
-            self._selecao_por_processo[pid] = vars_list
-            n = sum(1 for _, v in vars_list if v.get())
-            self._lbl_contador_por_processo[pid].configure(text=f"Selecionadas: {n}")
+                for pos, item in zip(posicoes, itens_processo)
+            ]
+            lista = ListaSelecaoVirtual(
+                frame_lista, itens_processo, textos,
+                ao_mudar=self._atualizar_contador_selecao,
+            )
+            lista.grid(row=0, column=0, sticky="nsew", padx=4, pady=(4, 0))
+            if self._posicoes_busca is not None:
+                lista.filtrar(self._filtro_da_lista(pid))
+            self._selecao_por_processo[pid] = lista
+            lbl_cont.configure(text=f"Selecionadas: {lista.selecao.quantidade}")
 
         for f in self._frame_lista_por_processo.values():
             f.grid_remove()
 
     def _itens_executaveis_para_processo(self, pid: str) -> list[dict[str, object]]:
         """Retorna os itens que têm valor/critério para o processo (para montar a lista)."""
-        if pid == "antecipado":
-            return [
-                item for item in self._lista_dados
-                if not _valor_atc_invalido(item.get("valor_atc"))
-            ]
-        if pid == "normal":
-            return [
-                item for item in self._lista_dados
-                if not _valor_normal_invalido(item.get("valor_normal"))
-            ]
-        if pid == "difal":
-            return [
-                item for item in self._lista_dados
-                if not _valor_difal_invalido(item.get("valor_difal"))
-            ]
-        return []
+        return self._indice.itens_do_processo(pid)
 
     def _marcar_todas_ies_processo(self, pid: str) -> None:
-        for _, var in self._selecao_por_processo.get(pid, []):
-            var.set(True)
+        if pid in self._selecao_por_processo:
+            self._selecao_por_processo[pid].marcar_todas()
 
     def _desmarcar_todas_ies_processo(self, pid: str) -> None:
-        for _, var in self._selecao_por_processo.get(pid, []):
-            var.set(False)
+        if pid in self._selecao_por_processo:
+            self._selecao_por_processo[pid].desmarcar_todas()
 
     def _atualizar_contador_selecao(self) -> None:
         pid = self._processo_selecao_visivel
-        n = sum(
-            1 for _, var in self._selecao_por_processo.get(pid, [])
-            if var.get()
-        )
+        lista = self._selecao_por_processo.get(pid)
+        n = lista.selecao.quantidade if lista is not None else 0
         if pid in self._lbl_contador_por_processo:
             self._lbl_contador_por_processo[pid].configure(text=f"Selecionadas: {n}")
 
     def _atualizar_resumo_e_tabela_processos(self) -> None:
         """Atualiza contagem Executáveis/Ignoradas e tabela de IEs quando a seleção de processos muda."""
-        if not self._lista_dados:
+        if not self._lista_dados or self._fila_carga is not None:
             return
-        processos_ativos = [p for p, var in self._vars_processos.items() if var.get()]
-        processos_ativos = processos_ativos or ["antecipado", "normal", "difal"]
-        qtd_exec, qtd_ign = _contar_executaveis_ignoradas(
-            self._lista_dados, processos_ativos
-        )
+        # A tabela não depende dos processos marcados: só contadores e seletor mudam
+        qtd_exec, qtd_ign = self._indice.contar(self._processos_ativos())
         self._lbl_exec.configure(text=str(qtd_exec))
         self._lbl_ignor.configure(text=str(qtd_ign))
         self._btn_executar.configure(state="normal" if qtd_exec > 0 else "disabled")
-        self._preencher_tabela_ies()
         if self._modo_ies == self._MODO_SELECAO:
             self._atualizar_seletor_processos_selecao()
             self._mostrar_lista_do_processo(self._processo_selecao_visivel)
@@ -776,44 +835,119 @@ class App(ctk.CTk):
         self._btn_abrir.configure(text="Trocar arquivo…")
 
     def _carregar_planilha(self) -> None:
-        if self._caminho_excel is None:
+        """Inicia a leitura da planilha em background; a tabela e os cards são preenchidos por lote."""
+        if self._caminho_excel is None or self._fila_carga is not None:
             return
         self._status("Carregando planilha…")
         self._log(f"Abrindo: {self._caminho_excel.name}")
 
-        try:
-            self._dados_extraidos, self._nome_para_indice, self._mes_ref, self._ano_ref = (
-                extrair_todos_os_dados(self._caminho_excel)
-            )
-            self._nomes_colunas = [
-                k for k, _ in sorted(self._nome_para_indice.items(), key=lambda x: x[1])
-            ]
-            self._lista_dados = obter_dados_para_dae(
-                self._dados_extraidos, self._nome_para_indice,
-                self._mes_ref, self._ano_ref,
+        self._dados_extraidos = []
+        self._lista_dados = []
+        self._indice = IndiceItens()
+        self._indice_colunas = None
+        self._status_tabela.clear()
+        self._limpar_busca()
+        self._entrada_busca.configure(state="disabled")
+        self._nome_para_indice = {}
+        self._nomes_colunas = []
+        self._total_estimado_carga = 0
+        self._lbl_periodo.configure(text="—")
+        for lbl in (self._lbl_total, self._lbl_exec, self._lbl_ignor):
+            lbl.configure(text="0")
+        if self._modo_ies == self._MODO_SELECAO:
+            self._mostrar_modo_tabela()
+        self._preencher_tabela_ies()
+
+        self._habilitar_botoes(False)
+        self._btn_ver_dados.grid_remove()
+        self._btn_cancelar_carga.configure(state="normal")
+        self._btn_cancelar_carga.grid()
+        self._fila_carga = queue.SimpleQueue()
+        self._cancelar_carga = threading.Event()
+        _carregar_planilha_em_background(self._caminho_excel, self._fila_carga, self._cancelar_carga)
+        self.after(_INTERVALO_PROGRESSO_MS, self._drenar_carga_planilha)
+
+    def _ao_cancelar_carga(self) -> None:
+        if self._cancelar_carga is not None:
+            self._cancelar_carga.set()
+            self._btn_cancelar_carga.configure(state="disabled")
+            self._status("Cancelando carga…")
+
+    def _drenar_carga_planilha(self) -> None:
+        """Aplica os lotes lidos desde o último ciclo (um insert na tabela por ciclo) e reagenda."""
+        if self._fila_carga is None:
+            return
+        novas = 0
+        final: tuple | None = None
+        while final is None:
+            try:
+                mensagem = self._fila_carga.get_nowait()
+            except queue.Empty:
+                break
+            if mensagem[0] == "cabecalho":
+                parte = mensagem[1]
+                self._nome_para_indice = parte["nome_para_indice"]
+                self._nomes_colunas = [
+                    k for k, _ in sorted(self._nome_para_indice.items(), key=lambda x: x[1])
+                ]
+                self._mes_ref, self._ano_ref = parte["mes_ref"], parte["ano_ref"]
+                self._total_estimado_carga = parte["total_estimado"]
+                self._lbl_periodo.configure(text=f"{self._mes_ref:02d}/{self._ano_ref}")
+            elif mensagem[0] == "linhas":
+                self._dados_extraidos.extend(mensagem[1])
+                self._lista_dados.extend(mensagem[2])
+                self._indice.estender(mensagem[2])
+                novas += len(mensagem[2])
+            else:
+                final = mensagem
+
+        if novas:
+            self._anexar_linhas_tabela_ies()
+            total = len(self._lista_dados)
+            qtd_exec, qtd_ign = self._indice.contar(self._processos_ativos())
+            self._lbl_total.configure(text=str(total))
+            self._lbl_exec.configure(text=str(qtd_exec))
+            self._lbl_ignor.configure(text=str(qtd_ign))
+            self._status(
+                f"Carregando planilha… {total} de ~{max(self._total_estimado_carga, total)} linhas"
             )
-        except Exception as e:
-            messagebox.showerror("Erro ao carregar planilha", str(e))
-            self._log(f"ERRO: {e}")
-            self._status("Falha ao carregar planilha")
+
+        if final is None:
+            self.after(_INTERVALO_PROGRESSO_MS, self._drenar_carga_planilha)
             return
 
-        processos_ativos = [pid for pid, var in self._vars_processos.items() if var.get()]
-        qtd_exec, qtd_ign = _contar_executaveis_ignoradas(
-            self._lista_dados,
-            processos_ativos if processos_ativos else ["antecipado", "normal", "difal"],
-        )
+        self._fila_carga = None
+        self._cancelar_carga = None
+        self._btn_cancelar_carga.grid_remove()
+        self._entrada_busca.configure(state="normal")
+        self._habilitar_botoes(True)
+        if final[0] == "fim":
+            self._concluir_carga_planilha()
+            return
+
+        self._dados_extraidos = []
+        self._lista_dados = []
+        self._indice = IndiceItens()
+        self._preencher_tabela_ies()
+        for lbl in (self._lbl_total, self._lbl_exec, self._lbl_ignor):
+            lbl.configure(text="0")
+        self._btn_executar.configure(state="disabled")
+        self._btn_alternar_modo.configure(state="disabled")
+        if final[0] == "cancelado":
+            self._log("Carga da planilha cancelada.")
+            self._status("Carga cancelada")
+        else:
+            messagebox.showerror("Erro ao carregar planilha", final[1])
+            self._status("Falha ao carregar planilha")
+
+    def _concluir_carga_planilha(self) -> None:
+        qtd_exec, qtd_ign = self._indice.contar(self._processos_ativos())
         total = len(self._lista_dados)
 
-        self._lbl_periodo.configure(text=f"{self._mes_ref:02d}/{self._ano_ref}")
         self._lbl_total.configure(text=str(total))
         self._lbl_exec.configure(text=str(qtd_exec))
         self._lbl_ignor.configure(text=str(qtd_ign))
 
-        self._preencher_tabela_ies()
-        if self._modo_ies == self._MODO_SELECAO:
-            self._mostrar_modo_tabela()
-
         self._btn_ver_dados.configure(state="normal")
         self._btn_ver_dados.grid()
         self._btn_alternar_modo.configure(state="normal" if total > 0 else "disabled")
@@ -841,42 +975,102 @@ class App(ctk.CTk):
         sep = "─" * 96 + "\n"
         self._textbox_ies.insert("end", header)
         self._textbox_ies.insert("end", sep)
-
-        for idx, item in enumerate(self._lista_dados, 1):
-            ie = _ie_para_exibicao(str(item.get("ie", "")))
-            valor_atc = item.get("valor_atc")
-            valor_normal = item.get("valor_normal")
-            valor_difal = item.get("valor_difal")
-            if _valor_atc_invalido(valor_atc):
-                atc_str = "—"
-            else:
-                atc_str = f"R$ {float(valor_atc):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-            if _valor_normal_invalido(valor_normal):
-                normal_str = "—"
-            else:
-                normal_str = f"R$ {float(valor_normal):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-            if _valor_difal_invalido(valor_difal):
-                difal_str = "—"
-            else:
-                difal_str = f"R$ {float(valor_difal):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-            status_atc = "pendente" if not _valor_atc_invalido(valor_atc) else "ignorada"
-            status_normal = "pendente" if not _valor_normal_invalido(valor_normal) else "ignorada"
-            status_difal = "pendente" if not _valor_difal_invalido(valor_difal) else "ignorada"
-            self._textbox_ies.insert(
-                "end",
-                f"{idx:>4}  {ie:>12}  {atc_str:>14}  {normal_str:>14}  {difal_str:>14}  {status_atc:>8}  {status_normal:>8}  {status_difal:>8}\n",
-            )
-
+        self._textbox_ies.configure(state="disabled")
+        self._linha_por_ie.clear()
+        self._linhas_na_tabela = 0
+        self._anexar_linhas_tabela_ies(self._posicoes_busca)
+
+    def _texto_linha_tabela(self, pos: int) -> str:
+        """Linha da tabela de IEs (sem quebra) para a posição do lote, com o status atual."""
+        indice = self._indice
+        ie_bruta = str(self._lista_dados[pos].get("ie", ""))
+        ie = _ie_para_exibicao(ie_bruta)
+        atc_str, normal_str, difal_str = (indice.valor_formatado(pos, pid) for pid in PROCESSOS)
+        status_atc, status_normal, status_difal = (
+            self._status_tabela.get((ie_bruta, pid))
+            or ("pendente" if indice.executavel(pos, pid) else "ignorada")
+            for pid in PROCESSOS
+        )
+        return f"{pos + 1:>4}  {ie:>12}  {atc_str:>14}  {normal_str:>14}  {difal_str:>14}  {status_atc:>8}  {status_normal:>8}  {status_difal:>8}"
+
+    def _anexar_linhas_tabela_ies(self, posicoes: list[int] | None = None) -> None:
+        """
+        Acrescenta à tabela, em um único insert, as posições dadas (busca ativa) ou, sem elas,
+        os itens de ``_lista_dados`` ainda não exibidos. O status vem do progresso do lote.
+        """
+        if posicoes is None:
+            posicoes = range(self._linhas_na_tabela, len(self._lista_dados))
+        linhas: list[str] = []
+        linha_textbox = _LINHAS_CABECALHO_TABELA + self._linhas_na_tabela
+        for pos in posicoes:
+            linha_textbox += 1
+            ie_bruta = str(self._lista_dados[pos].get("ie", ""))
+            self._linha_por_ie.setdefault(ie_bruta, (linha_textbox, pos))
+            linhas.append(self._texto_linha_tabela(pos) + "\n")
+        if not linhas:
+            return
+        self._linhas_na_tabela += len(linhas)
+        self._textbox_ies.configure(state="normal")
+        self._textbox_ies.insert("end", "".join(linhas))
         self._textbox_ies.configure(state="disabled")
 
+    # --- Busca de IEs ---
+    def _agendar_busca(self) -> None:
+        if self._busca_agendada is not None:
+            self.after_cancel(self._busca_agendada)
+        self._busca_agendada = self.after(_ATRASO_BUSCA_MS, self._aplicar_busca)
+
+    def _aplicar_busca(self) -> None:
+        """Filtra a tabela e as listas dos processos pelo índice de busca da carga."""
+        self._busca_agendada = None
+        posicoes = self._indice.buscar(self._entrada_busca.get())
+        if posicoes == self._posicoes_busca:
+            return
+        self._posicoes_busca = posicoes
+        self._lbl_busca.configure(
+            text="" if posicoes is None else f"{len(posicoes)} encontrada(s)"
+        )
+        self._preencher_tabela_ies()
+        for pid, lista in self._selecao_por_processo.items():
+            lista.filtrar(self._filtro_da_lista(pid))
+
+    def _filtro_da_lista(self, pid: str) -> list[int] | None:
+        """Converte as posições encontradas (na planilha) em índices da lista do processo."""
+        if self._posicoes_busca is None:
+            return None
+        posicoes_pid = self._indice.posicoes_do_processo(pid)
+        locais = []
+        for pos in self._posicoes_busca:
+            i = bisect.bisect_left(posicoes_pid, pos)
+            if i < len(posicoes_pid) and posicoes_pid[i] == pos:
+                locais.append(i)
+        return locais
+
+    def _marcar_encontradas(self, valor: bool) -> None:
+        lista = self._selecao_por_processo.get(self._processo_selecao_visivel)
+        if lista is not None:
+            lista.marcar_filtradas(valor)
+
+    def _limpar_busca(self) -> None:
+        if self._busca_agendada is not None:
+            self.after_cancel(self._busca_agendada)
+            self._busca_agendada = None
+        self._entrada_busca.delete(0, "end")
+        self._posicoes_busca = None
+        self._lbl_busca.configure(text="")
+
     def _ao_ver_dados(self) -> None:
         if not self._dados_extraidos or not self._caminho_excel:
             messagebox.showinfo("Dados", "Nenhum dado extraído para exibir.")
             return
-        _mostrar_janela_dados_extraidos(
-            self, self._caminho_excel, self._dados_extraidos,
-            self._nomes_colunas, self._nome_para_indice,
-        )
+        if self._indice_colunas is None:
+            from icms_pi.excel_filiais import _obter_chave_ie
+
+            self._indice_colunas = IndiceColunas(
+                self._dados_extraidos, self._nomes_colunas,
+                _obter_chave_ie(self._nome_para_indice),
+            )
+        _mostrar_janela_dados_extraidos(self, self._caminho_excel, self._indice_colunas)
 
     # --- Executar ---
     def _ao_executar(self) -> None:
@@ -890,8 +1084,8 @@ class App(ctk.CTk):
 
         if self._modo_ies == self._MODO_SELECAO:
             lista_por_processo = {
-                pid: [item for (item, var) in self._selecao_por_processo.get(pid, []) if var.get()]
-                for pid in processos
+                pid: self._selecao_por_processo[pid].itens_selecionados()
+                for pid in processos if pid in self._selecao_por_processo
             }
             total_selecionadas = sum(len(lst) for lst in lista_por_processo.values())
             if total_selecionadas == 0:
@@ -902,20 +1096,25 @@ class App(ctk.CTk):
                 )
                 return
             descricao_qtd = f"{total_selecionadas} IE(s) selecionada(s) nos processos"
+            quantidades = {pid: len(lst) for pid, lst in lista_por_processo.items()}
         else:
-            lista_por_processo = None
-            lista = [
-                item for item in self._lista_dados
-                if any(_item_executavel_para_processo(item, p) for p in processos)
-            ]
-            if not lista:
+            lista_por_processo = {p: self._indice.itens_do_processo(p) for p in processos}
+            qtd_executaveis, _ = self._indice.contar(processos)
+            if not qtd_executaveis:
                 messagebox.showwarning(
                     "Aviso",
                     "Nenhuma I.E. com valor para o(s) processo(s) selecionado(s). "
                     "Alterne para 'Selecionar IEs' para ver o detalhamento.",
                 )
                 return
-            descricao_qtd = f"{len(lista)} IE(s) executável(is)"
+            descricao_qtd = f"{qtd_executaveis} IE(s) executável(is)"
+            quantidades = {p: len(lst) for p, lst in lista_por_processo.items()}
+
+        estimativa = estimar_lote(quantidades, self._motor_selecionado())
+        origem_estimativa = (
+            f"histórico de {estimativa['execucoes_historico']} execução(ões)"
+            if estimativa["execucoes_historico"] else "sem histórico, custos padrão"
+        )
 
         nomes = ", ".join(_nome_processo_legivel(p) for p in processos)
 
@@ -923,7 +1122,10 @@ class App(ctk.CTk):
             "Confirmar execução",
             f"Executar {nomes} para {descricao_qtd}?\n"
             f"Período: {self._mes_ref:02d}/{self._ano_ref}\n"
-            f"Headless: {'Sim' if self._var_headless.get() else 'Não'}",
+            f"Headless: {'Sim' if self._var_headless.get() else 'Não'}\n"
+            f"Sondar portal antes: {'Sim' if self._var_sondar.get() else 'Não'}\n"
+            f"Motor: {self._motor_selecionado()}\n"
+            f"Duração estimada: {formatar_duracao(estimativa['total_s'])} ({origem_estimativa})",
         )
         if not confirmacao:
             return
@@ -935,49 +1137,243 @@ class App(ctk.CTk):
         self._log(f"\n{'═' * 40}")
         self._log(f"Executando: {nomes}  |  {descricao_qtd}  |  headless={self._var_headless.get()}")
         self._log(f"{'═' * 40}")
+        self._iniciar_progresso(sum(quantidades.values()), float(estimativa["total_s"]))
+        self._btn_pausar.configure(text="⏸  Pausar", state="normal")
+        self._btn_cancelar.configure(state="normal")
+        self._frame_controle.grid()
+
+        if configuracoes.PARTICOES_LOTE > 1:
+            # Lote dividido entre processos, cada um com seu navegador (teto de taxa comum)
+            from icms_pi.execucao_particionada import executar_particionado
+
+            if self._var_sondar.get():
+                self._log("Sonda do portal não roda com o lote particionado (PARTICOES_LOTE).")
+            self._controle, self._futuro_lote = executar_particionado(
+                lista_por_processo, processos, self._var_headless.get(),
+                motor=self._motor_selecionado(),
+                fila_progresso=self._fila_progresso,
+            )
+            return
 
-        def _ao_finalizar(ies_ok: list[str], ies_erro: list[tuple[str, str]]) -> None:
-            self.after(0, self._finalizar_execucao, ies_ok, ies_erro)
-
-        if self._modo_ies == self._MODO_SELECAO and lista_por_processo is not None:
-            _executar_lote_em_background(
-                [], processos,
-                self._var_headless.get(), result_callback=_ao_finalizar,
-                lista_por_processo=lista_por_processo,
+        if configuracoes.WORKER_EM_PROCESSO:
+            # Motores no processo worker: a GUI só recebe progresso, logs e o resultado
+            if self._processo_automacao is None:
+                self._processo_automacao = ProcessoAutomacao()
+            self._controle, self._futuro_lote = self._processo_automacao.executar(
+                lista_por_processo, processos, self._var_headless.get(),
+                motor=self._motor_selecionado(),
+                sondar=self._var_sondar.get(),
+                fila_progresso=self._fila_progresso,
             )
+            return
+
+        if self._laco is None:
+            self._laco = LacoAssincrono().iniciar()
+        self._controle = ControleExecucao()
+        self._futuro_lote = _submeter_lote(
+            self._laco, lista_por_processo, processos, self._var_headless.get(),
+            sondar=self._var_sondar.get(),
+            motor=self._motor_selecionado(),
+            fila_progresso=self._fila_progresso,
+            controle=self._controle,
+        )
+
+    def _ao_pausar_retomar(self) -> None:
+        if self._controle is None or self._controle.cancelado:
+            return
+        if self._controle.pausado:
+            self._controle.retomar()
+            self._btn_pausar.configure(text="⏸  Pausar")
+            self._log("Lote retomado.")
         else:
-            _executar_lote_em_background(
-                lista, processos,
-                self._var_headless.get(), result_callback=_ao_finalizar,
-            )
+            self._controle.pausar()
+            self._btn_pausar.configure(text="▶  Retomar")
+            self._log("Lote pausado: a I.E. em andamento termina e o lote espera.")
+
+    def _ao_cancelar_execucao(self) -> None:
+        if self._controle is None or self._controle.cancelado:
+            return
+        self._controle.cancelar()
+        self._btn_pausar.configure(state="disabled")
+        self._btn_cancelar.configure(state="disabled")
+        self._status("Cancelando: encerrando o navegador…")
+        self._log("Cancelamento solicitado.", logging.WARNING)
+
+    def destroy(self) -> None:
+        if self._processo_automacao is not None:
+            self._processo_automacao.encerrar()
+            self._processo_automacao = None
+        if self._laco is not None:
+            self._laco.encerrar()
+            self._laco = None
+        super().destroy()
+
+    def _ao_fechar(self) -> None:
+        if not self._executando:
+            self.destroy()
+            return
+        if not messagebox.askyesno(
+            "Lote em execução", "Cancelar o lote em andamento e fechar a janela?"
+        ):
+            return
+        self._fechar_ao_finalizar = True
+        self._ao_cancelar_execucao()
 
     def _finalizar_execucao(
         self, ies_ok: list[str], ies_erro: list[tuple[str, str]],
+        recusa: list[str] | None = None,
     ) -> None:
         self._executando = False
+        self._drenar_progresso()
+        self._fila_progresso = None
+        cancelado = self._controle is not None and self._controle.cancelado
+        self._controle = None
+        self._frame_controle.grid_remove()
+        if self._fechar_ao_finalizar:
+            self.destroy()
+            return
         self._habilitar_botoes(True)
         self._btn_executar.configure(text="▶  Executar")
 
+        if recusa is not None:
+            # Sonda recusou o portal: nenhuma I.E. executada, nada a listar como erro
+            self._log(f"\n{'─' * 40}")
+            self._log("Lote recusado pela sonda do portal; nenhuma I.E. executada.", logging.WARNING)
+            for motivo in recusa:
+                self._log(f"  {motivo}", logging.WARNING)
+            self._log(f"{'─' * 40}\n")
+            self._status("Lote não executado: portal recusado pela sonda (ver log)")
+            return
+
         self._log(f"\n{'─' * 40}")
-        self._log(f"Concluído: {len(ies_ok)} sucesso, {len(ies_erro)} erro(s)")
+        self._log(
+            f"{'Cancelado' if cancelado else 'Concluído'}: "
+            f"{len(ies_ok)} sucesso, {len(ies_erro)} erro(s)"
+        )
         if ies_ok:
             self._log(f"  Sucesso: {', '.join(ies_ok)}")
         if ies_erro:
             for ie, motivo in ies_erro:
-                self._log(f"  Erro IE {ie}: {motivo}")
+                self._log(f"  Erro IE {ie}: {motivo}", logging.WARNING)
         self._log(f"{'─' * 40}\n")
 
         total = len(ies_ok) + len(ies_erro)
-        if ies_erro:
+        if cancelado:
+            self._status(f"Cancelado: {len(ies_ok)}/{total} sucesso, {len(ies_erro)} erro(s) até a parada")
+        elif ies_erro:
             self._status(f"Finalizado: {len(ies_ok)}/{total} sucesso, {len(ies_erro)} erro(s)")
         else:
             self._status("Execução concluída com sucesso!")
 
+    # --- Progresso ao vivo ---
+    def _iniciar_progresso(self, total_previsto: int, estimativa_s: float) -> None:
+        """Zera tabela, contadores e ETA e começa a drenar os eventos do lote."""
+        self._status_tabela.clear()
+        self._preencher_tabela_ies()
+        self._fila_progresso = FilaProgresso()
+        self._total_previsto = total_previsto
+        self._estimador = EstimadorEta(total_previsto, estimativa_s)
+        self._contadores_progresso = {EVENTO_SUCESSO: 0, EVENTO_FALHA: 0, EVENTO_PULADA: 0}
+        self._ies_em_andamento.clear()
+        self._atualizar_contadores_progresso()
+        self.after(_INTERVALO_PROGRESSO_MS, self._ciclo_progresso)
+
+    def _ciclo_progresso(self) -> None:
+        if not self._executando:
+            return
+        self._drenar_progresso()
+        # ETA e vazão mudam com o tempo mesmo sem eventos novos
+        self._atualizar_contadores_progresso()
+        if self._futuro_lote is not None and self._futuro_lote.done():
+            self._concluir_lote()
+            return
+        self.after(_INTERVALO_PROGRESSO_MS, self._ciclo_progresso)
 
-def main() -> None:
+    def _concluir_lote(self) -> None:
+        """Lê o futuro do lote (na thread do Tk) e finaliza; exceção do lote vira erro geral."""
+        futuro, self._futuro_lote = self._futuro_lote, None
+        try:
+            ies_ok, ies_erro = futuro.result()
+        except LoteRecusadoPelaSonda as e:
+            self._finalizar_execucao([], [], recusa=e.motivos)
+            return
+        except Exception as e:
+            logger.error("Falha no lote: %s", e, exc_info=e)
+            ies_ok, ies_erro = [], [("lote", f"Falha na execução: {e}")]
+        self._finalizar_execucao(ies_ok, ies_erro)
+
+    def _drenar_progresso(self) -> None:
+        """
+        Aplica os eventos acumulados desde o último ciclo: vários eventos da mesma IE viram
+        uma única escrita na linha dela; contadores e barra de status são atualizados uma vez.
+        """
+        if self._fila_progresso is None:
+            return
+        eventos = self._fila_progresso.drenar()
+        if not eventos:
+            return
+
+        linhas_alteradas: dict[int, int] = {}
+        for evento in eventos:
+            if self._estimador is not None:
+                self._estimador.registrar(evento)
+            tipo = str(evento["tipo"])
+            chave = (str(evento["processo"]), str(evento["ie"]))
+            if tipo == EVENTO_INICIADA:
+                self._ies_em_andamento.add(chave)
+            elif tipo in self._contadores_progresso:
+                self._ies_em_andamento.discard(chave)
+                self._contadores_progresso[tipo] += 1
+            status = _STATUS_POR_EVENTO.get(tipo)
+            if status:
+                self._status_tabela[(chave[1], chave[0])] = status
+            linha = self._linha_por_ie.get(chave[1])
+            if status and linha is not None and chave[0] in PROCESSOS:
+                linhas_alteradas[linha[0]] = linha[1]
+
+        if linhas_alteradas:
+            # Redesenha a linha inteira com o mesmo formato da tabela (larguras nunca divergem)
+            self._textbox_ies.configure(state="normal")
+            for linha, pos in linhas_alteradas.items():
+                self._textbox_ies.delete(f"{linha}.0", f"{linha}.end")
+                self._textbox_ies.insert(f"{linha}.0", self._texto_linha_tabela(pos))
+            self._textbox_ies.configure(state="disabled")
+
+        ultimo = eventos[-1]
+        rotulo = _PID_PARA_LABEL_CURTO.get(str(ultimo["processo"]), str(ultimo["processo"]))
+        if ultimo["tipo"] == EVENTO_ETAPA:
+            self._status(f"{rotulo} · IE {ultimo['ie']}: {ultimo['etapa']}")
+        else:
+            detalhe = f" ({ultimo['detalhe']})" if ultimo["detalhe"] else ""
+            self._status(f"{rotulo} · IE {ultimo['ie']}: {ultimo['tipo']}{detalhe}")
+        self._atualizar_contadores_progresso()
+
+    def _atualizar_contadores_progresso(self) -> None:
+        c = self._contadores_progresso
+        concluidas = c.get(EVENTO_SUCESSO, 0) + c.get(EVENTO_FALHA, 0) + c.get(EVENTO_PULADA, 0)
+        self._lbl_progresso.configure(
+            text=(
+                f"{concluidas}/{self._total_previsto}  ok {c.get(EVENTO_SUCESSO, 0)}"
+                f"  erro {c.get(EVENTO_FALHA, 0)}  pulada {c.get(EVENTO_PULADA, 0)}"
+                f"  em andamento {len(self._ies_em_andamento)}"
+                + (f"  |  {self._estimador.resumo()}" if self._executando and self._estimador else "")
+            )
+        )
+
+
+def main(argv: list[str] | None = None) -> None:
     """Ponto de entrada da GUI ICMS-PI."""
+    parser = argparse.ArgumentParser(prog="icms_pi", description="Interface ICMS-PI.")
+    parser.add_argument(
+        perfil_inicializacao.ARGUMENTO, action="store_true",
+        help="registra o tempo de cada import e até a primeira pintura (também "
+             "PERFIL_INICIALIZACAO=1)",
+    )
+    parser.parse_args(argv)
+    perfil_inicializacao.marcar("modulos_importados")
     logger.info("Iniciando interface ICMS-PI.")
     app = App()
+    perfil_inicializacao.marcar("janela_criada")
     app.mainloop()
     logger.info("Interface encerrada.")
 
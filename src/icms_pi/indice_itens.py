@@ -0,0 +1,167 @@
+"""
+Índice dos itens da planilha por processo, calculado uma vez na carga.
+
+Para cada item de ``obter_dados_para_dae``, ``IndiceItens`` guarda uma máscara de bits com os
+processos em que ele é executável (ATC, Normal, DIFAL: valor válido pelas mesmas regras das
+automações) e o valor de cada processo já formatado em moeda BR. A GUI lê tudo daqui: contagem
+de executáveis/ignoradas (O(1), pela contagem por máscara), itens de cada processo para as
+listas e para o lote, e os textos da tabela de IEs — sem reavaliar as regras de valor
+(``icms_pi.regras_valor``).
+
+A busca usa um índice de n-gramas (1 a 3 dígitos) sobre a I.E. e os valores normalizados (só
+dígitos): a consulta parte da menor lista de posições entre os n-gramas dela, intersecta as
+demais e confirma o trecho só nessas candidatas.
+"""
+
+from collections.abc import Callable, Iterable
+
+from icms_pi.regras_valor import CHAVE_VALOR_POR_PROCESSO, REGRAS_DE_VALOR_POR_PROCESSO
+
+PROCESSOS: tuple[str, ...] = ("antecipado", "normal", "difal")
+
+_BIT_POR_PROCESSO: dict[str, int] = {"antecipado": 1, "normal": 2, "difal": 4}
+
+
+def regras_de_valor_por_processo() -> dict[str, Callable[[object], bool]]:
+    """Regras de valor das automações (``icms_pi.regras_valor``, sem Playwright)."""
+    return REGRAS_DE_VALOR_POR_PROCESSO
+
+
+SEM_VALOR = "—"
+
+_TAMANHO_MAXIMO_GRAMA = 3
+
+
+def normalizar_busca(texto: object) -> str:
+    """Só os dígitos: '19.123.456-7' e 'R$ 1.234,50' viram '191234567' e '123450'."""
+    return "".join(c for c in str(texto or "") if c.isdigit())
+
+
+def _gramas(campo: str) -> set[str]:
+    return {
+        campo[i: i + n]
+        for n in range(1, _TAMANHO_MAXIMO_GRAMA + 1)
+        for i in range(len(campo) - n + 1)
+    }
+
+
+def formatar_moeda_br(valor: object) -> str:
+    """1234.5 -> 'R$ 1.234,50'; valor não numérico vai como texto."""
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        return str(valor)
+    return f"R$ {numero:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def mascara_dos_processos(processos_ids: Iterable[str]) -> int:
+    mascara = 0
+    for pid in processos_ids:
+        mascara |= _BIT_POR_PROCESSO.get(pid, 0)
+    return mascara
+
+
+class IndiceItens:
+    """Executabilidade por processo (um byte por item) e valores formatados, em ordem da planilha."""
+
+    def __init__(self, itens: Iterable[dict[str, object]] = ()) -> None:
+        self.itens: list[dict[str, object]] = []
+        self._mascaras = bytearray()
+        # Quantos itens há com cada máscara (0..7): contagens sem percorrer os itens
+        self._contagem_por_mascara = [0] * (1 << len(PROCESSOS))
+        self._posicoes_por_processo: dict[str, list[int]] = {pid: [] for pid in PROCESSOS}
+        self._valores_formatados: dict[str, list[str]] = {pid: [] for pid in PROCESSOS}
+        # Busca: campos normalizados por item (I.E. e valores) e posições por n-grama
+        self._campos_busca: list[tuple[str, ...]] = []
+        self._posicoes_por_grama: dict[str, list[int]] = {}
+        if itens:
+            self.estender(itens)
+
+    def __len__(self) -> int:
+        return len(self.itens)
+
+    def estender(self, itens: Iterable[dict[str, object]]) -> None:
+        """Indexa mais itens (a carga da planilha chega em lotes)."""
+        valor_invalido = regras_de_valor_por_processo()
+        for item in itens:
+            posicao = len(self.itens)
+            mascara = 0
+            for pid in PROCESSOS:
+                valor = item.get(CHAVE_VALOR_POR_PROCESSO[pid])
+                if valor_invalido[pid](valor):
+                    self._valores_formatados[pid].append(SEM_VALOR)
+                    continue
+                mascara |= _BIT_POR_PROCESSO[pid]
+                self._posicoes_por_processo[pid].append(posicao)
+                self._valores_formatados[pid].append(formatar_moeda_br(valor))
+            self.itens.append(item)
+            self._mascaras.append(mascara)
+            self._contagem_por_mascara[mascara] += 1
+            self._indexar_busca(posicao, item)
+
+    def _indexar_busca(self, posicao: int, item: dict[str, object]) -> None:
+        campos = tuple(
+            campo for campo in (
+                normalizar_busca(item.get("ie")),
+                *(normalizar_busca(self._valores_formatados[pid][posicao]) for pid in PROCESSOS),
+            ) if campo
+        )
+        self._campos_busca.append(campos)
+        gramas: set[str] = set()
+        for campo in campos:
+            gramas |= _gramas(campo)
+        for grama in gramas:
+            self._posicoes_por_grama.setdefault(grama, []).append(posicao)
+
+    def buscar(self, consulta: str) -> list[int] | None:
+        """Posições (em ordem) cuja I.E. ou valor contém a consulta; None se a consulta for vazia."""
+        trecho = normalizar_busca(consulta)
+        if not trecho:
+            return None
+        tamanho = min(len(trecho), _TAMANHO_MAXIMO_GRAMA)
+        listas = sorted(
+            (
+                self._posicoes_por_grama.get(trecho[i: i + tamanho], [])
+                for i in range(len(trecho) - tamanho + 1)
+            ),
+            key=len,
+        )
+        candidatas = listas[0]
+        if not candidatas:
+            return []
+        if len(trecho) <= _TAMANHO_MAXIMO_GRAMA:
+            return list(candidatas)
+        for outra in listas[1:]:
+            conjunto = set(outra)
+            candidatas = [pos for pos in candidatas if pos in conjunto]
+        return [
+            pos for pos in candidatas
+            if any(trecho in campo for campo in self._campos_busca[pos])
+        ]
+
+    def executavel(self, posicao: int, processo_id: str) -> bool:
+        return bool(self._mascaras[posicao] & _BIT_POR_PROCESSO.get(processo_id, 0))
+
+    def executavel_em_algum(self, posicao: int, processos_ids: Iterable[str]) -> bool:
+        return bool(self._mascaras[posicao] & mascara_dos_processos(processos_ids))
+
+    def valor_formatado(self, posicao: int, processo_id: str) -> str:
+        return self._valores_formatados[processo_id][posicao]
+
+    def contar(self, processos_ids: Iterable[str]) -> tuple[int, int]:
+        """(executáveis em pelo menos um dos processos, ignoradas)."""
+        mascara = mascara_dos_processos(processos_ids)
+        executaveis = sum(
+            quantidade for m, quantidade in enumerate(self._contagem_por_mascara) if m & mascara
+        )
+        return executaveis, len(self.itens) - executaveis
+
+    def posicoes_do_processo(self, processo_id: str) -> list[int]:
+        return self._posicoes_por_processo.get(processo_id, [])
+
+    def itens_do_processo(self, processo_id: str) -> list[dict[str, object]]:
+        return [self.itens[i] for i in self.posicoes_do_processo(processo_id)]
+
+    def itens_executaveis(self, processos_ids: Iterable[str]) -> list[dict[str, object]]:
+        mascara = mascara_dos_processos(processos_ids)
+        return [item for item, m in zip(self.itens, self._mascaras) if m & mascara]
@@ -0,0 +1,291 @@
+"""
+Instrumentação das etapas dos motores (navegador e HTTP).
+
+Cada etapa (``_clicar_*``, ``_selecionar_*``, ``_preencher_*``, ``aguardar_pagina_carregar``,
+intervalo entre I.E.s, I.E. completa...) é cronometrada por ``@etapa_cronometrada`` ou
+``medir_etapa`` e registrada no ``MedidorEtapas`` ativo do contexto assíncrono (contextvar),
+um por processo e execução. Sem medidor ativo (ex.: sonda fora do lote), a medição é ignorada.
+Com telemetria ativa (``icms_pi.telemetria``), cada medição vira também um evento JSONL, e
+``medir_ie`` delimita o span de cada I.E.; o início da I.E. e cada etapa concluída dentro dela
+também são emitidos como eventos de progresso (``icms_pi.progresso``).
+
+As durações vão para histogramas log-lineares (estilo HDR): memória constante por etapa e
+erro relativo de ~1,5% nos percentis, independentemente do tamanho do lote. Ao fim da
+execução, p50/p95/p99 por etapa são gravados em
+``latencias_<execucao>_<processo>_<motor>.json`` na pasta de resultados.
+"""
+
+import functools
+import json
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar, Token
+from datetime import datetime
+from pathlib import Path
+
+from icms_pi import configuracoes
+from icms_pi.logger import configurar_logger_da_aplicacao
+from icms_pi.progresso import EVENTO_ETAPA, EVENTO_INICIADA, emitir_progresso
+from icms_pi.telemetria import RESULTADO_ERRO, RESULTADO_OK, telemetria_ativa
+
+logger = configurar_logger_da_aplicacao(__name__)
+
+
+class HistogramaLatencia:
+    """
+    Histograma log-linear de durações em microssegundos: valores abaixo de 2*SUB_BALDES são
+    exatos; acima, cada potência de 2 é dividida em SUB_BALDES baldes.
+    """
+
+    SUB_BALDES = 64
+
+    def __init__(self) -> None:
+        self._contagens: dict[int, int] = {}
+        self.total = 0
+        self.soma_us = 0
+        self.minimo_us = 0
+        self.maximo_us = 0
+
+    @classmethod
+    def _indice(cls, valor_us: int) -> int:
+        if valor_us < 2 * cls.SUB_BALDES:
+            return valor_us
+        expoente = valor_us.bit_length() - cls.SUB_BALDES.bit_length()
+        return cls.SUB_BALDES * expoente + (valor_us >> expoente)
+
+    @classmethod
+    def _valor_do_indice(cls, indice: int) -> int:
+        """Ponto médio do balde (us)."""
+        if indice < 2 * cls.SUB_BALDES:
+            return indice
+        expoente = indice // cls.SUB_BALDES - 1
+        mantissa = indice - cls.SUB_BALDES * expoente
+        return (mantissa << expoente) + (1 << expoente) // 2
+
+    def registrar_ms(self, duracao_ms: float) -> None:
+        valor_us = max(0, int(duracao_ms * 1000.0))
+        indice = self._indice(valor_us)
+        self._contagens[indice] = self._contagens.get(indice, 0) + 1
+        self.minimo_us = valor_us if self.total == 0 else min(self.minimo_us, valor_us)
+        self.maximo_us = max(self.maximo_us, valor_us)
+        self.total += 1
+        self.soma_us += valor_us
+
+    def mesclar(self, outro: "HistogramaLatencia") -> None:
+        for indice, contagem in outro._contagens.items():
+            self._contagens[indice] = self._contagens.get(indice, 0) + contagem
+        if outro.total:
+            self.minimo_us = outro.minimo_us if self.total == 0 else min(self.minimo_us, outro.minimo_us)
+            self.maximo_us = max(self.maximo_us, outro.maximo_us)
+        self.total += outro.total
+        self.soma_us += outro.soma_us
+
+    def percentil_ms(self, p: float) -> float:
+        """Percentil p (0-100) em ms; 0.0 se vazio."""
+        if not self.total:
+            return 0.0
+        alvo = max(1, -(-self.total * p // 100))
+        acumulado = 0
+        for indice in sorted(self._contagens):
+            acumulado += self._contagens[indice]
+            if acumulado >= alvo:
+                valor_us = min(max(self._valor_do_indice(indice), self.minimo_us), self.maximo_us)
+                return valor_us / 1000.0
+        return self.maximo_us / 1000.0
+
+    def resumo(self) -> dict[str, float]:
+        return {
+            "n": self.total,
+            "p50": round(self.percentil_ms(50), 1),
+            "p95": round(self.percentil_ms(95), 1),
+            "p99": round(self.percentil_ms(99), 1),
+            "max": round(self.maximo_us / 1000.0, 1),
+            "media": round(self.soma_us / self.total / 1000.0, 1) if self.total else 0.0,
+            "total_s": round(self.soma_us / 1_000_000.0, 2),
+        }
+
+    def para_dict(self) -> dict[str, object]:
+        return {
+            "contagens": {str(i): c for i, c in sorted(self._contagens.items())},
+            "total": self.total,
+            "soma_us": self.soma_us,
+            "minimo_us": self.minimo_us,
+            "maximo_us": self.maximo_us,
+        }
+
+    @classmethod
+    def de_dict(cls, dados: dict[str, object]) -> "HistogramaLatencia":
+        histograma = cls()
+        histograma._contagens = {int(i): int(c) for i, c in dict(dados["contagens"]).items()}
+        histograma.total = int(dados["total"])
+        histograma.soma_us = int(dados["soma_us"])
+        histograma.minimo_us = int(dados["minimo_us"])
+        histograma.maximo_us = int(dados["maximo_us"])
+        return histograma
+
+
+class MedidorEtapas:
+    """Histogramas por etapa de um processo em uma execução (lote)."""
+
+    def __init__(
+        self,
+        processo: str,
+        motor: str = configuracoes.MOTOR_NAVEGADOR,
+        id_execucao: str | None = None,
+    ) -> None:
+        self.processo = processo
+        self.motor = motor
+        telemetria = telemetria_ativa()
+        self.id_execucao = (
+            id_execucao
+            or (telemetria.id_execucao if telemetria else None)
+            or datetime.now().strftime("%Y%m%d_%H%M%S")
+        )
+        self.histogramas: dict[str, HistogramaLatencia] = {}
+
+    def registrar(self, etapa: str, duracao_ms: float) -> None:
+        histograma = self.histogramas.get(etapa)
+        if histograma is None:
+            histograma = self.histogramas[etapa] = HistogramaLatencia()
+        histograma.registrar_ms(duracao_ms)
+
+    def resumo(self) -> dict[str, dict[str, float]]:
+        """{etapa: {"n", "p50", "p95", "p99", "max", "media", "total_s"}} em ms."""
+        return {etapa: h.resumo() for etapa, h in self.histogramas.items()}
+
+    def salvar(self, pasta: Path | None = None) -> Path | None:
+        """Grava resumo e histogramas em ``latencias_<execucao>_<processo>_<motor>.json``."""
+        if not self.histogramas:
+            return None
+        pasta = pasta or configuracoes.PASTA_SAIDA_RESULTADOS_ABSOLUTA
+        caminho = pasta / f"latencias_{self.id_execucao}_{self.processo}_{self.motor}.json"
+        dados = {
+            "processo": self.processo,
+            "motor": self.motor,
+            "execucao": self.id_execucao,
+            "resumo_ms": self.resumo(),
+            "histogramas": {etapa: h.para_dict() for etapa, h in self.histogramas.items()},
+        }
+        try:
+            pasta.mkdir(parents=True, exist_ok=True)
+            caminho.write_text(json.dumps(dados, ensure_ascii=False, indent=2), encoding="utf-8")
+        except OSError:
+            logger.exception("Falha ao salvar latências das etapas em %s", caminho)
+            return None
+        logger.info(
+            "Latências por etapa (%s, %s): %s",
+            self.processo,
+            self.motor,
+            ", ".join(
+                f"{etapa} p50={r['p50']:.0f}/p95={r['p95']:.0f} ms"
+                for etapa, r in self.resumo().items()
+            ),
+        )
+        return caminho
+
+
+_medidor_atual: ContextVar[MedidorEtapas | None] = ContextVar("medidor_etapas", default=None)
+
+
+def ativar_medidor(medidor: MedidorEtapas) -> Token:
+    """Torna o medidor ativo no contexto atual (herdado pelas tasks criadas a partir dele)."""
+    return _medidor_atual.set(medidor)
+
+
+def desativar_medidor(token: Token) -> None:
+    _medidor_atual.reset(token)
+
+
+# (I.E., tentativa) em processamento no contexto atual, para os eventos de telemetria
+_ie_atual: ContextVar[tuple[str, int] | None] = ContextVar("ie_atual", default=None)
+
+
+def _emitir_telemetria(
+    medidor: MedidorEtapas,
+    tipo: str,
+    etapa: str,
+    inicio: float,
+    fim: float,
+    duracao_ms: float,
+    erro: BaseException | None,
+) -> None:
+    telemetria = telemetria_ativa()
+    if telemetria is None:
+        return
+    ie, tentativa = _ie_atual.get() or ("", 1)
+    telemetria.emitir({
+        "tipo": tipo,
+        "processo": medidor.processo,
+        "motor": medidor.motor,
+        "ie": ie,
+        "etapa": etapa,
+        "inicio": round(inicio, 6),
+        "fim": round(fim, 6),
+        "duracao_ms": round(duracao_ms, 3),
+        "tentativa": tentativa,
+        "resultado": RESULTADO_OK if erro is None else RESULTADO_ERRO,
+        "classe_erro": type(erro).__name__ if erro is not None else None,
+    })
+
+
+@asynccontextmanager
+async def _medir(etapa: str, tipo: str):
+    medidor = _medidor_atual.get()
+    if medidor is None:
+        yield
+        return
+    inicio_mono = time.monotonic()
+    inicio = time.perf_counter()
+    erro: BaseException | None = None
+    try:
+        yield
+    except BaseException as e:
+        erro = e
+        raise
+    finally:
+        duracao_ms = (time.perf_counter() - inicio) * 1000.0
+        medidor.registrar(etapa, duracao_ms)
+        _emitir_telemetria(
+            medidor, tipo, etapa, inicio_mono, time.monotonic(), duracao_ms, erro
+        )
+        ie_atual = _ie_atual.get()
+        if tipo == "etapa" and erro is None and ie_atual is not None:
+            emitir_progresso(
+                medidor.processo, EVENTO_ETAPA, ie_atual[0], etapa, tentativa=ie_atual[1]
+            )
+
+
+def medir_etapa(etapa: str):
+    """
+    Cronometra o bloco (``async with``) e registra no medidor ativo, com ou sem exceção;
+    com telemetria ativa, emite também um evento ``etapa``.
+    """
+    return _medir(etapa, "etapa")
+
+
+@asynccontextmanager
+async def medir_ie(ie: str, tentativa: int = 1):
+    """
+    Span de uma I.E.: as etapas dentro do bloco são atribuídas a ela na telemetria e a
+    duração total vai para a etapa ``ie_completa`` (evento ``ie``).
+    """
+    token = _ie_atual.set((ie, tentativa))
+    medidor = _medidor_atual.get()
+    if medidor is not None:
+        emitir_progresso(medidor.processo, EVENTO_INICIADA, ie, tentativa=tentativa)
+    try:
+        async with _medir("ie_completa", "ie"):
+            yield
+    finally:
+        _ie_atual.reset(token)
+
+
+def etapa_cronometrada(etapa: str):
+    """Decorador de corrotina: cronometra cada chamada como ``etapa``."""
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        async def _cronometrada(*args, **kwargs):
+            async with medir_etapa(etapa):
+                return await funcao(*args, **kwargs)
+        return _cronometrada
+    return decorador
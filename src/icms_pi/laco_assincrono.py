@@ -0,0 +1,71 @@
+"""
+Event loop persistente numa thread própria, dono da aplicação (não do lote).
+
+A GUI cria um ``LacoAssincrono`` no primeiro lote e o mantém até fechar: cada lote é uma
+corrotina submetida com ``submeter`` (``asyncio.run_coroutine_threadsafe``), que devolve um
+``concurrent.futures.Future`` que a thread do Tk consulta sem bloquear. Objetos assíncronos
+(navegador, limitadores, caches) podem assim sobreviver entre lotes, e os processos de um lote
+podem rodar como tarefas concorrentes no mesmo loop.
+"""
+
+import concurrent.futures
+import threading
+from collections.abc import Coroutine
+
+from icms_pi.logger import configurar_logger_da_aplicacao
+
+logger = configurar_logger_da_aplicacao(__name__)
+
+_ESPERA_ENCERRAMENTO_S = 10.0
+
+
+class LacoAssincrono:
+    """Thread com ``loop.run_forever()``; ``submeter`` pode ser chamado de qualquer thread."""
+
+    def __init__(self, nome: str = "laco-automacao") -> None:
+        self._nome = nome
+        self._loop = None
+        self._thread: threading.Thread | None = None
+        self._pronto = threading.Event()
+
+    def iniciar(self) -> "LacoAssincrono":
+        self._thread = threading.Thread(target=self._rodar, name=self._nome, daemon=True)
+        self._thread.start()
+        self._pronto.wait()
+        return self
+
+    @property
+    def ativo(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _rodar(self) -> None:
+        import asyncio
+
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._pronto.set()
+        try:
+            loop.run_forever()
+        finally:
+            # Tarefas ainda pendentes (lote interrompido pelo encerramento) são canceladas
+            pendentes = asyncio.all_tasks(loop)
+            for tarefa in pendentes:
+                tarefa.cancel()
+            loop.run_until_complete(asyncio.gather(*pendentes, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+    def submeter(self, corrotina: Coroutine) -> concurrent.futures.Future:
+        import asyncio
+
+        return asyncio.run_coroutine_threadsafe(corrotina, self._loop)
+
+    def encerrar(self) -> None:
+        """Para o loop (cancelando o que estiver rodando) e espera a thread."""
+        if not self.ativo:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=_ESPERA_ENCERRAMENTO_S)
+        if self._thread.is_alive():
+            logger.warning("Event loop da automação não encerrou em %.0f s.", _ESPERA_ENCERRAMENTO_S)
@@ -0,0 +1,206 @@
+"""
+Lista virtualizada de seleção de I.E.s para a GUI.
+
+``SelecaoBitset`` guarda a seleção de um processo em um bit por I.E., com a contagem de
+marcadas mantida a cada mudança (contador O(1)) e marcar/desmarcar todas em operação única.
+``ListaSelecaoVirtual`` desenha só as linhas visíveis: um conjunto fixo de linhas (checkbox +
+I.E. + valor) é reaproveitado ao rolar, apontando para outro trecho dos dados, de modo que o
+custo de montar e de "Selecionar todas" não depende do tamanho da planilha. Um filtro (lista
+de índices, vindo da busca) restringe as linhas percorridas sem recriar nada.
+"""
+
+from collections.abc import Callable
+
+import customtkinter as ctk
+
+_ALTURA_LINHA = 30
+
+
+class SelecaoBitset:
+    """Seleção de ``tamanho`` itens, um bit por item."""
+
+    def __init__(self, tamanho: int, marcados: bool = True) -> None:
+        self.tamanho = tamanho
+        self._bits = bytearray((tamanho + 7) // 8)
+        self.quantidade = 0
+        if marcados:
+            self.marcar_todos()
+
+    def marcado(self, indice: int) -> bool:
+        return bool(self._bits[indice >> 3] & (1 << (indice & 7)))
+
+    def marcar(self, indice: int, valor: bool = True) -> None:
+        if self.marcado(indice) == valor:
+            return
+        self._bits[indice >> 3] ^= 1 << (indice & 7)
+        self.quantidade += 1 if valor else -1
+
+    def marcar_todos(self) -> None:
+        self._bits[:] = b"\xff" * len(self._bits)
+        sobra = self.tamanho & 7
+        if sobra:
+            self._bits[-1] = (1 << sobra) - 1
+        self.quantidade = self.tamanho
+
+    def desmarcar_todos(self) -> None:
+        self._bits[:] = bytes(len(self._bits))
+        self.quantidade = 0
+
+    def marcar_indices(self, indices: list[int], valor: bool = True) -> None:
+        for indice in indices:
+            self.marcar(indice, valor)
+
+    def indices_marcados(self) -> list[int]:
+        return [i for i in range(self.tamanho) if self.marcado(i)]
+
+
+class ListaSelecaoVirtual(ctk.CTkFrame):
+    """Lista rolável de (I.E., valor) com checkbox, renderizando só as linhas visíveis."""
+
+    def __init__(
+        self,
+        master,
+        itens: list[dict[str, object]],
+        textos: list[tuple[str, str]],
+        ao_mudar: Callable[[], None] | None = None,
+        **kwargs,
+    ) -> None:
+        super().__init__(master, **kwargs)
+        self.itens = itens
+        self._textos = textos
+        self._ao_mudar = ao_mudar
+        self.selecao = SelecaoBitset(len(itens))
+        self._primeira = 0
+        # Índices exibidos (filtro da busca); None = todos
+        self._filtro: list[int] | None = None
+        # Conjunto fixo de linhas: (frame, checkbox, rótulo I.E., rótulo valor)
+        self._linhas: list[tuple[ctk.CTkFrame, ctk.CTkCheckBox, ctk.CTkLabel, ctk.CTkLabel]] = []
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+        self._corpo = ctk.CTkFrame(self, fg_color="transparent")
+        self._corpo.grid(row=0, column=0, sticky="nsew")
+        self._barra = ctk.CTkScrollbar(self, command=self._rolar)
+        self._barra.grid(row=0, column=1, sticky="ns")
+
+        self._corpo.bind("<Configure>", self._ao_redimensionar)
+        self._ligar_roda_mouse(self._corpo, self)
+
+    # --- Seleção ---
+    def marcar_todas(self) -> None:
+        self.selecao.marcar_todos()
+        self._desenhar()
+        self._notificar()
+
+    def desmarcar_todas(self) -> None:
+        self.selecao.desmarcar_todos()
+        self._desenhar()
+        self._notificar()
+
+    def itens_selecionados(self) -> list[dict[str, object]]:
+        return [self.itens[i] for i in self.selecao.indices_marcados()]
+
+    # --- Filtro ---
+    def filtrar(self, indices: list[int] | None) -> None:
+        """Exibe só os índices dados (None volta a exibir todos)."""
+        self._filtro = indices
+        self._primeira = 0
+        self._ao_redimensionar()
+
+    def marcar_filtradas(self, valor: bool = True) -> None:
+        """Marca (ou desmarca) de uma vez todas as linhas do filtro atual."""
+        if self._filtro is None:
+            if valor:
+                self.marcar_todas()
+            else:
+                self.desmarcar_todas()
+            return
+        self.selecao.marcar_indices(self._filtro, valor)
+        self._desenhar()
+        self._notificar()
+
+    def _quantidade_exibida(self) -> int:
+        return len(self.itens) if self._filtro is None else len(self._filtro)
+
+    def _indice_exibido(self, linha: int) -> int:
+        return linha if self._filtro is None else self._filtro[linha]
+
+    def _notificar(self) -> None:
+        if self._ao_mudar is not None:
+            self._ao_mudar()
+
+    def _alternar(self, posicao: int) -> None:
+        linha = self._primeira + posicao
+        if linha < self._quantidade_exibida():
+            indice = self._indice_exibido(linha)
+            self.selecao.marcar(indice, not self.selecao.marcado(indice))
+            self._notificar()
+
+    # --- Virtualização ---
+    def _linhas_visiveis(self) -> int:
+        return max(1, self._corpo.winfo_height() // _ALTURA_LINHA)
+
+    def _ao_redimensionar(self, _evento=None) -> None:
+        necessarias = min(self._linhas_visiveis(), self._quantidade_exibida())
+        while len(self._linhas) < necessarias:
+            self._linhas.append(self._criar_linha(len(self._linhas)))
+        while len(self._linhas) > necessarias:
+            self._linhas.pop()[0].destroy()
+        self._primeira = max(0, min(self._primeira, self._quantidade_exibida() - necessarias))
+        self._desenhar()
+
+    def _criar_linha(
+        self, posicao: int
+    ) -> tuple[ctk.CTkFrame, ctk.CTkCheckBox, ctk.CTkLabel, ctk.CTkLabel]:
+        linha = ctk.CTkFrame(self._corpo, fg_color="transparent", height=_ALTURA_LINHA)
+        linha.place(x=0, y=posicao * _ALTURA_LINHA, relwidth=1.0)
+        caixa = ctk.CTkCheckBox(
+            linha, text="", width=28, command=lambda p=posicao: self._alternar(p)
+        )
+        caixa.pack(side="left", padx=(0, 6), pady=3)
+        fonte = ctk.CTkFont(family="Consolas", size=12)
+        rotulo_ie = ctk.CTkLabel(linha, text="", font=fonte, width=110)
+        rotulo_ie.pack(side="left", padx=4, pady=3)
+        rotulo_valor = ctk.CTkLabel(linha, text="", font=fonte, width=120, anchor="e")
+        rotulo_valor.pack(side="left", padx=4, pady=3)
+        self._ligar_roda_mouse(linha, caixa, rotulo_ie, rotulo_valor)
+        return linha, caixa, rotulo_ie, rotulo_valor
+
+    def _desenhar(self) -> None:
+        """Reaponta as linhas do conjunto fixo para o trecho visível dos dados."""
+        for posicao, (_, caixa, rotulo_ie, rotulo_valor) in enumerate(self._linhas):
+            indice = self._indice_exibido(self._primeira + posicao)
+            ie, valor = self._textos[indice]
+            rotulo_ie.configure(text=ie)
+            rotulo_valor.configure(text=valor)
+            if self.selecao.marcado(indice):
+                caixa.select()
+            else:
+                caixa.deselect()
+        total = self._quantidade_exibida()
+        if total:
+            self._barra.set(self._primeira / total, (self._primeira + len(self._linhas)) / total)
+        else:
+            self._barra.set(0.0, 1.0)
+
+    def _rolar(self, acao: str, valor, unidade: str | None = None) -> None:
+        visiveis = len(self._linhas)
+        maximo = max(0, self._quantidade_exibida() - visiveis)
+        if acao == "moveto":
+            primeira = int(float(valor) * self._quantidade_exibida())
+        else:
+            passo = visiveis if unidade == "pages" else 1
+            primeira = self._primeira + int(valor) * passo
+        primeira = max(0, min(primeira, maximo))
+        if primeira != self._primeira:
+            self._primeira = primeira
+            self._desenhar()
+
+    def _ligar_roda_mouse(self, *widgets) -> None:
+        for widget in widgets:
+            widget.bind("<MouseWheel>", self._ao_roda_mouse)
+            widget.bind("<Button-4>", lambda _e: self._rolar("scroll", -3, "units"))
+            widget.bind("<Button-5>", lambda _e: self._rolar("scroll", 3, "units"))
+
+    def _ao_roda_mouse(self, evento) -> None:
+        self._rolar("scroll", -3 if evento.delta > 0 else 3, "units")
@@ -1,15 +1,222 @@
 """Configuração centralizada de logging para o sistema ICMS-PI.
 
-Saída:
-- Terminal (nível INFO+)
-- Arquivo em ``logs/`` (nível DEBUG+) com timestamp no nome.
+Todos os loggers de módulo compartilham um único ``QueueHandler``: no event loop da automação,
+``logger.debug``/``info`` só enfileiram o registro. Um ``QueueListener`` (thread própria) grava:
+
+- Terminal (nível ``LOG_NIVEL_CONSOLE``, padrão INFO+)
+- Um arquivo por execução em ``logs/icms_pi_<timestamp>.log`` (nível ``LOG_NIVEL_ARQUIVO``,
+  padrão DEBUG+), rotacionado por tamanho; os segmentos rotacionados são comprimidos (.gz).
+- Destinos extras registrados com ``adicionar_destino`` (o painel de log da GUI).
+
+Processos filhos (worker da automação, partições do lote) não abrem arquivo nem terminal: o
+destino registrado por eles (``HandlerIpc`` de ``icms_pi.worker_automacao``) manda os registros
+ao processo pai, que os grava no arquivo da execução dele.
+
+Cada execução detém uma trava de arquivo (``icms_pi_<timestamp>.lock``) enquanto roda. Na
+inicialização, logs de execuções anteriores cuja trava está livre são comprimidos em segundo
+plano e só as ``LOG_EXECUCOES_MANTIDAS`` mais recentes são mantidas; logs de outros processos
+ainda vivos (outra GUI, a CLI agendada, workers distribuídos) não são tocados. O nível por subsistema vem de
+``LOG_NIVEIS`` (ex.: ``atc=INFO,icms_pi.motor_http=DEBUG``; vale o prefixo mais específico).
 """
 
+import atexit
+import gzip
 import logging
+import multiprocessing
+import os
+import queue
+import shutil
 import sys
+import threading
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 
+from icms_pi import configuracoes
+from icms_pi.trava_arquivo import TravaArquivo
+
+PASTA_LOGS = Path(__file__).resolve().parent.parent.parent / "logs"
+
+_trava = threading.Lock()
+_handler_fila: QueueHandler | None = None
+_listener: QueueListener | None = None
+_trava_execucao: TravaArquivo | None = None
+arquivo_log_execucao: Path | None = None
+
+
+def _nivel(texto: str, padrao: int) -> int:
+    nivel = logging.getLevelName(texto.strip().upper())
+    return nivel if isinstance(nivel, int) else padrao
+
+
+def _niveis_por_subsistema() -> dict[str, int]:
+    niveis: dict[str, int] = {}
+    for par in configuracoes.LOG_NIVEIS.split(","):
+        if "=" not in par:
+            continue
+        prefixo, nivel = par.split("=", 1)
+        niveis[prefixo.strip()] = _nivel(nivel, logging.DEBUG)
+    return niveis
+
+
+def nivel_do_arquivo() -> int:
+    """Nível mínimo gravado no arquivo da execução (``LOG_NIVEL_ARQUIVO``)."""
+    return _nivel(configuracoes.LOG_NIVEL_ARQUIVO, logging.DEBUG)
+
+
+def _nivel_do_subsistema(nome_do_modulo: str) -> int:
+    """Nível do prefixo configurado mais específico que cobre o módulo (padrão DEBUG)."""
+    melhor = ""
+    nivel = logging.DEBUG
+    for prefixo, nivel_prefixo in _niveis_por_subsistema().items():
+        cobre = nome_do_modulo == prefixo or nome_do_modulo.startswith(prefixo + ".")
+        if cobre and len(prefixo) > len(melhor):
+            melhor, nivel = prefixo, nivel_prefixo
+    return nivel
+
+
+def _comprimir_segmento(origem: str, destino: str) -> None:
+    """Rotator do RotatingFileHandler: o segmento rotacionado vira .gz."""
+    with open(origem, "rb") as entrada, gzip.open(destino, "wb") as saida:
+        shutil.copyfileobj(entrada, saida)
+    os.remove(origem)
+
+
+def _caminho_trava(execucao: str) -> Path:
+    return PASTA_LOGS / f"{execucao}.lock"
+
+
+def _execucao_em_uso(execucao: str) -> bool:
+    """True se o processo dono da execução ainda roda (trava ocupada); remove travas órfãs."""
+    caminho = _caminho_trava(execucao)
+    if not caminho.exists():
+        return False
+    trava = TravaArquivo(caminho)
+    if not trava.adquirir(bloquear=False):
+        return True
+    trava.liberar()
+    caminho.unlink(missing_ok=True)
+    return False
+
+
+def _comprimir_execucoes_antigas(arquivo_atual: Path) -> None:
+    """Comprime logs de execuções encerradas e remove os mais antigos além da retenção."""
+    execucoes: dict[str, list[Path]] = {}
+    for caminho in PASTA_LOGS.glob("icms_pi_*.log*"):
+        execucoes.setdefault(caminho.name.split(".log")[0], []).append(caminho)
+    execucoes.pop(arquivo_atual.stem, None)
+    encerradas: dict[str, list[Path]] = {}
+    for execucao, caminhos in execucoes.items():
+        try:
+            if not _execucao_em_uso(execucao):
+                encerradas[execucao] = caminhos
+        except OSError as e:
+            logging.getLogger(__name__).warning("Log %s sem verificação de uso: %s", execucao, e)
+
+    # Uma falha (arquivo aberto por outro programa no Windows) não interrompe as demais
+    for execucao, caminhos in encerradas.items():
+        for caminho in caminhos:
+            if caminho.suffix == ".gz":
+                continue
+            try:
+                _comprimir_segmento(str(caminho), str(caminho) + ".gz")
+            except OSError as e:
+                logging.getLogger(__name__).warning("Falha ao comprimir %s: %s", caminho.name, e)
+
+    antigas = sorted(encerradas)[: max(0, len(encerradas) - configuracoes.LOG_EXECUCOES_MANTIDAS)]
+    for execucao in antigas:
+        for caminho in PASTA_LOGS.glob(f"{execucao}.log*.gz"):
+            try:
+                caminho.unlink(missing_ok=True)
+            except OSError as e:
+                logging.getLogger(__name__).warning("Falha ao remover %s: %s", caminho.name, e)
+
+
+def _iniciar_backend() -> QueueHandler:
+    """Cria (uma vez por processo) a fila, os handlers de arquivo/console e o listener."""
+    global _handler_fila, _listener, _trava_execucao, arquivo_log_execucao
+    with _trava:
+        if _handler_fila is not None:
+            return _handler_fila
+
+        fila: queue.SimpleQueue = queue.SimpleQueue()
+        _handler_fila = QueueHandler(fila)
+        # Nome do processo já vem do pai antes de o spawn reimportar o módulo principal
+        if multiprocessing.current_process().name != "MainProcess":
+            # Sem destinos próprios: o processo filho registra o dele (IPC para o pai)
+            _listener = QueueListener(fila, respect_handler_level=True)
+            _listener.start()
+            atexit.register(encerrar_logging)
+            return _handler_fila
+
+        PASTA_LOGS.mkdir(parents=True, exist_ok=True)
+        execucao = f"icms_pi_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        _trava_execucao = TravaArquivo(_caminho_trava(execucao))
+        if not _trava_execucao.adquirir(bloquear=False):
+            # Outro processo começou no mesmo segundo
+            execucao = f"{execucao}_{os.getpid()}"
+            _trava_execucao = TravaArquivo(_caminho_trava(execucao))
+            _trava_execucao.adquirir()
+        arquivo_log_execucao = PASTA_LOGS / f"{execucao}.log"
+
+        formato_detalhado = logging.Formatter(
+            "%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S",
+        )
+        formato_console = logging.Formatter("%(levelname)-8s | %(name)s | %(message)s")
+
+        handler_arquivo = RotatingFileHandler(
+            arquivo_log_execucao,
+            maxBytes=configuracoes.LOG_TAMANHO_MAXIMO_BYTES,
+            backupCount=configuracoes.LOG_SEGMENTOS_POR_EXECUCAO,
+            encoding="utf-8",
+        )
+        handler_arquivo.namer = lambda nome: nome + ".gz"
+        handler_arquivo.rotator = _comprimir_segmento
+        handler_arquivo.setLevel(nivel_do_arquivo())
+        handler_arquivo.setFormatter(formato_detalhado)
+
+        handler_console = logging.StreamHandler(sys.stdout)
+        handler_console.setLevel(_nivel(configuracoes.LOG_NIVEL_CONSOLE, logging.INFO))
+        handler_console.setFormatter(formato_console)
+
+        _listener = QueueListener(fila, handler_arquivo, handler_console, respect_handler_level=True)
+        _listener.start()
+        atexit.register(encerrar_logging)
+        threading.Thread(
+            target=_comprimir_execucoes_antigas,
+            args=(arquivo_log_execucao,),
+            name="logs-compressao",
+            daemon=True,
+        ).start()
+        return _handler_fila
+
+
+def adicionar_destino(handler: logging.Handler) -> None:
+    """Acrescenta um destino ao listener (ex.: painel da GUI); é chamado na thread do listener."""
+    _iniciar_backend()
+    with _trava:
+        if _listener is not None and handler not in _listener.handlers:
+            _listener.handlers = (*_listener.handlers, handler)
+
+
+def remover_destino(handler: logging.Handler) -> None:
+    with _trava:
+        if _listener is not None:
+            _listener.handlers = tuple(h for h in _listener.handlers if h is not handler)
+
+
+def encerrar_logging() -> None:
+    """Esvazia a fila, para o listener e libera o log da execução (chamado no atexit)."""
+    global _listener, _trava_execucao
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _trava_execucao is not None:
+        _trava_execucao.liberar()
+        _trava_execucao.caminho.unlink(missing_ok=True)
+        _trava_execucao = None
+
 
 def configurar_logger_da_aplicacao(nome_do_modulo: str) -> logging.Logger:
     """Retorna um logger configurado para o módulo informado."""
@@ -18,30 +225,9 @@ def configurar_logger_da_aplicacao(nome_do_modulo: str) -> logging.Logger:
     if logger.handlers:
         return logger
 
-    logger.setLevel(logging.DEBUG)
+    logger.setLevel(_nivel_do_subsistema(nome_do_modulo))
     logger.propagate = False
+    logger.addHandler(_iniciar_backend())
 
-    pasta_logs = Path(__file__).resolve().parent.parent.parent / "logs"
-    pasta_logs.mkdir(parents=True, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    arquivo_log = pasta_logs / f"icms_pi_{timestamp}.log"
-
-    formato_detalhado = logging.Formatter(
-        "%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
-    formato_console = logging.Formatter("%(levelname)-8s | %(name)s | %(message)s")
-
-    handler_arquivo = logging.FileHandler(arquivo_log, encoding="utf-8")
-    handler_arquivo.setLevel(logging.DEBUG)
-    handler_arquivo.setFormatter(formato_detalhado)
-    logger.addHandler(handler_arquivo)
-
-    handler_console = logging.StreamHandler(sys.stdout)
-    handler_console.setLevel(logging.INFO)
-    handler_console.setFormatter(formato_console)
-    logger.addHandler(handler_console)
-
-    logger.debug("Logger configurado: arquivo=%s", arquivo_log)
+    logger.debug("Logger configurado: arquivo=%s", arquivo_log_execucao)
     return logger
-
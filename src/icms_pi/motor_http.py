@@ -0,0 +1,622 @@
+"""
+Motor HTTP (postback JSF) para o fluxo do DAR Web, sem navegador.
+
+O fluxo 113011/113000/113001 é uma cadeia de POSTs de formulários JSF que carregam o
+``javax.faces.ViewState``. Este motor faz os mesmos passos do navegador (menu ICMS, código,
+I.E., Avançar e Caso Geral + Calcular Imposto) com requisições HTTP diretas: cookie jar e
+conexões reaproveitadas por ``APIRequestContext`` do Playwright (sem abrir o Chromium), HTML
+lido com ``html.parser`` e postback JSF padrão (não AJAX), que o servidor trata como o
+clique no botão.
+
+Falhas estruturais (campo ou botão não encontrado, ViewState expirado, resposta inesperada)
+não viram erro da I.E.: o item vai para ``itens_para_navegador`` e é reprocessado pelo motor
+de navegador, que continua sendo o fallback.
+"""
+
+import asyncio
+import re
+from html.parser import HTMLParser
+from types import ModuleType
+from urllib.parse import urljoin
+
+from playwright.async_api import APIRequestContext, async_playwright
+
+from icms_pi import configuracoes
+from icms_pi.instrumentacao import (
+    MedidorEtapas,
+    ativar_medidor,
+    desativar_medidor,
+    etapa_cronometrada,
+    medir_etapa,
+    medir_ie,
+)
+from icms_pi.controle_execucao import ExecucaoCancelada, ponto_de_controle, trecho_cancelavel
+from icms_pi.logger import configurar_logger_da_aplicacao
+from icms_pi.progresso import (
+    EVENTO_ETAPA,
+    EVENTO_FALHA,
+    EVENTO_PULADA,
+    EVENTO_SUCESSO,
+    emitir_progresso,
+)
+from icms_pi.regras_valor import (
+    CHAVE_VALOR_POR_PROCESSO,
+    REGRAS_DE_VALOR_POR_PROCESSO,
+    data_vencimento_no_passado,
+)
+from atc import configuracoes as configuracoes_atc
+from atc.navegacao.acoes_pagina import ErroPortalSefaz
+from atc.navegacao.localizador_campos import seletores_em_cache
+from difal import configuracoes as configuracoes_difal
+from normal import configuracoes as configuracoes_normal
+
+logger = configurar_logger_da_aplicacao(__name__)
+
+_PROCESSOS_HTTP: dict[str, dict[str, object]] = {
+    "antecipado": {
+        "nome": "atc",
+        "configuracoes": configuracoes_atc,
+        "opcao": configuracoes_atc.VALOR_OPCAO_PI_ANTECIPACAO_PARCIAL,
+        "chave_valor": CHAVE_VALOR_POR_PROCESSO["antecipado"],
+        "valor_invalido": REGRAS_DE_VALOR_POR_PROCESSO["antecipado"],
+    },
+    "normal": {
+        "nome": "normal",
+        "configuracoes": configuracoes_normal,
+        "opcao": configuracoes_normal.VALOR_OPCAO_PI_IMPOSTO_JUROS_MULTA,
+        "chave_valor": CHAVE_VALOR_POR_PROCESSO["normal"],
+        "valor_invalido": REGRAS_DE_VALOR_POR_PROCESSO["normal"],
+    },
+    "difal": {
+        "nome": "difal",
+        "configuracoes": configuracoes_difal,
+        "opcao": configuracoes_difal.VALOR_OPCAO_PI_IMPOSTO_JUROS_MULTA,
+        "chave_valor": CHAVE_VALOR_POR_PROCESSO["difal"],
+        "valor_invalido": REGRAS_DE_VALOR_POR_PROCESSO["difal"],
+    },
+}
+
+# Campo lógico -> nome da constante de seletor nas configurações do processo
+_SELETOR_DO_CAMPO: dict[str, str] = {
+    "select_codigo": "SELETOR_PI_SELECT_CODIGO",
+    "campo_ie": "SELETOR_PI_CAMPO_IE",
+    "substituicao": "SELETOR_PI_SUBSTITUICAO",
+    "periodo_referencia": "SELETOR_PI_PERIODO_REFERENCIA",
+    "data_vencimento": "SELETOR_PI_DATA_VENCIMENTO",
+    "data_pagamento": "SELETOR_PI_DATA_PAGAMENTO",
+    "valor_principal": "SELETOR_PI_VALOR_PRINCIPAL",
+}
+
+_TAGS_VAZIAS = {"input", "br", "img", "meta", "link", "hr", "area", "base", "col", "source", "wbr"}
+_CLASSES_RAIZ_MENSAGEM = {"ui-growl-item-container", "ui-messages-error", "ui-messages-fatal",
+                          "ui-messages-warn", "ui-message-error"}
+# Mesmas severidades de SELETOR_PI_MENSAGENS_ERRO (avisos não contam como erro)
+_CLASSES_SEVERIDADE_ERRO = {"ui-growl-image-error", "ui-growl-image-fatal",
+                            "ui-messages-error", "ui-messages-fatal", "ui-message-error"}
+
+
+class ErroMotorHttp(Exception):
+    """Resposta do portal fora do esperado pelo motor HTTP (reprocessar pelo navegador)."""
+
+
+def _id_de_seletor(seletor: str) -> str | None:
+    m = re.search(r'\[(?:id|name)="([^"]+)"\]', seletor)
+    if m:
+        return m.group(1)
+    m = re.fullmatch(r"#([\w:-]+)", seletor.strip())
+    return m.group(1) if m else None
+
+
+def _valor_br(valor: float) -> str:
+    """Formata como a máscara priceFormat do portal: 1234.5 -> '1.234,50'."""
+    return f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+class _LeitorPaginaJsf(HTMLParser):
+    """Extrai formulários, links e mensagens de erro do PrimeFaces de uma página JSF."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.formularios: list[dict[str, object]] = []
+        self.links: list[dict[str, object]] = []
+        self.mensagens_erro: list[str] = []
+        self._pilha: list[str] = []
+        self._form: dict[str, object] | None = None
+        self._select: dict[str, object] | None = None
+        self._opcao: dict[str, object] | None = None
+        self._botao: dict[str, object] | None = None
+        self._link: dict[str, object] | None = None
+        self._mensagens: list[dict[str, object]] = []
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        a = {k: (v or "") for k, v in attrs}
+        classes = set(a.get("class", "").split())
+        if tag not in _TAGS_VAZIAS:
+            self._pilha.append(tag)
+        if classes & _CLASSES_RAIZ_MENSAGEM:
+            self._mensagens.append({
+                "profundidade": len(self._pilha),
+                "texto": [],
+                "erro": bool(classes & _CLASSES_SEVERIDADE_ERRO),
+            })
+        elif classes & _CLASSES_SEVERIDADE_ERRO:
+            for mensagem in self._mensagens:
+                mensagem["erro"] = True
+
+        if tag == "form":
+            self._form = {
+                "id": a.get("id", ""), "action": a.get("action", ""),
+                "campos": {}, "nomes_por_id": {}, "selects": {}, "botoes": [],
+            }
+            self.formularios.append(self._form)
+        elif tag == "a":
+            self._link = {
+                "id": a.get("id", ""), "classes": classes, "href": a.get("href", ""),
+                "onclick": a.get("onclick", ""), "texto": [],
+                "form": self._form,
+            }
+            self.links.append(self._link)
+        elif self._form is None:
+            return
+        elif tag == "input":
+            nome = a.get("name", "")
+            tipo = a.get("type", "text").lower()
+            if a.get("id") and nome:
+                self._form["nomes_por_id"][a["id"]] = nome
+            if not nome:
+                return
+            if tipo in ("submit", "button", "image"):
+                self._form["botoes"].append(
+                    {"nome": nome, "valor": a.get("value", ""), "texto": a.get("value", "")}
+                )
+            elif tipo in ("checkbox", "radio"):
+                if "checked" in a:
+                    self._form["campos"][nome] = a.get("value", "on")
+            else:
+                self._form["campos"][nome] = a.get("value", "")
+        elif tag == "select":
+            nome = a.get("name", "")
+            self._select = {"nome": nome, "opcoes": [], "valor": None}
+            if nome:
+                self._form["selects"][nome] = self._select
+                if a.get("id"):
+                    self._form["nomes_por_id"][a["id"]] = nome
+        elif tag == "option" and self._select is not None:
+            self._opcao = {"valor": a.get("value"), "texto": [], "selecionada": "selected" in a}
+            self._select["opcoes"].append(self._opcao)
+        elif tag == "button":
+            nome = a.get("name", "") or a.get("id", "")
+            if a.get("type", "submit").lower() == "submit" and nome:
+                self._botao = {"nome": nome, "valor": a.get("value", "") or nome, "texto": []}
+                self._form["botoes"].append(self._botao)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in self._pilha:
+            while self._pilha:
+                if self._pilha.pop() == tag:
+                    break
+        for mensagem in [m for m in self._mensagens if m["profundidade"] > len(self._pilha)]:
+            self._mensagens.remove(mensagem)
+            texto = " ".join(" ".join(mensagem["texto"]).split())
+            if mensagem["erro"] and texto and texto not in self.mensagens_erro:
+                self.mensagens_erro.append(texto)
+        if tag == "form":
+            self._form = None
+        elif tag == "select" and self._select is not None:
+            for opcao in self._select["opcoes"]:
+                opcao["texto"] = " ".join("".join(opcao["texto"]).split())
+                if opcao["valor"] is None:
+                    opcao["valor"] = opcao["texto"]
+            selecionadas = [o for o in self._select["opcoes"] if o["selecionada"]]
+            padrao = selecionadas or self._select["opcoes"][:1]
+            self._select["valor"] = padrao[0]["valor"] if padrao else ""
+            self._select = None
+        elif tag == "option":
+            self._opcao = None
+        elif tag == "button" and self._botao is not None:
+            self._botao["texto"] = " ".join("".join(self._botao["texto"]).split())
+            self._botao = None
+        elif tag == "a" and self._link is not None:
+            self._link["texto"] = " ".join("".join(self._link["texto"]).split())
+            self._link = None
+
+    def handle_data(self, data: str) -> None:
+        for mensagem in self._mensagens:
+            mensagem["texto"].append(data)
+        if self._opcao is not None:
+            self._opcao["texto"].append(data)
+        if self._botao is not None:
+            self._botao["texto"].append(data)
+        if self._link is not None:
+            self._link["texto"].append(data)
+
+
+class _PaginaJsf:
+    """Página JSF já lida: URL final, formulários, links e mensagens de erro."""
+
+    def __init__(self, url: str, conteudo: str) -> None:
+        leitor = _LeitorPaginaJsf()
+        leitor.feed(conteudo)
+        leitor.close()
+        self.url = url
+        self.formularios = leitor.formularios
+        self.links = leitor.links
+        self.mensagens_erro = leitor.mensagens_erro
+
+    def formulario_com_campo(self, nome: str) -> dict[str, object] | None:
+        for form in self.formularios:
+            if nome in form["campos"] or nome in form["selects"]:
+                return form
+        return None
+
+    def nome_do_campo(self, id_ou_nome: str) -> str | None:
+        for form in self.formularios:
+            if id_ou_nome in form["campos"] or id_ou_nome in form["selects"]:
+                return id_ou_nome
+            if id_ou_nome in form["nomes_por_id"]:
+                return form["nomes_por_id"][id_ou_nome]
+        return None
+
+
+class MotorHttpDarWeb:
+    """
+    Executa o fluxo de um processo (antecipado, normal ou difal) por HTTP direto.
+    Mesma interface dos motores de navegador: ``executar_fluxo_por_ie_pi(lista_dados)``.
+    Com ``manter_aberto`` os contextos HTTP (e a sessão no portal) ficam abertos entre chamadas
+    até ``encerrar()``.
+    """
+
+    def __init__(
+        self,
+        processo_id: str,
+        concorrencia: int | None = None,
+        url_portal: str | None = None,
+        intervalo_ms: int | None = None,
+        manter_aberto: bool = False,
+    ) -> None:
+        self._processo_id = processo_id
+        self._manter_aberto = manter_aberto
+        self._playwright = None
+        self._contextos: list[APIRequestContext] = []
+        self._processo = _PROCESSOS_HTTP[processo_id]
+        self._modulo: ModuleType = self._processo["configuracoes"]
+        self._concorrencia = max(1, concorrencia or configuracoes.CONCORRENCIA_MOTOR_HTTP)
+        self._url_portal = url_portal or configuracoes.URL_PORTAL_DARWEB_SEFAZ_PI
+        self._intervalo_ms = (
+            configuracoes.INTERVALO_MOTOR_HTTP_MS if intervalo_ms is None else intervalo_ms
+        )
+        self._cache_seletores: dict[str, str] = {}
+        self.itens_para_navegador: list[dict[str, object]] = []
+        self.medidor: MedidorEtapas | None = None
+
+    # ------------------------------------------------------------------
+    # Campos e formulários
+    # ------------------------------------------------------------------
+    def _nome_campo(self, pagina: _PaginaJsf, campo: str) -> str | None:
+        """Nome do campo no POST: seletor do cache do localizador, depois o configurado."""
+        candidatos = [self._cache_seletores.get(campo)]
+        constante = _SELETOR_DO_CAMPO[campo]
+        candidatos.append(getattr(self._modulo, constante, None))
+        for seletor in candidatos:
+            if not seletor:
+                continue
+            id_ou_nome = _id_de_seletor(seletor)
+            nome = pagina.nome_do_campo(id_ou_nome) if id_ou_nome else None
+            if nome:
+                return nome
+        return None
+
+    def _exigir_campo(self, pagina: _PaginaJsf, campo: str) -> tuple[str, dict[str, object]]:
+        nome = self._nome_campo(pagina, campo)
+        form = pagina.formulario_com_campo(nome) if nome else None
+        if nome is None or form is None:
+            raise ErroMotorHttp(f"Campo {campo} não encontrado na resposta do portal")
+        return nome, form
+
+    @staticmethod
+    def _verificar_erros(pagina: _PaginaJsf) -> None:
+        if pagina.mensagens_erro:
+            raise ErroPortalSefaz(" — ".join(pagina.mensagens_erro))
+
+    @staticmethod
+    def _dados_formulario(form: dict[str, object]) -> dict[str, str]:
+        dados = dict(form["campos"])
+        for nome, select in form["selects"].items():
+            dados[nome] = select["valor"] or ""
+        return dados
+
+    async def _ler_resposta(self, resposta) -> _PaginaJsf:
+        if resposta.status >= 400:
+            raise ErroMotorHttp(f"HTTP {resposta.status} em {resposta.url}")
+        pagina = _PaginaJsf(resposta.url, await resposta.text())
+        self._verificar_erros(pagina)
+        return pagina
+
+    @etapa_cronometrada("requisicao_get")
+    async def _obter(self, requisicao: APIRequestContext, url: str) -> _PaginaJsf:
+        return await self._ler_resposta(await requisicao.get(url))
+
+    @etapa_cronometrada("postback_jsf")
+    async def _postar(
+        self,
+        requisicao: APIRequestContext,
+        pagina: _PaginaJsf,
+        form: dict[str, object],
+        dados: dict[str, str],
+    ) -> _PaginaJsf:
+        if "javax.faces.ViewState" not in dados:
+            raise ErroMotorHttp("Formulário sem javax.faces.ViewState")
+        url = urljoin(pagina.url, str(form["action"]) or pagina.url)
+        return await self._ler_resposta(await requisicao.post(url, form=dados))
+
+    async def _clicar_botao(
+        self,
+        requisicao: APIRequestContext,
+        pagina: _PaginaJsf,
+        form: dict[str, object],
+        texto: str,
+        valores: dict[str, str],
+    ) -> _PaginaJsf:
+        botao = next((b for b in form["botoes"] if texto in b["texto"]), None)
+        if botao is None:
+            raise ErroMotorHttp(f"Botão {texto} não encontrado no formulário {form['id']}")
+        dados = self._dados_formulario(form)
+        dados.update(valores)
+        dados[str(botao["nome"])] = str(botao["valor"])
+        return await self._postar(requisicao, pagina, form, dados)
+
+    # ------------------------------------------------------------------
+    # Etapas do fluxo
+    # ------------------------------------------------------------------
+    @etapa_cronometrada("menu_icms")
+    async def _clicar_menu_icms(
+        self, requisicao: APIRequestContext, pagina: _PaginaJsf
+    ) -> _PaginaJsf:
+        classe_menu = self._modulo.SELETOR_PI_MENU_ICMS.split(".")[-1]
+        link = next(
+            (l for l in pagina.links if classe_menu in l["classes"] and "ICMS" in l["texto"]),
+            None,
+        )
+        if link is None:
+            raise ErroMotorHttp("Link do menu ICMS não encontrado")
+        href = str(link["href"])
+        if href and href != "#" and not href.startswith("javascript"):
+            return await self._obter(requisicao, urljoin(pagina.url, href))
+        form = link["form"]
+        if form is None:
+            raise ErroMotorHttp("Link do menu ICMS fora de formulário JSF")
+        dados = self._dados_formulario(form)
+        # mojarra.jsfcljs(form, {'id':'id'}, '') → parâmetros extras do postback
+        dados.update(dict(re.findall(r"'([^']+)'\s*:\s*'([^']*)'", str(link["onclick"]))))
+        if link["id"]:
+            dados.setdefault(str(link["id"]), str(link["id"]))
+        return await self._postar(requisicao, pagina, form, dados)
+
+    @etapa_cronometrada("codigo")
+    async def _enviar_codigo(
+        self, requisicao: APIRequestContext, pagina: _PaginaJsf
+    ) -> _PaginaJsf:
+        rotulo = str(self._processo["opcao"])
+        nome = self._nome_campo(pagina, "select_codigo")
+        form = pagina.formulario_com_campo(nome) if nome else None
+        if form is None or not any(
+            o["texto"] == rotulo for o in form["selects"].get(nome, {}).get("opcoes", ())
+        ):
+            # id JSF mudou (o nome configurado sumiu ou caiu em outro campo): o select do
+            # código é o que oferece a opção do processo
+            nome = next(
+                (
+                    nome_select
+                    for form in pagina.formularios
+                    for nome_select, select in form["selects"].items()
+                    if any(o["texto"] == rotulo for o in select["opcoes"])
+                ),
+                None,
+            )
+            form = pagina.formulario_com_campo(nome) if nome else None
+        if form is None:
+            raise ErroMotorHttp("Select do código da receita não encontrado")
+        opcao = next((o for o in form["selects"][nome]["opcoes"] if o["texto"] == rotulo), None)
+        if opcao is None:
+            raise ErroMotorHttp(f"Opção {rotulo} não encontrada no select do código")
+        return await self._clicar_botao(
+            requisicao, pagina, form, "Avançar", {nome: str(opcao["valor"])}
+        )
+
+    @etapa_cronometrada("ie")
+    async def _enviar_ie(
+        self, requisicao: APIRequestContext, pagina: _PaginaJsf, ie_digitos: str
+    ) -> _PaginaJsf:
+        nome_ie, form = self._exigir_campo(pagina, "campo_ie")
+        valores = {nome_ie: ie_digitos}
+        if hasattr(self._modulo, "SELETOR_PI_SUBSTITUICAO"):
+            nome_sub, _ = self._exigir_campo(pagina, "substituicao")
+            valores[nome_sub] = self._modulo.VALOR_SUBSTITUICAO_NAO
+        return await self._clicar_botao(requisicao, pagina, form, "Avançar", valores)
+
+    @etapa_cronometrada("caso_geral")
+    async def _enviar_caso_geral(
+        self,
+        requisicao: APIRequestContext,
+        pagina: _PaginaJsf,
+        mes_ref: int,
+        ano_ref: int,
+        valor_principal: float,
+    ) -> _PaginaJsf:
+        data_str = f"15/{mes_ref:02d}/{ano_ref}"
+        valores: dict[str, str] = {}
+        form = None
+        for campo, valor in (
+            ("periodo_referencia", f"{mes_ref:02d}/{ano_ref}"),
+            ("data_vencimento", data_str),
+            ("data_pagamento", data_str),
+            ("valor_principal", _valor_br(valor_principal)),
+        ):
+            nome, form = self._exigir_campo(pagina, campo)
+            valores[nome] = valor
+        return await self._clicar_botao(requisicao, pagina, form, "Calcular Imposto", valores)
+
+    async def _processar_ie(
+        self,
+        requisicao: APIRequestContext,
+        ie_digitos: str,
+        mes_ref: int,
+        ano_ref: int,
+        valor_principal: float,
+    ) -> None:
+        pagina = await self._obter(requisicao, self._url_portal)
+        pagina = await self._clicar_menu_icms(requisicao, pagina)
+        pagina = await self._enviar_codigo(requisicao, pagina)
+        pagina = await self._enviar_ie(requisicao, pagina, ie_digitos)
+        await self._enviar_caso_geral(requisicao, pagina, mes_ref, ano_ref, valor_principal)
+
+    # ------------------------------------------------------------------
+    # Lote
+    # ------------------------------------------------------------------
+    def _validar_item(
+        self, item: dict[str, object], ies_erro: list[tuple[str, str]]
+    ) -> tuple[str, str, int, int, float] | None:
+        """Mesmas regras dos motores de navegador: None = item não executado."""
+        ie = str(item.get("ie", ""))
+        ie_digitos = str(item.get("ie_digitos", ""))
+        valor = item.get(str(self._processo["chave_valor"]))
+        try:
+            mes_ref = int(item.get("mes_ref"))
+            ano_ref = int(item.get("ano_ref"))
+        except (TypeError, ValueError):
+            ies_erro.append((ie or "(vazio)", "Período (mês/ano) ausente nos dados da planilha"))
+            emitir_progresso(self._processo_id, EVENTO_PULADA, ie, detalhe="Período ausente")
+            return None
+        if not ie or not ie_digitos:
+            ies_erro.append((ie or "(vazio)", "IE inválida ou vazia"))
+            emitir_progresso(self._processo_id, EVENTO_PULADA, ie, detalhe="IE inválida ou vazia")
+            return None
+        if self._processo["valor_invalido"](valor):
+            logger.info("IE %s pulada: valor ausente, zero ou vazio (%s).", ie, self._processo_id)
+            emitir_progresso(self._processo_id, EVENTO_PULADA, ie, detalhe="Valor ausente")
+            return None
+        if data_vencimento_no_passado(mes_ref, ano_ref):
+            motivo = "Data de vencimento no passado — portal não permite datas passadas"
+            ies_erro.append((ie, motivo))
+            logger.info("IE %s pulada: %s", ie, motivo)
+            emitir_progresso(self._processo_id, EVENTO_PULADA, ie, detalhe=motivo)
+            return None
+        return ie, ie_digitos, mes_ref, ano_ref, float(valor)
+
+    async def _abrir_contextos(self, quantidade: int) -> list[APIRequestContext]:
+        """Contextos HTTP para os trabalhadores; reaproveita os já abertos (``manter_aberto``)."""
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        while len(self._contextos) < quantidade:
+            self._contextos.append(
+                await self._playwright.request.new_context(ignore_https_errors=True)
+            )
+            logger.debug("Motor HTTP (%s): contexto %d aberto.", self._processo_id, len(self._contextos))
+        return self._contextos[:quantidade]
+
+    async def encerrar(self) -> None:
+        """Descarta os contextos HTTP e para o Playwright (idempotente)."""
+        contextos, self._contextos = self._contextos, []
+        playwright, self._playwright = self._playwright, None
+        for contexto in contextos:
+            try:
+                await contexto.dispose()
+            except Exception:
+                logger.debug("Falha ao descartar contexto HTTP.", exc_info=True)
+        if playwright is not None:
+            await playwright.stop()
+
+    async def executar_fluxo_por_ie_pi(
+        self,
+        lista_dados: list[dict[str, object]],
+    ) -> tuple[list[str], list[tuple[str, str]]]:
+        """
+        Para cada item (ie, ie_digitos, valor do processo, mes_ref, ano_ref) percorre o fluxo
+        por HTTP. Retorna (IEs com sucesso, lista de (IE, motivo) com erro); itens com falha
+        estrutural ficam em ``itens_para_navegador``.
+        """
+        ies_sucesso: list[str] = []
+        ies_erro: list[tuple[str, str]] = []
+        self.itens_para_navegador = []
+        # Relido a cada chamada: o fallback pelo navegador pode ter aprendido seletores
+        self._cache_seletores = await asyncio.to_thread(
+            seletores_em_cache, str(self._processo["nome"])
+        )
+        fila: asyncio.Queue = asyncio.Queue()
+        for item in lista_dados:
+            validado = self._validar_item(item, ies_erro)
+            if validado is not None:
+                fila.put_nowait((item, validado))
+        total = fila.qsize()
+
+        async def _trabalhador(requisicao: APIRequestContext) -> None:
+            try:
+                await _consumir_fila(requisicao)
+            except ExecucaoCancelada:
+                # Cada trabalhador vê o cancelamento em até uma fatia; a I.E. em curso é descartada
+                return
+
+        async def _consumir_fila(requisicao: APIRequestContext) -> None:
+            primeira = True
+            while not fila.empty():
+                await ponto_de_controle()
+                if fila.empty():
+                    break
+                item, (ie, ie_digitos, mes_ref, ano_ref, valor) = fila.get_nowait()
+                if not primeira and self._intervalo_ms:
+                    async with trecho_cancelavel(), medir_etapa("intervalo_entre_ies"):
+                        await asyncio.sleep(self._intervalo_ms / 1000.0)
+                primeira = False
+                logger.info("Processando IE %s via HTTP (%s).", ie, self._processo_id)
+                tentativa = int(item.get("tentativa", 1))
+                try:
+                    async with medir_ie(ie, tentativa), trecho_cancelavel():
+                        await self._processar_ie(requisicao, ie_digitos, mes_ref, ano_ref, valor)
+                except ErroPortalSefaz as e:
+                    logger.warning("Portal recusou IE %s: %s", ie, e)
+                    motivo = str(e).split("\n")[0].strip()
+                    if len(motivo) > 80:
+                        motivo = motivo[:77] + "..."
+                    ies_erro.append((ie, motivo))
+                    emitir_progresso(
+                        self._processo_id, EVENTO_FALHA, ie, detalhe=motivo, tentativa=tentativa
+                    )
+                    continue
+                except Exception as e:
+                    logger.warning(
+                        "IE %s sem resposta esperada via HTTP (%s); reprocessar pelo navegador.",
+                        ie, e,
+                    )
+                    self.itens_para_navegador.append(item)
+                    emitir_progresso(
+                        self._processo_id, EVENTO_ETAPA, ie, "fallback_navegador",
+                        tentativa=tentativa,
+                    )
+                    continue
+                ies_sucesso.append(ie)
+                emitir_progresso(self._processo_id, EVENTO_SUCESSO, ie, tentativa=tentativa)
+                logger.info("IE %s concluída via HTTP (%s).", ie, self._processo_id)
+
+        logger.info(
+            "Motor HTTP (%s): %d IE(s), concorrência %d.", self._processo_id, total, self._concorrencia
+        )
+        self.medidor = MedidorEtapas(self._processo_id, configuracoes.MOTOR_HTTP)
+        token_medidor = ativar_medidor(self.medidor)
+        try:
+            contextos = await self._abrir_contextos(min(self._concorrencia, max(total, 1)))
+            await asyncio.gather(*(_trabalhador(contexto) for contexto in contextos))
+        except BaseException:
+            # Contextos em estado desconhecido: a próxima chamada abre outros
+            await self.encerrar()
+            raise
+        finally:
+            if not self._manter_aberto:
+                await self.encerrar()
+            desativar_medidor(token_medidor)
+            self.medidor.salvar()
+
+        logger.info(
+            "Fluxo HTTP (%s) finalizado: %d sucesso, %d erro, %d para o navegador.",
+            self._processo_id, len(ies_sucesso), len(ies_erro), len(self.itens_para_navegador),
+        )
+        return ies_sucesso, ies_erro
@@ -0,0 +1,127 @@
+"""
+Painel de log da GUI com memória limitada.
+
+Os registros (INFO+) chegam pelo ``QueueListener`` do logging (``icms_pi.logger``) a um
+``HandlerPainel``, que só os guarda: um buffer circular com as últimas
+``LOG_PAINEL_CAPACIDADE`` linhas e a lista das ainda não exibidas, ambos protegidos por trava.
+``PainelLog`` descarrega as pendentes no textbox a cada ``LOG_PAINEL_INTERVALO_MS`` em um
+único insert, remove do topo o que passar da capacidade e, ao trocar o filtro de nível,
+redesenha a partir do buffer. O histórico completo fica no arquivo de log da execução.
+"""
+
+import logging
+import threading
+from collections import deque
+
+import customtkinter as ctk
+
+from icms_pi import configuracoes
+from icms_pi.logger import adicionar_destino, remover_destino
+
+# Rótulo do filtro -> nível mínimo exibido
+FILTROS_NIVEL: dict[str, int] = {
+    "Tudo": logging.INFO,
+    "Avisos e erros": logging.WARNING,
+    "Só erros": logging.ERROR,
+}
+
+
+class HandlerPainel(logging.Handler):
+    """Destino do listener: formata e guarda as linhas; nunca toca no Tk."""
+
+    def __init__(self, capacidade: int) -> None:
+        super().__init__(level=logging.INFO)
+        self.setFormatter(logging.Formatter("%(asctime)s  %(message)s", datefmt="%H:%M:%S"))
+        self._trava = threading.Lock()
+        self.buffer: deque[tuple[int, str]] = deque(maxlen=capacidade)
+        self._pendentes: deque[tuple[int, str]] = deque(maxlen=capacidade)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            texto = self.format(record)
+            if record.levelno >= logging.WARNING:
+                hora, _, mensagem = texto.partition("  ")
+                texto = f"{hora}  {record.levelname}: {mensagem}"
+        except Exception:
+            self.handleError(record)
+            return
+        linha = (record.levelno, texto)
+        with self._trava:
+            self.buffer.append(linha)
+            self._pendentes.append(linha)
+
+    def retirar_pendentes(self) -> list[tuple[int, str]]:
+        with self._trava:
+            pendentes = list(self._pendentes)
+            self._pendentes.clear()
+        return pendentes
+
+    def copia_do_buffer(self) -> list[tuple[int, str]]:
+        with self._trava:
+            self._pendentes.clear()
+            return list(self.buffer)
+
+
+class PainelLog(ctk.CTkFrame):
+    """Textbox de log alimentado pelo ``HandlerPainel`` em lotes, com filtro de nível."""
+
+    def __init__(self, master, **kwargs) -> None:
+        super().__init__(master, **kwargs)
+        self._capacidade = configuracoes.LOG_PAINEL_CAPACIDADE
+        self._handler = HandlerPainel(self._capacidade)
+        self._nivel_minimo = logging.INFO
+        self._linhas_no_widget = 0
+
+        self.grid_rowconfigure(1, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+        ctk.CTkLabel(
+            self, text="Log de execução",
+            font=ctk.CTkFont(size=13, weight="bold"),
+        ).grid(row=0, column=0, sticky="w", padx=12, pady=(8, 2))
+        self._filtro = ctk.CTkSegmentedButton(
+            self, values=list(FILTROS_NIVEL), command=self._ao_mudar_filtro,
+            font=ctk.CTkFont(size=11),
+        )
+        self._filtro.set("Tudo")
+        self._filtro.grid(row=0, column=1, sticky="e", padx=8, pady=(8, 2))
+
+        self._texto = ctk.CTkTextbox(
+            self, font=ctk.CTkFont(family="Consolas", size=11),
+            state="disabled", wrap="word",
+        )
+        self._texto.grid(row=1, column=0, columnspan=2, sticky="nsew", padx=8, pady=(0, 8))
+
+        adicionar_destino(self._handler)
+        self.after(configuracoes.LOG_PAINEL_INTERVALO_MS, self._ciclo)
+
+    def destroy(self) -> None:
+        remover_destino(self._handler)
+        super().destroy()
+
+    def _ciclo(self) -> None:
+        self._descarregar(self._handler.retirar_pendentes())
+        self.after(configuracoes.LOG_PAINEL_INTERVALO_MS, self._ciclo)
+
+    def _descarregar(self, linhas: list[tuple[int, str]], limpar: bool = False) -> None:
+        """Um insert para o lote e, se passar da capacidade, um delete das linhas do topo."""
+        visiveis = [texto for nivel, texto in linhas if nivel >= self._nivel_minimo]
+        if not visiveis and not limpar:
+            return
+        self._texto.configure(state="normal")
+        if limpar:
+            self._texto.delete("1.0", "end")
+            self._linhas_no_widget = 0
+        if visiveis:
+            visiveis = visiveis[-self._capacidade:]
+            self._texto.insert("end", "\n".join(visiveis) + "\n")
+            self._linhas_no_widget += sum(texto.count("\n") + 1 for texto in visiveis)
+        excesso = self._linhas_no_widget - self._capacidade
+        if excesso > 0:
+            self._texto.delete("1.0", f"{excesso + 1}.0")
+            self._linhas_no_widget -= excesso
+        self._texto.see("end")
+        self._texto.configure(state="disabled")
+
+    def _ao_mudar_filtro(self, rotulo: str) -> None:
+        self._nivel_minimo = FILTROS_NIVEL.get(rotulo, logging.INFO)
+        self._descarregar(self._handler.copia_do_buffer(), limpar=True)
@@ -0,0 +1,111 @@
+"""
+Perfil da inicialização da GUI (``--perfil-inicializacao`` ou ``PERFIL_INICIALIZACAO=1``).
+
+Importado antes de tudo em ``icms_pi.gui_app``. Ativo, cronometra cada ``import`` de nível mais
+externo (por thread: o que o módulo da GUI e a pré-carga em segundo plano importam
+diretamente, com o custo dos submódulos incluído) e os marcos registrados com ``marcar``
+(janela criada, primeira pintura, pré-carga concluída), todos em ms desde a importação deste
+módulo. ``gravar_relatorio`` registra o resumo no log e grava
+``perfil_inicializacao_<timestamp>.json`` na pasta de resultados, para acompanhar o cold start.
+A inicialização do interpretador, anterior ao ``gui_app``, fica de fora.
+
+Inativo, ``marcar`` e ``gravar_relatorio`` não fazem nada.
+"""
+
+import builtins
+import json
+import os
+import sys
+import threading
+import time
+
+ARGUMENTO = "--perfil-inicializacao"
+
+# Imports mais rápidos que isso não entram no relatório
+_LIMIAR_IMPORT_MS = 1.0
+
+_inicio = time.perf_counter()
+_import_original = builtins.__import__
+_profundidade = threading.local()
+_importacoes: list[tuple[str, float, str]] = []
+_marcos: list[tuple[str, float]] = []
+
+
+def _ms_desde_inicio() -> float:
+    return (time.perf_counter() - _inicio) * 1000
+
+
+# Mesma assinatura (e nomes de parâmetro) de builtins.__import__
+def _import_cronometrado(name, globals=None, locals=None, fromlist=(), level=0):
+    profundidade = getattr(_profundidade, "valor", 0)
+    _profundidade.valor = profundidade + 1
+    t0 = time.perf_counter()
+    try:
+        return _import_original(name, globals, locals, fromlist, level)
+    finally:
+        _profundidade.valor = profundidade
+        if profundidade == 0:
+            ms = (time.perf_counter() - t0) * 1000
+            if ms >= _LIMIAR_IMPORT_MS:
+                # "from pacote import submodulo": o custo é do submódulo
+                if fromlist and f"{name}.{fromlist[0]}" in sys.modules:
+                    name = f"{name}.{fromlist[0]}"
+                _importacoes.append((name, ms, threading.current_thread().name))
+
+
+def _pedido() -> bool:
+    if ARGUMENTO not in sys.argv and os.getenv("PERFIL_INICIALIZACAO") != "1":
+        return False
+    import multiprocessing
+
+    # O worker (spawn) reimporta o módulo principal com os mesmos argumentos
+    return multiprocessing.current_process().name == "MainProcess"
+
+
+ativo = _pedido()
+if ativo:
+    builtins.__import__ = _import_cronometrado
+
+
+def marcar(marco: str) -> None:
+    if ativo:
+        _marcos.append((marco, _ms_desde_inicio()))
+
+
+def gravar_relatorio() -> None:
+    """Encerra a cronometragem dos imports, loga o resumo e grava o JSON."""
+    global ativo
+    if not ativo:
+        return
+    ativo = False
+    builtins.__import__ = _import_original
+
+    from datetime import datetime
+
+    from icms_pi import configuracoes
+    from icms_pi.logger import configurar_logger_da_aplicacao
+
+    logger = configurar_logger_da_aplicacao(__name__)
+    importacoes = sorted(_importacoes, key=lambda i: i[1], reverse=True)
+    relatorio = {
+        "marcos_ms": {marco: round(ms, 1) for marco, ms in _marcos},
+        "importacoes_ms": [
+            {"modulo": nome, "ms": round(ms, 1), "thread": thread}
+            for nome, ms, thread in importacoes
+        ],
+    }
+    logger.info(
+        "Perfil da inicialização: %s",
+        ", ".join(f"{marco} {ms:.0f} ms" for marco, ms in _marcos),
+    )
+    for nome, ms, thread in importacoes[:15]:
+        logger.info("  import %-32s %7.1f ms  (%s)", nome, ms, thread)
+
+    pasta = configuracoes.PASTA_SAIDA_RESULTADOS_ABSOLUTA
+    try:
+        pasta.mkdir(parents=True, exist_ok=True)
+        caminho = pasta / f"perfil_inicializacao_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        caminho.write_text(json.dumps(relatorio, ensure_ascii=False, indent=2), encoding="utf-8")
+        logger.info("Perfil da inicialização gravado em %s", caminho)
+    except OSError:
+        logger.exception("Falha ao gravar o perfil da inicialização.")
@@ -0,0 +1,68 @@
+"""
+Eventos de progresso por I.E., dos motores (navegador e HTTP) para a GUI.
+
+Os motores chamam ``emitir_progresso`` a cada I.E. iniciada, etapa concluída, sucesso, falha
+ou I.E. pulada. Sem fila registrada (CLI, benchmark) a chamada não faz nada; com a GUI, os
+eventos vão para uma ``FilaProgresso`` (thread-safe, sem bloqueio) que a thread do Tk drena
+periodicamente com ``drenar``, atualizando só as linhas e contadores afetados.
+"""
+
+import queue
+import time
+
+EVENTO_INICIADA = "iniciada"
+EVENTO_ETAPA = "etapa"
+EVENTO_SUCESSO = "sucesso"
+EVENTO_FALHA = "falha"
+EVENTO_PULADA = "pulada"
+
+
+class FilaProgresso:
+    """Fila sem limite entre a thread do lote (produtora) e a thread do Tk (consumidora)."""
+
+    def __init__(self) -> None:
+        self._fila: queue.SimpleQueue = queue.SimpleQueue()
+
+    def emitir(self, evento: dict[str, object]) -> None:
+        self._fila.put(evento)
+
+    def drenar(self, maximo: int = 5_000) -> list[dict[str, object]]:
+        """Retira até ``maximo`` eventos sem bloquear (o restante fica para o próximo ciclo)."""
+        eventos: list[dict[str, object]] = []
+        while len(eventos) < maximo:
+            try:
+                eventos.append(self._fila.get_nowait())
+            except queue.Empty:
+                break
+        return eventos
+
+
+_fila_ativa: FilaProgresso | None = None
+
+
+def registrar_fila_progresso(fila: FilaProgresso | None) -> None:
+    """Define a fila que recebe os eventos do lote em andamento (None desliga)."""
+    global _fila_ativa
+    _fila_ativa = fila
+
+
+def emitir_progresso(
+    processo: str,
+    tipo: str,
+    ie: str,
+    etapa: str = "",
+    detalhe: str = "",
+    tentativa: int = 1,
+) -> None:
+    fila = _fila_ativa
+    if fila is None:
+        return
+    fila.emitir({
+        "tipo": tipo,
+        "processo": processo,
+        "ie": ie,
+        "etapa": etapa,
+        "detalhe": detalhe,
+        "tentativa": tentativa,
+        "ts": time.time(),
+    })
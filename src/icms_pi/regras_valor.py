@@ -0,0 +1,58 @@
+"""
+Regras de negócio dos itens do lote, comuns aos três processos e aos dois motores.
+
+Usadas pelas automações de navegador (``atc/normal/difal.automacao_sefaz_pi``), pelo motor
+HTTP e pelo índice da GUI (``icms_pi.indice_itens``). Sem dependências pesadas: importar este
+módulo não traz o Playwright.
+"""
+
+from collections.abc import Callable
+from datetime import date
+
+
+def valor_invalido(valor: object) -> bool:
+    """True se o valor da coluna do processo não deve ser processado (pular a I.E.)."""
+    if valor is None:
+        return True
+    if isinstance(valor, (int, float)) and valor == 0:
+        return True
+    if isinstance(valor, str):
+        s = valor.strip().lower()
+        if not s or s == "null":
+            return True
+    return False
+
+
+def data_dia_15_mes_referencia(mes_ref: int, ano_ref: int) -> tuple[int, int, int]:
+    """(dia, mês, ano) do dia 15 do mês de referência (portal exige datas no próprio período)."""
+    return 15, mes_ref, ano_ref
+
+
+def data_vencimento_no_passado(mes_ref: int, ano_ref: int) -> bool:
+    """True se a data de vencimento (dia 15 do mês de referência) já passou ou é inválida."""
+    dia, mes, ano = data_dia_15_mes_referencia(mes_ref, ano_ref)
+    try:
+        return date(ano, mes, dia) < date.today()
+    except ValueError:
+        return True
+
+
+# Mesma regra para as três colunas (ATC, NORMAL, DIF. ALIQUOTA)
+REGRAS_DE_VALOR_POR_PROCESSO: dict[str, Callable[[object], bool]] = {
+    "antecipado": valor_invalido,
+    "normal": valor_invalido,
+    "difal": valor_invalido,
+}
+
+# Chave do item (``obter_dados_para_dae``) com o valor de cada processo
+CHAVE_VALOR_POR_PROCESSO: dict[str, str] = {
+    "antecipado": "valor_atc",
+    "normal": "valor_normal",
+    "difal": "valor_difal",
+}
+
+
+def item_sem_valor(processo_id: str, item: dict[str, object]) -> bool:
+    """True se o item é pulado no processo por valor ausente/zero (não conta como erro)."""
+    chave = CHAVE_VALOR_POR_PROCESSO.get(processo_id)
+    return chave is not None and REGRAS_DE_VALOR_POR_PROCESSO[processo_id](item.get(chave))
@@ -0,0 +1,242 @@
+"""
+Regressão de desempenho por gravação/reprodução HAR.
+
+``gravar``: roda um processo uma vez contra o portal (ou o simulador local) com
+``record_har`` no contexto do navegador e salva, ao lado do HAR, a lista de I.E.s usada e os
+tempos de cada etapa (``<har>.etapas.json``).
+
+``reproduzir``: roda o mesmo lote com as respostas servidas do HAR (sem rede, ViewState e
+datas tolerados) e compara p50/p95 de cada etapa com a linha de base. A primeira
+reprodução pode ser fixada como linha de base (``--fixar-linha-base``); sem ela, compara-se
+com os tempos da gravação. Etapas mais lentas que a tolerância fazem o comando sair com 1.
+
+Gravado há meses, o período do lote já teria vencimento no passado e toda I.E. seria pulada
+sem medir nada; a reprodução move o período para o mês seguinte e, se mesmo assim nenhuma
+I.E. for medida, sai com 1 em vez de passar sem comparar.
+
+Uso::
+
+    python -m icms_pi.regressao_har gravar --processo antecipado --planilha filiais.xlsx --har atc.har
+    python -m icms_pi.regressao_har reproduzir --har atc.har --fixar-linha-base
+    python -m icms_pi.regressao_har reproduzir --har atc.har
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from datetime import date
+from pathlib import Path
+
+from icms_pi import configuracoes
+from icms_pi.benchmark import gerar_lote
+from icms_pi.excel_filiais import extrair_todos_os_dados, obter_dados_para_dae
+from icms_pi.execucao_lote import CLASSES_AUTOMACAO_POR_PROCESSO
+from icms_pi.logger import configurar_logger_da_aplicacao
+from icms_pi.regras_valor import data_vencimento_no_passado
+from icms_pi.simulador_darweb import SimuladorDarWeb
+
+logger = configurar_logger_da_aplicacao(__name__)
+
+TOLERANCIA_REGRESSAO = 0.20
+MARGEM_REGRESSAO_MS = 50.0
+
+_CHAVES_ITEM = ("ie", "ie_digitos", "valor_atc", "valor_normal", "valor_difal", "mes_ref", "ano_ref")
+
+
+def _arquivo_etapas(caminho_har: Path) -> Path:
+    return caminho_har.with_name(caminho_har.name + ".etapas.json")
+
+
+def _lote_da_planilha(caminho: Path, ies: list[str], quantidade: int) -> list[dict[str, object]]:
+    linhas, nome_para_indice, mes_ref, ano_ref = extrair_todos_os_dados(caminho)
+    lista = obter_dados_para_dae(linhas, nome_para_indice, mes_ref, ano_ref)
+    if ies:
+        lista = [item for item in lista if str(item.get("ie_digitos")) in ies]
+    return lista[:quantidade]
+
+
+def _lote_em_periodo_valido(lista_dados: list[dict[str, object]]) -> list[dict[str, object]]:
+    """Move para o mês seguinte os itens cujo vencimento (dia 15) já passou."""
+    hoje = date.today()
+    mes_ref = hoje.month % 12 + 1
+    ano_ref = hoje.year + (1 if hoje.month == 12 else 0)
+    lote = []
+    for item in lista_dados:
+        try:
+            vencido = data_vencimento_no_passado(int(item["mes_ref"]), int(item["ano_ref"]))
+        except (KeyError, TypeError, ValueError):
+            vencido = False
+        lote.append(dict(item, mes_ref=mes_ref, ano_ref=ano_ref) if vencido else dict(item))
+    return lote
+
+
+async def _executar_cronometrado(
+    processo_id: str,
+    lista_dados: list[dict[str, object]],
+    headless: bool,
+    url_portal: str,
+    **opcoes_har: Path,
+) -> tuple[dict[str, dict[str, float]], object]:
+    automacao = CLASSES_AUTOMACAO_POR_PROCESSO[processo_id](
+        headless=headless, url_portal=url_portal, intervalo_ms=0, **opcoes_har
+    )
+    ies_ok, ies_erro = await automacao.executar_fluxo_por_ie_pi(lista_dados)
+    logger.info("Execução HAR (%s): %d ok, %d erro.", processo_id, len(ies_ok), len(ies_erro))
+    return automacao.medidor.resumo(), automacao
+
+
+async def gravar(
+    processo_id: str,
+    caminho_har: Path,
+    lista_dados: list[dict[str, object]],
+    headless: bool,
+    url_portal: str,
+) -> dict[str, object]:
+    """Grava a sessão em ``caminho_har`` e salva lote e tempos da gravação."""
+    caminho_har.parent.mkdir(parents=True, exist_ok=True)
+    tempos, _ = await _executar_cronometrado(
+        processo_id, lista_dados, headless, url_portal, gravar_har=caminho_har
+    )
+    registro = {
+        "processo": processo_id,
+        "url_portal": url_portal,
+        "lista_dados": [{k: item.get(k) for k in _CHAVES_ITEM} for item in lista_dados],
+        "gravacao": tempos,
+        "linha_base_reproducao": None,
+    }
+    _arquivo_etapas(caminho_har).write_text(
+        json.dumps(registro, ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+    logger.info("Sessão gravada em %s", caminho_har)
+    return registro
+
+
+def comparar_tempos(
+    referencia: dict[str, dict[str, float]],
+    atual: dict[str, dict[str, float]],
+    tolerancia: float = TOLERANCIA_REGRESSAO,
+    margem_ms: float = MARGEM_REGRESSAO_MS,
+) -> list[dict[str, object]]:
+    """Compara p50/p95 por etapa; marca regressão quando o p50 passa da tolerância e da margem."""
+    comparacao = []
+    for etapa in sorted(set(referencia) | set(atual)):
+        antes = referencia.get(etapa, {})
+        depois = atual.get(etapa, {})
+        p50_antes = float(antes.get("p50", 0.0))
+        p50_depois = float(depois.get("p50", 0.0))
+        regressao = bool(antes) and bool(depois) and (
+            p50_depois > p50_antes * (1 + tolerancia) and p50_depois - p50_antes > margem_ms
+        )
+        comparacao.append({
+            "etapa": etapa,
+            "p50_referencia": p50_antes,
+            "p50_atual": p50_depois,
+            "p95_referencia": float(antes.get("p95", 0.0)),
+            "p95_atual": float(depois.get("p95", 0.0)),
+            "regressao": regressao,
+        })
+    return comparacao
+
+
+async def reproduzir(
+    caminho_har: Path,
+    headless: bool,
+    fixar_linha_base: bool = False,
+    tolerancia: float = TOLERANCIA_REGRESSAO,
+) -> dict[str, object]:
+    """Reproduz a sessão gravada e compara os tempos com a linha de base."""
+    arquivo_etapas = _arquivo_etapas(caminho_har)
+    registro = json.loads(arquivo_etapas.read_text(encoding="utf-8"))
+    tempos, automacao = await _executar_cronometrado(
+        registro["processo"],
+        _lote_em_periodo_valido(registro["lista_dados"]),
+        headless,
+        registro["url_portal"],
+        reproduzir_har=caminho_har,
+    )
+    referencia = registro.get("linha_base_reproducao") or registro["gravacao"]
+    ies_medidas = int(tempos.get("ie_completa", {}).get("n", 0))
+    resultado = {
+        "ies_medidas": ies_medidas,
+        "referencia": "reproducao" if registro.get("linha_base_reproducao") else "gravacao",
+        "comparacao": comparar_tempos(referencia, tempos, tolerancia),
+        "sem_correspondencia": list(automacao.reprodutor_har.sem_correspondencia)
+        if automacao.reprodutor_har else [],
+    }
+    if fixar_linha_base and not ies_medidas:
+        logger.warning("Linha de base não fixada: nenhuma I.E. medida na reprodução.")
+    elif fixar_linha_base:
+        registro["linha_base_reproducao"] = tempos
+        arquivo_etapas.write_text(
+            json.dumps(registro, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        logger.info("Linha de base da reprodução fixada em %s", arquivo_etapas)
+    return resultado
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="icms_pi_regressao_har",
+        description="Gravação e reprodução HAR do DAR Web com comparação de tempos por etapa.",
+    )
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    p_gravar = comandos.add_parser("gravar", help="grava uma sessão em HAR")
+    p_gravar.add_argument("--processo", required=True, choices=list(CLASSES_AUTOMACAO_POR_PROCESSO))
+    p_gravar.add_argument("--har", required=True, type=Path)
+    p_gravar.add_argument("--planilha", type=Path, help="planilha de onde vêm as I.E.s")
+    p_gravar.add_argument("--ies", default="", help="I.E.s (dígitos) separadas por vírgula")
+    p_gravar.add_argument("--quantidade", type=int, default=3)
+    p_gravar.add_argument(
+        "--simulador", action="store_true", help="grava contra o simulador local com lote sintético"
+    )
+    p_gravar.add_argument("--com-janela", action="store_true")
+
+    p_reproduzir = comandos.add_parser("reproduzir", help="reproduz e compara com a linha de base")
+    p_reproduzir.add_argument("--har", required=True, type=Path)
+    p_reproduzir.add_argument("--fixar-linha-base", action="store_true")
+    p_reproduzir.add_argument("--tolerancia", type=float, default=TOLERANCIA_REGRESSAO)
+    p_reproduzir.add_argument("--com-janela", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.comando == "gravar":
+        if args.simulador:
+            with SimuladorDarWeb() as simulador:
+                asyncio.run(gravar(
+                    args.processo, args.har, gerar_lote(args.quantidade),
+                    not args.com_janela, simulador.url,
+                ))
+        else:
+            if not args.planilha:
+                parser.error("informe --planilha ou --simulador")
+            ies = [ie.strip() for ie in args.ies.split(",") if ie.strip()]
+            lista = _lote_da_planilha(args.planilha, ies, args.quantidade)
+            asyncio.run(gravar(
+                args.processo, args.har, lista, not args.com_janela,
+                configuracoes.URL_PORTAL_DARWEB_SEFAZ_PI,
+            ))
+        print(f"HAR gravado em {args.har}")
+        return 0
+
+    resultado = asyncio.run(
+        reproduzir(args.har, not args.com_janela, args.fixar_linha_base, args.tolerancia)
+    )
+    print(f"Referência: {resultado['referencia']}")
+    for linha in resultado["comparacao"]:
+        marca = "  REGRESSÃO" if linha["regressao"] else ""
+        print(
+            f"  {linha['etapa']:<20} p50 {linha['p50_referencia']:>8.1f} -> {linha['p50_atual']:>8.1f} ms"
+            f"  p95 {linha['p95_referencia']:>8.1f} -> {linha['p95_atual']:>8.1f} ms{marca}"
+        )
+    for requisicao in resultado["sem_correspondencia"]:
+        print(f"  Sem resposta no HAR: {requisicao}")
+    if not resultado["ies_medidas"]:
+        print("Nenhuma I.E. medida na reprodução: sem tempos para comparar.")
+        return 1
+    falhou = any(linha["regressao"] for linha in resultado["comparacao"])
+    return 1 if falhou or resultado["sem_correspondencia"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,542 @@
+"""
+Simulador local do DAR Web (SEFAZ-PI) para testes sem tocar o portal real.
+
+Reproduz as telas JSF/PrimeFaces do fluxo 113011/113000/113001 com os mesmos seletores dos
+módulos ``atc/normal/difal.configuracoes``: menu ``a.portalPanelLink`` (mojarra.jsfcljs),
+seleção do código (``j_idt43``), tela da I.E., formulário ``formCasoGeral`` e resultado do
+cálculo. Cada resposta carrega um ``javax.faces.ViewState`` próprio da sessão (cookie
+JSESSIONID) e as recusas do portal aparecem como growl do PrimeFaces.
+
+Os campos de data e valor têm as máscaras do portal (calendário ``99/99/9999`` e jQuery
+priceFormat em centavos, que só aceitam digitação). Latência, variação, taxa de recusa de
+I.E., respostas AJAX (``partial-response`` do PrimeFaces) e renomeação dos ids ``j_idtNN``
+(como após um deploy da SEFAZ) são configuráveis.
+
+Uso::
+
+    with SimuladorDarWeb(latencia_ms=300, taxa_erro=0.05, ajax=True) as simulador:
+        print(simulador.url)  # http://127.0.0.1:<porta>/darweb/faces/views/index.xhtml
+"""
+
+import html
+import random
+import re
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from icms_pi.logger import configurar_logger_da_aplicacao
+from atc import configuracoes as configuracoes_atc
+from difal import configuracoes as configuracoes_difal
+from normal import configuracoes as configuracoes_normal
+
+logger = configurar_logger_da_aplicacao(__name__)
+
+CAMINHO_INDEX = "/darweb/faces/views/index.xhtml"
+
+# I.E. sempre recusada pelo simulador (mesma I.E. fictícia da sonda do portal)
+IE_NAO_CADASTRADA = "000000000"
+MENSAGEM_IE_PENDENTE = "Inscrição Estadual com pendência cadastral."
+
+_PADRAO_PERIODO = re.compile(r"^(0[1-9]|1[0-2])/\d{4}$")
+_PADRAO_DATA = re.compile(r"^(0[1-9]|[12]\d|3[01])/(0[1-9]|1[0-2])/\d{4}$")
+_PADRAO_VALOR = re.compile(r"^\d{1,3}(\.\d{3})*,\d{2}$|^\d+,\d{2}$")
+
+
+def _id_de_seletor(seletor: str) -> str:
+    """Extrai o id/name de seletores como ``[id="a:b"]``, ``#id`` ou ``select[name="x"]``."""
+    m = re.search(r'\[(?:id|name)="([^"]+)"\]', seletor)
+    if m:
+        return m.group(1)
+    return seletor.lstrip("#")
+
+
+_PADRAO_ID_JSF = re.compile(r"j_idt(\d+)")
+
+
+def _deslocar_id(id_jsf: str, deslocamento: int) -> str:
+    """Renumera os ``j_idtNN`` de um id, como o JSF faz quando a árvore de componentes muda."""
+    if not deslocamento:
+        return id_jsf
+    return _PADRAO_ID_JSF.sub(lambda m: f"j_idt{int(m.group(1)) + deslocamento}", id_jsf)
+
+
+def _processos_simulados(deslocamento: int) -> dict[str, dict[str, object]]:
+    """Telas por processo: código (valor, rótulo) e ids dos campos conforme as configurações."""
+    processos: dict[str, dict[str, object]] = {}
+    for chave, modulo, rotulo in (
+        ("113011", configuracoes_atc, configuracoes_atc.VALOR_OPCAO_PI_ANTECIPACAO_PARCIAL),
+        ("113000", configuracoes_normal, configuracoes_normal.VALOR_OPCAO_PI_IMPOSTO_JUROS_MULTA),
+        ("113001", configuracoes_difal, configuracoes_difal.VALOR_OPCAO_PI_IMPOSTO_JUROS_MULTA),
+    ):
+        def _id(nome: str) -> str | None:
+            seletor = getattr(modulo, nome, None)
+            return _deslocar_id(_id_de_seletor(seletor), deslocamento) if seletor else None
+
+        processos[chave] = {
+            "rotulo": rotulo,
+            "campo_ie": _id("SELETOR_PI_CAMPO_IE"),
+            "substituicao": _id("SELETOR_PI_SUBSTITUICAO"),
+            "periodo": _id("SELETOR_PI_PERIODO_REFERENCIA"),
+            "vencimento": _id("SELETOR_PI_DATA_VENCIMENTO"),
+            "pagamento": _id("SELETOR_PI_DATA_PAGAMENTO"),
+            "valor": _id("SELETOR_PI_VALOR_PRINCIPAL"),
+        }
+    return processos
+
+
+_ID_LINK_ICMS = "formMenu:lnkIcms"
+
+_SCRIPT_MOJARRA = """
+<script>
+var mojarra = {jsfcljs: function (f, pvp, t) {
+    for (var k in pvp) {
+        var i = document.createElement("input");
+        i.type = "hidden"; i.name = k; i.value = pvp[k]; f.appendChild(i);
+    }
+    f.submit();
+}};
+</script>
+"""
+
+# Máscaras do portal: priceFormat (centavos, milhar com ponto) e calendário dd/mm/aaaa.
+# Só aceitam digitação; colar é bloqueado como no plugin original.
+_SCRIPT_MASCARAS = """
+<script>
+(function () {
+    function digitos(s) { return (s || "").replace(/\\D/g, ""); }
+    function formatarPreco(d) {
+        d = d.replace(/^0+/, "");
+        while (d.length < 3) d = "0" + d;
+        return d.slice(0, -2).replace(/\\B(?=(\\d{3})+(?!\\d))/g, ".") + "," + d.slice(-2);
+    }
+    function formatarData(d) {
+        d = d.slice(0, 8);
+        var s = d.slice(0, 2);
+        if (d.length > 2) s += "/" + d.slice(2, 4);
+        if (d.length > 4) s += "/" + d.slice(4);
+        return s;
+    }
+    function mascara(el) {
+        if (!el.classList) return null;
+        if (el.classList.contains("priceFormat")) return formatarPreco;
+        if (el.classList.contains("hasDatepicker")) return formatarData;
+        return null;
+    }
+    document.addEventListener("keydown", function (ev) {
+        var el = ev.target, formatar = mascara(el);
+        if (!formatar || ev.ctrlKey || ev.metaKey || ev.altKey) return;
+        if (ev.key.length !== 1 && ev.key !== "Backspace") return;
+        ev.preventDefault();
+        var tudo = el.selectionStart === 0 && el.selectionEnd === el.value.length;
+        var d = tudo ? "" : digitos(el.value);
+        if (ev.key === "Backspace") d = d.slice(0, -1);
+        else if (/\\d/.test(ev.key)) d += ev.key;
+        el.value = d ? formatar(d) : "";
+        el.setSelectionRange(el.value.length, el.value.length);
+    }, true);
+    document.addEventListener("paste", function (ev) {
+        if (mascara(ev.target)) ev.preventDefault();
+    }, true);
+})();
+</script>
+"""
+
+# Botões p:commandButton com ajax="true": postback parcial e troca do corpo da página
+_SCRIPT_AJAX = """
+<script>
+document.addEventListener("click", function (ev) {
+    var botao = ev.target.closest && ev.target.closest("button[type=submit]");
+    if (!botao || !botao.form) return;
+    ev.preventDefault();
+    var dados = new URLSearchParams(new FormData(botao.form));
+    dados.append(botao.name, botao.name);
+    dados.append("javax.faces.partial.ajax", "true");
+    dados.append("javax.faces.source", botao.id);
+    fetch(botao.form.action, {
+        method: "POST",
+        body: dados,
+        credentials: "same-origin",
+        headers: {"Faces-Request": "partial/ajax"}
+    }).then(function (r) { return r.text(); }).then(function (xml) {
+        var doc = new DOMParser().parseFromString(xml, "text/xml");
+        var atualizacao = doc.querySelector("update");
+        if (atualizacao) document.body.innerHTML = atualizacao.textContent;
+    });
+});
+</script>
+"""
+
+
+def _growl_erro(mensagem: str) -> str:
+    return (
+        '<div id="growl_container" class="ui-growl ui-widget">'
+        '<div class="ui-growl-item-container ui-state-highlight ui-corner-all ui-shadow" role="alert">'
+        '<div class="ui-growl-item"><div class="ui-growl-icon-close ui-icon ui-icon-closethick"></div>'
+        '<span class="ui-growl-image ui-growl-image-error"></span>'
+        f'<div class="ui-growl-message"><span class="ui-growl-title">Erro</span><p>{html.escape(mensagem)}</p></div>'
+        "</div></div></div>"
+    )
+
+
+def _resposta_parcial(documento: str) -> str:
+    """Envelopa o corpo do documento em ``partial-response`` (resposta AJAX do JSF)."""
+    m = re.search(r"<body>(.*)</body>", documento, re.S)
+    corpo = m.group(1) if m else documento
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><partial-response id="j_id1"><changes>'
+        f'<update id="javax.faces.ViewRoot"><![CDATA[{corpo}]]></update>'
+        "</changes></partial-response>"
+    )
+
+
+def _botao(id_botao: str, texto: str) -> str:
+    return (
+        f'<button id="{id_botao}" name="{id_botao}" type="submit" '
+        'class="ui-button ui-widget ui-state-default ui-corner-all ui-button-text-only">'
+        f'<span class="ui-button-text ui-c">{texto}</span></button>'
+    )
+
+
+def _rotulo(para: str, texto: str) -> str:
+    return f'<label for="{para}" class="ui-outputlabel ui-widget">{texto}</label>'
+
+
+def _input_texto(id_campo: str, valor: str = "", classes: str = "ui-inputfield ui-inputtext") -> str:
+    return (
+        f'<input id="{id_campo}" name="{id_campo}" type="text" value="{html.escape(valor)}" '
+        f'class="{classes} ui-widget ui-state-default ui-corner-all">'
+    )
+
+
+class _Sessao:
+    def __init__(self) -> None:
+        self.visoes: dict[str, dict[str, object]] = {}
+        self.contador = 0
+        self.trava = threading.Lock()
+
+    def nova_visao(self, estado: dict[str, object]) -> str:
+        with self.trava:
+            self.contador += 1
+            view_state = f"{secrets.token_hex(8)}:{self.contador}"
+            self.visoes[view_state] = estado
+            return view_state
+
+
+class SimuladorDarWeb:
+    """
+    Servidor HTTP local que imita o DAR Web (em thread própria).
+
+    - latencia_ms / variacao_ms: atraso de cada resposta (base ± variação uniforme).
+    - taxa_erro: fração das I.E.s recusadas com growl de pendência cadastral (0.0 a 1.0).
+    - ajax: botões fazem postback parcial (``Faces-Request: partial/ajax``) em vez de recarregar.
+    - atraso_ajax_ms: atraso extra das respostas parciais (blockUI do PrimeFaces).
+    - deslocamento_ids: soma N aos ``j_idtNN`` (ids renomeados, como após um deploy).
+    - semente: semente do sorteio de recusas, para lotes reproduzíveis.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        porta: int = 0,
+        latencia_ms: int = 0,
+        variacao_ms: int = 0,
+        taxa_erro: float = 0.0,
+        ajax: bool = False,
+        atraso_ajax_ms: int = 0,
+        deslocamento_ids: int = 0,
+        semente: int | None = None,
+    ) -> None:
+        self._host = host
+        self._porta = porta
+        self.latencia_ms = max(0, latencia_ms)
+        self.variacao_ms = max(0, variacao_ms)
+        self.taxa_erro = min(max(taxa_erro, 0.0), 1.0)
+        self.ajax = ajax
+        self.atraso_ajax_ms = max(0, atraso_ajax_ms)
+        self._aleatorio = random.Random(semente)
+        self._processos = _processos_simulados(deslocamento_ids)
+        self._nome_select_codigo = _deslocar_id(
+            _id_de_seletor(configuracoes_atc.SELETOR_PI_SELECT_CODIGO), deslocamento_ids
+        )
+        self._ids = {
+            nome: _deslocar_id(id_jsf, deslocamento_ids)
+            for nome, id_jsf in (
+                ("form_codigo", "j_idt40"),
+                ("form_ie", "j_idt41"),
+                ("avancar_codigo", "j_idt44"),
+                ("avancar_ie", "j_idt47"),
+                ("calcular", "formCasoGeral:j_idt80"),
+                ("avancar_resultado", "formCasoGeral:j_idt90"),
+            )
+        }
+        self._servidor: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+        self._sessoes: dict[str, _Sessao] = {}
+        self._trava = threading.Lock()
+        self.requisicoes = 0
+
+    @property
+    def url(self) -> str:
+        if self._servidor is None:
+            raise RuntimeError("Simulador não iniciado.")
+        host, porta = self._servidor.server_address[:2]
+        return f"http://{host}:{porta}{CAMINHO_INDEX}"
+
+    def iniciar(self) -> str:
+        """Sobe o servidor em background e retorna a URL do index."""
+        self._servidor = ThreadingHTTPServer((self._host, self._porta), _ManipuladorDarWeb)
+        self._servidor.daemon_threads = True
+        self._servidor.simulador = self
+        self._thread = threading.Thread(
+            target=self._servidor.serve_forever, name="simulador-darweb", daemon=True
+        )
+        self._thread.start()
+        logger.info("Simulador DAR Web em %s", self.url)
+        return self.url
+
+    def encerrar(self) -> None:
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+        logger.info("Simulador DAR Web encerrado.")
+
+    def __enter__(self) -> "SimuladorDarWeb":
+        self.iniciar()
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self.encerrar()
+
+    def aguardar_latencia(self, parcial: bool = False) -> None:
+        """Dorme a latência configurada (chamado na thread de cada requisição)."""
+        with self._trava:
+            variacao = self._aleatorio.uniform(-self.variacao_ms, self.variacao_ms)
+        atraso_ms = max(0.0, self.latencia_ms + variacao)
+        if parcial:
+            atraso_ms += self.atraso_ajax_ms
+        if atraso_ms:
+            time.sleep(atraso_ms / 1000.0)
+
+    def _sortear_recusa(self) -> bool:
+        if not self.taxa_erro:
+            return False
+        with self._trava:
+            return self._aleatorio.random() < self.taxa_erro
+
+    # ------------------------------------------------------------------
+    # Sessões e visões
+    # ------------------------------------------------------------------
+    def _sessao(self, id_sessao: str | None) -> tuple[str, _Sessao]:
+        with self._trava:
+            self.requisicoes += 1
+            if id_sessao and id_sessao in self._sessoes:
+                return id_sessao, self._sessoes[id_sessao]
+            novo = secrets.token_hex(16).upper()
+            self._sessoes[novo] = _Sessao()
+            return novo, self._sessoes[novo]
+
+    def responder_get(self, id_sessao: str | None) -> tuple[str, int, str]:
+        id_sessao, sessao = self._sessao(id_sessao)
+        return id_sessao, 200, self._pagina_menu(sessao)
+
+    def responder_post(
+        self, id_sessao: str | None, campos: dict[str, str]
+    ) -> tuple[str, int, str]:
+        id_sessao, sessao = self._sessao(id_sessao)
+        estado = sessao.visoes.get(campos.get("javax.faces.ViewState", ""))
+        if estado is None:
+            return id_sessao, 500, (
+                "<html><body><h1>javax.faces.application.ViewExpiredException</h1></body></html>"
+            )
+        tela = estado["tela"]
+        if tela == "menu" and _ID_LINK_ICMS in campos:
+            return id_sessao, 200, self._pagina_codigo(sessao)
+        if tela == "codigo" and self._ids["avancar_codigo"] in campos:
+            codigo = campos.get(self._nome_select_codigo, "")
+            if codigo not in self._processos:
+                return id_sessao, 200, self._pagina_codigo(sessao, "Selecione o código da receita.")
+            return id_sessao, 200, self._pagina_ie(sessao, codigo)
+        if tela == "ie" and self._ids["avancar_ie"] in campos:
+            return id_sessao, 200, self._postar_ie(sessao, estado, campos)
+        if tela == "caso_geral" and self._ids["calcular"] in campos:
+            return id_sessao, 200, self._postar_caso_geral(sessao, estado, campos)
+        # Postback sem ação reconhecida: JSF re-renderiza a mesma visão
+        return id_sessao, 200, self._pagina_menu(sessao)
+
+    def _postar_ie(self, sessao: _Sessao, estado: dict[str, object], campos: dict[str, str]) -> str:
+        codigo = str(estado["codigo"])
+        processo = self._processos[codigo]
+        ie = "".join(c for c in campos.get(str(processo["campo_ie"]), "") if c.isdigit())
+        if len(ie) != 9:
+            return self._pagina_ie(sessao, codigo, "Inscrição Estadual inválida.")
+        if ie == IE_NAO_CADASTRADA:
+            return self._pagina_ie(sessao, codigo, "Inscrição Estadual não cadastrada.")
+        if self._sortear_recusa():
+            return self._pagina_ie(sessao, codigo, MENSAGEM_IE_PENDENTE)
+        if processo["substituicao"] and campos.get(str(processo["substituicao"])) != "NÃO":
+            return self._pagina_ie(sessao, codigo, "Informe a substituição tributária.")
+        return self._pagina_caso_geral(sessao, codigo, ie)
+
+    def _postar_caso_geral(
+        self, sessao: _Sessao, estado: dict[str, object], campos: dict[str, str]
+    ) -> str:
+        codigo = str(estado["codigo"])
+        ie = str(estado["ie"])
+        processo = self._processos[codigo]
+        periodo = campos.get(str(processo["periodo"]), "").strip()
+        vencimento = campos.get(str(processo["vencimento"]), "").strip()
+        pagamento = campos.get(str(processo["pagamento"]), "").strip()
+        valor = campos.get(str(processo["valor"]), "").strip()
+        if not _PADRAO_PERIODO.match(periodo):
+            erro = "Período de Referência: Erro de validação: o valor é necessário."
+        elif not _PADRAO_DATA.match(vencimento) or not _PADRAO_DATA.match(pagamento):
+            erro = "Data inválida."
+        elif vencimento[3:] != periodo or pagamento[3:] != periodo:
+            erro = "As datas devem pertencer ao período de referência."
+        elif not _PADRAO_VALOR.match(valor) or valor.strip("0.,") == "":
+            erro = "Valor Principal: Erro de validação: o valor é necessário."
+        else:
+            erro = None
+        if erro:
+            return self._pagina_caso_geral(sessao, codigo, ie, erro)
+        return self._pagina_resultado(sessao, codigo, ie, valor)
+
+    # ------------------------------------------------------------------
+    # Páginas
+    # ------------------------------------------------------------------
+    def _documento(self, corpo: str, mensagem_erro: str | None = None) -> str:
+        growl = _growl_erro(mensagem_erro) if mensagem_erro else ""
+        return (
+            "<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>DAR Web - SEFAZ-PI</title>"
+            f"{_SCRIPT_MOJARRA}{_SCRIPT_MASCARAS}{_SCRIPT_AJAX if self.ajax else ''}</head><body>{growl}{corpo}</body></html>"
+        )
+
+    def _form(self, sessao: _Sessao, id_form: str, estado: dict[str, object], conteudo: str) -> str:
+        view_state = sessao.nova_visao(estado)
+        return (
+            f'<form id="{id_form}" name="{id_form}" method="post" action="{CAMINHO_INDEX}" '
+            'enctype="application/x-www-form-urlencoded">'
+            f'<input type="hidden" name="{id_form}" value="{id_form}">'
+            f"{conteudo}"
+            '<input type="hidden" name="javax.faces.ViewState" id="j_id1:javax.faces.ViewState:0" '
+            f'value="{view_state}" autocomplete="off"></form>'
+        )
+
+    def _pagina_menu(self, sessao: _Sessao) -> str:
+        link = (
+            f'<a id="{_ID_LINK_ICMS}" href="#" class="portalPanelLink" '
+            "onclick=\"mojarra.jsfcljs(document.getElementById('formMenu'),"
+            f"{{'{_ID_LINK_ICMS}':'{_ID_LINK_ICMS}'}},'');return false\">ICMS</a>"
+        )
+        return self._documento(self._form(sessao, "formMenu", {"tela": "menu"}, link))
+
+    def _pagina_codigo(self, sessao: _Sessao, erro: str | None = None) -> str:
+        opcoes = '<option value="">Selecione</option>' + "".join(
+            f'<option value="{codigo}">{html.escape(str(dados["rotulo"]))}</option>'
+            for codigo, dados in self._processos.items()
+        )
+        conteudo = (
+            _rotulo(self._nome_select_codigo, "Código da Receita:")
+            + f'<select id="{self._nome_select_codigo}" name="{self._nome_select_codigo}" '
+            f'size="1">{opcoes}</select>'
+            + _botao(self._ids["avancar_codigo"], "Avançar")
+        )
+        form = self._form(sessao, self._ids["form_codigo"], {"tela": "codigo"}, conteudo)
+        return self._documento(form, erro)
+
+    def _pagina_ie(self, sessao: _Sessao, codigo: str, erro: str | None = None) -> str:
+        processo = self._processos[codigo]
+        campo_ie = str(processo["campo_ie"])
+        conteudo = _rotulo(campo_ie, "Inscrição Estadual:") + _input_texto(campo_ie)
+        if processo["substituicao"]:
+            substituicao = str(processo["substituicao"])
+            conteudo += (
+                _rotulo(substituicao, "Substituição Tributária:")
+                + f'<select id="{substituicao}" name="{substituicao}" size="1">'
+                '<option value="">Selecione</option><option value="SIM">SIM</option>'
+                '<option value="NÃO">NÃO</option></select>'
+            )
+        conteudo += _botao(self._ids["avancar_ie"], "Avançar")
+        estado = {"tela": "ie", "codigo": codigo}
+        return self._documento(self._form(sessao, self._ids["form_ie"], estado, conteudo), erro)
+
+    def _pagina_caso_geral(
+        self, sessao: _Sessao, codigo: str, ie: str, erro: str | None = None
+    ) -> str:
+        processo = self._processos[codigo]
+
+        def _calendario(id_input: str, rotulo: str) -> str:
+            id_componente = id_input.rsplit(":", 1)[0]
+            return (
+                _rotulo(id_input, rotulo)
+                + f'<span id="{id_componente}" class="ui-calendar">'
+                + _input_texto(id_input, classes="ui-inputfield hasDatepicker")
+                + "</span>"
+            )
+
+        conteudo = (
+            f'<h2>Cálculos do Imposto</h2><p>Inscrição Estadual: {ie}</p>'
+            + _rotulo(str(processo["periodo"]), "Período de Referência:")
+            + _input_texto(str(processo["periodo"]))
+            + _calendario(str(processo["vencimento"]), "Data de Vencimento:")
+            + _calendario(str(processo["pagamento"]), "Data de Pagamento:")
+            + _rotulo(str(processo["valor"]), "Valor Principal:")
+            + _input_texto(str(processo["valor"]), classes="ui-inputfield priceFormat")
+            + _botao(self._ids["calcular"], "Calcular Imposto")
+        )
+        estado = {"tela": "caso_geral", "codigo": codigo, "ie": ie}
+        return self._documento(self._form(sessao, "formCasoGeral", estado, conteudo), erro)
+
+    def _pagina_resultado(self, sessao: _Sessao, codigo: str, ie: str, valor: str) -> str:
+        conteudo = (
+            f'<h2>Cálculos do Imposto</h2><p>Inscrição Estadual: {ie}</p>'
+            f'<p id="formCasoGeral:valorTotal">Valor Total: R$ {html.escape(valor)}</p>'
+            + _botao(self._ids["avancar_resultado"], "Avançar")
+        )
+        estado = {"tela": "resultado", "codigo": codigo, "ie": ie}
+        return self._documento(self._form(sessao, "formCasoGeral", estado, conteudo))
+
+
+class _ManipuladorDarWeb(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, formato: str, *args: object) -> None:
+        logger.debug("Simulador: " + formato, *args)
+
+    def _id_sessao(self) -> str | None:
+        m = re.search(r"JSESSIONID=([0-9A-F]+)", self.headers.get("Cookie", ""))
+        return m.group(1) if m else None
+
+    def _responder(
+        self, id_sessao: str, status: int, corpo: str, parcial: bool = False
+    ) -> None:
+        self.server.simulador.aguardar_latencia(parcial)
+        if parcial and status == 200:
+            corpo = _resposta_parcial(corpo)
+        dados = corpo.encode("utf-8")
+        self.send_response(status)
+        tipo = "text/xml" if parcial and status == 200 else "text/html"
+        self.send_header("Content-Type", f"{tipo};charset=UTF-8")
+        self.send_header("Content-Length", str(len(dados)))
+        self.send_header("Set-Cookie", f"JSESSIONID={id_sessao}; Path=/darweb; HttpOnly")
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != CAMINHO_INDEX:
+            self.send_error(404)
+            return
+        self._responder(*self.server.simulador.responder_get(self._id_sessao()))
+
+    def do_POST(self) -> None:
+        tamanho = int(self.headers.get("Content-Length", "0") or 0)
+        corpo = self.rfile.read(tamanho).decode("utf-8")
+        campos = {k: v[-1] for k, v in parse_qs(corpo, keep_blank_values=True).items()}
+        parcial = self.headers.get("Faces-Request", "") == "partial/ajax"
+        self._responder(
+            *self.server.simulador.responder_post(self._id_sessao(), campos), parcial=parcial
+        )
@@ -0,0 +1,237 @@
+"""
+Sonda do portal DAR Web antes do lote.
+
+Para cada processo selecionado, abre o DAR Web e percorre o fluxo até o formulário Caso Geral
+com uma I.E. fictícia (``IE_SONDA_PORTAL``), medindo a latência de cada etapa e conferindo se
+cada seletor configurado em ``atc/normal/difal.configuracoes`` resolve na tela em que deveria
+aparecer. Com o resultado, o lote é recusado (portal fora do ar ou layout alterado), roda
+com concorrência 1 (portal lento) ou roda sem teto da sonda (portal saudável).
+
+A I.E. fictícia padrão é recusada pelo portal na tela da I.E., então os seletores do Caso
+Geral ficam sem verificação: a sonda os relata como lacuna (``seletores_nao_verificados``),
+não como saudáveis. Para cobri-los, configure em ``IE_SONDA_PORTAL`` uma I.E. real (a sonda
+para no formulário, sem calcular nem emitir DAE).
+"""
+
+import asyncio
+import json
+import time
+from datetime import datetime
+from types import ModuleType
+
+from playwright.async_api import Page
+
+from icms_pi import configuracoes
+from icms_pi.logger import configurar_logger_da_aplicacao
+from atc import configuracoes as configuracoes_atc
+from atc.automacao_sefaz_pi import AutomacaoAntecipacaoParcialPI
+from atc.navegacao.acoes_pagina import ErroPortalSefaz
+from difal import configuracoes as configuracoes_difal
+from difal.automacao_sefaz_pi import AutomacaoDifalPI
+from normal import configuracoes as configuracoes_normal
+from normal.automacao_sefaz_pi import AutomacaoNormalPI
+
+logger = configurar_logger_da_aplicacao(__name__)
+
+_AUTOMACOES_POR_PROCESSO: dict[str, tuple[type, ModuleType]] = {
+    "antecipado": (AutomacaoAntecipacaoParcialPI, configuracoes_atc),
+    "normal": (AutomacaoNormalPI, configuracoes_normal),
+    "difal": (AutomacaoDifalPI, configuracoes_difal),
+}
+
+# Etapa após a qual cada seletor configurado deve estar na tela
+_ETAPA_DO_SELETOR: dict[str, str] = {
+    "SELETOR_PI_MENU_ICMS": "pagina_inicial",
+    "SELETOR_PI_SELECT_CODIGO": "menu_icms",
+    "SELETOR_PI_BOTAO_AVANCAR": "selecionar_codigo",
+    "SELETOR_PI_CAMPO_IE": "avancar_codigo",
+    "SELETOR_PI_SUBSTITUICAO": "avancar_codigo",
+    "SELETOR_PI_PERIODO_REFERENCIA": "avancar_ie",
+    "SELETOR_PI_DATA_VENCIMENTO": "avancar_ie",
+    "SELETOR_PI_DATA_PAGAMENTO": "avancar_ie",
+    "SELETOR_PI_VALOR_PRINCIPAL": "avancar_ie",
+    "SELETOR_PI_BOTAO_CALCULAR_IMPOSTO": "avancar_ie",
+    "SELETOR_PI_BOTAO_ACAO": "avancar_ie",
+}
+
+# Seletores de ids JSF verificados pelo localizador de campos (autorreparáveis)
+_CAMPO_DO_SELETOR: dict[str, str] = {
+    "SELETOR_PI_SELECT_CODIGO": "select_codigo",
+    "SELETOR_PI_CAMPO_IE": "campo_ie",
+    "SELETOR_PI_SUBSTITUICAO": "substituicao",
+    "SELETOR_PI_PERIODO_REFERENCIA": "periodo_referencia",
+    "SELETOR_PI_DATA_VENCIMENTO": "data_vencimento",
+    "SELETOR_PI_DATA_PAGAMENTO": "data_pagamento",
+    "SELETOR_PI_VALOR_PRINCIPAL": "valor_principal",
+}
+
+SELETOR_OK = "ok"
+SELETOR_REPARADO = "reparado"
+SELETOR_AUSENTE = "ausente"
+SELETOR_NAO_VERIFICADO = "nao_verificado"
+
+
+def _seletores_configurados(modulo: ModuleType) -> dict[str, str]:
+    return {
+        nome: valor
+        for nome, valor in vars(modulo).items()
+        if nome.startswith("SELETOR_PI_") and isinstance(valor, str)
+    }
+
+
+async def _verificar_seletor(
+    automacao: object, pagina: Page, nome: str, seletor: str
+) -> str:
+    campo = _CAMPO_DO_SELETOR.get(nome)
+    if campo is None:
+        return SELETOR_OK if await pagina.locator(seletor).count() > 0 else SELETOR_AUSENTE
+    try:
+        resolvido = await automacao.resolver_campo(campo)
+    except ErroPortalSefaz:
+        raise
+    except Exception:
+        return SELETOR_AUSENTE
+    return SELETOR_OK if resolvido == seletor else SELETOR_REPARADO
+
+
+async def sondar_processo(processo_id: str, headless: bool) -> dict[str, object]:
+    """
+    Percorre o fluxo de um processo até o Caso Geral com a I.E. de sonda.
+    Retorna dict com latências por etapa (ms), status de cada seletor, erro e mensagem do portal.
+    """
+    classe, modulo = _AUTOMACOES_POR_PROCESSO[processo_id]
+    automacao = classe(headless=headless)
+    seletores = _seletores_configurados(modulo)
+    relatorio: dict[str, object] = {
+        "processo": processo_id,
+        "latencias_ms": {},
+        "seletores": {nome: SELETOR_NAO_VERIFICADO for nome in seletores},
+        "erro": None,
+        "mensagem_portal": None,
+    }
+    latencias: dict[str, float] = relatorio["latencias_ms"]
+    status_seletores: dict[str, str] = relatorio["seletores"]
+
+    try:
+        async with automacao.sessao() as pagina:
+            for etapa, executar in automacao.etapas_sonda_pi(configuracoes.IE_SONDA_PORTAL):
+                inicio = time.perf_counter()
+                try:
+                    await executar()
+                    for nome, seletor in seletores.items():
+                        if _ETAPA_DO_SELETOR.get(nome) == etapa:
+                            status_seletores[nome] = await _verificar_seletor(
+                                automacao, pagina, nome, seletor
+                            )
+                finally:
+                    latencias[etapa] = round((time.perf_counter() - inicio) * 1000.0, 1)
+    except ErroPortalSefaz as e:
+        # Portal respondeu (recusou a I.E. de sonda): telas seguintes não verificáveis
+        relatorio["mensagem_portal"] = str(e)
+    except Exception as e:
+        relatorio["erro"] = str(e).split("\n")[0].strip() or type(e).__name__
+
+    logger.info(
+        "Sonda %s: latências=%s, erro=%s, portal=%s",
+        processo_id, latencias, relatorio["erro"], relatorio["mensagem_portal"],
+    )
+    return relatorio
+
+
+def decidir_execucao(relatorios: list[dict[str, object]]) -> tuple[int | None, list[str]]:
+    """
+    A partir dos relatórios da sonda, retorna (teto de concorrência, motivos).
+    0 = não iniciar o lote; 1 = portal lento; None = portal saudável, sem teto da sonda.
+    Seletores não verificados entram nos motivos como lacuna da sonda (não recusam o lote).
+    """
+    motivos: list[str] = []
+    recusar = False
+    lento = False
+    for relatorio in relatorios:
+        processo = relatorio["processo"]
+        if relatorio["erro"]:
+            recusar = True
+            motivos.append(f"{processo}: portal indisponível ou fluxo quebrado ({relatorio['erro']})")
+        ausentes = [
+            nome for nome, status in relatorio["seletores"].items() if status == SELETOR_AUSENTE
+        ]
+        if ausentes:
+            recusar = True
+            motivos.append(f"{processo}: seletores não encontrados: {', '.join(ausentes)}")
+        reparados = [
+            nome for nome, status in relatorio["seletores"].items() if status == SELETOR_REPARADO
+        ]
+        if reparados:
+            motivos.append(f"{processo}: seletores reparados por pistas: {', '.join(reparados)}")
+        if relatorio["mensagem_portal"]:
+            motivos.append(f"{processo}: portal recusou a I.E. de sonda ({relatorio['mensagem_portal']})")
+        nao_verificados = seletores_nao_verificados(relatorio)
+        if nao_verificados and not relatorio["erro"]:
+            motivos.append(
+                f"{processo}: lacuna da sonda, seletores não verificados: "
+                f"{', '.join(nao_verificados)} (configure uma I.E. real em IE_SONDA_PORTAL)"
+            )
+        latencias = relatorio["latencias_ms"]
+        if latencias and max(latencias.values()) > configuracoes.LIMITE_LATENCIA_SONDA_MS:
+            lento = True
+            etapa = max(latencias, key=latencias.get)
+            motivos.append(f"{processo}: portal lento ({etapa} levou {latencias[etapa]:.0f} ms)")
+
+    if recusar:
+        return 0, motivos
+    if lento:
+        return 1, motivos
+    return None, motivos
+
+
+def seletores_nao_verificados(relatorio: dict[str, object]) -> list[str]:
+    return [
+        nome for nome, status in relatorio["seletores"].items()
+        if status == SELETOR_NAO_VERIFICADO
+    ]
+
+
+def _salvar_relatorio(resultado: dict[str, object]) -> None:
+    pasta = configuracoes.PASTA_SAIDA_RESULTADOS_ABSOLUTA
+    try:
+        pasta.mkdir(parents=True, exist_ok=True)
+        caminho = pasta / f"sonda_portal_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        caminho.write_text(json.dumps(resultado, ensure_ascii=False, indent=2), encoding="utf-8")
+        logger.debug("Relatório da sonda salvo em %s", caminho)
+    except OSError:
+        logger.exception("Falha ao salvar relatório da sonda.")
+
+
+async def sondar_portal(processos_ids: list[str], headless: bool) -> dict[str, object]:
+    """
+    Sonda os processos em paralelo (um navegador por processo) e decide se o lote pode rodar.
+    Retorna {"relatorios": [...], "concorrencia": int | None, "motivos": [...],
+    "seletores_nao_verificados": {processo: [...]}}.
+    """
+    relatorios = await asyncio.gather(
+        *(sondar_processo(pid, headless) for pid in processos_ids if pid in _AUTOMACOES_POR_PROCESSO)
+    )
+    concorrencia, motivos = decidir_execucao(list(relatorios))
+    resultado = {
+        "relatorios": list(relatorios),
+        "concorrencia": concorrencia,
+        "motivos": motivos,
+        "seletores_nao_verificados": {
+            r["processo"]: seletores_nao_verificados(r)
+            for r in relatorios if seletores_nao_verificados(r)
+        },
+    }
+    _salvar_relatorio(resultado)
+    if concorrencia == 0:
+        logger.warning("Sonda recusou o lote: %s", "; ".join(motivos))
+    else:
+        if resultado["seletores_nao_verificados"]:
+            logger.warning(
+                "Sonda com lacuna: seletores não verificados %s.",
+                resultado["seletores_nao_verificados"],
+            )
+        logger.info(
+            "Sonda aprovou o lote (%s).",
+            "portal lento, concorrência 1" if concorrencia == 1 else "sem teto de concorrência",
+        )
+    return resultado
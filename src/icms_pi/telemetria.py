@@ -0,0 +1,220 @@
+"""
+Telemetria estruturada (JSON lines) das execuções em lote.
+
+Cada execução grava ``telemetria_<execucao>.jsonl`` na pasta de resultados com um evento por
+I.E. (``tipo="ie"``) e um por etapa (``tipo="etapa"``): execução, processo, motor, I.E.,
+etapa, início/fim monotônicos (s), duração (ms), tentativa, resultado e classe do erro.
+Os eventos são produzidos por ``medir_etapa``/``medir_ie`` (``icms_pi.instrumentacao``).
+
+A escrita é feita por uma thread própria a partir de uma fila limitada: ``emitir`` nunca
+bloqueia o event loop — com a fila cheia o evento é descartado e contado.
+
+Relatório offline::
+
+    python -m icms_pi.telemetria resultados/telemetria_*.jsonl
+"""
+
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+
+from icms_pi import configuracoes
+from icms_pi.logger import configurar_logger_da_aplicacao
+
+logger = configurar_logger_da_aplicacao(__name__)
+
+RESULTADO_OK = "ok"
+RESULTADO_ERRO = "erro"
+
+_FIM_DA_FILA = None
+_LOTE_ESCRITA = 500
+
+
+class TelemetriaExecucao:
+    """Fila limitada + thread de escrita de um arquivo JSONL por execução."""
+
+    def __init__(self, id_execucao: str | None = None, pasta: Path | None = None) -> None:
+        self.id_execucao = id_execucao or datetime.now().strftime("%Y%m%d_%H%M%S")
+        pasta = pasta or configuracoes.PASTA_SAIDA_RESULTADOS_ABSOLUTA
+        self.caminho = pasta / f"telemetria_{self.id_execucao}.jsonl"
+        self.descartados = 0
+        self._fila: queue.Queue = queue.Queue(maxsize=configuracoes.CAPACIDADE_FILA_TELEMETRIA)
+        self._thread = threading.Thread(
+            target=self._escrever, name="telemetria-jsonl", daemon=True
+        )
+
+    def iniciar(self) -> "TelemetriaExecucao":
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        self._thread.start()
+        self.emitir({"tipo": "execucao", "evento": "inicio"})
+        return self
+
+    def emitir(self, evento: dict[str, object]) -> None:
+        """Enfileira o evento sem bloquear; com a fila cheia, descarta e conta."""
+        evento.setdefault("execucao", self.id_execucao)
+        evento.setdefault("ts", time.time())
+        try:
+            self._fila.put_nowait(evento)
+        except queue.Full:
+            self.descartados += 1
+
+    def encerrar(self, timeout_s: float = 5.0) -> None:
+        """Escreve o evento de fim, esvazia a fila e aguarda a thread de escrita."""
+        self.emitir({"tipo": "execucao", "evento": "fim", "descartados": self.descartados})
+        try:
+            self._fila.put(_FIM_DA_FILA, timeout=timeout_s)
+        except queue.Full:
+            logger.warning("Fila de telemetria cheia ao encerrar; eventos finais podem faltar.")
+        self._thread.join(timeout_s)
+        if self.descartados:
+            logger.warning("Telemetria: %d evento(s) descartado(s) (fila cheia).", self.descartados)
+        logger.info("Telemetria da execução gravada em %s", self.caminho)
+
+    def _escrever(self) -> None:
+        try:
+            with open(self.caminho, "a", encoding="utf-8") as arquivo:
+                while True:
+                    evento = self._fila.get()
+                    lote = [evento]
+                    while evento is not _FIM_DA_FILA and len(lote) < _LOTE_ESCRITA:
+                        try:
+                            evento = self._fila.get_nowait()
+                        except queue.Empty:
+                            break
+                        lote.append(evento)
+                    for item in lote:
+                        if item is not _FIM_DA_FILA:
+                            arquivo.write(json.dumps(item, ensure_ascii=False, default=str) + "\n")
+                    arquivo.flush()
+                    if lote[-1] is _FIM_DA_FILA:
+                        return
+        except OSError:
+            logger.exception("Falha ao gravar telemetria em %s", self.caminho)
+
+
+_telemetria_ativa: TelemetriaExecucao | None = None
+
+
+def iniciar_telemetria(id_execucao: str | None = None) -> TelemetriaExecucao | None:
+    """Abre a telemetria da execução (uma por vez); None se desativada em configurações."""
+    global _telemetria_ativa
+    if not configuracoes.TELEMETRIA_ATIVA:
+        return None
+    if _telemetria_ativa is not None:
+        _telemetria_ativa.encerrar()
+    _telemetria_ativa = TelemetriaExecucao(id_execucao).iniciar()
+    return _telemetria_ativa
+
+
+def encerrar_telemetria() -> None:
+    global _telemetria_ativa
+    if _telemetria_ativa is not None:
+        _telemetria_ativa.encerrar()
+        _telemetria_ativa = None
+
+
+def telemetria_ativa() -> TelemetriaExecucao | None:
+    return _telemetria_ativa
+
+
+# ---------------------------------------------------------------------------
+# Relatório offline
+# ---------------------------------------------------------------------------
+
+def ler_eventos(caminhos: list[Path]) -> list[dict[str, object]]:
+    eventos: list[dict[str, object]] = []
+    for caminho in caminhos:
+        with open(caminho, encoding="utf-8") as arquivo:
+            for numero, linha in enumerate(arquivo, 1):
+                if not linha.strip():
+                    continue
+                try:
+                    eventos.append(json.loads(linha))
+                except ValueError:
+                    logger.warning("Linha %d inválida em %s, ignorada.", numero, caminho)
+    return eventos
+
+
+def resumir_eventos(
+    eventos: list[dict[str, object]], etapas_mais_lentas: int = 5
+) -> list[dict[str, object]]:
+    """Resumo por (execução, processo, motor): vazão, taxa de falha e etapas mais lentas."""
+    from icms_pi.instrumentacao import HistogramaLatencia
+
+    grupos: dict[tuple[str, str, str], dict[str, object]] = defaultdict(
+        lambda: {"ies": [], "etapas": defaultdict(HistogramaLatencia)}
+    )
+    for evento in eventos:
+        chave = (
+            str(evento.get("execucao")), str(evento.get("processo")), str(evento.get("motor"))
+        )
+        if evento.get("tipo") == "ie":
+            grupos[chave]["ies"].append(evento)
+        elif evento.get("tipo") == "etapa":
+            grupos[chave]["etapas"][str(evento["etapa"])].registrar_ms(float(evento["duracao_ms"]))
+
+    resumos = []
+    for (execucao, processo, motor), grupo in sorted(grupos.items()):
+        ies = grupo["ies"]
+        falhas = [e for e in ies if e.get("resultado") != RESULTADO_OK]
+        janela_s = (
+            max(float(e["fim"]) for e in ies) - min(float(e["inicio"]) for e in ies)
+            if ies else 0.0
+        )
+        lentas = sorted(
+            ((etapa, h.resumo()) for etapa, h in grupo["etapas"].items()),
+            key=lambda par: par[1]["p95"],
+            reverse=True,
+        )[:etapas_mais_lentas]
+        resumos.append({
+            "execucao": execucao,
+            "processo": processo,
+            "motor": motor,
+            "ies": len(ies),
+            "falhas": len(falhas),
+            "taxa_falha": round(len(falhas) / len(ies), 3) if ies else 0.0,
+            "ies_por_minuto": round(len(ies) / janela_s * 60.0, 1) if janela_s else 0.0,
+            "classes_erro": dict(Counter(str(e.get("classe_erro")) for e in falhas)),
+            "etapas_mais_lentas": [{"etapa": etapa, **r} for etapa, r in lentas],
+        })
+    return resumos
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="icms_pi_telemetria",
+        description="Relatório de vazão, falhas e etapas mais lentas a partir da telemetria JSONL.",
+    )
+    parser.add_argument("arquivos", nargs="+", type=Path)
+    parser.add_argument("--top", type=int, default=5, help="etapas mais lentas por processo")
+    parser.add_argument("--json", action="store_true", help="imprime o resumo em JSON")
+    args = parser.parse_args(argv)
+
+    resumos = resumir_eventos(ler_eventos(args.arquivos), args.top)
+    if args.json:
+        print(json.dumps(resumos, ensure_ascii=False, indent=2))
+        return 0
+    for resumo in resumos:
+        print(
+            f"\n{resumo['execucao']} {resumo['processo']} [{resumo['motor']}]: "
+            f"{resumo['ies']} IEs, {resumo['ies_por_minuto']:.1f} IEs/min, "
+            f"falhas {resumo['falhas']} ({resumo['taxa_falha']:.1%})"
+        )
+        for classe, quantidade in resumo["classes_erro"].items():
+            print(f"  erro {classe}: {quantidade}")
+        for etapa in resumo["etapas_mais_lentas"]:
+            print(
+                f"  {etapa['etapa']:<26} n={etapa['n']:<5} p50={etapa['p50']:>8.1f} ms"
+                f"  p95={etapa['p95']:>8.1f} ms"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
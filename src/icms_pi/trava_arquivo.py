@@ -0,0 +1,73 @@
+"""
+Trava exclusiva de arquivo entre processos (``fcntl.flock`` no Linux/macOS, ``msvcrt`` no Windows).
+
+Usada onde vários processos da aplicação (GUI, worker, partições, CLI agendada, workers
+distribuídos na mesma máquina) escrevem no mesmo arquivo: cache de seletores e logs da
+execução. A trava é do sistema operacional: some sozinha se o processo que a detém morrer.
+Não é reentrante: o mesmo processo não deve abrir duas ``TravaArquivo`` do mesmo caminho.
+"""
+
+import os
+import time
+from pathlib import Path
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+_ESPERA_TENTATIVA_S = 0.05
+
+
+class TravaArquivo:
+    """Trava sobre ``caminho`` (criado se não existir); use com ``with`` ou ``adquirir``."""
+
+    def __init__(self, caminho: Path) -> None:
+        self.caminho = caminho
+        self._arquivo = None
+
+    def _tentar(self) -> bool:
+        try:
+            if os.name == "nt":
+                self._arquivo.seek(0)
+                msvcrt.locking(self._arquivo.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(self._arquivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def adquirir(self, bloquear: bool = True, timeout_s: float | None = None) -> bool:
+        """Adquire a trava; sem ``bloquear`` (ou esgotado ``timeout_s``) devolve False se ocupada."""
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        self._arquivo = open(self.caminho, "a+b")
+        limite = None if timeout_s is None else time.monotonic() + timeout_s
+        while not self._tentar():
+            if not bloquear or (limite is not None and time.monotonic() >= limite):
+                self._arquivo.close()
+                self._arquivo = None
+                return False
+            time.sleep(_ESPERA_TENTATIVA_S)
+        return True
+
+    def liberar(self) -> None:
+        if self._arquivo is None:
+            return
+        try:
+            if os.name == "nt":
+                self._arquivo.seek(0)
+                msvcrt.locking(self._arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._arquivo.fileno(), fcntl.LOCK_UN)
+        except OSError:
+            pass
+        finally:
+            self._arquivo.close()
+            self._arquivo = None
+
+    def __enter__(self) -> "TravaArquivo":
+        self.adquirir()
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self.liberar()
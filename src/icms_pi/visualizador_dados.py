@@ -0,0 +1,300 @@
+"""
+Janela "Ver dados extraídos" para planilhas grandes.
+
+``IndiceColunas`` é montado uma vez ao abrir a janela: I.E. só com dígitos por linha (filtro
+por trecho), valores numéricos de cada coluna com uma lista ordenada (filtro por faixa via
+bisect) e, sob demanda, a ordem de cada coluna (ordenação sem reordenar os dados). Os filtros
+devolvem posições; a janela guarda só a lista de posições do resultado.
+
+``JanelaDadosExtraidos`` desenha apenas a página atual (``LINHAS_POR_PAGINA`` linhas) no
+textbox. As larguras das colunas começam pelo cabeçalho e crescem conforme as páginas
+exibidas (limitadas a ``_LARGURA_MAXIMA``), sem varrer a planilha inteira para formatar.
+"""
+
+from bisect import bisect_left, bisect_right
+from collections.abc import Callable
+
+import customtkinter as ctk
+
+LINHAS_POR_PAGINA = 200
+_LARGURA_MAXIMA = 30
+_ATRASO_FILTRO_MS = 150
+_SEM_ORDENACAO = "(ordem da planilha)"
+_SEM_FAIXA = "(sem faixa de valor)"
+
+
+def _valor_numerico(valor: object) -> float | None:
+    """
+    Número da célula; None se não for numérico. Texto com vírgula decimal é lido no formato BR
+    ('1.234,56'); sem vírgula, como float comum ('1234.56', '1.5').
+    """
+    if isinstance(valor, bool):
+        return None
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    if isinstance(valor, str):
+        s = valor.strip()
+        if "," in s:
+            s = s.replace(".", "").replace(",", ".")
+        try:
+            return float(s)
+        except ValueError:
+            return None
+    return None
+
+
+def _texto_celula(valor: object) -> str:
+    return "" if valor is None else str(valor).strip()
+
+
+class IndiceColunas:
+    """Índices em memória sobre ``dados_extraidos`` para filtrar e ordenar por posição."""
+
+    def __init__(
+        self,
+        dados: list[dict[str, object]],
+        colunas: list[str],
+        chave_ie: str | None,
+    ) -> None:
+        self.dados = dados
+        self.colunas = colunas
+        self.chave_ie = chave_ie
+        self._ies = [
+            "".join(c for c in _texto_celula(linha.get(chave_ie)) if c.isdigit()) if chave_ie else ""
+            for linha in dados
+        ]
+        # Por coluna numérica: valor por posição e pares (valor, posição) ordenados
+        self._numeros: dict[str, list[float | None]] = {}
+        self._ordenados: dict[str, list[tuple[float, int]]] = {}
+        for coluna in colunas:
+            numeros = [_valor_numerico(linha.get(coluna)) for linha in dados]
+            presentes = sum(1 for n in numeros if n is not None)
+            # Numérica se a maior parte das células preenchidas for número
+            preenchidas = sum(1 for linha in dados if _texto_celula(linha.get(coluna)))
+            if coluna != chave_ie and presentes and presentes * 2 >= preenchidas:
+                self._numeros[coluna] = numeros
+                self._ordenados[coluna] = sorted(
+                    (n, pos) for pos, n in enumerate(numeros) if n is not None
+                )
+        self._ordem_por_coluna: dict[str, list[int]] = {}
+
+    @property
+    def colunas_numericas(self) -> list[str]:
+        return [c for c in self.colunas if c in self._numeros]
+
+    def ie_exibicao(self, posicao: int) -> str:
+        return self._ies[posicao]
+
+    def filtrar(
+        self,
+        trecho_ie: str = "",
+        coluna_valor: str | None = None,
+        minimo: float | None = None,
+        maximo: float | None = None,
+    ) -> list[int] | None:
+        """Posições que atendem aos filtros, em ordem da planilha; None = sem filtro."""
+        selecionadas: set[int] | None = None
+        if coluna_valor in self._ordenados and (minimo is not None or maximo is not None):
+            ordenados = self._ordenados[coluna_valor]
+            inicio = 0 if minimo is None else bisect_left(ordenados, (minimo, -1))
+            fim = len(ordenados) if maximo is None else bisect_right(ordenados, (maximo, len(self.dados)))
+            selecionadas = {pos for _, pos in ordenados[inicio:fim]}
+        trecho = "".join(c for c in trecho_ie if c.isdigit())
+        if trecho:
+            candidatas = range(len(self.dados)) if selecionadas is None else sorted(selecionadas)
+            return [pos for pos in candidatas if trecho in self._ies[pos]]
+        if selecionadas is None:
+            return None
+        return sorted(selecionadas)
+
+    def ordem(self, coluna: str) -> list[int]:
+        """Posições ordenadas pela coluna (números antes de textos, vazios no fim); em cache."""
+        if coluna not in self._ordem_por_coluna:
+            if coluna in self._numeros:
+                numeros = self._numeros[coluna]
+                com_numero = [pos for _, pos in self._ordenados[coluna]]
+                sem_numero = [pos for pos, n in enumerate(numeros) if n is None]
+                self._ordem_por_coluna[coluna] = com_numero + sem_numero
+            else:
+                textos = [_texto_celula(linha.get(coluna)).lower() for linha in self.dados]
+                self._ordem_por_coluna[coluna] = sorted(
+                    range(len(self.dados)), key=lambda pos: (not textos[pos], textos[pos])
+                )
+        return self._ordem_por_coluna[coluna]
+
+    def aplicar(
+        self,
+        filtradas: list[int] | None,
+        coluna_ordem: str | None,
+        decrescente: bool = False,
+    ) -> list[int]:
+        """Resultado final: filtro aplicado sobre a ordem em cache da coluna (ou da planilha)."""
+        if coluna_ordem is None:
+            posicoes = list(range(len(self.dados))) if filtradas is None else filtradas
+        elif filtradas is None:
+            posicoes = list(self.ordem(coluna_ordem))
+        else:
+            conjunto = set(filtradas)
+            posicoes = [pos for pos in self.ordem(coluna_ordem) if pos in conjunto]
+        if decrescente:
+            posicoes.reverse()
+        return posicoes
+
+
+class JanelaDadosExtraidos(ctk.CTkToplevel):
+    """Visualização paginada, filtrável e ordenável dos dados extraídos."""
+
+    def __init__(
+        self,
+        master,
+        titulo: str,
+        indice: IndiceColunas,
+        formatar_ie: Callable[[str], str] = str,
+    ) -> None:
+        super().__init__(master)
+        self.title("Dados extraídos do Excel")
+        self.geometry("920x560")
+        self.minsize(560, 380)
+        self._indice = indice
+        self._formatar_ie = formatar_ie
+        self._larguras = [max(len(str(c)), 4) for c in indice.colunas]
+        self._posicoes: list[int] = list(range(len(indice.dados)))
+        self._pagina = 0
+        self._filtro_agendado: str | None = None
+
+        ctk.CTkLabel(self, text=titulo, font=ctk.CTkFont(size=12)).pack(pady=(8, 4))
+        self._criar_filtros()
+
+        self._texto = ctk.CTkTextbox(
+            self, font=ctk.CTkFont(family="Consolas", size=12), wrap="none",
+        )
+        self._texto.pack(fill="both", expand=True, padx=12, pady=(4, 4))
+
+        rodape = ctk.CTkFrame(self, fg_color="transparent")
+        rodape.pack(fill="x", padx=12, pady=(0, 10))
+        self._btn_anterior = ctk.CTkButton(
+            rodape, text="◀", width=36, command=lambda: self._ir_para(self._pagina - 1)
+        )
+        self._btn_anterior.pack(side="left")
+        self._lbl_pagina = ctk.CTkLabel(rodape, text="", font=ctk.CTkFont(size=12))
+        self._lbl_pagina.pack(side="left", padx=10)
+        self._btn_proxima = ctk.CTkButton(
+            rodape, text="▶", width=36, command=lambda: self._ir_para(self._pagina + 1)
+        )
+        self._btn_proxima.pack(side="left")
+
+        self._desenhar_pagina()
+
+    def _criar_filtros(self) -> None:
+        barra = ctk.CTkFrame(self, fg_color="transparent")
+        barra.pack(fill="x", padx=12)
+        fonte = ctk.CTkFont(size=12)
+
+        ctk.CTkLabel(barra, text="I.E.:", font=fonte).pack(side="left")
+        self._entrada_ie = ctk.CTkEntry(barra, width=130, placeholder_text="trecho da I.E.")
+        self._entrada_ie.pack(side="left", padx=(4, 10))
+
+        numericas = self._indice.colunas_numericas
+        self._combo_valor = ctk.CTkComboBox(
+            barra, values=[_SEM_FAIXA] + numericas, width=170,
+            command=lambda _v: self._agendar_filtro(),
+        )
+        self._combo_valor.set(_SEM_FAIXA)
+        self._combo_valor.pack(side="left")
+        self._entrada_min = ctk.CTkEntry(barra, width=80, placeholder_text="mín.")
+        self._entrada_min.pack(side="left", padx=(4, 2))
+        self._entrada_max = ctk.CTkEntry(barra, width=80, placeholder_text="máx.")
+        self._entrada_max.pack(side="left", padx=(2, 10))
+
+        self._combo_ordem = ctk.CTkComboBox(
+            barra, values=[_SEM_ORDENACAO] + list(self._indice.colunas), width=170,
+            command=lambda _v: self._aplicar_filtro(),
+        )
+        self._combo_ordem.set(_SEM_ORDENACAO)
+        self._combo_ordem.pack(side="left")
+        self._var_decrescente = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(
+            barra, text="Decrescente", variable=self._var_decrescente,
+            command=self._aplicar_filtro, font=fonte,
+        ).pack(side="left", padx=(8, 0))
+
+        for entrada in (self._entrada_ie, self._entrada_min, self._entrada_max):
+            entrada.bind("<KeyRelease>", lambda _e: self._agendar_filtro())
+
+    def _agendar_filtro(self) -> None:
+        """Debounce: filtra uma vez após a pausa na digitação."""
+        if self._filtro_agendado is not None:
+            self.after_cancel(self._filtro_agendado)
+        self._filtro_agendado = self.after(_ATRASO_FILTRO_MS, self._aplicar_filtro)
+
+    def _aplicar_filtro(self) -> None:
+        self._filtro_agendado = None
+        coluna_valor = self._combo_valor.get()
+        coluna_ordem = self._combo_ordem.get()
+        filtradas = self._indice.filtrar(
+            self._entrada_ie.get(),
+            None if coluna_valor == _SEM_FAIXA else coluna_valor,
+            _valor_numerico(self._entrada_min.get()) if self._entrada_min.get().strip() else None,
+            _valor_numerico(self._entrada_max.get()) if self._entrada_max.get().strip() else None,
+        )
+        self._posicoes = self._indice.aplicar(
+            filtradas,
+            None if coluna_ordem == _SEM_ORDENACAO else coluna_ordem,
+            self._var_decrescente.get(),
+        )
+        self._pagina = 0
+        self._desenhar_pagina()
+
+    def _ir_para(self, pagina: int) -> None:
+        paginas = max(1, -(-len(self._posicoes) // LINHAS_POR_PAGINA))
+        pagina = max(0, min(pagina, paginas - 1))
+        if pagina != self._pagina:
+            self._pagina = pagina
+            self._desenhar_pagina()
+
+    def _celulas(self, posicao: int) -> list[str]:
+        linha = self._indice.dados[posicao]
+        celulas = []
+        for coluna in self._indice.colunas:
+            if coluna == self._indice.chave_ie and linha.get(coluna) is not None:
+                celulas.append(self._formatar_ie(str(linha.get(coluna))))
+            else:
+                celulas.append(_texto_celula(linha.get(coluna)))
+        return celulas
+
+    def _desenhar_pagina(self) -> None:
+        """Formata só as linhas da página; larguras crescem com o que já foi exibido."""
+        inicio = self._pagina * LINHAS_POR_PAGINA
+        pagina = self._posicoes[inicio: inicio + LINHAS_POR_PAGINA]
+        linhas = [self._celulas(pos) for pos in pagina]
+        for celulas in linhas:
+            for i, celula in enumerate(celulas):
+                if len(celula) > self._larguras[i]:
+                    self._larguras[i] = min(len(celula), _LARGURA_MAXIMA)
+
+        def _cel(s: str, w: int) -> str:
+            return (s[: w - 2] + "..") if len(s) > w else s.ljust(w)
+
+        texto = [
+            " | ".join(_cel(str(c), self._larguras[i]) for i, c in enumerate(self._indice.colunas)),
+            "-+-".join("-" * w for w in self._larguras),
+        ]
+        texto.extend(
+            " | ".join(_cel(c, self._larguras[i]) for i, c in enumerate(celulas))
+            for celulas in linhas
+        )
+        self._texto.configure(state="normal")
+        self._texto.delete("1.0", "end")
+        self._texto.insert("1.0", "\n".join(texto))
+        self._texto.configure(state="disabled")
+
+        total = len(self._posicoes)
+        paginas = max(1, -(-total // LINHAS_POR_PAGINA))
+        self._lbl_pagina.configure(
+            text=(
+                f"Página {self._pagina + 1} de {paginas}  |  "
+                f"{total} de {len(self._indice.dados)} linhas"
+            )
+        )
+        self._btn_anterior.configure(state="normal" if self._pagina > 0 else "disabled")
+        self._btn_proxima.configure(state="normal" if self._pagina < paginas - 1 else "disabled")
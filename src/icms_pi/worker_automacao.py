@@ -0,0 +1,403 @@
+"""
+Processo worker da automação: os motores (Playwright, HTTP) rodam fora do processo da GUI.
+
+A GUI cria um ``ProcessoAutomacao`` e o mantém vivo entre os lotes; o worker é iniciado com
+``spawn`` (interpretador limpo, sem Tk) e conversa com a GUI por um ``Pipe`` de dicionários:
+
+- GUI → worker: ``executar`` (itens por processo, processos, headless, motor, sonda, caminho do
+  diário), ``pausar``, ``retomar``, ``cancelar`` e ``encerrar``;
+- worker → GUI: ``progresso`` (eventos de ``icms_pi.progresso``), ``log`` (registros a partir
+  de ``LOG_NIVEL_ARQUIVO``, que a GUI grava no arquivo da execução dela e mostra INFO+ no painel;
+  o worker não tem arquivo de log próprio) e ``fim`` (IEs com sucesso e com erro).
+
+Cada resultado terminal de I.E. (sucesso, falha, pulada) é gravado pelo worker no diário do lote
+(``icms_pi.diario_execucao``) no momento em que acontece. Se o worker cair no meio do lote, a
+GUI o reinicia (até ``WORKER_REINICIOS_MAXIMOS`` vezes) só com as I.E.s pendentes do diário; sem
+reinícios restantes, as pendentes voltam como erro. O resultado do lote reiniciado é remontado
+a partir do diário.
+"""
+
+import concurrent.futures
+import logging
+import multiprocessing
+import queue
+import threading
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from icms_pi import configuracoes
+from icms_pi.controle_execucao import (
+    ControleExecucao,
+    LoteRecusadoPelaSonda,
+    registrar_controle,
+)
+from icms_pi.diario_execucao import (
+    RESULTADO_FALHA,
+    RESULTADO_PULADA,
+    RESULTADO_SUCESSO,
+    DiarioExecucao,
+    item_serializavel,
+)
+from icms_pi.logger import adicionar_destino, configurar_logger_da_aplicacao, nivel_do_arquivo
+from icms_pi.progresso import FilaProgresso, registrar_fila_progresso
+from icms_pi.telemetria import encerrar_telemetria, iniciar_telemetria
+
+if TYPE_CHECKING:
+    import asyncio
+
+logger = configurar_logger_da_aplicacao(__name__)
+# Registros vindos do worker, regravados no log da GUI
+logger_worker = configurar_logger_da_aplicacao("icms_pi.worker")
+
+_RESULTADOS_TERMINAIS = {RESULTADO_SUCESSO, RESULTADO_FALHA, RESULTADO_PULADA}
+MOTIVO_WORKER_ENCERRADO = "worker encerrado inesperadamente"
+_ESPERA_ENCERRAMENTO_S = 5.0
+
+
+class _CanalIpc:
+    """Envio pelo pipe a partir de várias threads (lote, listener do logging, leitor)."""
+
+    def __init__(self, conexao: Connection) -> None:
+        self._conexao = conexao
+        self._trava = threading.Lock()
+
+    def enviar(self, mensagem: dict[str, object]) -> bool:
+        with self._trava:
+            try:
+                self._conexao.send(mensagem)
+                return True
+            except (OSError, ValueError):
+                return False
+
+
+# ---------------------------------------------------------------------------
+# Lado do worker (processo filho)
+# ---------------------------------------------------------------------------
+
+class HandlerIpc(logging.Handler):
+    """
+    Destino do logging em processos filhos (worker, partições do lote): manda os registros ao
+    processo pai, que os grava. ``canal`` é qualquer objeto com ``enviar(mensagem) -> bool``.
+    """
+
+    def __init__(self, canal: _CanalIpc) -> None:
+        super().__init__(level=nivel_do_arquivo())
+        self.setFormatter(logging.Formatter("%(message)s"))
+        self._canal = canal
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            mensagem = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        self._canal.enviar(
+            {"tipo": "log", "nivel": record.levelno, "nome": record.name, "mensagem": mensagem}
+        )
+
+
+class _ProgressoIpc(FilaProgresso):
+    """Fila de progresso do worker: repassa o evento à GUI e grava os terminais no diário."""
+
+    def __init__(self, canal: _CanalIpc, diario: DiarioExecucao) -> None:
+        super().__init__()
+        self._canal = canal
+        self._diario = diario
+
+    def emitir(self, evento: dict[str, object]) -> None:
+        if evento["tipo"] in _RESULTADOS_TERMINAIS:
+            self._diario.registrar_ie(
+                str(evento["processo"]), str(evento["ie"]), str(evento["tipo"]),
+                str(evento.get("detalhe") or ""),
+            )
+        self._canal.enviar({"tipo": "progresso", "evento": evento})
+
+
+def _ler_comandos(conexao: Connection, comandos: queue.SimpleQueue) -> None:
+    """Thread do worker: pausa/retomada/cancelamento valem na hora; lotes vão para a fila."""
+    controle: ControleExecucao | None = None
+    while True:
+        try:
+            mensagem = conexao.recv()
+        except (EOFError, OSError):
+            # GUI fechou o pipe: cancela o lote em curso e encerra
+            if controle is not None:
+                controle.cancelar()
+            comandos.put(({"tipo": "encerrar"}, None))
+            return
+        tipo = mensagem.get("tipo")
+        if tipo == "executar":
+            controle = ControleExecucao()
+            comandos.put((mensagem, controle))
+        elif tipo in ("pausar", "retomar", "cancelar"):
+            if controle is not None:
+                getattr(controle, tipo)()
+        elif tipo == "encerrar":
+            if controle is not None:
+                controle.cancelar()
+            comandos.put((mensagem, None))
+            return
+
+
+def _executar_no_worker(
+    loop: "asyncio.AbstractEventLoop",
+    canal: _CanalIpc,
+    pedido: dict[str, object],
+    controle: ControleExecucao,
+) -> None:
+    from icms_pi.execucao_lote import executar_lote
+
+    diario = DiarioExecucao(Path(str(pedido["diario"])))
+    lista_por_processo: dict[str, list[dict[str, object]]] = pedido["lista_por_processo"]
+    registrar_fila_progresso(_ProgressoIpc(canal, diario))
+    registrar_controle(controle)
+    iniciar_telemetria()
+    recusa: list[str] | None = None
+    try:
+        ies_ok, ies_erro = loop.run_until_complete(
+            executar_lote(
+                lista_por_processo, list(pedido["processos_ids"]), bool(pedido["headless"]),
+                motor=pedido.get("motor"), sondar=bool(pedido.get("sondar")),
+            )
+        )
+    except LoteRecusadoPelaSonda as e:
+        ies_ok, ies_erro, recusa = [], [], e.motivos
+    except Exception as e:
+        logger.exception("Falha no lote do worker.")
+        # O que terminou está no diário; o restante volta como erro
+        ies_ok, ies_erro = diario.resultados()
+        ies_erro += [
+            (str(item.get("ie", "")), f"Erro no worker: {e}")
+            for itens in diario.pendentes().values() for item in itens
+        ]
+    finally:
+        registrar_controle(None)
+        registrar_fila_progresso(None)
+        encerrar_telemetria()
+    canal.enviar({
+        "tipo": "fim", "ok": ies_ok, "erro": ies_erro, "cancelado": controle.cancelado,
+        "recusado_pela_sonda": recusa,
+    })
+
+
+def _principal_worker(conexao: Connection) -> None:
+    """Ponto de entrada do processo worker: um event loop persistente, um lote por vez."""
+    import asyncio
+
+    canal = _CanalIpc(conexao)
+    adicionar_destino(HandlerIpc(canal))
+    comandos: queue.SimpleQueue = queue.SimpleQueue()
+    threading.Thread(
+        target=_ler_comandos, args=(conexao, comandos), name="worker-comandos", daemon=True
+    ).start()
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        while True:
+            pedido, controle = comandos.get()
+            if pedido["tipo"] == "encerrar":
+                break
+            _executar_no_worker(loop, canal, pedido, controle)
+    finally:
+        loop.close()
+
+
+# ---------------------------------------------------------------------------
+# Lado da GUI
+# ---------------------------------------------------------------------------
+
+class ControleRemoto(ControleExecucao):
+    """Controle do lote na GUI: mantém o estado local e repassa os comandos ao worker."""
+
+    def __init__(self, canal: _CanalIpc) -> None:
+        super().__init__()
+        self._canal = canal
+
+    def pausar(self) -> None:
+        super().pausar()
+        self._canal.enviar({"tipo": "pausar"})
+
+    def retomar(self) -> None:
+        super().retomar()
+        self._canal.enviar({"tipo": "retomar"})
+
+    def cancelar(self) -> None:
+        super().cancelar()
+        self._canal.enviar({"tipo": "cancelar"})
+
+
+class ProcessoAutomacao:
+    """Worker da automação gerenciado pela GUI (iniciado no primeiro lote, reiniciado se cair)."""
+
+    def __init__(self) -> None:
+        self._processo: multiprocessing.process.BaseProcess | None = None
+        self._conexao: Connection | None = None
+        self._canal: _CanalIpc | None = None
+        self._controle: ControleRemoto | None = None
+
+    def _iniciar(self) -> None:
+        contexto = multiprocessing.get_context("spawn")
+        conexao_gui, conexao_worker = contexto.Pipe()
+        self._processo = contexto.Process(
+            target=_principal_worker, args=(conexao_worker,),
+            name="icms-pi-worker", daemon=True,
+        )
+        self._processo.start()
+        conexao_worker.close()
+        self._conexao = conexao_gui
+        self._canal = _CanalIpc(conexao_gui)
+        if self._controle is not None:
+            self._controle._canal = self._canal
+        logger.info("Worker da automação iniciado (pid %s).", self._processo.pid)
+
+    def _garantir_vivo(self) -> None:
+        if self._processo is None or not self._processo.is_alive():
+            self._descartar()
+            self._iniciar()
+
+    def _descartar(self) -> int | None:
+        """Fecha o pipe e espera (ou mata) o processo; devolve o código de saída."""
+        codigo = None
+        if self._conexao is not None:
+            self._conexao.close()
+        if self._processo is not None:
+            self._processo.join(timeout=_ESPERA_ENCERRAMENTO_S)
+            if self._processo.is_alive():
+                self._processo.kill()
+                self._processo.join()
+            codigo = self._processo.exitcode
+        self._processo = self._conexao = self._canal = None
+        return codigo
+
+    def _enviar_lote(
+        self,
+        lista_por_processo: dict[str, list[dict[str, object]]],
+        processos_ids: list[str],
+        headless: bool,
+        motor: str | None,
+        sondar: bool,
+        diario: DiarioExecucao,
+    ) -> None:
+        self._canal.enviar({
+            "tipo": "executar",
+            "lista_por_processo": {
+                pid: [item_serializavel(item) for item in itens]
+                for pid, itens in lista_por_processo.items()
+            },
+            "processos_ids": processos_ids,
+            "headless": headless,
+            "motor": motor,
+            "sondar": sondar,
+            "diario": str(diario.caminho),
+        })
+
+    def executar(
+        self,
+        lista_por_processo: dict[str, list[dict[str, object]]],
+        processos_ids: list[str],
+        headless: bool,
+        motor: str | None,
+        sondar: bool,
+        fila_progresso: FilaProgresso | None,
+    ) -> tuple[ControleRemoto, concurrent.futures.Future]:
+        """Envia o lote ao worker; o futuro recebe (IEs com sucesso, (IE, motivo) com erro)."""
+        self._garantir_vivo()
+        diario = DiarioExecucao.novo()
+        logger.info(
+            "Lote enviado ao worker: processos=%s, total itens=%s, headless=%s, motor=%s, diário=%s",
+            processos_ids, sum(len(itens) for itens in lista_por_processo.values()),
+            headless, motor or configuracoes.MOTOR_AUTOMACAO, diario.caminho.name,
+        )
+        diario.registrar_lote(lista_por_processo, processos_ids, headless, motor, sondar)
+        self._controle = ControleRemoto(self._canal)
+        self._enviar_lote(lista_por_processo, processos_ids, headless, motor, sondar, diario)
+        futuro: concurrent.futures.Future = concurrent.futures.Future()
+        threading.Thread(
+            target=self._acompanhar_lote,
+            args=(self._controle, diario, processos_ids, headless, motor, fila_progresso, futuro),
+            name="worker-acompanhamento",
+            daemon=True,
+        ).start()
+        return self._controle, futuro
+
+    def _acompanhar_lote(
+        self,
+        controle: ControleRemoto,
+        diario: DiarioExecucao,
+        processos_ids: list[str],
+        headless: bool,
+        motor: str | None,
+        fila_progresso: FilaProgresso | None,
+        futuro: concurrent.futures.Future,
+    ) -> None:
+        """Lê as mensagens do worker até o fim do lote, reiniciando-o se ele cair."""
+        reinicios = 0
+        while True:
+            try:
+                mensagem = self._conexao.recv()
+            except (EOFError, OSError):
+                codigo = self._descartar()
+                pendentes = diario.pendentes()
+                restantes = sum(len(itens) for itens in pendentes.values())
+                if (
+                    controle.cancelado or not restantes
+                    or reinicios >= configuracoes.WORKER_REINICIOS_MAXIMOS
+                ):
+                    logger.error(
+                        "Worker da automação encerrado (código %s); %d I.E.(s) não executada(s).",
+                        codigo, restantes,
+                    )
+                    ies_ok, ies_erro = diario.resultados()
+                    ies_erro += [
+                        (str(item.get("ie", "")), MOTIVO_WORKER_ENCERRADO)
+                        for itens in pendentes.values() for item in itens
+                    ]
+                    diario.registrar({"tipo": "fim", "sucesso": len(ies_ok),
+                                      "erro": len(ies_erro), "cancelado": controle.cancelado})
+                    futuro.set_result((ies_ok, ies_erro))
+                    return
+                reinicios += 1
+                logger.warning(
+                    "Worker da automação encerrado (código %s); reiniciando (%d/%d) com %d "
+                    "I.E.(s) pendente(s).",
+                    codigo, reinicios, configuracoes.WORKER_REINICIOS_MAXIMOS, restantes,
+                )
+                diario.registrar({"tipo": "reinicio", "tentativa": reinicios})
+                self._iniciar()
+                self._enviar_lote(pendentes, processos_ids, headless, motor, False, diario)
+                if controle.pausado:
+                    self._canal.enviar({"tipo": "pausar"})
+                continue
+
+            tipo = mensagem.get("tipo")
+            if tipo == "progresso":
+                if fila_progresso is not None:
+                    fila_progresso.emitir(mensagem["evento"])
+            elif tipo == "log":
+                # Mantém o nome do logger de origem no arquivo da GUI
+                logger_worker.handle(logger_worker.makeRecord(
+                    str(mensagem.get("nome") or logger_worker.name), int(mensagem["nivel"]),
+                    "", 0, "%s", (mensagem["mensagem"],), None,
+                ))
+            elif tipo == "fim" and mensagem.get("recusado_pela_sonda") is not None:
+                # Nenhuma I.E. executada: a recusa sobe à parte dos erros por I.E.
+                diario.registrar({"tipo": "fim", "sucesso": 0, "erro": 0, "cancelado": False,
+                                  "recusado_pela_sonda": mensagem["recusado_pela_sonda"]})
+                futuro.set_exception(LoteRecusadoPelaSonda(mensagem["recusado_pela_sonda"]))
+                return
+            elif tipo == "fim":
+                ies_ok, ies_erro = mensagem["ok"], mensagem["erro"]
+                if reinicios:
+                    ies_ok, ies_erro = diario.resultados()
+                diario.registrar({"tipo": "fim", "sucesso": len(ies_ok),
+                                  "erro": len(ies_erro), "cancelado": mensagem["cancelado"]})
+                futuro.set_result((ies_ok, ies_erro))
+                return
+
+    def encerrar(self) -> None:
+        """Pede ao worker que termine (cancelando o lote em curso) e espera sua saída."""
+        if self._canal is not None:
+            self._canal.enviar({"tipo": "encerrar"})
+        self._descartar()
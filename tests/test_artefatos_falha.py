@@ -0,0 +1,43 @@
+"""Deduplicação de capturas do ``ColetorArtefatosFalha`` (sem navegador)."""
+
+import pytest
+
+from atc.navegacao.artefatos_falha import ColetorArtefatosFalha, telas_semelhantes
+from icms_pi import configuracoes
+
+
+@pytest.fixture
+def coletor(tmp_path, monkeypatch):
+    monkeypatch.setattr(configuracoes, "PASTA_CAPTURAS_ERROS_ABSOLUTA", tmp_path)
+    return ColetorArtefatosFalha("antecipado")
+
+
+def _registrar(coletor, assinatura, hash_tela, nome):
+    # O que registrar_falha faz com uma tela nova, sem a página
+    coletor._assinaturas.setdefault(assinatura, []).append((hash_tela, nome))
+    coletor._capturas_a_gravar.add(nome)
+    coletor._gravar(
+        {"assinatura": assinatura, "hash_tela": hash_tela, "captura": nome, "repetida": False},
+        {nome: b"\xff" * 1024},
+    )
+
+
+def test_hash_perceptual_separa_telas_da_mesma_assinatura(coletor):
+    _registrar(coletor, "a", "00000000000000ff", "tela_1.jpg")
+    assert coletor._captura_semelhante("a", "00000000000000fe") == "tela_1.jpg"
+    assert coletor._captura_semelhante("a", "ffffffff00000000") is None
+    assert telas_semelhantes(None, "ffffffff00000000")
+
+
+def test_captura_podada_deixa_de_valer(coletor, monkeypatch):
+    _registrar(coletor, "a", "00000000000000ff", "tela_1.jpg")
+    monkeypatch.setattr(configuracoes, "ARTEFATOS_ORCAMENTO_DISCO_MB", 0)
+    _registrar(coletor, "b", "00000000000000ff", "tela_2.jpg")
+    assert coletor._captura_semelhante("a", "00000000000000ff") is None
+    assert coletor._assinaturas["a"] == []
+
+
+def test_indice_recarregado_mantem_hash_das_capturas(coletor):
+    _registrar(coletor, "a", "00000000000000ff", "tela_1.jpg")
+    recarregado = ColetorArtefatosFalha("antecipado")
+    assert recarregado._captura_semelhante("a", "00000000000000ff") == "tela_1.jpg"
@@ -0,0 +1,28 @@
+"""Resultados remontados a partir do diário do lote."""
+
+from icms_pi.diario_execucao import (
+    RESULTADO_FALHA,
+    RESULTADO_PULADA,
+    RESULTADO_SUCESSO,
+    DiarioExecucao,
+)
+
+
+def test_pulada_por_valor_ausente_nao_conta_como_erro(tmp_path):
+    diario = DiarioExecucao(tmp_path / "diario.jsonl")
+    itens = [
+        {"ie": "1", "valor_atc": 0},
+        {"ie": "2", "valor_atc": 10.0},
+        {"ie": "3", "valor_atc": 10.0},
+        {"ie": "4", "valor_atc": 10.0},
+    ]
+    diario.registrar_lote({"antecipado": itens}, ["antecipado"], True, None, False)
+    diario.registrar_ie("antecipado", "1", RESULTADO_PULADA, "Valor ATC ausente")
+    diario.registrar_ie("antecipado", "2", RESULTADO_PULADA, "Data de vencimento no passado")
+    diario.registrar_ie("antecipado", "3", RESULTADO_FALHA, "Pendência cadastral")
+    diario.registrar_ie("antecipado", "4", RESULTADO_SUCESSO)
+
+    ies_ok, ies_erro = diario.resultados()
+
+    assert ies_ok == ["4"]
+    assert ies_erro == [("2", "Data de vencimento no passado"), ("3", "Pendência cadastral")]
@@ -0,0 +1,70 @@
+"""Coordenador e dois workers na mesma máquina, com o motor HTTP contra o simulador."""
+
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+from pathlib import Path
+
+from icms_pi import configuracoes
+from icms_pi.benchmark import gerar_lote
+from icms_pi.cli import SAIDA_SUCESSO
+from icms_pi.diario_execucao import DiarioExecucao
+from icms_pi.execucao_distribuida import coordenar
+from icms_pi.simulador_darweb import SimuladorDarWeb
+
+_SRC = Path(__file__).resolve().parent.parent / "src"
+
+
+def _porta_livre() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_dois_workers_dividem_o_lote_reaproveitando_o_motor(tmp_path, monkeypatch):
+    monkeypatch.setattr(configuracoes, "PASTA_SAIDA_RESULTADOS_ABSOLUTA", tmp_path)
+    lote = gerar_lote(16, semente=5)
+    diario = DiarioExecucao(tmp_path / "diario_distribuido.jsonl")
+    diario.registrar_lote({"antecipado": lote}, ["antecipado"], True, configuracoes.MOTOR_HTTP, False)
+    porta = _porta_livre()
+
+    with SimuladorDarWeb(latencia_ms=100) as simulador:
+        ambiente = dict(
+            os.environ,
+            PYTHONPATH=str(_SRC),
+            URL_PORTAL_DARWEB_SEFAZ_PI=simulador.url,
+            INTERVALO_MOTOR_HTTP_MS="0",
+            PASTA_SAIDA_RESULTADOS=str(tmp_path / "workers"),
+            LOG_NIVEL_CONSOLE="DEBUG",
+        )
+        workers = [
+            subprocess.Popen(
+                [sys.executable, "-m", "icms_pi.execucao_distribuida", "worker",
+                 f"http://127.0.0.1:{porta}", "--concorrencia", "2", "--ies-por-pedido", "2"],
+                env=ambiente, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+            )
+            for _ in range(2)
+        ]
+        try:
+            codigo, caminho = coordenar(None, [], porta=porta, retomar=diario.caminho)
+            saidas = [worker.communicate(timeout=60)[0] for worker in workers]
+        finally:
+            for worker in workers:
+                if worker.poll() is None:
+                    worker.kill()
+
+    assert codigo == SAIDA_SUCESSO
+    resultado = json.loads(caminho.read_text(encoding="utf-8"))
+    assert sorted(resultado["sucesso"]) == sorted(item["ie"] for item in lote)
+    assert resultado["erro"] == []
+    assert len(resultado["workers"]) == 2
+    assert all(worker.returncode == 0 for worker in workers)
+
+    # Várias concessões por worker, mas um só conjunto de contextos HTTP em cada um
+    concessoes = sum(len(re.findall(r"Motor HTTP \(antecipado\): \d+ IE", s)) for s in saidas)
+    assert concessoes > len(workers)
+    for saida in saidas:
+        assert saida.count("Motor HTTP (antecipado): contexto 1 aberto.") <= 1
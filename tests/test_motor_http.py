@@ -0,0 +1,85 @@
+"""Motor HTTP contra o simulador local do DAR Web (``icms_pi.simulador_darweb``)."""
+
+import asyncio
+
+import pytest
+
+from atc.navegacao.localizador_campos import _gravar_cache_disco
+from icms_pi import configuracoes
+from icms_pi.benchmark import gerar_lote
+from icms_pi.motor_http import _PROCESSOS_HTTP, _SELETOR_DO_CAMPO, MotorHttpDarWeb
+from icms_pi.simulador_darweb import SimuladorDarWeb, _deslocar_id
+
+
+@pytest.fixture(autouse=True)
+def _saidas_isoladas(tmp_path, monkeypatch):
+    monkeypatch.setattr(configuracoes, "ARQUIVO_CACHE_SELETORES", tmp_path / "cache_seletores.json")
+    monkeypatch.setattr(configuracoes, "PASTA_SAIDA_RESULTADOS_ABSOLUTA", tmp_path / "resultados")
+
+
+def _executar(processo_id, lote, **parametros_simulador):
+    with SimuladorDarWeb(**parametros_simulador) as simulador:
+        motor = MotorHttpDarWeb(processo_id, concorrencia=2, url_portal=simulador.url, intervalo_ms=0)
+        sucesso, erro = asyncio.run(motor.executar_fluxo_por_ie_pi(lote))
+    return sucesso, erro, motor.itens_para_navegador
+
+
+@pytest.mark.parametrize("processo_id", ["antecipado", "normal", "difal"])
+def test_lote_completo_no_simulador(processo_id):
+    lote = gerar_lote(6, semente=1)
+    sucesso, erro, para_navegador = _executar(processo_id, lote)
+    assert sorted(sucesso) == sorted(item["ie"] for item in lote)
+    assert erro == []
+    assert para_navegador == []
+
+
+def test_recusa_do_portal_vira_erro_sem_fallback():
+    lote = gerar_lote(3, semente=2)
+    sucesso, erro, para_navegador = _executar("antecipado", lote, taxa_erro=1.0)
+    assert sucesso == []
+    assert sorted(ie for ie, _motivo in erro) == sorted(item["ie"] for item in lote)
+    assert para_navegador == []
+
+
+def test_valor_invalido_e_pulado_sem_ir_ao_portal():
+    lote = gerar_lote(2, semente=3)
+    lote[0]["valor_atc"] = 0
+    sucesso, erro, _ = _executar("antecipado", lote)
+    assert sucesso == [lote[1]["ie"]]
+    assert erro == []
+
+
+
+@pytest.mark.parametrize("processo_id", ["antecipado", "normal", "difal"])
+def test_ids_jsf_renomeados_sem_cache_seguem_para_o_navegador(processo_id):
+    lote = gerar_lote(3, semente=4)
+    sucesso, erro, para_navegador = _executar(processo_id, lote, deslocamento_ids=3)
+    assert sucesso == []
+    assert erro == []
+    assert sorted(item["ie"] for item in para_navegador) == sorted(item["ie"] for item in lote)
+
+
+@pytest.mark.parametrize("processo_id", ["antecipado", "normal", "difal"])
+def test_ids_jsf_renomeados_com_cache_do_localizador(processo_id):
+    # Seletores que o localizador do navegador gravaria após re-resolver pelas pistas; o select
+    # do código fica de fora: o id configurado cai em outro campo e o motor acha o select
+    # pela opção do processo
+    processo = _PROCESSOS_HTTP[processo_id]
+    modulo = processo["configuracoes"]
+    _gravar_cache_disco(str(processo["nome"]), {
+        campo: _deslocar_id(getattr(modulo, constante), 3)
+        for campo, constante in _SELETOR_DO_CAMPO.items()
+        if campo != "select_codigo" and hasattr(modulo, constante)
+    })
+    lote = gerar_lote(3, semente=4)
+    sucesso, erro, para_navegador = _executar(processo_id, lote, deslocamento_ids=3)
+    assert sorted(sucesso) == sorted(item["ie"] for item in lote)
+    assert erro == []
+    assert para_navegador == []
+
+def test_ie_sem_digitos_falha_como_no_navegador():
+    lote = gerar_lote(2, semente=5)
+    lote[0]["ie_digitos"] = ""
+    sucesso, erro, _ = _executar("antecipado", lote)
+    assert sucesso == [lote[1]["ie"]]
+    assert erro == [(lote[0]["ie"], "IE inválida ou vazia")]
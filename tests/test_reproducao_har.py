@@ -0,0 +1,51 @@
+"""Casamento de requisições do ``ReprodutorHar`` (sem navegador)."""
+
+import json
+from types import SimpleNamespace
+
+from atc.navegacao.reproducao_har import ReprodutorHar
+
+_URL = "http://portal/darweb/faces/views/index.xhtml"
+
+
+def _entrada(corpo, texto):
+    return {
+        "request": {"method": "POST", "url": _URL, "postData": {"text": corpo}},
+        "response": {"status": 200, "headers": [], "content": {"text": texto}},
+    }
+
+
+def _reprodutor(tmp_path, entradas):
+    caminho = tmp_path / "sessao.har"
+    caminho.write_text(json.dumps({"log": {"entries": entradas}}), encoding="utf-8")
+    return ReprodutorHar(caminho)
+
+
+def _texto(reprodutor, corpo):
+    resposta = reprodutor._resposta_para(SimpleNamespace(method="POST", url=_URL, post_data=corpo))
+    return resposta["content"]["text"]
+
+
+def test_resposta_consumida_num_nivel_nao_volta_por_outro(tmp_path):
+    reprodutor = _reprodutor(tmp_path, [
+        _entrada("ie=1&javax.faces.ViewState=a", "primeira"),
+        _entrada("ie=2&javax.faces.ViewState=b", "segunda"),
+    ])
+    assert _texto(reprodutor, "ie=1&javax.faces.ViewState=x") == "primeira"
+    # Mesmos nomes de campos, outro valor: a "primeira" já foi servida
+    assert _texto(reprodutor, "ie=3&javax.faces.ViewState=y") == "segunda"
+
+
+def test_chave_esgotada_repete_a_ultima(tmp_path):
+    reprodutor = _reprodutor(tmp_path, [_entrada("ie=1", "unica")])
+    assert _texto(reprodutor, "ie=1") == "unica"
+    assert _texto(reprodutor, "ie=1") == "unica"
+
+
+def test_periodo_e_datas_de_outro_mes_casam_no_nivel_exato(tmp_path):
+    reprodutor = _reprodutor(tmp_path, [
+        _entrada("periodo=03/2025&venc=15/03/2025&ie=1", "gravada"),
+        _entrada("periodo=04/2025&venc=15/04/2025&ie=2", "outra"),
+    ])
+    # Reprodução com o período movido para um mês válido: ainda casa a I.E. 2 pelos valores
+    assert _texto(reprodutor, "periodo=11/2026&venc=15/11/2026&ie=2") == "outra"